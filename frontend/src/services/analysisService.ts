@@ -11,6 +11,67 @@ export const analysisService = {
     return response.data;
   },
 
+  /**
+   * Analyze a whole watchlist in one request. The server streams NDJSON events
+   * (`result` / `error` per symbol, then `done`); onEvent is called for each as it arrives.
+   */
+  analyzeBatch: async (
+    symbols: string[],
+    options: { analysisType?: string; mode?: 'fast' | 'full' | 'auto' } = {},
+    onEvent: (event: any) => void = () => {}
+  ): Promise<any[]> => {
+    const events: any[] = [];
+    let consumed = 0;
+    const consume = (text: string, final: boolean) => {
+      const end = final ? text.length : text.lastIndexOf('\n') + 1;
+      text.slice(consumed, end).split('\n').filter((line) => line.trim()).forEach((line) => {
+        const event = JSON.parse(line);
+        events.push(event);
+        onEvent(event);
+      });
+      consumed = Math.max(consumed, end);
+    };
+    const response = await api.post(
+      '/analysis/batch',
+      { symbols, analysis_type: options.analysisType, mode: options.mode },
+      {
+        responseType: 'text',
+        onDownloadProgress: (progress) => consume(progress.event?.target?.responseText ?? '', false),
+      }
+    );
+    consume(response.data, true);
+    return events;
+  },
+
+  /**
+   * Poll a background LLM enrichment started by an `auto` mode analysis
+   */
+  getAnalysisJob: async (jobId: string): Promise<any> => {
+    const response = await api.get(`/analysis/jobs/${jobId}`);
+    return response.data;
+  },
+
+  /**
+   * Stored analyses for a symbol, newest first; pass next_cursor to page further
+   */
+  getAnalysisHistory: async (
+    symbol: string,
+    options: { analysisType?: string; limit?: number; cursor?: string } = {}
+  ): Promise<any> => {
+    const response = await api.get(`/analysis/history/${symbol}`, {
+      params: { analysis_type: options.analysisType, limit: options.limit, cursor: options.cursor },
+    });
+    return response.data;
+  },
+
+  /**
+   * Latest stored analysis for each symbol of a watchlist in one request
+   */
+  getLatestAnalyses: async (symbols: string[], analysisType?: string): Promise<any> => {
+    const response = await api.post('/analysis/history/latest', { symbols, analysis_type: analysisType });
+    return response.data;
+  },
+
   /**
    * Get sentiment analysis for a stock
    */
@@ -20,10 +81,22 @@ export const analysisService = {
   },
 
   /**
-   * Get technical analysis for a stock
+   * Get technical analysis for a stock.
+   * Series come back as column arrays (series.timestamp, series.close, series.rsi, ...),
+   * downsampled server-side to at most maxPoints points.
    */
-  getTechnicalAnalysis: async (symbol: string): Promise<any> => {
-    const response = await api.post(`/analysis/technical/${symbol}`);
+  getTechnicalAnalysis: async (
+    symbol: string,
+    options: { period?: string; interval?: string; indicators?: string[]; maxPoints?: number } = {}
+  ): Promise<any> => {
+    const response = await api.post(`/analysis/technical/${symbol}`, null, {
+      params: {
+        period: options.period,
+        interval: options.interval,
+        indicators: options.indicators?.join(','),
+        max_points: options.maxPoints,
+      },
+    });
     return response.data;
   },
 
@@ -45,4 +118,20 @@ export const analysisService = {
     const response = await api.get(`/analysis/fear-greed/${symbol}`);
     return response.data;
   },
+
+  /**
+   * Get Fear & Greed Index for many stocks at once (e.g. every holding)
+   */
+  getFearGreedBulk: async (symbols: string[], includeNews = false): Promise<any> => {
+    const response = await api.post('/analysis/fear-greed/bulk', { symbols, include_news: includeNews });
+    return response.data;
+  },
+
+  /**
+   * Get the market-wide Fear & Greed Index
+   */
+  getMarketFearGreed: async (): Promise<any> => {
+    const response = await api.get('/analysis/fear-greed/market');
+    return response.data;
+  },
 };
\ No newline at end of file
@@ -123,6 +123,9 @@ export interface AIAnalysis {
   summary: string;
   recommendation: string;
   confidence_score: number;
+  price_target?: number | null;
+  mode?: 'fast' | 'full' | 'auto';
+  narrative_status?: 'generated' | 'cached' | 'stored' | 'pending' | 'none';
   key_points: string[];
   risks: string[];
   opportunities: string[];
@@ -137,11 +140,13 @@ export interface AnalysisRequest {
   include_technical?: boolean;
   include_sentiment?: boolean;
   custom_prompt?: string;
+  mode?: 'fast' | 'full' | 'auto';
 }
 
 export interface AnalysisResponse {
   success: boolean;
   data?: AIAnalysis;
+  job_id?: string | null;
   error?: string;
   processing_time: number;
 }
@@ -7,26 +7,162 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8083
     DEBUG: bool = True
+    WORKERS: int = 1  # worker processes; each gets its own event loop and connection pools
+    UVICORN_LOOP: str = "auto"  # auto, uvloop or asyncio
+    UVICORN_HTTP: str = "auto"  # auto, httptools or h11
+    SHUTDOWN_DRAIN_TIMEOUT: int = 30  # seconds to let in-flight LLM jobs finish on shutdown
+    PRELOAD_MODULES: bool = True  # import deferred heavy modules (NumPy, httpx) in the background once serving
     
     # Ollama settings
     OLLAMA_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama2"  # or mistral, codellama, etc.
+    OLLAMA_FAST_MODEL: Optional[str] = None  # smaller model used while the generation queue is deep, e.g. llama3.2:1b
+    OLLAMA_FAST_MODEL_QUEUE_DEPTH: int = 4  # in-flight generations (per worker) before new ones use the fast model
+    OLLAMA_KEEP_ALIVE: str = "30m"  # how long Ollama keeps a model loaded after the last request ("-1" = forever)
+    OLLAMA_PRELOAD: bool = True  # load the model(s) at startup so the first request doesn't pay for it
+    OLLAMA_KEEP_ALIVE_INTERVAL: int = 600  # seconds between pings of idle models (0 disables); keep below OLLAMA_KEEP_ALIVE
+    OLLAMA_LOAD_TIMEOUT: float = 300.0  # seconds allowed for a model load
+    OLLAMA_NUM_CTX: int = 4096  # context window; must fit PROMPT_TOKEN_BUDGET + MAX_ANALYSIS_LENGTH
+    OLLAMA_NUM_THREAD: int = 0  # CPU threads per generation (0 = Ollama default)
+    OLLAMA_EMBED_MODEL: str = "nomic-embed-text"  # local embedding model (semantic cache, news retrieval)
+    OLLAMA_JSON_SCHEMA: bool = True  # constrain structured replies with a JSON schema (Ollama 0.5+); False = plain JSON mode
     
-    # Database settings (optional - for caching analysis)
+    # Database settings (optional - shared analysis store when ANALYSIS_STORE=postgres)
     DB_HOST: Optional[str] = "localhost"
     DB_PORT: Optional[int] = 5432
     DB_USER: Optional[str] = "natols_user"
     DB_PASSWORD: Optional[str] = "natols_password"
     DB_NAME: Optional[str] = "natols_db"
     
+    # Redis (optional - shares rate limits and coalesced work across workers)
+    REDIS_URL: Optional[str] = None  # e.g. redis://redis:6379/0
+    
     # External API keys (optional)
     ALPHA_VANTAGE_API_KEY: Optional[str] = None
     NEWS_API_KEY: Optional[str] = None
+    ALPHA_VANTAGE_URL: str = "https://www.alphavantage.co/query"
+    NEWS_API_URL: str = "https://newsapi.org/v2/everything"
+    ALPHA_VANTAGE_RATE_LIMIT: int = 0  # calls per minute across all workers (0 = unlimited)
+    NEWS_API_RATE_LIMIT: int = 0  # calls per minute across all workers (0 = unlimited)
+    RATE_LIMIT_MAX_WAIT: float = 10.0  # longest a call waits for a rate-limit slot before failing
+    
+    # Request deadlines (upstream timeouts are capped by the time a request has left)
+    DEADLINE_HEADER: str = "X-Request-Timeout"  # seconds the caller is still willing to wait
+    DEADLINE_ROUTE_BUDGETS: str = "/analysis/stock=150,/analysis/generate=150,/analysis/stock/stream=300,/analysis/batch=900"  # path prefix=seconds
+    DEADLINE_RESERVE: float = 0.25  # seconds kept back to build and send the response
+    DEADLINE_MIN_LLM_SECONDS: float = 5.0  # an LLM narrative isn't started with less time left; the response omits it
+    DEADLINE_MIN_FETCH_SECONDS: float = 1.0  # same for optional upstream fetches (news sentiment)
+    
+    # Hedged market-data requests (a second copy is sent when the first is slower than usual)
+    HEDGE_ENABLED: bool = True
+    HEDGE_QUANTILE: float = 0.95  # hedge after this quantile of recent latencies
+    HEDGE_MAX_RATIO: float = 0.1  # most calls that may be hedged
+    HEDGE_MIN_SAMPLES: int = 20  # latencies seen per endpoint before hedging starts
+    
+    # Response compression and conditional requests
+    COMPRESSION_MIN_SIZE: int = 1024  # JSON bodies below this many bytes go out uncompressed (streams always compress)
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; br is offered only when the brotli package is installed
+    RESPONSE_MAX_AGE: int = 0  # Cache-Control max-age for ETag-ed responses (0 = revalidate every time)
+    
+    # Upstream HTTP pool (one per worker)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE: int = 20
     
     # Analysis settings
-    MAX_ANALYSIS_LENGTH: int = 2000
+    MAX_ANALYSIS_LENGTH: int = 2000  # max tokens generated per analysis (Ollama num_predict)
+    PROMPT_TOKEN_BUDGET: int = 1500  # estimated tokens (system + prompt) per LLM call; optional data is dropped beyond it
     ENABLE_CACHING: bool = True
     CACHE_TTL: int = 3600  # 1 hour
+    ENRICHMENT_JOB_TTL: int = 3600  # seconds a background LLM enrichment job stays queryable
+    COALESCE_RESULT_TTL: int = 15  # seconds a coalesced stock snapshot is shared between workers
+    HISTORY_DB_PATH: str = "data/history.db"  # local OHLCV store (SQLite)
+    INTRADAY_CACHE_TTL: int = 300  # seconds stored 1/5/15/60min bars count as fresh (capped by CACHE_TTL)
+    INTRADAY_RETENTION_DAYS: int = 90  # stored intraday bars older than this are dropped on sync (0 = keep all)
+    INTRADAY_EXTENDED_HOURS: bool = True  # include pre- and post-market intraday bars
+    MARKET_TIMEZONE: str = "US/Eastern"  # exchange clock: intraday bars roll up into days, weeks and months at its midnight
+    ANALYSIS_STORE: str = "sqlite"  # where generated analyses persist: sqlite, postgres (DB_* settings) or none
+    ANALYSIS_DB_PATH: str = "data/analysis.db"  # SQLite file for ANALYSIS_STORE=sqlite
+    ANALYSIS_HISTORY_LIMIT: int = 50  # stored analyses kept per symbol and analysis type
+    BATCH_MAX_SYMBOLS: int = 50  # largest watchlist accepted by /analysis/batch
+    BATCH_CONCURRENCY: int = 8  # upstream fetches / LLM calls in flight per batch
+    TECHNICAL_MAX_POINTS: int = 500  # series longer than this are downsampled for charting
+    
+    # Alerts
+    ALERT_DB_PATH: str = "data/alerts.db"  # alert rules (SQLite, shared by the workers on a host)
+    ALERT_SEED_INTERVAL: str = "daily"  # history replayed to warm up indicators for new symbols ("" = live bars only)
+    ALERT_WEBHOOK_URL: Optional[str] = None  # POST fired alerts here
+    ALERT_REDIS_CHANNEL: str = "alerts"  # publish fired alerts here when Redis is configured ("" = off)
+    
+    # Compute executor (CPU-bound NumPy work off the event loop)
+    COMPUTE_WORKERS: int = 2  # processes per service worker for heavy jobs, started on first use (0 = threads)
+    COMPUTE_INLINE_COST: int = 200000  # jobs with fewer array elements than this run inline
+    COMPUTE_SHM_MIN_BYTES: int = 65536  # arrays at least this large reach worker processes via shared memory
+    
+    # Backtesting
+    BACKTEST_MAX_SYMBOLS: int = 500  # largest universe accepted by /backtest/run
+    BACKTEST_MAX_COMBINATIONS: int = 500  # largest parameter grid per run
+    
+    # Monte Carlo risk simulation
+    RISK_DEFAULT_PATHS: int = 20000  # simulated paths when a request doesn't say...
+    RISK_DEFAULT_DRAWS: int = 250000000  # ...cut to keep paths × days × holdings under this (about 5 s of one core)
+    RISK_MAX_PATHS: int = 200000
+    RISK_MAX_HOLDINGS: int = 200
+    RISK_MAX_DRAWS: int = 5000000000  # paths × days × holdings per simulation
+    RISK_CHUNK_ELEMENTS: int = 4000000  # random draws held in memory at once per compute job (16 MB each)
+    RISK_FREE_RATE: float = 0.04  # annual, for Sharpe ratios
+    
+    # Mean-variance optimizer (rebalancing)
+    OPTIMIZER_FRONTIER_POINTS: int = 20  # efficient frontier points computed per run
+    OPTIMIZER_MAX_ITERATIONS: int = 5000  # solver iterations per frontier point
+    OPTIMIZER_WARM_START_TTL: int = 3600  # seconds a portfolio's solver state is kept to warm-start the next run
+    OPTIMIZER_MIN_TRADE_WEIGHT: float = 0.001  # weight changes smaller than this aren't traded
+    OPTIMIZER_MAX_WEIGHT: float = 0.4  # default cap per holding (at least 1 / holdings)
+    OPTIMIZER_MAX_TURNOVER: float = 0.25  # default one-way turnover per rebalance (at least what the caps force)
+    
+    # Fear & Greed settings
+    MARKET_UNIVERSE: str = "AAPL,MSFT,GOOGL,AMZN,NVDA,META,TSLA,JPM,V,JNJ,WMT,XOM,PG,UNH,HD"  # comma-separated
+    MARKET_NEWS_QUERY: str = "stock market"
+    FEAR_GREED_REFRESH_SECONDS: int = 900  # market-wide aggregate refresh interval (0 disables the scheduler)
+    FEAR_GREED_MAX_SYMBOLS: int = 500  # largest universe accepted by the bulk endpoint
+    FEAR_GREED_CONCURRENCY: int = 8  # concurrent history/news fetches per bulk computation
+    
+    # Semantic cache settings (answers to custom prompts, per worker)
+    SEMANTIC_CACHE_ENABLED: bool = True  # reuse the answer to a similar earlier prompt about the same symbol
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9  # cosine similarity of prompt embeddings needed for a hit
+    SEMANTIC_CACHE_SIZE: int = 2048  # prompts kept; the least recently used is evicted
+    SEMANTIC_CACHE_TTL: int = 900  # seconds an answer stays reusable
+    SEMANTIC_CACHE_MAX_PRICE_MOVE: float = 0.02  # price change (fraction) since the answer after which it is stale
+    
+    # Retrieval settings (news and filing passages added to prompts)
+    RETRIEVAL_ENABLED: bool = True  # index fetched news and add the most relevant passages to prompts
+    NEWS_INDEX_DIR: str = "data/news_index"  # memory-mapped vector files (one per symbol) and passage text
+    NEWS_INDEX_MAX_PASSAGES: int = 5000  # per symbol; the oldest passages are dropped beyond it
+    NEWS_PAGE_SIZE: int = 50  # articles per NewsAPI call (max 100); all are indexed, sentiment scores the first 10
+    RETRIEVAL_CHUNK_TOKENS: int = 120  # passage size when articles are split
+    RETRIEVAL_TOP_K: int = 8  # passages considered per prompt
+    RETRIEVAL_TOKEN_BUDGET: int = 400  # estimated tokens of passages per prompt
+    RETRIEVAL_MIN_SCORE: float = 0.3  # cosine similarity below which a passage is not relevant
+    RETRIEVAL_MAX_AGE_DAYS: int = 30  # passages older than this are not retrieved (0 = any age)
+    
+    # Event-loop monitor settings
+    LOOP_MONITOR_INTERVAL: float = 0.25  # seconds between lag probes (0 disables the monitor)
+    LOOP_SLOW_THRESHOLD: float = 0.1  # loop blocked this long past a probe gets its stack sampled
+    LOOP_MONITOR_MAX_OFFENDERS: int = 50  # distinct blocking stacks kept per worker
+    LOOP_DEBUG_ENDPOINT: bool = False  # expose GET /debug/loop (stacks reveal code paths)
+    
+    # Health probe settings
+    HEALTH_PROBE_INTERVAL: float = 15.0  # seconds between background dependency probes (0 disables them)
+    HEALTH_PROBE_TIMEOUT: float = 5.0  # per-probe timeout
+    HEALTH_FAILURE_THRESHOLD: int = 2  # consecutive failed probes before a component is unhealthy
+    HEALTH_CRITICAL_COMPONENTS: str = "ollama"  # comma-separated; /health/ready fails while one is unhealthy
+    HEALTH_PROBE_PROVIDERS: bool = True  # reachability probes of Alpha Vantage and NewsAPI (sent without API keys)
+    
+    # Tracing settings
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 1.0  # fraction of root traces recorded
+    TRACING_EXPORTER: str = "file"  # file, console or memory
+    TRACING_EXPORT_PATH: str = "traces/spans.jsonl"
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,145 @@
+# services/analysis-service/app/dependencies.py
+"""Service providers
+
+Services are built on first use instead of at import time, which keeps importing
+the app (container start, worker recycle) cheap. Routes receive them through
+``Depends``; lifespan and background code call the provider directly. Tests can
+swap any of them with ``app.dependency_overrides``.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from app.services.alert_engine import AlertEngine
+    from app.services.analysis_store import AnalysisStore
+    from app.services.backtest import BacktestService
+    from app.services.enrichment_service import EnrichmentService
+    from app.services.fear_greed_service import FearGreedService
+    from app.services.health_service import HealthService
+    from app.services.history_store import HistoryStore
+    from app.services.market_data_service import MarketDataService
+    from app.services.ollama_service import OllamaService
+    from app.services.optimizer import PortfolioOptimizer
+    from app.services.retrieval_service import RetrievalService
+    from app.services.risk import RiskService
+    from app.services.semantic_cache import SemanticCache
+    from app.services.sentiment_service import SentimentService
+    from app.services.technical_analysis import TechnicalAnalysisService
+
+
+@lru_cache(maxsize=None)
+def get_history_store() -> HistoryStore:
+    from app.services.history_store import HistoryStore
+    return HistoryStore(settings.HISTORY_DB_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_market_data_service() -> MarketDataService:
+    from app.services.market_data_service import MarketDataService
+    return MarketDataService(get_history_store())
+
+
+@lru_cache(maxsize=None)
+def get_ollama_service() -> OllamaService:
+    from app.services.ollama_service import OllamaService
+    return OllamaService()
+
+
+@lru_cache(maxsize=None)
+def get_retrieval_service() -> Optional[RetrievalService]:
+    """News passages for prompts, or None when ``RETRIEVAL_ENABLED`` is off"""
+    if not settings.RETRIEVAL_ENABLED:
+        return None
+    from app.services.news_index import NewsIndex
+    from app.services.retrieval_service import RetrievalService
+    return RetrievalService(NewsIndex(settings.NEWS_INDEX_DIR, settings.NEWS_INDEX_MAX_PASSAGES), get_ollama_service())
+
+
+@lru_cache(maxsize=None)
+def get_sentiment_service() -> SentimentService:
+    from app.services.sentiment_service import SentimentService
+    return SentimentService(get_retrieval_service())
+
+
+@lru_cache(maxsize=None)
+def get_technical_service() -> TechnicalAnalysisService:
+    from app.services.technical_analysis import TechnicalAnalysisService
+    return TechnicalAnalysisService()
+
+
+@lru_cache(maxsize=None)
+def get_fear_greed_service() -> FearGreedService:
+    from app.services.fear_greed_service import FearGreedService
+    return FearGreedService(get_market_data_service(), get_sentiment_service(), get_technical_service())
+
+
+@lru_cache(maxsize=None)
+def get_enrichment_service() -> EnrichmentService:
+    from app.services.enrichment_service import EnrichmentService
+    return EnrichmentService()
+
+
+@lru_cache(maxsize=None)
+def get_analysis_store() -> Optional[AnalysisStore]:
+    """Persistent analysis results, or None when ``ANALYSIS_STORE=none``"""
+    from app.services.analysis_store import AnalysisStore
+    if settings.ANALYSIS_STORE == "none":
+        return None
+    if settings.ANALYSIS_STORE == "postgres":
+        from psycopg.conninfo import make_conninfo
+        conninfo = make_conninfo(host=settings.DB_HOST, port=settings.DB_PORT, user=settings.DB_USER,
+                                 password=settings.DB_PASSWORD, dbname=settings.DB_NAME)
+        return AnalysisStore("postgres", conninfo=conninfo, history_limit=settings.ANALYSIS_HISTORY_LIMIT)
+    return AnalysisStore("sqlite", path=settings.ANALYSIS_DB_PATH, history_limit=settings.ANALYSIS_HISTORY_LIMIT)
+
+
+@lru_cache(maxsize=None)
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Answers to similar custom prompts, or None when ``SEMANTIC_CACHE_ENABLED`` is off"""
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    from app.services.semantic_cache import SemanticCache
+    return SemanticCache(get_ollama_service(), settings.SEMANTIC_CACHE_SIZE, settings.SEMANTIC_CACHE_TTL,
+                         settings.SEMANTIC_CACHE_THRESHOLD, settings.SEMANTIC_CACHE_MAX_PRICE_MOVE)
+
+
+@lru_cache(maxsize=None)
+def get_alert_engine() -> AlertEngine:
+    from app.services.alert_engine import AlertEngine
+    from app.services.alert_sinks import RedisPubSubSink, WebhookSink
+    from app.services.alert_store import AlertRuleStore
+    engine = AlertEngine(AlertRuleStore(settings.ALERT_DB_PATH), get_market_data_service())
+    if settings.ALERT_WEBHOOK_URL:
+        engine.add_sink(WebhookSink(settings.ALERT_WEBHOOK_URL))
+    if settings.ALERT_REDIS_CHANNEL:
+        engine.add_sink(RedisPubSubSink(settings.ALERT_REDIS_CHANNEL))
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_backtest_service() -> BacktestService:
+    from app.services.backtest import BacktestService
+    return BacktestService(get_market_data_service(), get_history_store())
+
+
+@lru_cache(maxsize=None)
+def get_risk_service() -> RiskService:
+    from app.services.risk import RiskService
+    return RiskService(get_market_data_service(), get_history_store())
+
+
+@lru_cache(maxsize=None)
+def get_portfolio_optimizer() -> PortfolioOptimizer:
+    from app.services.optimizer import PortfolioOptimizer
+    return PortfolioOptimizer(get_risk_service())
+
+
+@lru_cache(maxsize=None)
+def get_health_service() -> HealthService:
+    from app.services.health_service import HealthService
+    critical = [name.strip() for name in settings.HEALTH_CRITICAL_COMPONENTS.split(",") if name.strip()]
+    return HealthService(settings.HEALTH_PROBE_INTERVAL, settings.HEALTH_PROBE_TIMEOUT,
+                         settings.HEALTH_FAILURE_THRESHOLD, critical)
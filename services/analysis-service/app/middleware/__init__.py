@@ -0,0 +1,6 @@
+from .compression import CompressionMiddleware
+from .deadline import DeadlineMiddleware
+from .timing import TimingMiddleware
+from .tracing import TracingMiddleware
+
+__all__ = ['CompressionMiddleware', 'DeadlineMiddleware', 'TimingMiddleware', 'TracingMiddleware']
@@ -0,0 +1,142 @@
+# services/analysis-service/app/middleware/compression.py
+import asyncio
+import importlib.util
+import zlib
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson")
+# Bodies at least this large are compressed off the event loop
+THREAD_MIN_SIZE = 256 * 1024
+
+
+def negotiate(accept_encoding: str, brotli_available: bool) -> Optional[str]:
+    """Preferred encoding the client accepts: br, then gzip (None for identity)"""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding] = quality
+
+    def allowed(coding: str) -> bool:
+        return accepted.get(coding, accepted.get("*", 0.0)) > 0
+
+    if brotli_available and allowed("br"):
+        return "br"
+    if allowed("gzip"):
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            import brotli
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress and flush, so a streamed event reaches the client without waiting for more"""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """gzip or brotli for JSON and NDJSON responses, negotiated from ``Accept-Encoding``
+
+    Complete bodies are compressed once they reach ``COMPRESSION_MIN_SIZE``. Streams are
+    always compressed, flushing after every chunk so NDJSON events aren't held back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # brotli is optional; without it only gzip is offered
+        self.brotli_available = importlib.util.find_spec("brotli") is not None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for key, value in scope.get("headers", []):
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept, self.brotli_available) if accept else None
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                content_type = headers.get("content-type", "").split(";")[0].strip()
+                if (content_type not in COMPRESSIBLE_TYPES or "content-encoding" in headers
+                        or message["status"] in (204, 304)):
+                    passthrough = True
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                # Held back until the first body chunk shows whether compression pays off
+                start_message = {**message, "headers": headers.raw}
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                streaming = more_body
+                if encoding is None or (not streaming and len(body) < settings.COMPRESSION_MIN_SIZE):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if not streaming:
+                    if len(body) >= THREAD_MIN_SIZE:
+                        body = await asyncio.to_thread(compressor.finish, body)
+                    else:
+                        body = compressor.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                    await send({**start_message, "headers": headers.raw})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send({**start_message, "headers": headers.raw})
+
+            data = compressor.chunk(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,56 @@
+# services/analysis-service/app/middleware/deadline.py
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.utils import deadline
+
+
+def parse_route_budgets(value: str) -> List[Tuple[str, float]]:
+    """``/path=seconds,...`` pairs, longest path first so the most specific prefix wins"""
+    budgets = []
+    for item in value.split(","):
+        path, _, seconds = item.strip().partition("=")
+        if path and seconds:
+            budgets.append((path.rstrip("/"), float(seconds)))
+    return sorted(budgets, key=lambda budget: len(budget[0]), reverse=True)
+
+
+class DeadlineMiddleware:
+    """Give each request a deadline: the caller's remaining time, capped by the route's budget"""
+
+    def __init__(self, app):
+        self.app = app
+        self.header = settings.DEADLINE_HEADER.lower().encode("latin-1")
+        self.budgets = parse_route_budgets(settings.DEADLINE_ROUTE_BUDGETS)
+
+    def _budget(self, scope) -> Optional[float]:
+        seconds = None
+        for key, value in scope.get("headers", []):
+            if key == self.header:
+                try:
+                    seconds = float(value.decode("latin-1"))
+                except ValueError:
+                    pass
+                break
+
+        path = scope.get("path", "")
+        for prefix, budget in self.budgets:
+            if path == prefix or path.startswith(prefix + "/"):
+                seconds = budget if seconds is None else min(seconds, budget)
+                break
+
+        if seconds is None:
+            return None
+        # Keep a little back for building and sending the response
+        return max(0.0, seconds - settings.DEADLINE_RESERVE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tokens = deadline.begin(self._budget(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            deadline.end(tokens)
@@ -0,0 +1,54 @@
+# services/analysis-service/app/middleware/timing.py
+import time
+
+from app.telemetry.metrics import (
+    metrics,
+    begin_server_timing,
+    end_server_timing,
+    current_server_timings
+)
+
+
+def _format_server_timing(entries, total_ms: float) -> bytes:
+    parts = [f"{name};dur={duration:.1f}" for name, duration in entries]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class TimingMiddleware:
+    """Record request metrics and attach a Server-Timing header breaking down each request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        token = begin_server_timing()
+        status_code = 500
+        metrics.http_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _format_server_timing(current_server_timings(), total_ms)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.http_in_flight.dec()
+            end_server_timing(token)
+            # Label by route template rather than raw path to keep cardinality bounded
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            metrics.http_request_duration.observe(time.perf_counter() - start, method=method, route=route_label)
+            metrics.http_requests_total.inc(method=method, route=route_label, status=str(status_code))
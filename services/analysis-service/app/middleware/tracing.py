@@ -0,0 +1,56 @@
+# services/analysis-service/app/middleware/tracing.py
+from app.telemetry.tracing import (
+    tracer,
+    parse_traceparent,
+    set_remote_parent,
+    reset_remote_parent
+)
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class TracingMiddleware:
+    """Open a server span per request, continuing any W3C trace context from the API gateway"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        parent = parse_traceparent(_header(scope, b"traceparent"), _header(scope, b"tracestate"))
+        parent_token = set_remote_parent(parent)
+        method = scope.get("method", "")
+        span = tracer.start_as_current_span(
+            f"{method} {scope.get('path', '')}",
+            kind="server",
+            attributes={"http.method": method, "http.target": scope.get("path", "")}
+        )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if span.context is not None and span.context.sampled:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-trace-id", span.context.trace_id_hex.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            with span:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    route = scope.get("route")
+                    if span.is_recording and getattr(route, "path", None):
+                        span.name = f"{method} {route.path}"
+                        span.set_attribute("http.route", route.path)
+        finally:
+            reset_remote_parent(parent_token)
@@ -1,8 +1,10 @@
 # services/analysis-service/app/models/analysis.py
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict, Literal
 from datetime import datetime
 
+RECOMMENDATIONS = ("Strong Buy", "Buy", "Hold", "Sell", "Strong Sell")
+
 class TechnicalIndicators(BaseModel):
     rsi: Optional[float] = None
     macd: Optional[Dict[str, float]] = None
@@ -16,12 +18,55 @@ class SentimentAnalysis(BaseModel):
     sources: List[str]
     summary: str
 
+class StockAnalysisOutput(BaseModel):
+    """Structured reply requested from the LLM; its JSON schema is sent as Ollama's ``format``
+
+    Fields are declared in the order clients want them while streaming.
+    """
+    recommendation: Literal["Strong Buy", "Buy", "Hold", "Sell", "Strong Sell"]
+    confidence: float = Field(..., description="Confidence in the recommendation, 0 to 1")
+    price_target: Optional[float] = Field(None, description="12-month price target")
+    summary: str
+    key_points: List[str] = []
+    risks: List[str] = []
+    opportunities: List[str] = []
+    investor_profile: Optional[str] = Field(None, description="Investor type the stock suits best")
+    
+    @field_validator("recommendation", mode="before")
+    @classmethod
+    def normalize_recommendation(cls, value):
+        if isinstance(value, str):
+            for option in RECOMMENDATIONS:
+                if value.strip().lower() == option.lower():
+                    return option
+        return value
+    
+    @field_validator("confidence", mode="before")
+    @classmethod
+    def clamp_confidence(cls, value):
+        # Schema bounds aren't enforced by every model server; accept 0-100 and clamp
+        if isinstance(value, (int, float)):
+            value = value / 100 if value > 1 else value
+            return min(max(value, 0.0), 1.0)
+        return value
+    
+    @classmethod
+    def unstructured(cls, text: str) -> "StockAnalysisOutput":
+        """Wrap free text (custom prompts, unparseable replies) that carries no recommendation"""
+        return cls.model_construct(
+            recommendation="N/A", confidence=0.5, price_target=None, summary=text,
+            key_points=[text[:100]], risks=[], opportunities=[], investor_profile=None
+        )
+
 class AIAnalysis(BaseModel):
     stock_symbol: str
     analysis_type: str  # fundamental, technical, sentiment, comprehensive
     summary: str
     recommendation: str  # buy, sell, hold
     confidence_score: float
+    price_target: Optional[float] = None
+    mode: str = "full"  # fast, full, auto
+    narrative_status: str = "generated"  # generated, cached, similar, stored, pending, skipped (deadline), none
     key_points: List[str]
     risks: List[str]
     opportunities: List[str]
@@ -32,5 +77,7 @@ class AIAnalysis(BaseModel):
 class AnalysisResponse(BaseModel):
     success: bool
     data: Optional[AIAnalysis] = None
+    job_id: Optional[str] = None  # background LLM enrichment (mode=auto); poll /analysis/jobs/{job_id}
+    skipped: List[str] = []  # stages left out because the request deadline was near
     error: Optional[str] = None
     processing_time: float
\ No newline at end of file
@@ -1,6 +1,7 @@
 # services/analysis-service/app/models/request.py
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from datetime import date, datetime
+from typing import Dict, Optional, List, Literal
 
 class AnalysisRequest(BaseModel):
     symbol: str = Field(..., description="Stock symbol (e.g., AAPL)")
@@ -11,6 +12,22 @@ class AnalysisRequest(BaseModel):
     include_technical: bool = Field(default=True, description="Include technical analysis")
     include_sentiment: bool = Field(default=True, description="Include sentiment analysis")
     custom_prompt: Optional[str] = Field(None, description="Custom analysis prompt")
+    include_news: bool = Field(default=True, description="Add the indexed news passages most relevant to the question")
+    mode: Literal["fast", "full", "auto"] = Field(
+        default="full",
+        description="fast: computed results only; full: wait for the LLM narrative; "
+                    "auto: cached narrative if available, else fast results plus an enrichment job id"
+    )
+
+class BatchAnalysisRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, description="Stock symbols, e.g. a watchlist")
+    analysis_type: str = Field(default="comprehensive", description="Analysis type applied to every symbol")
+    include_technical: bool = Field(default=True, description="Include technical analysis")
+    include_sentiment: bool = Field(default=True, description="Include sentiment analysis")
+    mode: Literal["fast", "full", "auto"] = Field(
+        default="auto",
+        description="Tier per symbol, as for /analysis/stock; auto returns enrichment job ids for uncached narratives"
+    )
 
 class CompareRequest(BaseModel):
     symbols: List[str] = Field(..., description="List of stock symbols to compare")
@@ -19,6 +36,150 @@ class CompareRequest(BaseModel):
         description="Comparison criteria"
     )
 
+class Holding(BaseModel):
+    symbol: str = Field(..., description="Stock symbol")
+    quantity: Optional[float] = Field(None, gt=0, description="Shares held, valued at the last stored close")
+    value: Optional[float] = Field(None, gt=0, description="Market value of the position")
+
+    @model_validator(mode="after")
+    def one_size(self):
+        if (self.quantity is None) == (self.value is None):
+            raise ValueError("Set exactly one of quantity or value")
+        self.symbol = self.symbol.strip().upper()
+        return self
+
+def unique_holdings(holdings: List[Holding]) -> List[Holding]:
+    symbols = [holding.symbol for holding in holdings]
+    if len(set(symbols)) != len(symbols):
+        raise ValueError("Each symbol may appear only once in holdings")
+    return holdings
+
+class RebalanceOptions(BaseModel):
+    objective: Literal["max_sharpe", "min_variance"] = Field(default="max_sharpe", description="Portfolio the trades lead to")
+    min_weight: float = Field(default=0.0, ge=0, le=1, description="Smallest weight of each holding")
+    max_weight: Optional[float] = Field(
+        None, gt=0, le=1, description="Largest weight of each holding (default OPTIMIZER_MAX_WEIGHT); 1 = uncapped"
+    )
+    max_turnover: Optional[float] = Field(
+        None, ge=0, le=1, description="Largest fraction of the portfolio traded, one-way (default OPTIMIZER_MAX_TURNOVER); 1 = unlimited"
+    )
+    expected_returns: Optional[Dict[str, float]] = Field(
+        None, description="Annual expected return per symbol; historical means are used for the others"
+    )
+    risk_free_rate: Optional[float] = Field(None, description="Annual rate for Sharpe ratios (default RISK_FREE_RATE)")
+
+    @model_validator(mode="after")
+    def ordered_bounds(self):
+        if self.max_weight is not None and self.min_weight > self.max_weight:
+            raise ValueError("min_weight must not exceed max_weight")
+        return self
+
 class PortfolioAnalysisRequest(BaseModel):
     portfolio_id: int = Field(..., description="Portfolio ID to analyze")
-    include_recommendations: bool = Field(default=True, description="Include rebalancing recommendations")
\ No newline at end of file
+    include_recommendations: bool = Field(default=True, description="Include rebalancing recommendations")
+    holdings: Optional[List[Holding]] = Field(
+        None, min_length=1, description="Positions to analyze; simulated risk is added to the analysis"
+    )
+    horizon_days: int = Field(default=21, ge=1, le=756, description="Risk horizon in trading days")
+    rebalance: RebalanceOptions = Field(
+        default_factory=RebalanceOptions, description="Optimizer settings for the recommended trades (with holdings)"
+    )
+
+    @model_validator(mode="after")
+    def distinct_holdings(self):
+        if self.holdings:
+            unique_holdings(self.holdings)
+        return self
+
+class FearGreedBulkRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, description="Stock symbols to score in one pass")
+    include_news: bool = Field(default=False, description="Include per-symbol news sentiment (one news request per symbol)")
+
+class NewsDocument(BaseModel):
+    title: str = Field(..., description="Headline or filing title")
+    text: str = Field(..., description="Body text; split into passages before embedding")
+    url: Optional[str] = Field(None, description="Source URL; identifies the document, so it is only indexed once")
+    source: Optional[str] = Field(None, description="Publisher, e.g. Reuters or SEC 10-Q")
+    published_at: Optional[datetime] = Field(None, description="Publication time (now if omitted)")
+
+class NewsIngestRequest(BaseModel):
+    documents: List[NewsDocument] = Field(..., min_length=1, description="Articles or filings to index for a symbol")
+
+class LatestAnalysesRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, description="Stock symbols (e.g., a watchlist)")
+    analysis_type: Optional[str] = Field(None, description="Only analyses of this type; latest of any type if omitted")
+
+AlertIndicator = Literal[
+    "close", "volume", "change_percent", "rsi", "sma_20", "sma_50", "ema_12", "ema_26",
+    "macd", "macd_signal", "bb_upper", "bb_middle", "bb_lower"
+]
+
+class AlertRule(BaseModel):
+    symbol: str = Field(..., description="Stock symbol")
+    indicator: AlertIndicator = Field(..., description="Value compared on every new bar")
+    op: Literal["above", "below"] = Field(..., description="Fires when the indicator crosses above / below")
+    value: Optional[float] = Field(None, description="Fixed threshold, e.g. 30 for RSI")
+    reference: Optional[AlertIndicator] = Field(None, description="Threshold from another indicator, e.g. bb_upper")
+
+    @model_validator(mode="after")
+    def one_threshold(self):
+        if (self.value is None) == (self.reference is None):
+            raise ValueError("Set exactly one of value or reference")
+        self.symbol = self.symbol.strip().upper()
+        return self
+
+class AlertRulesRequest(BaseModel):
+    rules: List[AlertRule] = Field(..., min_length=1, description="Rules to register")
+
+class PriceBar(BaseModel):
+    symbol: str
+    timestamp: int = Field(..., description="Bar time, epoch seconds")
+    close: float
+    volume: Optional[float] = None
+
+class PriceBarsRequest(BaseModel):
+    bars: List[PriceBar] = Field(..., min_length=1, description="New bars, any mix of symbols")
+
+class RiskSimulationRequest(BaseModel):
+    holdings: List[Holding] = Field(..., min_length=1, description="Positions to simulate")
+    paths: Optional[int] = Field(None, ge=100, description="Simulated paths (default RISK_DEFAULT_PATHS, fewer beyond RISK_DEFAULT_DRAWS draws)")
+    horizon_days: int = Field(default=21, ge=1, le=756, description="Trading days simulated")
+    confidence: List[float] = Field(default=[0.95, 0.99], min_length=1, description="VaR/CVaR confidence levels")
+    lookback_days: int = Field(default=504, ge=60, le=5040, description="Daily returns the covariance is estimated from")
+    include_drift: bool = Field(default=False, description="Add the historical mean return (otherwise driftless)")
+    seed: Optional[int] = Field(None, ge=0, description="Seed of a previous run, to repeat it exactly")
+    refresh: bool = Field(default=False, description="Sync each series from Alpha Vantage first; otherwise stored bars are used and only symbols never synced are fetched")
+
+    @model_validator(mode="after")
+    def valid_levels(self):
+        if any(not 0.5 <= level < 1 for level in self.confidence):
+            raise ValueError("Confidence levels must be at least 0.5 and below 1")
+        unique_holdings(self.holdings)
+        return self
+
+class OptimizeRequest(RebalanceOptions):
+    holdings: List[Holding] = Field(..., min_length=1, description="Current positions")
+    lookback_days: int = Field(default=504, ge=60, le=5040, description="Daily returns the covariance is estimated from")
+    frontier_points: Optional[int] = Field(None, ge=2, le=100, description="Efficient frontier points (default OPTIMIZER_FRONTIER_POINTS)")
+    refresh: bool = Field(default=False, description="Sync each series from Alpha Vantage first; otherwise stored bars are used and only symbols never synced are fetched")
+
+    @model_validator(mode="after")
+    def distinct_holdings(self):
+        unique_holdings(self.holdings)
+        return self
+
+class BacktestRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, description="Symbols to replay")
+    strategy: Literal["rsi", "bollinger", "score"] = Field(default="rsi", description="Signal to backtest")
+    params: Dict[str, List[float]] = Field(
+        default_factory=dict,
+        description="Parameter grid, e.g. {\"oversold\": [20, 25, 30]}; omitted parameters use the defaults"
+    )
+    interval: Literal["daily", "weekly", "monthly"] = Field(default="daily", description="Bar interval")
+    start: Optional[date] = Field(None, description="First evaluated day; earlier bars only warm up indicators")
+    end: Optional[date] = Field(None, description="Last evaluated day")
+    cost_bps: float = Field(default=5.0, ge=0, description="Commission and slippage per side, in basis points")
+    rank_by: Literal[
+        "mean_sharpe", "mean_cagr", "median_cagr", "hit_rate", "mean_max_drawdown", "worst_max_drawdown"
+    ] = Field(default="mean_sharpe", description="Metric the grid results are ordered by")
+    refresh: bool = Field(default=False, description="Sync each series from Alpha Vantage first; otherwise stored bars are used and only symbols never synced are fetched")
@@ -0,0 +1,68 @@
+# services/analysis-service/app/resources.py
+from __future__ import annotations
+from typing import Any, Optional
+
+from app.config import settings
+from app.telemetry.log import log
+from app.telemetry.tracing import inject_headers
+from app.utils.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+
+
+async def _propagate_trace(request: httpx.Request) -> None:
+    # Upstream calls run inside their ``track_upstream`` client span
+    inject_headers(request.headers)
+
+
+class SharedResources:
+    """Connection pools created once per worker process and closed on shutdown
+
+    Redis is connected from the application lifespan. The HTTP pool is created on
+    first use, so neither httpx nor a pool is paid for before the worker is serving,
+    and services keep working when called outside the app (scripts, benchmarks).
+    """
+
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+        self.redis: Optional[Any] = None
+
+    def _create_http(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE
+        )
+        return httpx.AsyncClient(timeout=30.0, limits=limits, event_hooks={"request": [_propagate_trace]})
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Pooled client for every upstream call; pass a per-request ``timeout``"""
+        if self._http is None or self._http.is_closed:
+            self._http = self._create_http()
+        return self._http
+
+    async def startup(self) -> None:
+        if settings.REDIS_URL:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError:  # Redis is optional; shared state falls back to per-worker
+                log("REDIS_URL is set but the redis package is not installed; shared state is per-worker")
+                return
+            client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+            try:
+                await client.ping()
+                self.redis = client
+            except Exception as e:
+                log(f"Redis unavailable ({str(e)}); shared state is per-worker")
+                await client.aclose()
+
+    async def shutdown(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+
+resources = SharedResources()
@@ -1,4 +1,3 @@
-# services/analysis-service/app/routes/__init__.py
-from . import analysis, health
+from . import alerts, analysis, backtest, health, metrics
 
-__all__ = ['analysis', 'health']
\ No newline at end of file
+__all__ = ['alerts', 'analysis', 'backtest', 'health', 'metrics']
@@ -0,0 +1,55 @@
+# services/analysis-service/app/routes/alerts.py
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import Optional
+import asyncio
+
+from app.models.request import AlertRulesRequest, PriceBarsRequest
+from app.services.alert_engine import AlertEngine
+from app.dependencies import get_alert_engine
+
+router = APIRouter()
+
+@router.post("/rules")
+async def create_alert_rules(request: AlertRulesRequest, engine: AlertEngine = Depends(get_alert_engine)):
+    """Register alert rules; each fires when its indicator crosses above / below the threshold"""
+    ids = await asyncio.to_thread(engine.store.add, [rule.model_dump() for rule in request.rules])
+    await engine.sync_rules()
+    return {"success": True, "count": len(ids), "ids": ids}
+
+@router.get("/rules")
+async def list_alert_rules(
+    symbol: Optional[str] = Query(None, description="Only rules on this symbol"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    engine: AlertEngine = Depends(get_alert_engine)
+):
+    """Registered alert rules"""
+    rules = await asyncio.to_thread(engine.store.list, symbol.upper() if symbol else None, limit, offset)
+    return {"success": True, "count": len(rules), "rules": rules}
+
+@router.delete("/rules/{rule_id}")
+async def delete_alert_rule(rule_id: str, engine: AlertEngine = Depends(get_alert_engine)):
+    """Remove an alert rule"""
+    if not await asyncio.to_thread(engine.store.remove, rule_id):
+        raise HTTPException(status_code=404, detail=f"Unknown alert rule {rule_id}")
+    await engine.sync_rules()
+    return {"success": True, "id": rule_id}
+
+@router.post("/bars")
+async def push_bars(request: PriceBarsRequest, engine: AlertEngine = Depends(get_alert_engine)):
+    """New price bars from a feed; rules on their symbols are evaluated and fired alerts delivered"""
+    bars = [bar.model_dump() for bar in request.bars]
+    for bar in bars:
+        bar["symbol"] = bar["symbol"].strip().upper()
+    await engine.publish(bars)
+    return {"success": True, "accepted": len(bars)}
+
+@router.get("/fired")
+async def recent_alerts(
+    symbol: Optional[str] = Query(None, description="Only alerts on this symbol"),
+    limit: int = Query(100, ge=1, le=500),
+    engine: AlertEngine = Depends(get_alert_engine)
+):
+    """Most recent alerts fired in this worker, newest first"""
+    alerts = [alert for alert in reversed(engine.recent) if symbol is None or alert["symbol"] == symbol.upper()]
+    return {"success": True, "count": len(alerts[:limit]), "alerts": alerts[:limit]}
@@ -1,137 +1,188 @@
 # services/analysis-service/app/routes/analysis.py
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import List, Optional
+import asyncio
 import time
 from datetime import datetime
-import httpx
 
-from app.models.request import AnalysisRequest, CompareRequest, PortfolioAnalysisRequest
-from app.models.analysis import AnalysisResponse, AIAnalysis, TechnicalIndicators, SentimentAnalysis
-from app.services.ollama_service import ollama_service
-from app.services.technical_analysis import technical_service
-from app.services.sentiment_service import sentiment_service
+from app.models.request import (
+    AnalysisRequest, BatchAnalysisRequest, CompareRequest, PortfolioAnalysisRequest, FearGreedBulkRequest,
+    LatestAnalysesRequest, NewsIngestRequest
+)
+from app.models.analysis import (
+    AnalysisResponse, AIAnalysis, TechnicalIndicators, SentimentAnalysis, StockAnalysisOutput
+)
+from app.services.ollama_service import OllamaService
+from app.services.technical_analysis import TechnicalAnalysisService
+from app.services.sentiment_service import SentimentService
+from app.services.fear_greed_service import FearGreedService
+from app.services.enrichment_service import EnrichmentService
+from app.services.analysis_store import AnalysisStore, data_fingerprint
+from app.services.market_data_service import MarketDataService, MarketDataError, source_interval
+from app.services.resampler import TIMEFRAMES
+from app.services.prompt_builder import STOCK_SYSTEM_PROMPT, build_custom_prompt, build_stock_prompt
+from app.services.retrieval_service import RetrievalService
+from app.services.optimizer import PortfolioOptimizer
+from app.services.risk import RiskService
+from app.services.semantic_cache import SemanticCache
 from app.config import settings
+from app.dependencies import (
+    get_analysis_store, get_enrichment_service, get_fear_greed_service, get_market_data_service, get_ollama_service,
+    get_portfolio_optimizer, get_retrieval_service, get_risk_service, get_semantic_cache, get_sentiment_service, get_technical_service
+)
+from app.resources import resources
+from app.telemetry.metrics import metrics, stage, track_upstream
+from app.utils.helpers import generate_cache_key, parse_date_range, lttb_indices, series_to_list, ndjson
+from app.utils import deadline
+from app.utils.compute import compute
+from app.utils.hedging import hedger
+from app.utils.http_cache import cache_headers, make_etag, not_modified, not_modified_response
+from app.utils.json_stream import IncrementalJSONParser, parse_json_object
+from app.utils.shared_state import Coalescer, RateLimitExceeded, alpha_vantage_limiter
+from app.utils.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+np = lazy_import("numpy")
 
 router = APIRouter()
+stock_data_coalescer = Coalescer("stock_data")
 
 async def fetch_stock_data(symbol: str):
     """Fetch comprehensive stock data from Alpha Vantage"""
+    # Identical requests in flight (in any worker) share one set of upstream calls, which
+    # run to completion whatever this request's deadline
+    try:
+        return await stock_data_coalescer.run(
+            symbol, lambda: _fetch_stock_data(symbol), result_ttl=settings.COALESCE_RESULT_TTL
+        )
+    except deadline.DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Failed to fetch stock data: {str(e)}")
+
+async def alpha_vantage_get(function: str, url: str):
+    """One Alpha Vantage GET, bounded by the request deadline and hedged when it runs slow"""
+    async def request():
+        with track_upstream("alpha_vantage", function):
+            return await resources.http.get(url, timeout=deadline.timeout(30.0))
+    
+    await alpha_vantage_limiter.acquire()
+    response = await hedger(f"alpha_vantage:{function}").run(request, admit=alpha_vantage_limiter.try_acquire)
+    return response.json()
+
+async def _fetch_stock_data(symbol: str):
     api_key = settings.ALPHA_VANTAGE_API_KEY
     if not api_key:
         raise HTTPException(status_code=500, detail="Alpha Vantage API key not configured")
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Get quote data
-            quote_url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={api_key}"
-            quote_response = await client.get(quote_url)
-            quote_data = quote_response.json()
+        # Get quote data
+        quote_url = f"{settings.ALPHA_VANTAGE_URL}?function=GLOBAL_QUOTE&symbol={symbol}&apikey={api_key}"
+        quote_data = await alpha_vantage_get("GLOBAL_QUOTE", quote_url)
+        
+        if "Global Quote" not in quote_data or not quote_data["Global Quote"]:
+            raise HTTPException(status_code=404, detail=f"Stock symbol {symbol} not found")
+        
+        quote = quote_data["Global Quote"]
+        
+        # Get company overview (fundamentals, dividends, etc.)
+        overview_url = f"{settings.ALPHA_VANTAGE_URL}?function=OVERVIEW&symbol={symbol}&apikey={api_key}"
+        overview_data = await alpha_vantage_get("OVERVIEW", overview_url)
+        
+        # Get time series data for technical analysis
+        ts_url = f"{settings.ALPHA_VANTAGE_URL}?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize=compact&apikey={api_key}"
+        ts_data = await alpha_vantage_get("TIME_SERIES_DAILY", ts_url)
+        
+        prices = []
+        volumes = []
+        
+        if "Time Series (Daily)" in ts_data:
+            time_series = ts_data["Time Series (Daily)"]
+            for date in sorted(time_series.keys())[-20:]:  # Last 20 days
+                day_data = time_series[date]
+                prices.append(float(day_data["4. close"]))
+                volumes.append(int(day_data["5. volume"]))
+        
+        # Helper function to safely convert to float
+        def safe_float(value, default=0.0):
+            if value == "None" or value is None or value == "":
+                return default
+            try:
+                return float(value)
+            except (ValueError, TypeError):
+                return default
+        
+        # Extract key metrics
+        return {
+            "symbol": symbol,
+            "name": overview_data.get("Name", symbol),
+            "exchange": overview_data.get("Exchange", "N/A"),
+            "currency": overview_data.get("Currency", "USD"),
+            "sector": overview_data.get("Sector", "N/A"),
+            "industry": overview_data.get("Industry", "N/A"),
             
-            if "Global Quote" not in quote_data or not quote_data["Global Quote"]:
-                raise HTTPException(status_code=404, detail=f"Stock symbol {symbol} not found")
+            # Price data
+            "price": float(quote.get("05. price", 0)),
+            "change_percent": float(quote.get("10. change percent", "0").rstrip('%')),
+            "volume": int(quote.get("06. volume", 0)),
+            "high": float(quote.get("03. high", 0)),
+            "low": float(quote.get("04. low", 0)),
+            "open": float(quote.get("02. open", 0)),
+            "previous_close": float(quote.get("08. previous close", 0)),
             
-            quote = quote_data["Global Quote"]
+            # Valuation metrics
+            "market_cap": int(overview_data.get("MarketCapitalization", 0)),
+            "pe_ratio": safe_float(overview_data.get("PERatio")),
+            "peg_ratio": safe_float(overview_data.get("PEGRatio")),
+            "price_to_book": safe_float(overview_data.get("PriceToBookRatio")),
+            "price_to_sales": safe_float(overview_data.get("PriceToSalesRatioTTM")),
+            "ev_to_revenue": safe_float(overview_data.get("EVToRevenue")),
+            "ev_to_ebitda": safe_float(overview_data.get("EVToEBITDA")),
             
-            # Get company overview (fundamentals, dividends, etc.)
-            overview_url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={symbol}&apikey={api_key}"
-            overview_response = await client.get(overview_url)
-            overview_data = overview_response.json()
+            # Dividend metrics
+            "dividend_yield": safe_float(overview_data.get("DividendYield")),
+            "dividend_per_share": safe_float(overview_data.get("DividendPerShare")),
+            "ex_dividend_date": overview_data.get("ExDividendDate", "N/A"),
+            "dividend_date": overview_data.get("DividendDate", "N/A"),
+            "payout_ratio": safe_float(overview_data.get("PayoutRatio")),
             
-            # Get time series data for technical analysis
-            ts_url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize=compact&apikey={api_key}"
-            ts_response = await client.get(ts_url)
-            ts_data = ts_response.json()
+            # Financial health
+            "profit_margin": safe_float(overview_data.get("ProfitMargin")),
+            "operating_margin": safe_float(overview_data.get("OperatingMarginTTM")),
+            "return_on_equity": safe_float(overview_data.get("ReturnOnEquityTTM")),
+            "return_on_assets": safe_float(overview_data.get("ReturnOnAssetsTTM")),
+            "debt_to_equity": safe_float(overview_data.get("DebtToEquity")),
+            "current_ratio": safe_float(overview_data.get("CurrentRatio")),
+            "book_value": safe_float(overview_data.get("BookValue")),
             
-            prices = []
-            volumes = []
+            # Growth metrics
+            "revenue_ttm": int(overview_data.get("RevenueTTM", 0)),
+            "revenue_per_share": safe_float(overview_data.get("RevenuePerShareTTM")),
+            "quarterly_earnings_growth": safe_float(overview_data.get("QuarterlyEarningsGrowthYOY")),
+            "quarterly_revenue_growth": safe_float(overview_data.get("QuarterlyRevenueGrowthYOY")),
+            "eps": safe_float(overview_data.get("EPS")),
+            "diluted_eps": safe_float(overview_data.get("DilutedEPSTTM")),
             
-            if "Time Series (Daily)" in ts_data:
-                time_series = ts_data["Time Series (Daily)"]
-                for date in sorted(time_series.keys())[-20:]:  # Last 20 days
-                    day_data = time_series[date]
-                    prices.append(float(day_data["4. close"]))
-                    volumes.append(int(day_data["5. volume"]))
+            # Analyst targets
+            "analyst_target_price": safe_float(overview_data.get("AnalystTargetPrice")),
+            "52_week_high": safe_float(overview_data.get("52WeekHigh")),
+            "52_week_low": safe_float(overview_data.get("52WeekLow")),
+            "50_day_ma": safe_float(overview_data.get("50DayMovingAverage")),
+            "200_day_ma": safe_float(overview_data.get("200DayMovingAverage")),
             
-            # Helper function to safely convert to float
-            def safe_float(value, default=0.0):
-                if value == "None" or value is None or value == "":
-                    return default
-                try:
-                    return float(value)
-                except (ValueError, TypeError):
-                    return default
+            # Additional metrics
+            "shares_outstanding": int(overview_data.get("SharesOutstanding", 0)),
+            "beta": safe_float(overview_data.get("Beta")),
+            "forward_pe": safe_float(overview_data.get("ForwardPE")),
             
-            # Extract key metrics
-            return {
-                "symbol": symbol,
-                "name": overview_data.get("Name", symbol),
-                "exchange": overview_data.get("Exchange", "N/A"),
-                "currency": overview_data.get("Currency", "USD"),
-                "sector": overview_data.get("Sector", "N/A"),
-                "industry": overview_data.get("Industry", "N/A"),
-                
-                # Price data
-                "price": float(quote.get("05. price", 0)),
-                "change_percent": float(quote.get("10. change percent", "0").rstrip('%')),
-                "volume": int(quote.get("06. volume", 0)),
-                "high": float(quote.get("03. high", 0)),
-                "low": float(quote.get("04. low", 0)),
-                "open": float(quote.get("02. open", 0)),
-                "previous_close": float(quote.get("08. previous close", 0)),
-                
-                # Valuation metrics
-                "market_cap": int(overview_data.get("MarketCapitalization", 0)),
-                "pe_ratio": safe_float(overview_data.get("PERatio")),
-                "peg_ratio": safe_float(overview_data.get("PEGRatio")),
-                "price_to_book": safe_float(overview_data.get("PriceToBookRatio")),
-                "price_to_sales": safe_float(overview_data.get("PriceToSalesRatioTTM")),
-                "ev_to_revenue": safe_float(overview_data.get("EVToRevenue")),
-                "ev_to_ebitda": safe_float(overview_data.get("EVToEBITDA")),
-                
-                # Dividend metrics
-                "dividend_yield": safe_float(overview_data.get("DividendYield")),
-                "dividend_per_share": safe_float(overview_data.get("DividendPerShare")),
-                "ex_dividend_date": overview_data.get("ExDividendDate", "N/A"),
-                "dividend_date": overview_data.get("DividendDate", "N/A"),
-                "payout_ratio": safe_float(overview_data.get("PayoutRatio")),
-                
-                # Financial health
-                "profit_margin": safe_float(overview_data.get("ProfitMargin")),
-                "operating_margin": safe_float(overview_data.get("OperatingMarginTTM")),
-                "return_on_equity": safe_float(overview_data.get("ReturnOnEquityTTM")),
-                "return_on_assets": safe_float(overview_data.get("ReturnOnAssetsTTM")),
-                "debt_to_equity": safe_float(overview_data.get("DebtToEquity")),
-                "current_ratio": safe_float(overview_data.get("CurrentRatio")),
-                "book_value": safe_float(overview_data.get("BookValue")),
-                
-                # Growth metrics
-                "revenue_ttm": int(overview_data.get("RevenueTTM", 0)),
-                "revenue_per_share": safe_float(overview_data.get("RevenuePerShareTTM")),
-                "quarterly_earnings_growth": safe_float(overview_data.get("QuarterlyEarningsGrowthYOY")),
-                "quarterly_revenue_growth": safe_float(overview_data.get("QuarterlyRevenueGrowthYOY")),
-                "eps": safe_float(overview_data.get("EPS")),
-                "diluted_eps": safe_float(overview_data.get("DilutedEPSTTM")),
-                
-                # Analyst targets
-                "analyst_target_price": safe_float(overview_data.get("AnalystTargetPrice")),
-                "52_week_high": safe_float(overview_data.get("52WeekHigh")),
-                "52_week_low": safe_float(overview_data.get("52WeekLow")),
-                "50_day_ma": safe_float(overview_data.get("50DayMovingAverage")),
-                "200_day_ma": safe_float(overview_data.get("200DayMovingAverage")),
-                
-                # Additional metrics
-                "shares_outstanding": int(overview_data.get("SharesOutstanding", 0)),
-                "beta": safe_float(overview_data.get("Beta")),
-                "forward_pe": safe_float(overview_data.get("ForwardPE")),
-                
-                # Description
-                "description": overview_data.get("Description", ""),
-                
-                # Technical data
-                "prices": prices,
-                "volumes": volumes
-            }
-    except httpx.HTTPError as e:
+            # Description
+            "description": overview_data.get("Description", ""),
+            
+            # Technical data
+            "prices": prices,
+            "volumes": volumes
+        }
+    except (httpx.HTTPError, RateLimitExceeded) as e:
         raise HTTPException(status_code=503, detail=f"Failed to fetch stock data: {str(e)}")
 
 def calculate_investment_scores(stock_data, technical_indicators):
@@ -208,258 +259,453 @@ def calculate_investment_scores(stock_data, technical_indicators):
     
     return scores
 
-@router.post("/generate", response_model=AnalysisResponse)
-@router.post("/stock", response_model=AnalysisResponse)
-async def analyze_stock(request: AnalysisRequest):
-    """Analyze a single stock with AI-powered insights"""
-    start_time = time.time()
-    
-    try:
-        # Fetch comprehensive stock data
+STRATEGY_NAMES = {
+    "dividend_investing": "Dividend Income",
+    "dividend_growth": "Dividend Growth",
+    "day_trading": "Day Trading",
+    "swing_trading": "Swing Trading",
+    "options_trading": "Options Trading",
+    "long_term_growth": "Long-term Growth",
+    "value_investing": "Value Investing"
+}
+
+def technical_model(tech_data) -> TechnicalIndicators:
+    return TechnicalIndicators(
+        rsi=tech_data.get('rsi'),
+        macd=tech_data.get('macd'),
+        moving_averages=tech_data.get('moving_averages'),
+        bollinger_bands=tech_data.get('bollinger_bands'),
+        volume_trend=tech_data.get('volume_trend')
+    )
+
+def sentiment_model(sentiment_data) -> SentimentAnalysis:
+    return SentimentAnalysis(
+        overall_sentiment=sentiment_data['overall_sentiment'],
+        confidence=sentiment_data['confidence'],
+        sources=sentiment_data['sources'],
+        summary=sentiment_data['summary']
+    )
+
+# What to look for in the news when the request has no question of its own
+RETRIEVAL_QUESTIONS = {
+    "fundamental": "{name} ({symbol}) earnings, revenue, guidance, margins, dividends and valuation",
+    "technical": "{name} ({symbol}) share price moves, trading volume and analyst rating changes",
+    "sentiment": "{name} ({symbol}) investor sentiment, reactions and controversies",
+}
+DEFAULT_RETRIEVAL_QUESTION = "{name} ({symbol}) outlook: earnings, guidance, risks, analyst views and major news"
+
+def retrieval_question(request: AnalysisRequest, stock_data) -> str:
+    if request.custom_prompt:
+        return request.custom_prompt
+    template = RETRIEVAL_QUESTIONS.get(request.analysis_type, DEFAULT_RETRIEVAL_QUESTION)
+    return template.format(name=stock_data.get('name') or request.symbol, symbol=request.symbol.upper())
+
+async def gather_market_context(request: AnalysisRequest, technical_service: TechnicalAnalysisService):
+    """Market data and technical indicators for one stock
+
+    Indicators are added as ``stock_data['technical_indicators']`` on a copy: the fetched
+    data is shared.
+    """
+    # Fetch comprehensive stock data
+    with stage("fetch_stock_data"):
         stock_data = await fetch_stock_data(request.symbol)
-        
-        # Technical Analysis
-        technical_indicators = None
-        if request.include_technical and stock_data.get('prices'):
-            tech_data = technical_service.get_comprehensive_analysis(
-                stock_data['prices'], 
-                stock_data['volumes']
+    
+    # Technical Analysis
+    technical_indicators = None
+    if request.include_technical and stock_data.get('prices'):
+        with stage("technical_analysis"):
+            # Arrays, so a process worker maps them from shared memory instead of unpickling lists
+            tech_data = await compute.run(
+                technical_service.get_comprehensive_analysis,
+                np.asarray(stock_data['prices'], dtype=np.float64),
+                np.asarray(stock_data['volumes'], dtype=np.float64)
             )
-            technical_indicators = TechnicalIndicators(
-                rsi=tech_data.get('rsi'),
-                macd=tech_data.get('macd'),
-                moving_averages=tech_data.get('moving_averages'),
-                bollinger_bands=tech_data.get('bollinger_bands'),
-                volume_trend=tech_data.get('volume_trend')
+        technical_indicators = technical_model(tech_data)
+        # A copy: the fetched data is shared with concurrent and later callers
+        stock_data = {**stock_data, 'technical_indicators': tech_data}
+    return stock_data, technical_indicators
+
+async def gather_news_context(request: AnalysisRequest, stock_data, sentiment_service: SentimentService,
+                              retrieval_service: Optional[RetrievalService] = None):
+    """News sentiment and relevant news passages; passages are added as ``stock_data['news_context']`` on a copy"""
+    # Sentiment Analysis (left out when the deadline doesn't allow it)
+    sentiment = None
+    if request.include_sentiment:
+        try:
+            deadline.ensure(settings.DEADLINE_MIN_FETCH_SECONDS, "sentiment")
+            with stage("sentiment"):
+                sentiment_data = await sentiment_service.analyze_news_sentiment(request.symbol)
+            sentiment = sentiment_model(sentiment_data)
+        except deadline.DeadlineExceeded:
+            deadline.skip("sentiment")
+    
+    # News passages most relevant to the question, within RETRIEVAL_TOKEN_BUDGET
+    if retrieval_service is not None and request.include_news:
+        try:
+            deadline.ensure(settings.DEADLINE_MIN_FETCH_SECONDS, "news context")
+            with stage("retrieval"):
+                passages = await retrieval_service.retrieve(request.symbol, retrieval_question(request, stock_data))
+            if passages:
+                stock_data = {**stock_data, 'news_context': passages}
+        except deadline.DeadlineExceeded:
+            deadline.skip("news_context")
+        except Exception:
+            # Counted by stage(); the analysis goes ahead without news
+            pass
+    
+    return stock_data, sentiment
+
+async def gather_stock_context(request: AnalysisRequest, technical_service: TechnicalAnalysisService,
+                               sentiment_service: SentimentService,
+                               retrieval_service: Optional[RetrievalService] = None):
+    """Market data, technical indicators, news sentiment and relevant news passages for one stock"""
+    stock_data, technical_indicators = await gather_market_context(request, technical_service)
+    stock_data, sentiment = await gather_news_context(request, stock_data, sentiment_service, retrieval_service)
+    return stock_data, technical_indicators, sentiment
+
+def parse_stock_output(text: str, parser: Optional[IncrementalJSONParser] = None) -> StockAnalysisOutput:
+    """Validate the model's structured reply; replies that don't parse are kept as plain text
+
+    Pass the parser that already consumed ``text`` while streaming to avoid parsing it twice.
+    """
+    with stage("llm_parse"):
+        try:
+            fields = parse_json_object(text) if parser is None else parser.result()
+            return StockAnalysisOutput.model_validate(fields)
+        except (ValueError, ValidationError) as e:
+            metrics.errors_total.inc(stage="llm_parse", error=type(e).__name__)
+            return StockAnalysisOutput.unstructured(text)
+
+def compute_stock_insights(stock_data, technical_indicators):
+    """Deterministic key points, risks, opportunities and confidence from the data alone"""
+    rsi = technical_indicators.rsi if technical_indicators else None
+    
+    # Calculate confidence based on multiple factors
+    confidence_score = 0.5
+    if rsi and 30 <= rsi <= 70:
+        confidence_score += 0.2
+    if stock_data.get("pe_ratio", 0) > 0 and stock_data["pe_ratio"] < 30:
+        confidence_score += 0.1
+    if stock_data.get("debt_to_equity", 100) < 1:
+        confidence_score += 0.1
+    if stock_data.get("profit_margin", 0) > 0.1:
+        confidence_score += 0.1
+    
+    # Build comprehensive key points
+    key_points = [
+        f"Current price: ${stock_data['price']:.2f} ({stock_data['change_percent']:+.2f}%)",
+        f"Market Cap: ${stock_data['market_cap']/1e9:.1f}B",
+        f"P/E Ratio: {stock_data['pe_ratio']:.1f}" if stock_data.get('pe_ratio') else "P/E: N/A",
+    ]
+    if stock_data.get('dividend_yield', 0) > 0:
+        key_points.append(f"Dividend Yield: {stock_data['dividend_yield']*100:.2f}%")
+    if stock_data.get('quarterly_revenue_growth'):
+        key_points.append(f"Revenue Growth: {stock_data['quarterly_revenue_growth']*100:.1f}% YoY")
+    if rsi:
+        rsi_signal = "Oversold" if rsi < 30 else "Overbought" if rsi > 70 else "Neutral"
+        key_points.append(f"RSI: {rsi:.1f} ({rsi_signal})")
+    if stock_data.get('analyst_target_price') and stock_data.get('price'):
+        upside = ((stock_data['analyst_target_price'] / stock_data['price']) - 1) * 100
+        key_points.append(f"Analyst Target: ${stock_data['analyst_target_price']:.2f} ({upside:+.1f}% upside)")
+    
+    # Add investment strategy suitability to key points
+    investment_scores = calculate_investment_scores(stock_data, technical_indicators)
+    best_strategy = max(investment_scores, key=investment_scores.get)
+    best_score = investment_scores[best_strategy]
+    if best_score > 50:
+        key_points.append(f"Best suited for: {STRATEGY_NAMES[best_strategy]} (Score: {best_score}/100)")
+    
+    # Threshold-based risks
+    risks = []
+    if stock_data.get('debt_to_equity', 0) > 2:
+        risks.append(f"High debt-to-equity ratio: {stock_data['debt_to_equity']:.1f}")
+    if stock_data.get('payout_ratio', 0) > 0.8:
+        risks.append(f"High payout ratio may limit dividend growth: {stock_data['payout_ratio']*100:.0f}%")
+    if rsi and rsi > 70:
+        risks.append("Stock appears overbought based on RSI")
+    if stock_data.get('52_week_high') and stock_data['price'] > stock_data['52_week_high'] * 0.95:
+        risks.append("Trading near 52-week high")
+    
+    # Threshold-based opportunities
+    opportunities = []
+    if stock_data.get('quarterly_revenue_growth', 0) > 0.15:
+        opportunities.append(f"Strong revenue growth: {stock_data['quarterly_revenue_growth']*100:.1f}% YoY")
+    if stock_data.get('dividend_yield', 0) > 0.03 and stock_data.get('payout_ratio', 1) < 0.6:
+        opportunities.append("Sustainable dividend with room for growth")
+    if rsi and rsi < 30:
+        opportunities.append("Stock appears oversold - potential buying opportunity")
+    if stock_data.get('pe_ratio', 100) < stock_data.get('peg_ratio', 0) and stock_data.get('peg_ratio', 0) > 0:
+        opportunities.append("Attractive valuation relative to growth")
+    if stock_data.get('price') and stock_data['price'] < stock_data.get('analyst_target_price', 0):
+        opportunities.append(f"Trading below analyst target by {((stock_data['analyst_target_price'] / stock_data['price']) - 1) * 100:.1f}%")
+    
+    return {
+        "summary": "; ".join(key_points[:2]) + ".",
+        "confidence": min(confidence_score, 1.0),
+        "key_points": key_points,
+        "risks": risks,
+        "opportunities": opportunities
+    }
+
+def build_ai_analysis(request: AnalysisRequest, stock_data, technical_indicators, sentiment,
+                      output: Optional[StockAnalysisOutput] = None, narrative_status: str = "generated") -> AIAnalysis:
+    """Computed insights, plus the model's narrative when there is one"""
+    insights = compute_stock_insights(stock_data, technical_indicators)
+    key_points, risks, opportunities = insights["key_points"], insights["risks"], insights["opportunities"]
+    if output is None:
+        summary, recommendation, confidence_score, price_target = insights["summary"], "N/A", insights["confidence"], None
+    else:
+        summary, recommendation, confidence_score = output.summary, output.recommendation, output.confidence
+        price_target = output.price_target
+        # Computed items first so the list doesn't reshuffle when the narrative arrives
+        key_points = key_points + [p for p in output.key_points if p not in key_points]
+        risks = risks + [r for r in output.risks if r not in risks]
+        opportunities = opportunities + [o for o in output.opportunities if o not in opportunities]
+    
+    return AIAnalysis(
+        stock_symbol=request.symbol,
+        analysis_type=request.analysis_type,
+        summary=summary,
+        recommendation=recommendation,
+        confidence_score=confidence_score,
+        price_target=price_target,
+        mode=request.mode,
+        narrative_status=narrative_status,
+        key_points=key_points,
+        risks=risks,
+        opportunities=opportunities,
+        technical_indicators=technical_indicators,
+        sentiment=sentiment,
+        timestamp=datetime.utcnow()
+    )
+
+def narrative_key(request: AnalysisRequest) -> str:
+    return generate_cache_key("narrative", {
+        "symbol": request.symbol.upper(),
+        "analysis_type": request.analysis_type,
+        "include_technical": request.include_technical,
+        "custom_prompt": request.custom_prompt
+    })
+
+async def similar_answer(request: AnalysisRequest, stock_data,
+                         semantic_cache: Optional[SemanticCache]) -> Optional[StockAnalysisOutput]:
+    """A fresh earlier answer to a prompt like ``custom_prompt`` about the same symbol"""
+    if not request.custom_prompt or semantic_cache is None:
+        return None
+    with stage("semantic_cache"):
+        answer = await semantic_cache.lookup(request.symbol, request.custom_prompt, stock_data.get('price'))
+    return StockAnalysisOutput.unstructured(answer) if answer is not None else None
+
+async def generate_narrative(request: AnalysisRequest, stock_data, technical_indicators,
+                             ollama_service: OllamaService,
+                             semantic_cache: Optional[SemanticCache] = None) -> StockAnalysisOutput:
+    """The LLM part of an analysis: structured output, or plain text for custom prompts
+
+    Raises ``DeadlineExceeded`` if the request hasn't enough time left to generate it.
+    """
+    deadline.ensure(settings.DEADLINE_MIN_LLM_SECONDS, "the LLM narrative")
+    if request.custom_prompt:
+        with stage("llm_generate"):
+            answer = await ollama_service.generate(
+                build_custom_prompt(request.custom_prompt, stock_data.get('news_context'))
             )
-            stock_data['technical_indicators'] = tech_data
-        
-        # Sentiment Analysis
-        sentiment = None
-        if request.include_sentiment:
-            sentiment_data = await sentiment_service.analyze_news_sentiment(request.symbol)
-            sentiment = SentimentAnalysis(
-                overall_sentiment=sentiment_data['overall_sentiment'],
-                confidence=sentiment_data['confidence'],
-                sources=sentiment_data['sources'],
-                summary=sentiment_data['summary']
+        if semantic_cache is not None:
+            await semantic_cache.store(request.symbol, request.custom_prompt, stock_data.get('price'), answer)
+        return StockAnalysisOutput.unstructured(answer)
+    
+    # Build comprehensive prompt for AI
+    with stage("prompt_build"):
+        ai_prompt = build_stock_prompt(request.symbol, stock_data, technical_indicators)
+    with stage("llm_generate"):
+        ai_response = await ollama_service.generate(
+            ai_prompt, STOCK_SYSTEM_PROMPT,
+            response_format=ollama_service.response_format(StockAnalysisOutput)
+        )
+    return parse_stock_output(ai_response)
+
+def analysis_fingerprint(request: AnalysisRequest, stock_data) -> str:
+    """Identifies the inputs of an analysis; stored results are reused only while it matches"""
+    return data_fingerprint(stock_data, {
+        "include_technical": request.include_technical,
+        "include_sentiment": request.include_sentiment,
+        "custom_prompt": request.custom_prompt
+    })
+
+def analysis_etag(request: AnalysisRequest, stock_data, model: Optional[str], narrative_state: str) -> str:
+    """Validator for an analysis response, known before any news or LLM work is done
+
+    ``stock_data`` is the market snapshot with its indicators (no news passages yet) and
+    ``narrative_state`` is ``ready`` or, for an ``auto`` job still running, ``pending``.
+    News sentiment is not hashed: a revalidation never waits for a news fetch, so the
+    sentiment in a cached response is as old as its market data.
+    """
+    return make_etag(
+        analysis_fingerprint(request, stock_data), request.analysis_type, request.mode, request.include_news,
+        model, narrative_state
+    )
+
+async def revalidated(http_request: Request, request: AnalysisRequest, stock_data, model: Optional[str],
+                      enrichment_service: EnrichmentService) -> Optional[str]:
+    """The request's ETag when ``If-None-Match`` names it and the response would not change"""
+    if not http_request.headers.get("if-none-match"):
+        return None
+    key = narrative_key(request)
+    ready = request.mode != "auto" or await enrichment_service.get_narrative(key) is not None
+    etag = analysis_etag(request, stock_data, model, "ready" if ready else "pending")
+    # A pending response stays current only while its job is still running
+    if not_modified(http_request, etag) and (ready or enrichment_service.pending_job(key) is not None):
+        return etag
+    return None
+
+async def load_stored_analysis(store: Optional[AnalysisStore], request: AnalysisRequest,
+                               fingerprint: str) -> Optional[AIAnalysis]:
+    if store is None:
+        return None
+    try:
+        with stage("analysis_store"):
+            stored = await asyncio.to_thread(store.get, request.symbol.upper(), request.analysis_type, fingerprint)
+    except Exception as e:
+        # The store only saves work; never fail an analysis because of it
+        metrics.errors_total.inc(stage="analysis_store", error=type(e).__name__)
+        return None
+    if stored is None:
+        return None
+    analysis = AIAnalysis.model_validate(stored["analysis"])
+    analysis.mode = request.mode
+    analysis.narrative_status = "stored"
+    return analysis
+
+async def save_analysis(store: Optional[AnalysisStore], request: AnalysisRequest, fingerprint: str,
+                        analysis: AIAnalysis) -> None:
+    if store is None:
+        return
+    try:
+        with stage("analysis_store"):
+            await asyncio.to_thread(
+                store.save, request.symbol.upper(), request.analysis_type, fingerprint, analysis.model_dump(mode="json")
             )
-        
-        # Calculate investment strategy scores
-        investment_scores = calculate_investment_scores(stock_data, technical_indicators)
-        
-        # Build comprehensive prompt for AI - Pre-format all conditional values
-        dividend_yield_str = f"{stock_data['dividend_yield']*100:.2f}%" if stock_data['dividend_yield'] else "No dividend"
-        dividend_per_share_str = f"${stock_data['dividend_per_share']:.2f}" if stock_data['dividend_per_share'] else "N/A"
-        payout_ratio_str = f"{stock_data['payout_ratio']*100:.1f}%" if stock_data['payout_ratio'] else "N/A"
-        
-        pe_ratio_str = f"{stock_data['pe_ratio']:.2f}" if stock_data['pe_ratio'] else "N/A"
-        peg_ratio_str = f"{stock_data['peg_ratio']:.2f}" if stock_data['peg_ratio'] else "N/A"
-        price_to_book_str = f"{stock_data['price_to_book']:.2f}" if stock_data['price_to_book'] else "N/A"
-        price_to_sales_str = f"{stock_data['price_to_sales']:.2f}" if stock_data['price_to_sales'] else "N/A"
-        
-        profit_margin_str = f"{stock_data['profit_margin']*100:.1f}%" if stock_data['profit_margin'] else "N/A"
-        roe_str = f"{stock_data['return_on_equity']*100:.1f}%" if stock_data['return_on_equity'] else "N/A"
-        debt_to_equity_str = f"{stock_data['debt_to_equity']:.2f}" if stock_data['debt_to_equity'] else "N/A"
-        current_ratio_str = f"{stock_data['current_ratio']:.2f}" if stock_data['current_ratio'] else "N/A"
-        
-        quarterly_revenue_growth_str = f"{stock_data['quarterly_revenue_growth']*100:.1f}%" if stock_data['quarterly_revenue_growth'] else "N/A"
-        quarterly_earnings_growth_str = f"{stock_data['quarterly_earnings_growth']*100:.1f}%" if stock_data['quarterly_earnings_growth'] else "N/A"
-        eps_str = f"${stock_data['eps']:.2f}" if stock_data['eps'] else "N/A"
-        
-        rsi_line = f"- RSI: {technical_indicators.rsi:.1f}" if technical_indicators and technical_indicators.rsi else ""
-        volume_trend_line = f"- Volume Trend: {technical_indicators.volume_trend}" if technical_indicators else ""
-        
-        ma_50_str = f"${stock_data['50_day_ma']:.2f}" if stock_data['50_day_ma'] else "N/A"
-        ma_200_str = f"${stock_data['200_day_ma']:.2f}" if stock_data['200_day_ma'] else "N/A"
-        
-        analyst_target_str = f"${stock_data['analyst_target_price']:.2f}" if stock_data['analyst_target_price'] else "N/A"
-        
-        ai_prompt = f"""Analyze {stock_data['name']} ({request.symbol}) comprehensively:
-
-COMPANY INFO:
-- Sector: {stock_data['sector']}
-- Industry: {stock_data['industry']}
-- Market Cap: ${stock_data['market_cap']:,}
-
-CURRENT PRICE DATA:
-- Price: ${stock_data['price']:.2f}
-- Change: {stock_data['change_percent']:.2f}%
-- 52-Week Range: ${stock_data['52_week_low']:.2f} - ${stock_data['52_week_high']:.2f}
-- Volume: {stock_data['volume']:,}
-
-VALUATION METRICS:
-- P/E Ratio: {pe_ratio_str}
-- PEG Ratio: {peg_ratio_str}
-- Price/Book: {price_to_book_str}
-- Price/Sales: {price_to_sales_str}
-
-DIVIDEND INFORMATION:
-- Dividend Yield: {dividend_yield_str}
-- Dividend Per Share: {dividend_per_share_str}
-- Payout Ratio: {payout_ratio_str}
-- Ex-Dividend Date: {stock_data['ex_dividend_date']}
-
-FINANCIAL HEALTH:
-- Profit Margin: {profit_margin_str}
-- ROE: {roe_str}
-- Debt/Equity: {debt_to_equity_str}
-- Current Ratio: {current_ratio_str}
-
-GROWTH METRICS:
-- Quarterly Revenue Growth: {quarterly_revenue_growth_str}
-- Quarterly Earnings Growth: {quarterly_earnings_growth_str}
-- EPS: {eps_str}
-
-TECHNICAL INDICATORS:
-{rsi_line}
-{volume_trend_line}
-- 50-Day MA: {ma_50_str}
-- 200-Day MA: {ma_200_str}
-
-ANALYST TARGET: {analyst_target_str}
-
-Provide:
-1. Clear BUY, HOLD, or SELL recommendation with reasoning
-2. Key strengths and weaknesses
-3. Price target and upside/downside potential
-4. Risk factors to consider
-5. Dividend sustainability assessment (if applicable)
-6. Best suited for which type of investor (growth, value, dividend, day trader, etc.)"""
-
-        # AI Analysis using Ollama
-        if request.custom_prompt:
-            ai_response = await ollama_service.generate(request.custom_prompt)
-            summary = ai_response
-            recommendation = "N/A"
-            confidence_score = 0.5
-            key_points = [ai_response[:100]]
-            risks = []
-            opportunities = []
+    except Exception as e:
+        metrics.errors_total.inc(stage="analysis_store", error=type(e).__name__)
+
+async def run_analysis(request: AnalysisRequest, stock_data, technical_indicators, sentiment,
+                       ollama_service: OllamaService, enrichment_service: EnrichmentService,
+                       analysis_store: Optional[AnalysisStore], semantic_cache: Optional[SemanticCache] = None):
+    """The tiered part of an analysis once its inputs are gathered; returns (analysis, job_id)"""
+    fingerprint = analysis_fingerprint(request, stock_data) if request.mode != "fast" else None
+    if fingerprint:
+        stored = await load_stored_analysis(analysis_store, request, fingerprint)
+        if stored is not None:
+            return stored, None
+    
+    job_id = None
+    output = None
+    narrative_status = "none"
+    key = narrative_key(request)
+    if request.mode == "full":
+        try:
+            output = await similar_answer(request, stock_data, semantic_cache)
+            if output is not None:
+                narrative_status = "similar"
+            else:
+                output = await generate_narrative(
+                    request, stock_data, technical_indicators, ollama_service, semantic_cache
+                )
+                await enrichment_service.store_narrative(key, output.model_dump())
+                narrative_status = "generated"
+        except deadline.DeadlineExceeded:
+            # Out of time: answer with the computed results alone
+            deadline.skip("llm_generate")
+            narrative_status = "skipped"
+    elif request.mode == "auto":
+        cached = await enrichment_service.get_narrative(key)
+        similar = await similar_answer(request, stock_data, semantic_cache) if cached is None else None
+        if cached is not None:
+            # Written by us from a validated (or deliberately unstructured) output
+            output = StockAnalysisOutput.model_construct(**cached)
+            narrative_status = "cached"
+        elif similar is not None:
+            output = similar
+            narrative_status = "similar"
         else:
-            ai_response = await ollama_service.generate(ai_prompt)
-            
-            # Parse AI response
-            summary = ai_response
-            
-            # Extract recommendation (improved logic)
-            recommendation = "Hold"
-            ai_lower = ai_response.lower()
-            
-            if "strong buy" in ai_lower or "buy recommendation" in ai_lower:
-                recommendation = "Strong Buy"
-            elif "buy" in ai_lower and "don't buy" not in ai_lower and "not a buy" not in ai_lower:
-                recommendation = "Buy"
-            elif "sell" in ai_lower and "don't sell" not in ai_lower:
-                if "strong sell" in ai_lower:
-                    recommendation = "Strong Sell"
-                else:
-                    recommendation = "Sell"
-            
-            # Calculate confidence based on multiple factors
-            confidence_score = 0.5
-            if technical_indicators and technical_indicators.rsi:
-                if 30 <= technical_indicators.rsi <= 70:
-                    confidence_score += 0.2
-            if stock_data.get("pe_ratio", 0) > 0 and stock_data["pe_ratio"] < 30:
-                confidence_score += 0.1
-            if stock_data.get("debt_to_equity", 100) < 1:
-                confidence_score += 0.1
-            if stock_data.get("profit_margin", 0) > 0.1:
-                confidence_score += 0.1
-            
-            confidence_score = min(confidence_score, 1.0)
-            
-            # Build comprehensive key points
-            key_points = [
-                f"Current price: ${stock_data['price']:.2f} ({stock_data['change_percent']:+.2f}%)",
-                f"Market Cap: ${stock_data['market_cap']/1e9:.1f}B",
-                f"P/E Ratio: {stock_data['pe_ratio']:.1f}" if stock_data.get('pe_ratio') else "P/E: N/A",
-            ]
-            
-            if stock_data.get('dividend_yield', 0) > 0:
-                key_points.append(f"Dividend Yield: {stock_data['dividend_yield']*100:.2f}%")
+            async def enrich():
+                narrative = await generate_narrative(
+                    request, stock_data, technical_indicators, ollama_service, semantic_cache
+                )
+                await save_analysis(analysis_store, request, fingerprint, build_ai_analysis(
+                    request, stock_data, technical_indicators, sentiment, narrative
+                ))
+                return narrative.model_dump()
             
-            if stock_data.get('quarterly_revenue_growth'):
-                key_points.append(f"Revenue Growth: {stock_data['quarterly_revenue_growth']*100:.1f}% YoY")
-            
-            if technical_indicators and technical_indicators.rsi:
-                rsi_signal = "Oversold" if technical_indicators.rsi < 30 else "Overbought" if technical_indicators.rsi > 70 else "Neutral"
-                key_points.append(f"RSI: {technical_indicators.rsi:.1f} ({rsi_signal})")
-            
-            if stock_data.get('analyst_target_price'):
-                upside = ((stock_data['analyst_target_price'] / stock_data['price']) - 1) * 100
-                key_points.append(f"Analyst Target: ${stock_data['analyst_target_price']:.2f} ({upside:+.1f}% upside)")
-            
-            # Extract risks
-            risks = []
-            if stock_data.get('debt_to_equity', 0) > 2:
-                risks.append(f"High debt-to-equity ratio: {stock_data['debt_to_equity']:.1f}")
-            if stock_data.get('payout_ratio', 0) > 0.8:
-                risks.append(f"High payout ratio may limit dividend growth: {stock_data['payout_ratio']*100:.0f}%")
-            if technical_indicators and technical_indicators.rsi and technical_indicators.rsi > 70:
-                risks.append("Stock appears overbought based on RSI")
-            if stock_data['price'] > stock_data.get('52_week_high', float('inf')) * 0.95:
-                risks.append("Trading near 52-week high")
-            if "risk" in ai_lower or "concern" in ai_lower:
-                risks.append("AI identified risks - see full analysis")
-            
-            # Extract opportunities
-            opportunities = []
-            if stock_data.get('quarterly_revenue_growth', 0) > 0.15:
-                opportunities.append(f"Strong revenue growth: {stock_data['quarterly_revenue_growth']*100:.1f}% YoY")
-            if stock_data.get('dividend_yield', 0) > 0.03 and stock_data.get('payout_ratio', 1) < 0.6:
-                opportunities.append("Sustainable dividend with room for growth")
-            if technical_indicators and technical_indicators.rsi and technical_indicators.rsi < 30:
-                opportunities.append("Stock appears oversold - potential buying opportunity")
-            if stock_data.get('pe_ratio', 100) < stock_data.get('peg_ratio', 0) and stock_data.get('peg_ratio', 0) > 0:
-                opportunities.append("Attractive valuation relative to growth")
-            if stock_data['price'] < stock_data.get('analyst_target_price', 0):
-                opportunities.append(f"Trading below analyst target by {((stock_data.get('analyst_target_price', 0) / stock_data['price']) - 1) * 100:.1f}%")
-        
-        # Add investment strategy suitability to key points
-        best_strategy = max(investment_scores, key=investment_scores.get)
-        best_score = investment_scores[best_strategy]
-        
-        strategy_names = {
-            "dividend_investing": "Dividend Income",
-            "dividend_growth": "Dividend Growth",
-            "day_trading": "Day Trading",
-            "swing_trading": "Swing Trading",
-            "options_trading": "Options Trading",
-            "long_term_growth": "Long-term Growth",
-            "value_investing": "Value Investing"
-        }
+            job_id = await enrichment_service.submit(key, request.symbol, enrich)
+            narrative_status = "pending"
+    
+    analysis = build_ai_analysis(request, stock_data, technical_indicators, sentiment, output, narrative_status)
+    if output is not None:
+        await save_analysis(analysis_store, request, fingerprint, analysis)
+    return analysis, job_id
+
+@router.post("/generate", response_model=AnalysisResponse)
+@router.post("/stock", response_model=AnalysisResponse)
+async def analyze_stock(
+    request: AnalysisRequest,
+    http_request: Request,
+    response: Response,
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    technical_service: TechnicalAnalysisService = Depends(get_technical_service),
+    sentiment_service: SentimentService = Depends(get_sentiment_service),
+    enrichment_service: EnrichmentService = Depends(get_enrichment_service),
+    analysis_store: Optional[AnalysisStore] = Depends(get_analysis_store),
+    semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache),
+    retrieval_service: Optional[RetrievalService] = Depends(get_retrieval_service)
+):
+    """Analyze a single stock with AI-powered insights
+
+    ``mode`` picks the tier: ``fast`` returns computed results only, ``full`` waits for the
+    LLM narrative, ``auto`` uses a cached narrative or returns fast results with a job id.
+    ``full`` and ``auto`` first look for a stored analysis of the same input data, and
+    custom prompts for a fresh answer to a similar prompt (``narrative_status: similar``).
+    Responses carry an ``ETag`` computed from the market data, so polling with
+    ``If-None-Match`` gets ``304`` before any news, sentiment or LLM work is done.
+    """
+    start_time = time.time()
+    
+    try:
+        stock_data, technical_indicators = await gather_market_context(request, technical_service)
+        market_data = stock_data
+        model = ollama_service.model if request.mode != "fast" else None
+        # Analyses are read-only, so a repeated POST is revalidated like a GET
+        etag = await revalidated(http_request, request, market_data, model, enrichment_service)
+        if etag is not None:
+            return not_modified_response(etag)
         
-        if best_score > 50:
-            key_points.append(f"Best suited for: {strategy_names[best_strategy]} (Score: {best_score}/100)")
-        
-        # Create analysis result
-        analysis = AIAnalysis(
-            stock_symbol=request.symbol,
-            analysis_type=request.analysis_type,
-            summary=summary,
-            recommendation=recommendation,
-            confidence_score=confidence_score,
-            key_points=key_points,
-            risks=risks,
-            opportunities=opportunities,
-            technical_indicators=technical_indicators,
-            sentiment=sentiment,
-            timestamp=datetime.utcnow()
+        # Fast mode never prompts the LLM, so it needs no news passages
+        stock_data, sentiment = await gather_news_context(
+            request, stock_data, sentiment_service, retrieval_service if request.mode != "fast" else None
         )
+        analysis, job_id = await run_analysis(
+            request, stock_data, technical_indicators, sentiment, ollama_service, enrichment_service, analysis_store,
+            semantic_cache
+        )
+        
+        # A response missing parts because of the deadline is not worth revalidating
+        if not deadline.skipped():
+            etag = analysis_etag(request, market_data, model, "pending" if job_id else "ready")
+            response.headers.update(cache_headers(etag))
         
         processing_time = time.time() - start_time
         
         return AnalysisResponse(
             success=True,
             data=analysis,
+            job_id=job_id,
+            skipped=deadline.skipped(),
             processing_time=processing_time
         )
         
     except HTTPException:
         raise
     except Exception as e:
+        metrics.errors_total.inc(stage="analyze_stock", error=type(e).__name__)
         processing_time = time.time() - start_time
         return AnalysisResponse(
             success=False,
@@ -467,8 +713,344 @@ Provide:
             processing_time=processing_time
         )
 
+@router.post("/batch")
+async def analyze_batch(
+    request: BatchAnalysisRequest,
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    technical_service: TechnicalAnalysisService = Depends(get_technical_service),
+    sentiment_service: SentimentService = Depends(get_sentiment_service),
+    enrichment_service: EnrichmentService = Depends(get_enrichment_service),
+    analysis_store: Optional[AnalysisStore] = Depends(get_analysis_store)
+):
+    """Analyze a watchlist in one request, streamed as NDJSON
+
+    Market data for all symbols is fetched concurrently (sharing any identical fetch in
+    flight), technicals are computed in one vectorized pass and news sentiment in one bulk
+    call. Each symbol then goes through the same tiers, stored results and caches as
+    ``/analysis/stock``. Emits ``result`` or ``error`` per symbol as it completes, then ``done``.
+    """
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in request.symbols if symbol.strip()))
+    if len(symbols) > settings.BATCH_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_SYMBOLS} symbols per batch")
+    
+    def failure(symbol: str, e: Exception) -> dict:
+        if isinstance(e, HTTPException):
+            return {"event": "error", "symbol": symbol, "status": e.status_code, "error": e.detail}
+        metrics.errors_total.inc(stage="analyze_batch", error=type(e).__name__)
+        return {"event": "error", "symbol": symbol, "status": 500, "error": str(e)}
+    
+    async def events():
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+        tasks: List[asyncio.Task] = []
+        errors = 0
+        
+        async def fetch(symbol: str):
+            async with semaphore:
+                try:
+                    return symbol, await fetch_stock_data(symbol), None
+                except Exception as e:
+                    return symbol, None, e
+        
+        async def analyze(symbol: str):
+            symbol_request = AnalysisRequest(
+                symbol=symbol,
+                analysis_type=request.analysis_type,
+                include_technical=request.include_technical,
+                include_sentiment=request.include_sentiment,
+                mode=request.mode
+            )
+            async with semaphore:
+                try:
+                    analysis, job_id = await run_analysis(
+                        symbol_request, fetched[symbol], technical.get(symbol), sentiments.get(symbol),
+                        ollama_service, enrichment_service, analysis_store
+                    )
+                    return symbol, {"event": "result", "symbol": symbol, "job_id": job_id,
+                                    "data": analysis.model_dump(mode="json")}
+                except Exception as e:
+                    return symbol, failure(symbol, e)
+        
+        try:
+            sentiment_task = None
+            if request.include_sentiment:
+                sentiment_task = asyncio.create_task(
+                    sentiment_service.analyze_news_sentiment_bulk(symbols, settings.BATCH_CONCURRENCY)
+                )
+                tasks.append(sentiment_task)
+            
+            fetches = [asyncio.create_task(fetch(symbol)) for symbol in symbols]
+            tasks.extend(fetches)
+            fetched = {}
+            for future in asyncio.as_completed(fetches):
+                symbol, stock_data, error = await future
+                if error is None:
+                    fetched[symbol] = stock_data
+                else:
+                    errors += 1
+                    yield ndjson(failure(symbol, error))
+            
+            technical = {}
+            with_prices = [symbol for symbol in symbols if symbol in fetched and fetched[symbol].get('prices')]
+            if request.include_technical and with_prices:
+                with stage("technical_analysis"):
+                    price_rows = [np.asarray(fetched[symbol]['prices'], dtype=np.float64) for symbol in with_prices]
+                    volume_rows = [np.asarray(fetched[symbol]['volumes'], dtype=np.float64) for symbol in with_prices]
+                    # Equal-length series go as one matrix each, which shares memory with a process worker
+                    if len({len(row) for row in price_rows}) == 1 and len({len(row) for row in volume_rows}) == 1:
+                        price_rows, volume_rows = np.stack(price_rows), np.stack(volume_rows)
+                    tech_rows = await compute.run(
+                        technical_service.get_comprehensive_analysis_batch, price_rows, volume_rows
+                    )
+                for symbol, tech_data in zip(with_prices, tech_rows):
+                    # Copies: fetched data is shared with other coalesced callers
+                    fetched[symbol] = {**fetched[symbol], 'technical_indicators': tech_data}
+                    technical[symbol] = technical_model(tech_data)
+            
+            sentiments = {}
+            if sentiment_task is not None:
+                sentiments = {symbol: sentiment_model(data) for symbol, data in (await sentiment_task).items()}
+            
+            analyses = [asyncio.create_task(analyze(symbol)) for symbol in symbols if symbol in fetched]
+            tasks.extend(analyses)
+            for future in asyncio.as_completed(analyses):
+                symbol, event = await future
+                if event["event"] == "error":
+                    errors += 1
+                yield ndjson(event)
+            
+            yield ndjson({
+                "event": "done",
+                "count": len(symbols) - errors,
+                "errors": errors,
+                "skipped": deadline.skipped(),
+                "processing_time": time.time() - start_time
+            })
+        finally:
+            # Client went away mid-batch: don't leave fetches and generations running
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/jobs/{job_id}")
+async def get_enrichment_job(
+    job_id: str,
+    http_request: Request,
+    response: Response,
+    enrichment_service: EnrichmentService = Depends(get_enrichment_service)
+):
+    """Status of a background LLM enrichment; ``narrative`` is set once it is done"""
+    job = await enrichment_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job {job_id}")
+    
+    # A job only changes when it completes
+    etag = make_etag(job_id, job["status"], job.get("completed_at"))
+    if not_modified(http_request, etag):
+        return not_modified_response(etag)
+    response.headers.update(cache_headers(etag))
+    return {"success": True, **job}
+
+@router.get("/history/{symbol}")
+async def get_analysis_history(
+    symbol: str,
+    analysis_type: Optional[str] = Query(None, description="Only analyses of this type"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    analysis_store: Optional[AnalysisStore] = Depends(get_analysis_store)
+):
+    """Stored analyses for a symbol, newest first"""
+    if analysis_store is None:
+        raise HTTPException(status_code=404, detail="Analysis store is disabled")
+    try:
+        items, next_cursor = await asyncio.to_thread(
+            analysis_store.history, symbol.upper(), analysis_type, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "symbol": symbol.upper(), "count": len(items), "items": items, "next_cursor": next_cursor}
+
+@router.post("/history/latest")
+async def get_latest_analyses(
+    request: LatestAnalysesRequest,
+    analysis_store: Optional[AnalysisStore] = Depends(get_analysis_store)
+):
+    """Most recent stored analysis for each symbol of a watchlist, in one query"""
+    if analysis_store is None:
+        raise HTTPException(status_code=404, detail="Analysis store is disabled")
+    symbols = [symbol.upper() for symbol in request.symbols]
+    results = await asyncio.to_thread(analysis_store.latest, symbols, request.analysis_type)
+    return {
+        "success": True,
+        "results": results,
+        "missing": [symbol for symbol in dict.fromkeys(symbols) if symbol not in results]
+    }
+
+@router.delete("/history/{symbol}")
+async def invalidate_analyses(
+    symbol: str,
+    analysis_type: Optional[str] = Query(None, description="Only analyses of this type"),
+    analysis_store: Optional[AnalysisStore] = Depends(get_analysis_store)
+):
+    """Drop a symbol's stored analyses so the next request regenerates them"""
+    if analysis_store is None:
+        raise HTTPException(status_code=404, detail="Analysis store is disabled")
+    deleted = await asyncio.to_thread(analysis_store.invalidate, symbol.upper(), analysis_type)
+    return {"success": True, "symbol": symbol.upper(), "deleted": deleted}
+
+@router.post("/news/{symbol}")
+async def ingest_news(
+    symbol: str,
+    request: NewsIngestRequest,
+    retrieval_service: Optional[RetrievalService] = Depends(get_retrieval_service)
+):
+    """Index articles or filings for a symbol so analyses can retrieve them; known URLs are skipped"""
+    if retrieval_service is None:
+        raise HTTPException(status_code=404, detail="Retrieval is disabled")
+    # Same shape as NewsAPI articles, which are indexed as they are fetched
+    articles = [
+        {
+            "title": document.title,
+            "content": document.text,
+            "url": document.url,
+            "source": {"name": document.source},
+            "publishedAt": document.published_at.isoformat() if document.published_at else None
+        }
+        for document in request.documents
+    ]
+    try:
+        with stage("news_ingest"):
+            added = await retrieval_service.ingest(symbol, articles)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to index documents: {str(e)}")
+    stats = await asyncio.to_thread(retrieval_service.index.stats, symbol.upper())
+    return {"success": True, "passages_added": added, **stats}
+
+@router.get("/news/{symbol}/search")
+async def search_news(
+    symbol: str,
+    q: str = Query(..., min_length=1, description="Question or topic"),
+    k: Optional[int] = Query(None, ge=1, le=50, description="Passages to consider (default RETRIEVAL_TOP_K)"),
+    retrieval_service: Optional[RetrievalService] = Depends(get_retrieval_service)
+):
+    """Indexed passages most relevant to a question, as they would be added to a prompt"""
+    if retrieval_service is None:
+        raise HTTPException(status_code=404, detail="Retrieval is disabled")
+    try:
+        with stage("retrieval"):
+            passages = await retrieval_service.retrieve(symbol, q, k=k)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to search news: {str(e)}")
+    return {"success": True, "symbol": symbol.upper(), "count": len(passages), "passages": passages}
+
+@router.post("/stock/stream")
+async def stream_stock_analysis(
+    request: AnalysisRequest,
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    technical_service: TechnicalAnalysisService = Depends(get_technical_service),
+    sentiment_service: SentimentService = Depends(get_sentiment_service),
+    enrichment_service: EnrichmentService = Depends(get_enrichment_service),
+    analysis_store: Optional[AnalysisStore] = Depends(get_analysis_store),
+    semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache),
+    retrieval_service: Optional[RetrievalService] = Depends(get_retrieval_service)
+):
+    """Stream a single-stock analysis as NDJSON events
+
+    ``context`` (indicators and sentiment) comes first, then one ``field`` event per output
+    field as soon as the model has finished it (``text`` deltas for custom prompts), and
+    finally ``done`` with the complete analysis or ``error``. The narrative is always
+    generated (``mode`` is ignored), cached for later ``auto`` requests and stored, unless
+    the request deadline runs out first: ``done`` then lists it under ``skipped``.
+    """
+    async def events():
+        start_time = time.time()
+        try:
+            stock_data, technical_indicators, sentiment = await gather_stock_context(
+                request, technical_service, sentiment_service, retrieval_service
+            )
+            yield ndjson({
+                "event": "context",
+                "technical_indicators": technical_indicators.model_dump() if technical_indicators else None,
+                "sentiment": sentiment.model_dump() if sentiment else None,
+                "news": [
+                    {key: passage[key] for key in ("title", "source", "url", "published_at", "score")}
+                    for passage in stock_data.get('news_context') or []
+                ]
+            })
+            
+            narrative_status = "generated"
+            try:
+                output = await similar_answer(request, stock_data, semantic_cache)
+                if output is not None:
+                    # A similar prompt was answered recently: send that answer as one delta
+                    narrative_status = "similar"
+                    yield ndjson({"event": "text", "delta": output.summary})
+                elif request.custom_prompt:
+                    deadline.ensure(settings.DEADLINE_MIN_LLM_SECONDS, "the LLM narrative")
+                    chunks = []
+                    with stage("llm_generate"):
+                        async for delta in ollama_service.generate_stream(
+                            build_custom_prompt(request.custom_prompt, stock_data.get('news_context'))
+                        ):
+                            chunks.append(delta)
+                            yield ndjson({"event": "text", "delta": delta})
+                    output = StockAnalysisOutput.unstructured("".join(chunks))
+                    if semantic_cache is not None:
+                        await semantic_cache.store(
+                            request.symbol, request.custom_prompt, stock_data.get('price'), output.summary
+                        )
+                else:
+                    deadline.ensure(settings.DEADLINE_MIN_LLM_SECONDS, "the LLM narrative")
+                    with stage("prompt_build"):
+                        ai_prompt = build_stock_prompt(request.symbol, stock_data, technical_indicators)
+                    chunks, parser = [], IncrementalJSONParser()
+                    with stage("llm_generate"):
+                        async for delta in ollama_service.generate_stream(
+                            ai_prompt, STOCK_SYSTEM_PROMPT,
+                            response_format=ollama_service.response_format(StockAnalysisOutput)
+                        ):
+                            chunks.append(delta)
+                            if parser is None:
+                                continue
+                            try:
+                                fields = parser.feed(delta)
+                            except ValueError:
+                                # Not JSON after all; parse_stock_output keeps the plain text
+                                parser = None
+                                continue
+                            for name, value in fields:
+                                yield ndjson({"event": "field", "name": name, "value": value})
+                    output = parse_stock_output("".join(chunks), parser)
+            except deadline.DeadlineExceeded:
+                # Out of time: finish with the computed results alone
+                deadline.skip("llm_generate")
+                output = None
+            
+            if output is not None:
+                await enrichment_service.store_narrative(narrative_key(request), output.model_dump())
+                analysis = build_ai_analysis(
+                    request, stock_data, technical_indicators, sentiment, output, narrative_status
+                )
+                await save_analysis(analysis_store, request, analysis_fingerprint(request, stock_data), analysis)
+            else:
+                analysis = build_ai_analysis(request, stock_data, technical_indicators, sentiment, None, "skipped")
+            yield ndjson({
+                "event": "done",
+                "data": analysis.model_dump(mode="json"),
+                "skipped": deadline.skipped(),
+                "processing_time": time.time() - start_time
+            })
+        except HTTPException as e:
+            yield ndjson({"event": "error", "status": e.status_code, "error": e.detail})
+        except Exception as e:
+            metrics.errors_total.inc(stage="analyze_stock", error=type(e).__name__)
+            yield ndjson({"event": "error", "status": 500, "error": str(e)})
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @router.post("/compare")
-async def compare_stocks(request: CompareRequest):
+async def compare_stocks(request: CompareRequest, ollama_service: OllamaService = Depends(get_ollama_service)):
     """Compare multiple stocks"""
     start_time = time.time()
     
@@ -503,23 +1085,86 @@ async def compare_stocks(request: CompareRequest):
             "processing_time": processing_time
         }
 
+def portfolio_risk_data(portfolio_id: int, risk, plan=None) -> dict:
+    """Prompt data for a simulated portfolio: totals, holdings, the risk figures and any optimizer trades"""
+    var = {level: values["percent"] for level, values in risk["var"].items()}
+    cvar = {level: values["percent"] for level, values in risk["cvar"].items()}
+    data = {
+        "portfolio_id": portfolio_id,
+        "total_value": risk["portfolio_value"],
+        "holdings": [
+            {"symbol": symbol, "value": holding["value"], "weight": round(holding["weight"] * 100, 2),
+             "risk_share": round(holding["risk_contribution"] * 100, 2)
+             if holding["risk_contribution"] is not None else None}
+            for symbol, holding in risk["holdings"].items()
+        ],
+        "risk": {
+            "horizon_days": risk["horizon_days"],
+            "annual_volatility": risk["annual_volatility"],
+            "var": var,
+            "cvar": cvar,
+            "probability_of_loss": risk["probability_of_loss"],
+            "median_max_drawdown": risk["max_drawdown"]["percentiles"]["p50"],
+            "p95_max_drawdown": risk["max_drawdown"]["percentiles"]["p95"]
+        }
+    }
+    if plan is not None:
+        target = plan[plan["objective"]]
+        data["rebalancing"] = {
+            "objective": plan["objective"],
+            "max_weight": plan["constraints"]["max_weight"],
+            "max_turnover": plan["constraints"]["max_turnover"],
+            "turnover": target["turnover"],
+            "current": {name: plan["current"][name] for name in ("expected_return", "volatility", "sharpe")},
+            "target": {name: target[name] for name in ("expected_return", "volatility", "sharpe")}
+        }
+        data["trades"] = [
+            {"symbol": trade["symbol"], "action": trade["action"],
+             "weight_from": round(trade["current_weight"] * 100, 2), "weight_to": round(trade["target_weight"] * 100, 2),
+             "value": trade["value"], "shares": trade["shares"]}
+            for trade in plan["trades"]
+        ]
+    return data
+
 @router.post("/portfolio")
-async def analyze_portfolio(request: PortfolioAnalysisRequest):
-    """Analyze entire portfolio"""
+async def analyze_portfolio(
+    request: PortfolioAnalysisRequest,
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    risk_service: RiskService = Depends(get_risk_service),
+    optimizer: PortfolioOptimizer = Depends(get_portfolio_optimizer)
+):
+    """Analyze a portfolio
+
+    With ``holdings``, its simulated VaR, CVaR and drawdowns are analyzed too and the
+    rebalancing trades come from the mean-variance optimizer; the model only explains them.
+    """
     start_time = time.time()
     
     try:
-        portfolio_data = {
-            "portfolio_id": request.portfolio_id,
-            "total_value": 100000,
-            "total_cost": 90000,
-            "total_gain": 10000,
-            "holdings": [
-                {"symbol": "AAPL", "quantity": 100, "value": 15000, "weight": 15},
-                {"symbol": "GOOGL", "quantity": 50, "value": 12500, "weight": 12.5},
-                {"symbol": "MSFT", "quantity": 75, "value": 22500, "weight": 22.5}
-            ]
-        }
+        risk, plan = None, None
+        if request.holdings:
+            holdings = {holding.symbol: {"quantity": holding.quantity, "value": holding.value}
+                        for holding in request.holdings}
+            simulation = risk_service.simulate(holdings, horizon_days=request.horizon_days)
+            if request.include_recommendations:
+                risk, plan = await asyncio.gather(
+                    simulation, optimizer.optimize(holdings, **request.rebalance.model_dump())
+                )
+            else:
+                risk = await simulation
+            portfolio_data = portfolio_risk_data(request.portfolio_id, risk, plan)
+        else:
+            portfolio_data = {
+                "portfolio_id": request.portfolio_id,
+                "total_value": 100000,
+                "total_cost": 90000,
+                "total_gain": 10000,
+                "holdings": [
+                    {"symbol": "AAPL", "quantity": 100, "value": 15000, "weight": 15},
+                    {"symbol": "GOOGL", "quantity": 50, "value": 12500, "weight": 12.5},
+                    {"symbol": "MSFT", "quantity": 75, "value": 22500, "weight": 22.5}
+                ]
+            }
         
         analysis = await ollama_service.portfolio_analysis(portfolio_data)
         
@@ -529,6 +1174,8 @@ async def analyze_portfolio(request: PortfolioAnalysisRequest):
             "success": True,
             "portfolio_id": request.portfolio_id,
             "analysis": analysis,
+            "risk": risk,
+            "rebalance": plan,
             "include_recommendations": request.include_recommendations,
             "processing_time": processing_time
         }
@@ -542,7 +1189,7 @@ async def analyze_portfolio(request: PortfolioAnalysisRequest):
         }
 
 @router.get("/sentiment/{symbol}")
-async def get_sentiment(symbol: str):
+async def get_sentiment(symbol: str, sentiment_service: SentimentService = Depends(get_sentiment_service)):
     """Get sentiment analysis for a stock"""
     try:
         sentiment_data = await sentiment_service.analyze_news_sentiment(symbol)
@@ -556,45 +1203,155 @@ async def get_sentiment(symbol: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/fear-greed/{symbol}")
-async def get_fear_greed_index(symbol: str):
-    """Calculate Fear & Greed index for a stock"""
+@router.post("/fear-greed/bulk")
+async def get_fear_greed_bulk(
+    request: FearGreedBulkRequest,
+    fear_greed_service: FearGreedService = Depends(get_fear_greed_service)
+):
+    """Calculate Fear & Greed index for many stocks in one vectorized pass"""
+    if len(request.symbols) > settings.FEAR_GREED_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.FEAR_GREED_MAX_SYMBOLS} symbols per request")
+    
     try:
-        market_data = {
-            "price_change_percent": 2.5,
-            "volume_trend": "increasing",
-            "rsi": 55
+        computed = await fear_greed_service.compute(request.symbols, include_news=request.include_news)
+        return {
+            "success": True,
+            "count": len(computed["results"]),
+            "results": computed["results"],
+            "errors": computed["errors"]
         }
         
-        fear_greed = sentiment_service.calculate_fear_greed_index(market_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/fear-greed/market")
+async def get_market_fear_greed(fear_greed_service: FearGreedService = Depends(get_fear_greed_service)):
+    """Market-wide Fear & Greed index, refreshed in the background"""
+    try:
+        return {
+            "success": True,
+            "fear_greed_index": await fear_greed_service.get_market()
+        }
+        
+    except deadline.DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except MarketDataError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/fear-greed/{symbol}")
+async def get_fear_greed_index(symbol: str, fear_greed_service: FearGreedService = Depends(get_fear_greed_service)):
+    """Calculate Fear & Greed index for a stock"""
+    try:
+        computed = await fear_greed_service.compute([symbol], include_news=True)
+        if not computed["results"]:
+            raise HTTPException(status_code=503, detail=computed["errors"].get(symbol.upper(), "Market data unavailable"))
         
         return {
             "success": True,
-            "symbol": symbol,
-            "fear_greed_index": fear_greed
+            "symbol": symbol.upper(),
+            "fear_greed_index": computed["results"][0]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+TECHNICAL_PERIODS = ("1d", "1w", "1m", "3m", "6m", "1y", "5y")
+TECHNICAL_INDICATORS = ("rsi", "sma", "ema", "macd", "bollinger", "volume")
+# Bars computed before the requested range so long-window indicators are warmed up
+TECHNICAL_WARMUP_BARS = 250
+
+@router.get("/technical/{symbol}")
 @router.post("/technical/{symbol}")
-async def get_technical_analysis(symbol: str):
-    """Get technical analysis for a stock"""
+async def get_technical_analysis(
+    symbol: str,
+    http_request: Request,
+    response: Response,
+    period: str = Query("6m", description="Range: 1d, 1w, 1m, 3m, 6m, 1y or 5y"),
+    interval: str = Query("daily", description="Bar interval: 1min, 5min, 15min, 30min, 60min, 240min, daily, weekly or monthly"),
+    base: Optional[str] = Query(None, description="Stored interval to roll the bars up from (default: the interval itself when Alpha Vantage serves it)"),
+    indicators: str = Query(",".join(TECHNICAL_INDICATORS), description="Comma-separated indicators to compute"),
+    max_points: int = Query(settings.TECHNICAL_MAX_POINTS, ge=10, le=5000, description="Downsample series to at most this many points"),
+    market_data_service: MarketDataService = Depends(get_market_data_service),
+    technical_service: TechnicalAnalysisService = Depends(get_technical_service)
+):
+    """Get technical analysis for a stock over real price history
+
+    The ``ETag`` hashes the bars the response is computed from, so a matching
+    ``If-None-Match`` gets ``304`` before any indicator is computed.
+    """
+    if period.lower() not in TECHNICAL_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported period '{period}'. Use one of: {', '.join(TECHNICAL_PERIODS)}")
+    if interval not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval '{interval}'. Use one of: {', '.join(TIMEFRAMES)}")
     try:
-        mock_prices = [145, 147, 146, 148, 150, 151, 149, 152, 150, 153, 
-                       152, 154, 156, 155, 157, 159, 158, 160, 162, 161]
-        mock_volumes = [45000000, 47000000, 46000000, 48000000, 50000000,
-                        51000000, 49000000, 52000000, 50000000, 53000000,
-                        52000000, 54000000, 56000000, 55000000, 57000000,
-                        59000000, 58000000, 60000000, 62000000, 61000000]
+        base = source_interval(interval, base)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    selected = [name.strip().lower() for name in indicators.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in TECHNICAL_INDICATORS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown indicators: {', '.join(unknown)}")
+    
+    try:
+        with stage("fetch_history"):
+            history = await market_data_service.get_bars(symbol, interval, base)
+        
+        start_date, end_date = parse_date_range(period)
+        timestamps = history["timestamp"]
+        lo = int(np.searchsorted(timestamps, int(start_date.timestamp()), side="left"))
+        hi = int(np.searchsorted(timestamps, int(end_date.timestamp()), side="right"))
+        if lo >= hi:
+            raise HTTPException(status_code=404, detail=f"No {interval} bars for {symbol} in the last {period}")
+        warm = max(0, lo - TECHNICAL_WARMUP_BARS)
+        
+        etag = make_etag(
+            symbol.upper(), period.lower(), interval, base, selected, max_points, lo - warm,
+            *(history[name][warm:hi] for name in ("timestamp", "open", "high", "low", "close", "volume"))
+        )
+        if not_modified(http_request, etag):
+            return not_modified_response(etag)
+        response.headers.update(cache_headers(etag))
         
-        analysis = technical_service.get_comprehensive_analysis(mock_prices, mock_volumes)
+        with stage("technical_analysis"):
+            closes = history["close"][warm:hi]
+            volumes = history["volume"][warm:hi]
+            indicator_series = await compute.run(technical_service.get_indicator_series, closes, volumes, selected)
+            summary = technical_service.summarize_series(indicator_series, volumes)
+            
+            # Drop the warm-up bars and downsample every column with the same indices
+            offset = lo - warm
+            columns = {name: history[name][lo:hi] for name in ("timestamp", "open", "high", "low", "close", "volume")}
+            columns.update({name: values[offset:] for name, values in indicator_series.items()})
+            total_points = hi - lo
+            if total_points > max_points:
+                # The LTTB loop runs in Python, roughly 1000 array elements' worth of work per point
+                keep = await compute.run(
+                    lttb_indices, columns["timestamp"], columns["close"], max_points, cost=total_points + 1000 * max_points
+                )
+                columns = {name: values[keep] for name, values in columns.items()}
         
         return {
             "success": True,
-            "symbol": symbol,
-            "technical_analysis": analysis
+            "symbol": symbol.upper(),
+            "period": period.lower(),
+            "interval": interval,
+            "base": base,
+            "indicators": selected,
+            "total_points": total_points,
+            "points": len(columns["timestamp"]),
+            "technical_analysis": summary,
+            "series": {name: series_to_list(values) for name, values in columns.items()}
         }
         
+    except HTTPException:
+        raise
+    except deadline.DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except MarketDataError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,44 @@
+# services/analysis-service/app/routes/backtest.py
+from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime, time, timezone
+
+from app.models.request import BacktestRequest
+from app.services.backtest import BacktestService, STRATEGIES
+from app.config import settings
+from app.dependencies import get_backtest_service
+
+router = APIRouter()
+
+@router.get("/strategies")
+async def list_strategies():
+    """Backtestable strategies and their default parameters"""
+    return {"success": True, "strategies": STRATEGIES}
+
+@router.post("/run")
+async def run_backtest(request: BacktestRequest, backtest_service: BacktestService = Depends(get_backtest_service)):
+    """Replay price history through a strategy for every symbol and parameter combination"""
+    if len(request.symbols) > settings.BACKTEST_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BACKTEST_MAX_SYMBOLS} symbols per request")
+    
+    try:
+        result = await backtest_service.run(
+            request.symbols,
+            strategy=request.strategy,
+            params=request.params,
+            interval=request.interval,
+            start=datetime.combine(request.start, time.min, tzinfo=timezone.utc) if request.start else None,
+            end=datetime.combine(request.end, time.max, tzinfo=timezone.utc) if request.end else None,
+            cost_bps=request.cost_bps,
+            rank_by=request.rank_by,
+            refresh=request.refresh
+        )
+        if not result["results"]:
+            raise HTTPException(status_code=404, detail={"message": "No price history for any symbol", "errors": result["errors"]})
+        return {"success": True, **result}
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
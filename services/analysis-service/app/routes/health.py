@@ -1,14 +1,18 @@
 # services/analysis-service/app/routes/health.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from datetime import datetime
-import httpx
 from app.config import settings
+from app.dependencies import get_health_service, get_ollama_service
+from app.services.health_service import HealthService
+from app.services.ollama_service import OllamaService
 
 router = APIRouter()
 
 @router.get("/health")
+@router.get("/health/live")
 async def health_check():
-    """Basic health check endpoint"""
+    """Liveness: the worker is up and its event loop is answering"""
     return {
         "status": "healthy",
         "service": "analysis-service",
@@ -16,63 +20,59 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@router.get("/health/ready")
+async def readiness_check(
+    health: HealthService = Depends(get_health_service),
+    ollama_service: OllamaService = Depends(get_ollama_service)
+):
+    """Readiness: 503 while a critical dependency (by default Ollama) is down, or while draining"""
+    readiness = health.readiness(draining=ollama_service.draining)
+
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content={
+            "status": "ready" if readiness["ready"] else "not_ready",
+            "reasons": readiness["reasons"],
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        headers={"Cache-Control": "no-store"}
+    )
+
 @router.get("/health/detailed")
-async def detailed_health_check():
-    """Detailed health check including Ollama connectivity"""
+async def detailed_health_check(health: HealthService = Depends(get_health_service)):
+    """Detailed health from the latest background probes of Ollama, Redis, Postgres and the data providers"""
+    if not health.enabled():
+        # Background probes are off (HEALTH_PROBE_INTERVAL=0): probe on demand
+        await health.probe_all()
+    
     health_status = {
-        "status": "healthy",
+        "status": health.status(),
         "service": "analysis-service",
         "timestamp": datetime.utcnow().isoformat(),
         "version": "1.0.0",
-        "components": {}
+        "probe_interval_seconds": health.interval,
+        "stale": health.stale(),
+        "components": health.components()
     }
-    
-    # Check Ollama connectivity
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{settings.OLLAMA_URL}/api/tags")
-            if response.status_code == 200:
-                health_status["components"]["ollama"] = {
-                    "status": "healthy",
-                    "url": settings.OLLAMA_URL,
-                    "model": settings.OLLAMA_MODEL
-                }
-            else:
-                health_status["components"]["ollama"] = {
-                    "status": "unhealthy",
-                    "error": f"HTTP {response.status_code}"
-                }
-                health_status["status"] = "degraded"
-    except Exception as e:
-        health_status["components"]["ollama"] = {
-            "status": "unhealthy",
-            "error": str(e)
-        }
-        health_status["status"] = "degraded"
-    
+    if "ollama" in health_status["components"]:
+        health_status["components"]["ollama"]["url"] = settings.OLLAMA_URL
+
     return health_status
 
 @router.get("/models")
-async def list_available_models():
-    """List available Ollama models"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{settings.OLLAMA_URL}/api/tags")
-            response.raise_for_status()
-            data = response.json()
-            
-            models = []
-            for model in data.get("models", []):
-                models.append({
-                    "name": model.get("name"),
-                    "size": model.get("size"),
-                    "modified": model.get("modified_at")
-                })
-            
-            return {
-                "success": True,
-                "current_model": settings.OLLAMA_MODEL,
-                "available_models": models
-            }
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Failed to fetch models: {str(e)}")
\ No newline at end of file
+async def list_available_models(health: HealthService = Depends(get_health_service)):
+    """List available Ollama models (as of the latest health probe)"""
+    if not health.enabled():
+        await health.probe_all()
+    
+    if health.models is None:
+        ollama = health.components().get("ollama")
+        detail = ollama["error"] if ollama else "not probed yet"
+        raise HTTPException(status_code=503, detail=f"Failed to fetch models: {detail}")
+
+    return {
+        "success": True,
+        "current_model": settings.OLLAMA_MODEL,
+        "fast_model": settings.OLLAMA_FAST_MODEL,
+        "available_models": health.models
+    }
@@ -0,0 +1,25 @@
+# services/analysis-service/app/routes/metrics.py
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.telemetry.loop_monitor import loop_monitor
+from app.telemetry.metrics import metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose service metrics in the Prometheus text format"""
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@router.get("/debug/loop")
+async def get_loop_health(limit: int = Query(10, ge=1, le=100)):
+    """Recent event-loop lag and the stacks that blocked the loop longest (LOOP_DEBUG_ENDPOINT)"""
+    if not settings.LOOP_DEBUG_ENDPOINT:
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    return loop_monitor.report(limit)
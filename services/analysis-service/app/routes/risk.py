@@ -0,0 +1,50 @@
+# services/analysis-service/app/routes/risk.py
+from fastapi import APIRouter, HTTPException, Depends
+
+from app.models.request import OptimizeRequest, RebalanceOptions, RiskSimulationRequest
+from app.services.optimizer import PortfolioOptimizer
+from app.services.risk import RiskService
+from app.dependencies import get_portfolio_optimizer, get_risk_service
+
+router = APIRouter()
+
+@router.post("/simulate")
+async def simulate_risk(request: RiskSimulationRequest, risk_service: RiskService = Depends(get_risk_service)):
+    """Monte Carlo VaR, CVaR and drawdown distribution of a portfolio over a horizon"""
+    try:
+        result = await risk_service.simulate(
+            {holding.symbol: {"quantity": holding.quantity, "value": holding.value} for holding in request.holdings},
+            paths=request.paths,
+            horizon_days=request.horizon_days,
+            confidence=request.confidence,
+            lookback_days=request.lookback_days,
+            include_drift=request.include_drift,
+            seed=request.seed,
+            refresh=request.refresh
+        )
+        return {"success": True, **result}
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/optimize")
+async def optimize_portfolio(request: OptimizeRequest,
+                             optimizer: PortfolioOptimizer = Depends(get_portfolio_optimizer)):
+    """Efficient frontier, minimum-variance and max-Sharpe weights, and the trades to the chosen target"""
+    try:
+        result = await optimizer.optimize(
+            {holding.symbol: {"quantity": holding.quantity, "value": holding.value} for holding in request.holdings},
+            # objective, bounds, turnover and return views
+            **request.model_dump(include=set(RebalanceOptions.model_fields)),
+            lookback_days=request.lookback_days,
+            frontier_points=request.frontier_points,
+            refresh=request.refresh
+        )
+        return {"success": True, **result}
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
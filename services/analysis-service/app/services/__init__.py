@@ -1,10 +1,20 @@
 # services/analysis-service/app/services/__init__.py
-from .ollama_service import ollama_service
-from .technical_analysis import technical_service
-from .sentiment_service import sentiment_service
+from app import dependencies
+
+# Service instances are created on first access; see app.dependencies
+_PROVIDERS = {
+    'ollama_service': dependencies.get_ollama_service,
+    'technical_service': dependencies.get_technical_service,
+    'sentiment_service': dependencies.get_sentiment_service
+}
+
+def __getattr__(name):
+    if name in _PROVIDERS:
+        return _PROVIDERS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     'ollama_service',
     'technical_service',
     'sentiment_service'
-]
\ No newline at end of file
+]
@@ -0,0 +1,396 @@
+# services/analysis-service/app/services/alert_engine.py
+from __future__ import annotations
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple, get_args
+
+from app.config import settings
+from app.models.request import AlertIndicator
+from app.resources import resources
+from app.services.alert_sinks import AlertSink, deliver_all
+from app.services.alert_store import AlertRuleStore
+from app.services.market_data_service import MarketDataService
+from app.telemetry.log import log
+from app.telemetry.metrics import metrics, stage
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Per-symbol values a rule can compare, as of the symbol's latest bar
+ALERT_FEATURES: Tuple[str, ...] = get_args(AlertIndicator)
+FEATURE_INDEX = {name: i for i, name in enumerate(ALERT_FEATURES)}
+# "above": indicator - threshold > 0, "below": threshold - indicator > 0
+OP_SIGNS = {"above": 1.0, "below": -1.0}
+
+WINDOW = 50  # closes kept per symbol (longest moving average)
+RSI_PERIOD = 14
+SEED_BARS = 120  # history bars replayed to warm up a new symbol
+RECENT_ALERTS = 500  # fired alerts kept in memory for GET /alerts/fired
+BARS_CHANNEL = "alerts:bars"  # Redis channel broadcasting incoming bars to every worker
+FIRED_KEY_TTL = 86400
+
+
+class IndicatorState:
+    """Incremental indicators for many symbols, advanced one bar at a time
+
+    Each symbol keeps its last ``WINDOW`` closes plus running EMA and Wilder averages, so
+    a bar costs O(1) per symbol and a batch of bars is a handful of array operations.
+    Definitions follow the full-series methods of ``TechnicalAnalysisService``: Wilder RSI,
+    EMAs seeded with the first close, a 9-bar EMA signal line and population-std bands.
+    """
+
+    # name -> (trailing shape, initial value, dtype); arrays are created on first use
+    _ARRAYS = {
+        "count": ((), 0, "int64"),
+        "last_ts": ((), float("-inf"), "float64"),
+        "last_close": ((), float("nan"), "float64"),
+        "closes": ((WINDOW,), float("nan"), "float64"),
+        "avg_gain": ((), 0.0, "float64"),
+        "avg_loss": ((), 0.0, "float64"),
+        "ema_12": ((), 0.0, "float64"),
+        "ema_26": ((), 0.0, "float64"),
+        "signal": ((), 0.0, "float64"),
+        "features": ((len(ALERT_FEATURES),), float("nan"), "float64")
+    }
+
+    def __init__(self):
+        self.symbols: Dict[str, int] = {}
+        self.capacity = 0
+        for name in self._ARRAYS:
+            setattr(self, name, None)
+
+    def _grow(self, capacity: int) -> None:
+        for name, (tail, fill, dtype) in self._ARRAYS.items():
+            array = np.full((capacity,) + tail, fill, dtype=dtype)
+            old = getattr(self, name)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def index(self, symbols: Sequence[str]) -> np.ndarray:
+        """Row of each symbol, registering new ones"""
+        for symbol in symbols:
+            if symbol not in self.symbols:
+                self.symbols[symbol] = len(self.symbols)
+        if len(self.symbols) > self.capacity:
+            self._grow(max(64, 2 * len(self.symbols)))
+        return np.fromiter((self.symbols[symbol] for symbol in symbols), dtype=np.int64, count=len(symbols))
+
+    def advance(self, rows: np.ndarray, timestamps: np.ndarray, closes: np.ndarray,
+                volumes: np.ndarray) -> np.ndarray:
+        """Apply one new bar to each of ``rows`` (unique); bars not newer than the last are ignored
+
+        Returns the rows that advanced.
+        """
+        fresh = timestamps > self.last_ts[rows]
+        rows, timestamps, closes, volumes = rows[fresh], timestamps[fresh], closes[fresh], volumes[fresh]
+        if len(rows) == 0:
+            return rows
+
+        before = self.count[rows]
+        after = before + 1
+        prev = self.last_close[rows]
+        has_prev = before > 0
+
+        # Wilder RSI: the first 14 changes are summed, averaged, then smoothed with alpha 1/14
+        delta = np.where(has_prev, closes - prev, 0.0)
+        gain, loss = np.maximum(delta, 0.0), np.maximum(-delta, 0.0)
+        warming = before <= RSI_PERIOD
+        avg_gain, avg_loss = self.avg_gain[rows], self.avg_loss[rows]
+        avg_gain = np.where(warming, avg_gain + gain, avg_gain + (gain - avg_gain) / RSI_PERIOD)
+        avg_loss = np.where(warming, avg_loss + loss, avg_loss + (loss - avg_loss) / RSI_PERIOD)
+        seeded = before == RSI_PERIOD
+        avg_gain = np.where(seeded, avg_gain / RSI_PERIOD, avg_gain)
+        avg_loss = np.where(seeded, avg_loss / RSI_PERIOD, avg_loss)
+
+        ema_12 = np.where(has_prev, self.ema_12[rows] + 2 / 13 * (closes - self.ema_12[rows]), closes)
+        ema_26 = np.where(has_prev, self.ema_26[rows] + 2 / 27 * (closes - self.ema_26[rows]), closes)
+        macd = ema_12 - ema_26
+        signal = np.where(after > 26, self.signal[rows] + 0.2 * (macd - self.signal[rows]), macd)
+
+        self.closes[rows, before % WINDOW] = closes
+        recent = np.take_along_axis(
+            self.closes[rows], (after[:, None] - 1 - np.arange(WINDOW)[None, :]) % WINDOW, axis=1
+        )
+        window_20 = recent[:, :20]
+        middle = window_20.mean(axis=1)
+        std = window_20.std(axis=1)
+
+        nan = np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+            change = (closes / prev - 1) * 100
+        columns = {
+            "close": closes,
+            "volume": volumes,
+            "change_percent": np.where(has_prev, change, nan),
+            "rsi": np.where(before >= RSI_PERIOD, rsi, nan),
+            "sma_20": np.where(after >= 20, middle, nan),
+            "sma_50": np.where(after >= 50, recent.mean(axis=1), nan),
+            "ema_12": np.where(after >= 12, ema_12, nan),
+            "ema_26": np.where(after >= 26, ema_26, nan),
+            "macd": np.where(after >= 26, macd, nan),
+            "macd_signal": np.where(after >= 34, signal, nan),
+            "bb_upper": np.where(after >= 20, middle + 2 * std, nan),
+            "bb_middle": np.where(after >= 20, middle, nan),
+            "bb_lower": np.where(after >= 20, middle - 2 * std, nan)
+        }
+        self.features[rows] = np.column_stack([columns[name] for name in ALERT_FEATURES])
+
+        self.count[rows] = after
+        self.last_ts[rows] = timestamps
+        self.last_close[rows] = closes
+        self.avg_gain[rows] = avg_gain
+        self.avg_loss[rows] = avg_loss
+        self.ema_12[rows] = ema_12
+        self.ema_26[rows] = ema_26
+        self.signal[rows] = signal
+        return rows
+
+
+class CompiledRules:
+    """Rules as parallel arrays, evaluated for all rules of the updated symbols at once
+
+    ``last`` holds each rule's previous outcome (-1 unknown, 0 false, 1 true). A rule
+    fires only on a false -> true edge, so an alert registered while its condition already
+    holds waits for the next crossing.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], state: IndicatorState,
+                 previous: Optional[CompiledRules] = None):
+        count = len(rules)
+        self.rules = rules
+        self.row = state.index([rule["symbol"] for rule in rules])
+        self.lhs = np.fromiter((FEATURE_INDEX[rule["indicator"]] for rule in rules), dtype=np.int64, count=count)
+        self.rhs = np.fromiter(
+            (FEATURE_INDEX[rule["reference"]] if rule["reference"] else -1 for rule in rules), dtype=np.int64, count=count
+        )
+        self.value = np.fromiter(
+            (np.nan if rule["value"] is None else rule["value"] for rule in rules), dtype=np.float64, count=count
+        )
+        self.sign = np.fromiter((OP_SIGNS[rule["op"]] for rule in rules), dtype=np.float64, count=count)
+        self.last = np.full(count, -1, dtype=np.int8)
+        if previous is not None and len(previous.rules):
+            # Keep edge state across reloads so unchanged rules don't re-fire or miss a crossing
+            previous_index = {rule["id"]: i for i, rule in enumerate(previous.rules)}
+            pairs = [(i, previous_index[rule["id"]]) for i, rule in enumerate(rules) if rule["id"] in previous_index]
+            if pairs:
+                new, old = np.array(pairs).T
+                self.last[new] = previous.last[old]
+
+    def evaluate(self, rows: np.ndarray, features: np.ndarray):
+        """(rule indices that fired, observed values, thresholds) after ``rows`` advanced"""
+        touched = np.zeros(len(features), dtype=bool)
+        touched[rows] = True
+        index = np.flatnonzero(touched[self.row])
+        symbol_rows = self.row[index]
+        lhs = features[symbol_rows, self.lhs[index]]
+        reference = self.rhs[index]
+        rhs = np.where(reference >= 0, features[symbol_rows, np.maximum(reference, 0)], self.value[index])
+
+        valid = ~(np.isnan(lhs) | np.isnan(rhs))
+        holds = valid & (self.sign[index] * (lhs - rhs) > 0)
+        last = self.last[index]
+        fired = holds & (last == 0)
+        self.last[index] = np.where(valid, holds, last)
+        return index[fired], lhs[fired], rhs[fired]
+
+
+class AlertEngine:
+    """Edge-triggered alert rules evaluated as new bars arrive
+
+    Rules live in an ``AlertRuleStore`` and are compiled into arrays; each bar advances
+    the symbol's incremental indicator state and then only the rules on updated symbols
+    are evaluated. Fired alerts go to every registered sink.
+
+    With Redis, bars received by any worker are broadcast to all of them, so every
+    worker's indicator state sees every bar; a shared marker delivers each alert once.
+    Without Redis, bars are evaluated by the worker that received them.
+    """
+
+    def __init__(self, store: AlertRuleStore, market_data: MarketDataService):
+        self.store = store
+        self.market_data = market_data
+        self.state = IndicatorState()
+        self.rules: Optional[CompiledRules] = None
+        self.version = -1
+        self.sinks: List[AlertSink] = []
+        self.recent: deque = deque(maxlen=RECENT_ALERTS)
+        self._lock = asyncio.Lock()
+        self._seeded: set = set()
+        self._tasks: set = set()
+        self._listener: Optional[asyncio.Task] = None
+
+    def add_sink(self, sink: AlertSink) -> None:
+        self.sinks.append(sink)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _sync_rules(self) -> None:
+        """Recompile when the stored rules changed (in any worker); caller holds the lock"""
+        if await asyncio.to_thread(self.store.version) == self.version:
+            return
+        version, rules = await asyncio.to_thread(self.store.load_all)
+        if not rules and self.rules is None:
+            # Nothing to compile yet (keeps numpy out of startup when no rules exist)
+            self.version = version
+            return
+        with stage("alert_compile"):
+            self.rules = CompiledRules(rules, self.state, self.rules)
+        self.version = version
+        metrics.alert_rules.set(len(rules))
+        if settings.ALERT_SEED_INTERVAL:
+            new_symbols = list(dict.fromkeys(rule["symbol"] for rule in rules if rule["symbol"] not in self._seeded))
+            if new_symbols:
+                self._seeded.update(new_symbols)
+                self._spawn(self._seed(new_symbols))
+
+    async def sync_rules(self) -> None:
+        async with self._lock:
+            await self._sync_rules()
+
+    async def _seed(self, symbols: List[str]) -> None:
+        """Warm up indicators for new symbols by replaying their recent history"""
+        semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+        async def load(symbol: str):
+            async with semaphore:
+                return await self.market_data.get_history(symbol, settings.ALERT_SEED_INTERVAL)
+
+        histories = await asyncio.gather(*(load(symbol) for symbol in symbols), return_exceptions=True)
+        loaded = [
+            (symbol, history) for symbol, history in zip(symbols, histories)
+            if not isinstance(history, BaseException) and len(history["timestamp"])
+        ]
+        if not loaded:
+            return
+        # Right-aligned (symbols, bars) matrices; NaN where a shorter history has no bar
+        width = min(SEED_BARS, max(len(history["timestamp"]) for _, history in loaded))
+        matrices = {name: np.full((len(loaded), width), np.nan) for name in ("timestamp", "close", "volume")}
+        for i, (_, history) in enumerate(loaded):
+            for name, matrix in matrices.items():
+                values = history[name][-width:]
+                matrix[i, width - len(values):] = values
+
+        async with self._lock:
+            rows = self.state.index([symbol for symbol, _ in loaded])
+            # Symbols that already received live bars keep their state
+            cold = self.state.count[rows] == 0
+            for step in range(width):
+                has_bar = cold & ~np.isnan(matrices["timestamp"][:, step])
+                advanced = self.state.advance(
+                    rows[has_bar], *(matrices[name][has_bar, step] for name in ("timestamp", "close", "volume"))
+                )
+                # Arms the rules at the current level; replayed history never fires
+                self.rules.evaluate(advanced, self.state.features)
+
+    def _process(self, bars: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Advance state bar by bar (per symbol, in time order) and collect fired alerts"""
+        if self.rules is None:
+            return []
+        by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+        for bar in bars:
+            if bar["symbol"] in self.state.symbols:
+                by_symbol.setdefault(bar["symbol"], []).append(bar)
+        if not by_symbol:
+            return []
+        series = [sorted(items, key=lambda bar: bar["timestamp"]) for items in by_symbol.values()]
+        rows = self.state.index(list(by_symbol))
+
+        fired: List[Dict[str, Any]] = []
+        now = time.time()
+        # Round k applies every symbol's k-th bar, so each symbol's bars are seen in order
+        for k in range(max(len(items) for items in series)):
+            present = [i for i, items in enumerate(series) if len(items) > k]
+            advanced = self.state.advance(
+                rows[present],
+                np.array([series[i][k]["timestamp"] for i in present], dtype=np.float64),
+                np.array([series[i][k]["close"] for i in present], dtype=np.float64),
+                np.array([series[i][k].get("volume") or 0 for i in present], dtype=np.float64)
+            )
+            if len(advanced) == 0:
+                continue
+            index, observed, threshold = self.rules.evaluate(advanced, self.state.features)
+            for i, value, limit in zip(index.tolist(), observed.tolist(), threshold.tolist()):
+                rule = self.rules.rules[i]
+                fired.append({
+                    "rule_id": rule["id"],
+                    "symbol": rule["symbol"],
+                    "indicator": rule["indicator"],
+                    "op": rule["op"],
+                    "reference": rule["reference"],
+                    "threshold": limit,
+                    "value": value,
+                    "bar_timestamp": int(self.state.last_ts[self.rules.row[i]]),
+                    "fired_at": now
+                })
+        return fired
+
+    async def ingest(self, bars: List[Dict[str, Any]]) -> int:
+        """Evaluate a batch of bars in this worker; returns the number of alerts fired"""
+        async with self._lock:
+            await self._sync_rules()
+            with stage("alert_evaluate"):
+                fired = self._process(bars)
+        if fired:
+            self.recent.extend(fired)
+            await self._deliver(fired)
+        return len(fired)
+
+    async def _deliver(self, alerts: List[Dict[str, Any]]) -> None:
+        redis = resources.redis
+        if redis is not None and self._listener is not None:
+            # Every worker evaluated the broadcast bars; only the first to claim an alert delivers it
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for alert in alerts:
+                        pipe.set(f"alert_fired:{alert['rule_id']}:{alert['bar_timestamp']}", 1, nx=True, ex=FIRED_KEY_TTL)
+                    claimed = await pipe.execute()
+                alerts = [alert for alert, ok in zip(alerts, claimed) if ok]
+            except Exception as e:
+                metrics.errors_total.inc(stage="alert_dedupe", error=type(e).__name__)
+        if alerts:
+            metrics.alerts_fired_total.inc(len(alerts))
+            await deliver_all(self.sinks, alerts)
+
+    async def publish(self, bars: List[Dict[str, Any]]) -> None:
+        """Entry point for new bars: broadcast to every worker through Redis, else evaluate here"""
+        redis = resources.redis
+        if redis is not None and self._listener is not None:
+            await redis.publish(BARS_CHANNEL, json.dumps(bars))
+        else:
+            await self.ingest(bars)
+
+    async def _listen(self) -> None:
+        pubsub = resources.redis.pubsub()
+        await pubsub.subscribe(BARS_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    await self.ingest(json.loads(message["data"]))
+                except Exception as e:
+                    metrics.errors_total.inc(stage="alert_evaluate", error=type(e).__name__)
+                    log(f"Alert evaluation failed: {str(e)}")
+        finally:
+            await pubsub.aclose()
+
+    def start(self) -> None:
+        """Load rules (warming up their symbols) and, with Redis, subscribe to broadcast bars"""
+        self._spawn(self.sync_rules())
+        if resources.redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks) + ([self._listener] if self._listener is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._listener = None
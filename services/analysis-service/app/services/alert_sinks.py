@@ -0,0 +1,59 @@
+# services/analysis-service/app/services/alert_sinks.py
+import json
+from typing import Any, Dict, List
+
+from app.resources import resources
+from app.telemetry.log import log
+from app.telemetry.metrics import metrics, track_upstream
+
+
+class AlertSink:
+    """Where fired alerts are delivered; subclass and register with ``AlertEngine.add_sink``"""
+
+    name = "sink"
+
+    async def deliver(self, alerts: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+
+class WebhookSink(AlertSink):
+    """POSTs each batch of fired alerts as ``{"alerts": [...]}`` to a URL"""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def deliver(self, alerts: List[Dict[str, Any]]) -> None:
+        with track_upstream("alert_webhook", "deliver"):
+            response = await resources.http.post(self.url, json={"alerts": alerts}, timeout=self.timeout)
+            response.raise_for_status()
+
+
+class RedisPubSubSink(AlertSink):
+    """Publishes each fired alert as JSON on a Redis channel"""
+
+    name = "redis"
+
+    def __init__(self, channel: str):
+        self.channel = channel
+
+    async def deliver(self, alerts: List[Dict[str, Any]]) -> None:
+        redis = resources.redis
+        if redis is None:
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            for alert in alerts:
+                pipe.publish(self.channel, json.dumps(alert))
+            await pipe.execute()
+
+
+async def deliver_all(sinks: List[AlertSink], alerts: List[Dict[str, Any]]) -> None:
+    """Hand alerts to every sink; one failing sink doesn't stop the others"""
+    for sink in sinks:
+        try:
+            await sink.deliver(alerts)
+        except Exception as e:
+            metrics.errors_total.inc(stage=f"alert_sink_{sink.name}", error=type(e).__name__)
+            log(f"Alert delivery via {sink.name} failed: {str(e)}")
@@ -0,0 +1,117 @@
+# services/analysis-service/app/services/alert_store.py
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+RULE_COLUMNS = ("id", "symbol", "indicator", "op", "value", "reference", "created_at")
+
+
+class AlertRuleStore:
+    """Alert rules in a local SQLite file, shared by every worker on the host
+
+    Each change bumps a version counter in the same transaction, so engines in other
+    workers can tell cheaply when they have to reload. Methods block; callers run them
+    via ``asyncio.to_thread``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._shared_conn: Optional[sqlite3.Connection] = None
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.path == ":memory:":
+            if self._shared_conn is None:
+                self._shared_conn = sqlite3.connect(self.path, check_same_thread=False)
+            return self._shared_conn
+
+        # One connection per thread; callers run store operations via asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS alert_rules (
+                id TEXT PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                indicator TEXT NOT NULL,
+                op TEXT NOT NULL,
+                value REAL,
+                reference TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS alert_rules_symbol ON alert_rules (symbol);
+
+            CREATE TABLE IF NOT EXISTS alert_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO alert_meta (key, value) VALUES ('version', 0);
+        """)
+        conn.commit()
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection) -> None:
+        conn.execute("UPDATE alert_meta SET value = value + 1 WHERE key = 'version'")
+
+    def version(self) -> int:
+        return self._connect().execute("SELECT value FROM alert_meta WHERE key = 'version'").fetchone()[0]
+
+    def add(self, rules: List[Dict[str, Any]]) -> List[str]:
+        """Insert rules (dicts with symbol, indicator, op and value or reference); returns their ids"""
+        now = time.time()
+        rows = [
+            (uuid.uuid4().hex, rule["symbol"], rule["indicator"], rule["op"], rule.get("value"),
+             rule.get("reference"), now)
+            for rule in rules
+        ]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO alert_rules (id, symbol, indicator, op, value, reference, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._bump(conn)
+        return [row[0] for row in rows]
+
+    def remove(self, rule_id: str) -> bool:
+        conn = self._connect()
+        with conn:
+            deleted = conn.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,)).rowcount
+            if deleted:
+                self._bump(conn)
+        return bool(deleted)
+
+    def list(self, symbol: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(RULE_COLUMNS)} FROM alert_rules"
+        params: List[Any] = []
+        if symbol:
+            query += " WHERE symbol = ?"
+            params.append(symbol)
+        query += " ORDER BY created_at, id LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        return [dict(zip(RULE_COLUMNS, row)) for row in self._connect().execute(query, params).fetchall()]
+
+    def load_all(self):
+        """(version, rules) read in one transaction, so the version matches the rules"""
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN")
+            version = conn.execute("SELECT value FROM alert_meta WHERE key = 'version'").fetchone()[0]
+            rows = conn.execute(f"SELECT {', '.join(RULE_COLUMNS)} FROM alert_rules").fetchall()
+        return version, [dict(zip(RULE_COLUMNS, row)) for row in rows]
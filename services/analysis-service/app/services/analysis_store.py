@@ -0,0 +1,207 @@
+# services/analysis-service/app/services/analysis_store.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Portable DDL: SQLite accepts the Postgres type names
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS analyses (
+        id TEXT PRIMARY KEY,
+        symbol TEXT NOT NULL,
+        analysis_type TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        created_at DOUBLE PRECISION NOT NULL,
+        payload TEXT NOT NULL
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS analyses_key ON analyses (symbol, analysis_type, fingerprint)",
+    "CREATE INDEX IF NOT EXISTS analyses_history ON analyses (symbol, created_at, id)",
+)
+
+
+def data_fingerprint(stock_data: Dict[str, Any], options: Dict[str, Any]) -> str:
+    """Hash of everything an analysis is computed from (snapshot, indicators, request options)
+
+    Any change in the inputs gives a new fingerprint, so stored results for the old data
+    simply stop matching.
+    """
+    blob = json.dumps({"snapshot": stock_data, "options": options}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def encode_cursor(created_at: float, analysis_id: str) -> str:
+    return f"{created_at!r}:{analysis_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    created_at, _, analysis_id = cursor.partition(":")
+    try:
+        return float(created_at), analysis_id
+    except ValueError:
+        raise ValueError(f"Invalid cursor {cursor!r}")
+
+
+class AnalysisStore:
+    """Generated analyses keyed by symbol, analysis type and data fingerprint
+
+    Backed by a local SQLite file, or by Postgres (``ANALYSIS_STORE=postgres`` with the
+    ``DB_*`` settings) so every instance serves the same results. Methods block; callers
+    run them via ``asyncio.to_thread``.
+    """
+
+    def __init__(self, backend: str = "sqlite", path: Optional[str] = None, conninfo: Optional[str] = None,
+                 history_limit: int = 50):
+        if backend not in ("sqlite", "postgres"):
+            raise ValueError(f"Unsupported analysis store backend {backend!r}")
+        self.backend = backend
+        self.path = path
+        self.conninfo = conninfo
+        self.history_limit = history_limit
+        self._local = threading.local()
+        self._shared_conn = None
+        if backend == "sqlite" and path and path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._cursor(write=True) as cur:
+            for statement in SCHEMA:
+                cur.execute(statement)
+
+    def _connect(self):
+        if self.backend == "sqlite" and self.path == ":memory:":
+            if self._shared_conn is None:
+                self._shared_conn = sqlite3.connect(self.path, check_same_thread=False)
+            return self._shared_conn
+
+        # One connection per worker thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None or (self.backend == "postgres" and conn.closed):
+            if self.backend == "postgres":
+                import psycopg  # optional; only needed for the Postgres backend
+                conn = psycopg.connect(self.conninfo, autocommit=True)
+            else:
+                conn = sqlite3.connect(self.path, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _cursor(self, write: bool = False):
+        conn = self._connect()
+        if self.backend == "postgres":
+            with conn.transaction() if write else nullcontext():
+                with conn.cursor() as cur:
+                    yield cur
+        else:
+            with conn if write else nullcontext():
+                cur = conn.cursor()
+                try:
+                    yield cur
+                finally:
+                    cur.close()
+
+    def _sql(self, query: str) -> str:
+        return query.replace("?", "%s") if self.backend == "postgres" else query
+
+    def ping(self) -> None:
+        """Round trip to the database; raises when it is unreachable"""
+        with self._cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+    @staticmethod
+    def _row(row) -> Dict[str, Any]:
+        analysis_id, symbol, analysis_type, fingerprint, created_at, payload = row
+        return {
+            "id": analysis_id,
+            "symbol": symbol,
+            "analysis_type": analysis_type,
+            "fingerprint": fingerprint,
+            "created_at": created_at,
+            "analysis": json.loads(payload)
+        }
+
+    def get(self, symbol: str, analysis_type: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """The stored analysis for exactly this input data, if any"""
+        with self._cursor() as cur:
+            cur.execute(self._sql(
+                "SELECT id, symbol, analysis_type, fingerprint, created_at, payload FROM analyses "
+                "WHERE symbol = ? AND analysis_type = ? AND fingerprint = ?"
+            ), (symbol, analysis_type, fingerprint))
+            row = cur.fetchone()
+        return self._row(row) if row else None
+
+    def save(self, symbol: str, analysis_type: str, fingerprint: str, analysis: Dict[str, Any]) -> str:
+        """Store an analysis and trim the symbol's history to ``history_limit`` entries"""
+        analysis_id = uuid.uuid4().hex
+        with self._cursor(write=True) as cur:
+            cur.execute(self._sql(
+                "INSERT INTO analyses (id, symbol, analysis_type, fingerprint, created_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (symbol, analysis_type, fingerprint) "
+                "DO UPDATE SET created_at = excluded.created_at, payload = excluded.payload"
+            ), (analysis_id, symbol, analysis_type, fingerprint, time.time(), json.dumps(analysis, default=str)))
+            cur.execute(self._sql(
+                "DELETE FROM analyses WHERE symbol = ? AND analysis_type = ? AND id NOT IN ("
+                "SELECT id FROM analyses WHERE symbol = ? AND analysis_type = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?)"
+            ), (symbol, analysis_type, symbol, analysis_type, self.history_limit))
+        return analysis_id
+
+    def history(self, symbol: str, analysis_type: Optional[str] = None, limit: int = 20,
+                cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Newest-first page of a symbol's analyses and the cursor for the next page"""
+        query = "SELECT id, symbol, analysis_type, fingerprint, created_at, payload FROM analyses WHERE symbol = ?"
+        params: List[Any] = [symbol]
+        if analysis_type:
+            query += " AND analysis_type = ?"
+            params.append(analysis_type)
+        if cursor:
+            # Keyset pagination: stable under concurrent inserts and no OFFSET scans
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(decode_cursor(cursor))
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._cursor() as cur:
+            cur.execute(self._sql(query), params)
+            rows = cur.fetchall()
+        items = [self._row(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"]) if len(rows) > limit else None
+        return items, next_cursor
+
+    def latest(self, symbols: Iterable[str], analysis_type: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Most recent analysis per symbol in one query (watchlists)"""
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        query = (
+            "SELECT id, symbol, analysis_type, fingerprint, created_at, payload FROM ("
+            "SELECT *, ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY created_at DESC, id DESC) AS rank "
+            f"FROM analyses WHERE symbol IN ({', '.join('?' * len(symbols))})"
+        )
+        params: List[Any] = list(symbols)
+        if analysis_type:
+            query += " AND analysis_type = ?"
+            params.append(analysis_type)
+        query += ") ranked WHERE rank = 1"
+
+        with self._cursor() as cur:
+            cur.execute(self._sql(query), params)
+            rows = cur.fetchall()
+        return {row[1]: self._row(row) for row in rows}
+
+    def invalidate(self, symbol: str, analysis_type: Optional[str] = None) -> int:
+        """Delete a symbol's stored analyses so the next request regenerates them"""
+        query = "DELETE FROM analyses WHERE symbol = ?"
+        params: List[Any] = [symbol]
+        if analysis_type:
+            query += " AND analysis_type = ?"
+            params.append(analysis_type)
+        with self._cursor(write=True) as cur:
+            cur.execute(self._sql(query), params)
+            return cur.rowcount
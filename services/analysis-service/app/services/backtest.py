@@ -0,0 +1,393 @@
+# services/analysis-service/app/services/backtest.py
+from __future__ import annotations
+import asyncio
+import itertools
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.history_store import HistoryStore
+from app.services.market_data_service import MarketDataService, MarketDataError
+from app.services.technical_analysis import TechnicalAnalysisService
+from app.telemetry.metrics import stage
+from app.utils.compute import compute
+from app.utils.helpers import metric_value
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Strategy -> default parameter grid. Each strategy replays one piece of advice the
+# analysis endpoints give:
+# - rsi: buy when "oversold" (RSI below oversold), sell when "overbought"
+# - bollinger: buy below the lower band, sell back at the middle band
+# - score: hold while the price-driven part of the day-trading score (RSI band,
+#   volume trend, daily move, as in calculate_investment_scores) is at least threshold
+STRATEGIES: Dict[str, Dict[str, List[float]]] = {
+    "rsi": {"rsi_period": [14], "oversold": [30.0], "overbought": [70.0]},
+    "bollinger": {"bb_period": [20], "num_std": [2.0]},
+    "score": {"threshold": [60.0]}
+}
+
+# Parameters that change the indicator series; the rest are thresholds applied to it
+INDICATOR_PARAMS = {"rsi": ("rsi_period",), "bollinger": ("bb_period",), "score": ()}
+INTEGER_PARAMS = {"rsi_period", "bb_period"}
+
+PERIODS_PER_YEAR = {"daily": 252, "weekly": 52, "monthly": 12}
+
+METRICS = ("cagr", "sharpe", "max_drawdown", "hit_rate", "trades", "exposure", "total_return")
+
+
+def expand_grid(strategy: str, params: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """Every combination of the given parameter values; omitted parameters use the defaults"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}. Use one of: {', '.join(STRATEGIES)}")
+    defaults = STRATEGIES[strategy]
+    unknown = [name for name in params if name not in defaults]
+    if unknown:
+        raise ValueError(f"Unknown {strategy} parameters: {', '.join(unknown)}")
+    grid = {name: list(params.get(name) or values) for name, values in defaults.items()}
+    for name in INTEGER_PARAMS & grid.keys():
+        if any(value < 2 or value != int(value) for value in grid[name]):
+            raise ValueError(f"{name} must be whole numbers of at least 2")
+        grid[name] = [int(value) for value in grid[name]]
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def align_histories(histories: List[Dict[str, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Stack column arrays on the union of their timestamps
+
+    Returns (timestamps, closes, volumes, first) where closes and volumes are
+    (symbols, bars) matrices and ``first`` is the column of each symbol's first bar.
+    Missing bars repeat the previous close (no return, no trade); columns before a
+    symbol's first bar are only placeholders and are never traded.
+    """
+    timestamps = np.unique(np.concatenate([history["timestamp"] for history in histories]))
+    closes = np.full((len(histories), len(timestamps)), np.nan)
+    volumes = np.zeros((len(histories), len(timestamps)))
+    for row, history in enumerate(histories):
+        columns = np.searchsorted(timestamps, history["timestamp"])
+        closes[row, columns] = history["close"]
+        volumes[row, columns] = history["volume"]
+
+    present = ~np.isnan(closes)
+    first = present.argmax(axis=1)
+    index = np.where(present, np.arange(len(timestamps)), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    closes = np.take_along_axis(closes, np.maximum(index, first[:, None]), axis=1)
+    return timestamps, closes, volumes, first
+
+
+async def load_histories(market_data: MarketDataService, store: HistoryStore, symbols: List[str], interval: str,
+                         refresh: bool) -> List[Any]:
+    """Stored bars per symbol (synced from Alpha Vantage first with ``refresh``)
+
+    Symbols with nothing stored yet are synced either way. One result per symbol,
+    in order: its column arrays or the exception raised loading it
+    (``MarketDataError`` when there is no history).
+    """
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def load(symbol: str):
+        if not refresh:
+            history = await asyncio.to_thread(store.load_bars, symbol, interval)
+            if len(history["timestamp"]):
+                return history
+        async with semaphore:
+            return await market_data.get_history(symbol, interval)
+
+    return await asyncio.gather(*(load(symbol) for symbol in symbols), return_exceptions=True)
+
+
+def _rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """Trailing mean along the last axis (NaN for the first period - 1 bars)"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] >= period:
+        cumulative = np.cumsum(values, axis=-1)
+        out[..., period - 1] = cumulative[..., period - 1]
+        out[..., period:] = cumulative[..., period:] - cumulative[..., :-period]
+        out[..., period - 1:] /= period
+    return out
+
+
+def _by_start(function, matrix: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """Apply a row-wise series function to each symbol's own history
+
+    Symbols are grouped by their first bar so every group is one dense matrix and
+    no indicator is warmed up on placeholder columns.
+    """
+    out = np.full(matrix.shape, np.nan)
+    for start in np.unique(first).tolist():
+        rows = np.flatnonzero(first == start)
+        out[rows, start:] = function(matrix[rows, start:])
+    return out
+
+
+def _indicators(strategy: str, key: Tuple, closes: np.ndarray, volumes: np.ndarray,
+                first: np.ndarray) -> Dict[str, np.ndarray]:
+    tas = TechnicalAnalysisService
+    if strategy == "rsi":
+        return {"rsi": _by_start(lambda c: tas.rsi_series(c, key[0]), closes, first)}
+    if strategy == "bollinger":
+        period = key[0]
+        middle = _by_start(lambda c: _rolling_mean(c, period), closes, first)
+        square = _by_start(lambda c: _rolling_mean(c * c, period), closes, first)
+        return {"middle": middle, "std": np.sqrt(np.maximum(square - middle * middle, 0.0))}
+
+    # Technical part of the day-trading score, bar by bar
+    rsi = _by_start(lambda c: tas.rsi_series(c, 14), closes, first)
+    recent = _by_start(lambda v: _rolling_mean(v, 5), volumes, first)
+    older = np.full(recent.shape, np.nan)
+    older[:, 5:] = recent[:, :-5]
+    change = np.zeros(closes.shape)
+    change[:, 1:] = np.abs(closes[:, 1:] / closes[:, :-1] - 1) * 100
+    with np.errstate(invalid="ignore"):
+        score = (
+            30.0 * ((rsi > 30) & (rsi < 70))
+            + 30.0 * (recent > older * 1.2)
+            + np.where(change > 1, np.minimum(change * 10, 40), 0.0)
+        )
+    return {"score": score}
+
+
+def _signals(strategy: str, params: Dict[str, float], closes: np.ndarray,
+             series: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """(entries, exits) boolean matrices; NaN indicator values compare False"""
+    with np.errstate(invalid="ignore"):
+        if strategy == "rsi":
+            return series["rsi"] < params["oversold"], series["rsi"] > params["overbought"]
+        if strategy == "bollinger":
+            lower = series["middle"] - params["num_std"] * series["std"]
+            return closes < lower, closes > series["middle"]
+        holding = series["score"] >= params["threshold"]
+        return holding, ~holding
+
+
+def positions(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """Long (1) from an entry signal until the next exit signal, else flat (0)"""
+    state = np.where(entries, 1.0, np.where(exits, 0.0, np.nan))
+    state[:, 0] = np.nan_to_num(state[:, 0])
+    index = np.where(np.isnan(state), 0, np.arange(state.shape[1]))
+    np.maximum.accumulate(index, axis=1, out=index)
+    return np.take_along_axis(state, index, axis=1)
+
+
+def bar_returns(closes: np.ndarray) -> np.ndarray:
+    """Close-to-close return of every bar (0 for the first)"""
+    returns = np.zeros(closes.shape)
+    returns[:, 1:] = closes[:, 1:] / closes[:, :-1] - 1
+    return returns
+
+
+def simulate(returns: np.ndarray, target: np.ndarray, start: np.ndarray, fee: float,
+             periods_per_year: int) -> Dict[str, np.ndarray]:
+    """Per-symbol performance of a position matrix
+
+    A signal on bar t's close is traded on bar t+1's close, so no strategy sees its
+    own fill price. ``fee`` is charged on every unit of turnover; ``start`` is the
+    first evaluated column of each row (positions before it are flat, so every
+    return before it is exactly zero and the sums below need no window mask).
+    """
+    count, bars = returns.shape
+    held = np.zeros(target.shape)
+    held[:, 1:] = target[:, :-1]
+    held[np.arange(bars) < start[:, None]] = 0.0
+
+    change = np.diff(held, axis=1, prepend=0.0, append=0.0)
+    strategy = np.abs(change[:, :-1])
+    strategy *= -fee
+    strategy[:, 1:] += held[:, :-1] * returns[:, 1:]
+
+    # equity[:, t + 1] is the growth of one unit after bar t
+    equity = np.ones((count, bars + 1))
+    np.cumprod(strategy + 1, axis=1, out=equity[:, 1:])
+    evaluated = np.maximum(bars - start, 1)
+    years = np.maximum(bars - start - 1, 1) / periods_per_year
+
+    mean = strategy.sum(axis=1) / evaluated
+    variance = np.maximum(np.einsum("ij,ij->i", strategy, strategy) / evaluated - mean * mean, 0.0)
+    # A strategy that stays in cash has no volatility; count it as Sharpe 0 rather than
+    # dropping it, or grids would favour parameters that almost never trade
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(variance > 1e-18, mean / np.sqrt(variance) * np.sqrt(periods_per_year), 0.0)
+    max_drawdown = 1 - (equity / np.maximum.accumulate(equity, axis=1)).min(axis=1)
+
+    # Trades: an entry where the held position goes 0 -> 1, closed where it goes back
+    # to 0 (or marked to market on the last bar); each row's k-th entry pairs with its k-th exit
+    entry_rows, entry_columns = np.nonzero(change > 0)
+    _, exit_columns = np.nonzero(change < 0)
+    exit_columns = np.minimum(exit_columns, bars - 1)
+    trade_returns = equity[entry_rows, exit_columns + 1] / equity[entry_rows, entry_columns] - 1
+    trades = np.bincount(entry_rows, minlength=count)
+    wins = np.bincount(entry_rows, weights=trade_returns > 0, minlength=count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hit_rate = np.where(trades > 0, wins / trades, np.nan)
+
+    total = equity[:, -1]
+    return {
+        "cagr": total ** (1 / years) - 1,
+        "sharpe": sharpe,
+        "max_drawdown": max_drawdown,
+        "hit_rate": hit_rate,
+        "trades": trades.astype(np.float64),
+        "exposure": held.sum(axis=1) / evaluated,
+        "total_return": total - 1
+    }
+
+
+def run_grid(strategy: str, combos: List[Dict[str, float]], closes: np.ndarray, volumes: np.ndarray,
+             first: np.ndarray, start: np.ndarray, fee: float, periods_per_year: int) -> Dict[str, np.ndarray]:
+    """Metrics for every (combination, symbol): each metric is a (combos, symbols) matrix
+
+    Indicator series are computed once per distinct indicator parameter set and shared
+    by every threshold combination that uses them. Module-level so it can run on the
+    compute executor.
+    """
+    results = {name: np.empty((len(combos), len(closes))) for name in METRICS}
+    returns = bar_returns(closes)
+    keys = [tuple(params[name] for name in INDICATOR_PARAMS[strategy]) for params in combos]
+    key, series = None, None
+    for i in sorted(range(len(combos)), key=keys.__getitem__):
+        if keys[i] != key:
+            key, series = keys[i], _indicators(strategy, keys[i], closes, volumes, first)
+        entries, exits = _signals(strategy, combos[i], closes, series)
+        for name, values in simulate(returns, positions(entries, exits), start, fee, periods_per_year).items():
+            results[name][i] = values
+    return results
+
+
+def buy_and_hold(closes: np.ndarray, start: np.ndarray, periods_per_year: int) -> Dict[str, np.ndarray]:
+    """Benchmark: fully invested over the same window, without costs"""
+    return simulate(bar_returns(closes), np.ones(closes.shape), start, 0.0, periods_per_year)
+
+
+def bar_date(timestamp) -> str:
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).date().isoformat()
+
+
+def summarize(metrics: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Cross-symbol aggregate of one combination's per-symbol metrics"""
+    trades = metrics["trades"].sum()
+    wins = np.nansum(metrics["hit_rate"] * metrics["trades"])
+    with np.errstate(all="ignore"):
+        return {
+            "mean_cagr": metric_value(np.nanmean(metrics["cagr"])),
+            "median_cagr": metric_value(np.nanmedian(metrics["cagr"])),
+            "mean_sharpe": metric_value(np.mean(metrics["sharpe"])),
+            "mean_max_drawdown": metric_value(np.nanmean(metrics["max_drawdown"])),
+            "worst_max_drawdown": metric_value(np.nanmax(metrics["max_drawdown"])),
+            "hit_rate": metric_value(wins / trades) if trades else None,
+            "trades": int(trades),
+            "mean_exposure": metric_value(np.nanmean(metrics["exposure"]))
+        }
+
+
+class BacktestService:
+    """Replays stored price history through the indicator signals and scoring rules
+
+    Every symbol and every parameter combination is simulated in (symbols, bars)
+    matrix operations; large grids are split across the compute executor's processes.
+    """
+
+    def __init__(self, market_data: MarketDataService, store: HistoryStore):
+        self.market_data = market_data
+        self.store = store
+
+    async def run(self, symbols: List[str], strategy: str = "rsi", params: Optional[Dict[str, List[float]]] = None,
+                  interval: str = "daily", start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  cost_bps: float = 5.0, rank_by: str = "mean_sharpe", refresh: bool = False) -> Dict[str, Any]:
+        """Backtest a parameter grid over many symbols
+
+        ``start``/``end`` bound the evaluated window; earlier bars still warm up the
+        indicators. ``cost_bps`` is charged per side on every trade. With ``refresh``
+        each series is synced from Alpha Vantage first; otherwise only stored bars are used.
+        """
+        combos = expand_grid(strategy, params or {})
+        if len(combos) > settings.BACKTEST_MAX_COMBINATIONS:
+            raise ValueError(f"Grid has {len(combos)} combinations; at most {settings.BACKTEST_MAX_COMBINATIONS} allowed")
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+
+        with stage("fetch_history"):
+            fetched = await load_histories(self.market_data, self.store, symbols, interval, refresh)
+        loaded, histories, errors = [], [], {}
+        for symbol, result in zip(symbols, fetched):
+            if isinstance(result, MarketDataError):
+                errors[symbol] = str(result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                if end is not None:
+                    keep = result["timestamp"] <= int(end.timestamp())
+                    result = {name: values[keep] for name, values in result.items()}
+                if len(result["timestamp"]) < 2:
+                    errors[symbol] = f"Not enough {interval} history for {symbol}"
+                    continue
+                loaded.append(symbol)
+                histories.append(result)
+        if not loaded:
+            return {"results": [], "best": None, "errors": errors}
+
+        with stage("backtest"):
+            timestamps, closes, volumes, first = await asyncio.to_thread(align_histories, histories)
+            window = 0 if start is None else int(np.searchsorted(timestamps, int(start.timestamp())))
+            evaluated_from = np.maximum(first, window)
+            results, benchmark = await self._simulate(
+                strategy, combos, closes, volumes, first, evaluated_from, cost_bps / 10000, PERIODS_PER_YEAR[interval]
+            )
+
+        summaries = [
+            {"params": params, "summary": summarize({name: values[i] for name, values in results.items()})}
+            for i, params in enumerate(combos)
+        ]
+        ranked = sorted(range(len(combos)), key=lambda i: self._rank_key(summaries[i]["summary"], rank_by))
+        best = ranked[0]
+        per_symbol = {
+            symbol: {name: metric_value(results[name][best, row]) for name in METRICS}
+            for row, symbol in enumerate(loaded)
+        }
+        return {
+            "strategy": strategy,
+            "interval": interval,
+            "cost_bps": cost_bps,
+            "start": bar_date(timestamps[min(window, len(timestamps) - 1)]),
+            "end": bar_date(timestamps[-1]),
+            "symbols": loaded,
+            "combinations": len(combos),
+            "rank_by": rank_by,
+            "results": [summaries[i] for i in ranked],
+            "best": {**summaries[best], "symbols": per_symbol},
+            "benchmark": summarize(benchmark),
+            "errors": errors
+        }
+
+    @staticmethod
+    def _rank_key(summary: Dict[str, Any], rank_by: str):
+        value = summary.get(rank_by)
+        if value is None:
+            return float("inf")
+        # Smaller drawdowns are better; everything else ranks highest first
+        return value if rank_by.endswith("drawdown") else -value
+
+    @staticmethod
+    async def _simulate(strategy: str, combos: List[Dict[str, float]], closes: np.ndarray, volumes: np.ndarray,
+                        first: np.ndarray, start: np.ndarray, fee: float, periods_per_year: int):
+        """run_grid on the compute executor, split into one job per compute worker
+
+        Combinations sharing an indicator stay in one job so it is computed once; the
+        price matrices are shared by every job rather than copied to each.
+        """
+        order = sorted(range(len(combos)), key=lambda i: tuple(combos[i][name] for name in INDICATOR_PARAMS[strategy]))
+        chunks = [chunk.tolist() for chunk in np.array_split(np.array(order), max(1, compute.workers)) if len(chunk)]
+        async with compute.share(closes, volumes) as (shared_closes, shared_volumes):
+            parts = await asyncio.gather(*(
+                compute.run(run_grid, strategy, [combos[i] for i in chunk], shared_closes, shared_volumes, first, start,
+                            fee, periods_per_year, cost=closes.size * len(chunk))
+                for chunk in chunks
+            ))
+            benchmark = await compute.run(buy_and_hold, shared_closes, start, periods_per_year)
+
+        results = {name: np.empty((len(combos), len(closes))) for name in METRICS}
+        for chunk, part in zip(chunks, parts):
+            for name in METRICS:
+                results[name][chunk] = part[name]
+        return results, benchmark
@@ -0,0 +1,77 @@
+# services/analysis-service/app/services/enrichment_service.py
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.config import settings
+from app.telemetry.log import log
+from app.utils import deadline
+from app.utils.shared_state import SharedStore
+
+
+class EnrichmentService:
+    """LLM narratives for tiered analyses, cached and generated in the background
+
+    A narrative is the model's structured output for one symbol and prompt. ``auto`` mode
+    serves it from cache when it exists and otherwise submits a job here, returning the job
+    id right away. Jobs and narratives are shared across workers when Redis is configured.
+    """
+
+    def __init__(self):
+        self.narratives = SharedStore("llm_narrative", ttl=settings.CACHE_TTL)
+        self.jobs = SharedStore("enrichment_jobs", ttl=settings.ENRICHMENT_JOB_TTL)
+        # Narrative key -> job id for jobs running in this worker, so repeats reuse the job
+        self._pending: Dict[str, str] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get_narrative(self, key: str) -> Optional[Dict[str, Any]]:
+        if not settings.ENABLE_CACHING:
+            return None
+        return await self.narratives.get(key)
+
+    async def store_narrative(self, key: str, narrative: Dict[str, Any]) -> None:
+        if settings.ENABLE_CACHING:
+            await self.narratives.set(key, narrative)
+
+    def pending_job(self, key: str) -> Optional[str]:
+        """Id of the job generating the narrative for ``key`` in this worker, if one is running"""
+        return self._pending.get(key)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.jobs.get(job_id)
+
+    async def submit(self, key: str, symbol: str, factory: Callable[[], Awaitable[Dict[str, Any]]]) -> str:
+        """Start generating the narrative for ``key`` unless it is already being generated"""
+        job_id = self._pending.get(key)
+        if job_id is not None:
+            return job_id
+
+        job_id = uuid.uuid4().hex
+        self._pending[key] = job_id
+        job = {"job_id": job_id, "symbol": symbol, "status": "pending", "created_at": datetime.utcnow().isoformat()}
+        await self.jobs.set(job_id, job)
+        task = asyncio.create_task(self._run(job, key, factory))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    async def _run(self, job: Dict[str, Any], key: str, factory: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+        try:
+            # The job outlives the request that submitted it, and so does its time budget
+            with deadline.unbounded():
+                narrative = await factory()
+            await self.store_narrative(key, narrative)
+            job.update(status="done", narrative=narrative)
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+        finally:
+            self._pending.pop(key, None)
+        job["completed_at"] = datetime.utcnow().isoformat()
+        await self.jobs.set(job["job_id"], job)
+
+    async def drain(self, timeout: float) -> None:
+        """Let running enrichment jobs finish on shutdown"""
+        if self._tasks:
+            log(f"Waiting up to {timeout}s for {len(self._tasks)} enrichment job(s) to finish")
+            await asyncio.wait(set(self._tasks), timeout=timeout)
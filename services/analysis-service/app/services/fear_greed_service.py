@@ -0,0 +1,219 @@
+# services/analysis-service/app/services/fear_greed_service.py
+from __future__ import annotations
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.market_data_service import MarketDataService, MarketDataError
+from app.services.sentiment_service import SentimentService, fear_greed_labels
+from app.services.technical_analysis import TechnicalAnalysisService
+from app.telemetry.log import log
+from app.telemetry.metrics import stage
+from app.utils.cache import TTLCache
+from app.utils.compute import compute
+from app.utils.shared_state import Coalescer
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Bars per symbol used for the index: enough for the 100-bar volatility baseline
+FEAR_GREED_BARS = 120
+# Seconds a query without articles is remembered: the news fetch may have failed, so retry soon
+NEWS_EMPTY_TTL = 60
+
+
+def align_history(histories: List[Dict[str, np.ndarray]], bars: int = FEAR_GREED_BARS) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack the most recent ``bars`` closes and volumes into (symbols, bars) matrices
+
+    Shorter histories are left-padded with their first bar, i.e. a flat price with
+    unchanged volume, which leaves momentum, RSI and volatility unaffected.
+    """
+    width = min(bars, max(len(history["close"]) for history in histories))
+    closes = np.empty((len(histories), width))
+    volumes = np.empty((len(histories), width))
+    for row, history in enumerate(histories):
+        close = history["close"][-width:]
+        volume = history["volume"][-width:]
+        pad = width - len(close)
+        closes[row, :pad] = close[0]
+        closes[row, pad:] = close
+        volumes[row, :pad] = volume[0]
+        volumes[row, pad:] = volume
+    return closes, volumes
+
+
+class FearGreedService:
+    """Fear & Greed Index from price history and news, for one symbol or a whole universe"""
+
+    def __init__(self, market_data: MarketDataService, sentiment: SentimentService,
+                 technical: TechnicalAnalysisService):
+        self.market_data = market_data
+        self.sentiment = sentiment
+        self.technical = technical
+        self.news_cache = TTLCache("news_sentiment", maxsize=1024, ttl=settings.CACHE_TTL)
+        self.market_cache = TTLCache("fear_greed_market", maxsize=1, ttl=max(settings.FEAR_GREED_REFRESH_SECONDS * 2, 60))
+        # Each worker runs the scheduler; the coalescer makes them share one computation per cycle
+        self.market_coalescer = Coalescer("fear_greed_market", lock_ttl=120.0)
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def _news_score(self, query: str) -> Optional[float]:
+        """Mean article sentiment in [-1, 1], or None when there is no news"""
+        cached = self.news_cache.get(query)
+        if cached is not None:
+            return cached[0]
+        sentiment = await self.sentiment.analyze_news_sentiment(query)
+        score = sentiment['score'] if sentiment['article_count'] else None
+        self.news_cache.set(query, (score,), ttl=None if score is not None else NEWS_EMPTY_TTL)
+        return score
+
+    async def _gather(self, symbols: List[str], include_news: bool):
+        semaphore = asyncio.Semaphore(settings.FEAR_GREED_CONCURRENCY)
+
+        async def load(symbol: str):
+            async with semaphore:
+                history = await self.market_data.get_history(symbol, "daily")
+                news = await self._news_score(symbol) if include_news else None
+                return history, news
+
+        return await asyncio.gather(*(load(symbol) for symbol in symbols), return_exceptions=True)
+
+    async def compute(self, symbols: List[str], include_news: bool = False,
+                      news_sentiment: Optional[float] = None) -> Dict:
+        """Score every symbol in one vectorized pass
+
+        ``news_sentiment`` applies a single (e.g. market-wide) news score to all symbols
+        instead of per-symbol news. A symbol whose data can't be loaded is reported in
+        ``errors`` and the others are still scored.
+        """
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+
+        with stage("fetch_history"):
+            fetched = await self._gather(symbols, include_news)
+
+        loaded, histories, news, errors = [], [], [], {}
+        for symbol, result in zip(symbols, fetched):
+            if isinstance(result, MarketDataError):
+                errors[symbol] = str(result)
+            elif isinstance(result, Exception):
+                log(f"Fear & Greed data for {symbol} failed: {str(result)}")
+                errors[symbol] = f"Failed to load data: {str(result)}"
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                loaded.append(symbol)
+                histories.append(result[0])
+                news.append(np.nan if result[1] is None else result[1])
+
+        if not loaded:
+            return {'results': [], 'errors': errors}
+
+        with stage("fear_greed"):
+            closes, volumes = align_history(histories)
+            components = await compute.run(self.technical.fear_greed_components, closes, volumes)
+            if news_sentiment is not None:
+                components['news_sentiment'] = np.array([news_sentiment])
+            elif include_news:
+                components['news_sentiment'] = np.array(news)
+            scored = self.sentiment.calculate_fear_greed_bulk(components)
+
+        scores = np.round(scored['score'], 1).tolist()
+        labels = scored['sentiment'].tolist()
+        points = {name: np.round(value, 1).tolist() for name, value in scored['components'].items()}
+        inputs = {
+            name: [None if np.isnan(v) else round(v, 3) for v in np.broadcast_to(value, (len(loaded),)).tolist()]
+            for name, value in components.items()
+        }
+        as_of = [
+            datetime.fromtimestamp(int(history["timestamp"][-1]), tz=timezone.utc).strftime("%Y-%m-%d")
+            for history in histories
+        ]
+
+        results = [
+            {
+                'symbol': symbol,
+                'score': scores[i],
+                'sentiment': labels[i],
+                'interpretation': self.sentiment._get_fear_greed_interpretation(scores[i]),
+                'components': {name: values[i] for name, values in points.items()},
+                'inputs': {name: values[i] for name, values in inputs.items()},
+                'as_of': as_of[i]
+            }
+            for i, symbol in enumerate(loaded)
+        ]
+        return {'results': results, 'errors': errors}
+
+    async def _compute_market(self) -> Dict:
+        """Aggregate over ``MARKET_UNIVERSE``"""
+        universe = [symbol for symbol in settings.MARKET_UNIVERSE.split(",") if symbol.strip()]
+        market_news = await self._news_score(settings.MARKET_NEWS_QUERY)
+        computed = await self.compute(universe, news_sentiment=market_news)
+        results = computed['results']
+        if not results:
+            raise MarketDataError("No market data available for the Fear & Greed universe")
+
+        scores = np.array([row['score'] for row in results])
+        score = round(float(scores.mean()), 1)
+        labels = [row['sentiment'] for row in results]
+        snapshot = {
+            'score': score,
+            'sentiment': str(fear_greed_labels(score)),
+            'interpretation': self.sentiment._get_fear_greed_interpretation(score),
+            'breadth': {
+                'symbols': len(results),
+                'greed_percent': round(float((scores >= 60).mean() * 100), 1),
+                'fear_percent': round(float((scores < 45).mean() * 100), 1),
+                'distribution': {label: labels.count(label) for label in dict.fromkeys(labels)}
+            },
+            'components': {
+                name: round(float(np.mean([row['components'][name] for row in results])), 1)
+                for name in results[0]['components']
+            },
+            'market_news_sentiment': market_news,
+            'constituents': [
+                {'symbol': row['symbol'], 'score': row['score'], 'sentiment': row['sentiment']}
+                for row in results
+            ],
+            'errors': computed['errors'],
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }
+        return snapshot
+
+    async def refresh_market(self) -> Dict:
+        """Recompute the market-wide aggregate and cache it"""
+        snapshot = await self.market_coalescer.run(
+            "market", self._compute_market, result_ttl=max(settings.FEAR_GREED_REFRESH_SECONDS / 2, 30)
+        )
+        self.market_cache.set("market", snapshot)
+        return snapshot
+
+    async def get_market(self) -> Dict:
+        """Latest market-wide aggregate, computed on demand if the scheduler has not produced one"""
+        snapshot = self.market_cache.get("market")
+        if snapshot is None:
+            snapshot = await self.refresh_market()
+        return snapshot
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            start = time.monotonic()
+            try:
+                await self.refresh_market()
+            except Exception as e:
+                log(f"Fear & Greed refresh failed: {str(e)}")
+            await asyncio.sleep(max(0.0, settings.FEAR_GREED_REFRESH_SECONDS - (time.monotonic() - start)))
+
+    def start(self) -> None:
+        """Start the background refresh of the market-wide aggregate"""
+        if settings.FEAR_GREED_REFRESH_SECONDS > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
@@ -0,0 +1,194 @@
+# services/analysis-service/app/services/health_service.py
+"""Dependency health
+
+A background task probes Ollama, Redis, Postgres and the market-data providers every
+``HEALTH_PROBE_INTERVAL`` seconds and keeps the latest result for each in memory. The
+health endpoints read that snapshot, so orchestrator probes and dashboards never cause
+upstream I/O. A component turns unhealthy after ``HEALTH_FAILURE_THRESHOLD`` failed
+probes in a row (degraded before that), so one slow answer doesn't pull a worker out
+of rotation.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.resources import resources
+from app.telemetry.log import log
+from app.telemetry.metrics import metrics
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+UNHEALTHY = "unhealthy"
+
+# A probe returns details to merge into the component's status; a missing model or an
+# unexpected answer is reported by raising ProbeWarning (degraded, not failed)
+Probe = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class ProbeWarning(Exception):
+    """The component answered, but not the way it should"""
+
+
+class HealthService:
+    """Scheduled dependency probes and the readiness state derived from them"""
+
+    def __init__(self, interval: float, timeout: float, failure_threshold: int, critical: List[str]):
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.critical = critical
+        self.models: Optional[List[Dict[str, Any]]] = None
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._failures: Dict[str, int] = {}
+        self._last_round: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def probes(self) -> Dict[str, Probe]:
+        """Components this worker depends on, given the settings"""
+        probes: Dict[str, Probe] = {"ollama": self._probe_ollama}
+        if settings.REDIS_URL:
+            probes["redis"] = self._probe_redis
+        if settings.ANALYSIS_STORE == "postgres":
+            probes["postgres"] = self._probe_postgres
+        if settings.HEALTH_PROBE_PROVIDERS:
+            probes["alpha_vantage"] = lambda: self._probe_reachable(settings.ALPHA_VANTAGE_URL)
+            probes["newsapi"] = lambda: self._probe_reachable(settings.NEWS_API_URL)
+        return probes
+
+    async def _probe_ollama(self) -> Dict[str, Any]:
+        response = await resources.http.get(f"{settings.OLLAMA_URL}/api/tags", timeout=self.timeout)
+        response.raise_for_status()
+        self.models = [
+            {"name": model.get("name"), "size": model.get("size"), "modified": model.get("modified_at")}
+            for model in response.json().get("models", [])
+        ]
+        available = {model["name"] for model in self.models}
+        missing = [
+            model for model in (settings.OLLAMA_MODEL, settings.OLLAMA_FAST_MODEL,
+                                settings.OLLAMA_EMBED_MODEL if settings.SEMANTIC_CACHE_ENABLED or settings.RETRIEVAL_ENABLED else None)
+            if model and model not in available and f"{model}:latest" not in available
+        ]
+        if missing:
+            raise ProbeWarning(f"Model(s) not pulled: {', '.join(missing)}")
+        return {"model": settings.OLLAMA_MODEL, "fast_model": settings.OLLAMA_FAST_MODEL}
+
+    async def _probe_redis(self) -> Dict[str, Any]:
+        if resources.redis is None:
+            # Startup couldn't connect; shared state has fallen back to per-worker
+            raise ConnectionError("Not connected; shared state is per-worker")
+        await resources.redis.ping()
+        return {}
+
+    async def _probe_postgres(self) -> Dict[str, Any]:
+        from app.dependencies import get_analysis_store
+
+        def ping() -> None:
+            get_analysis_store().ping()
+
+        await asyncio.to_thread(ping)
+        return {}
+
+    async def _probe_reachable(self, url: str) -> Dict[str, Any]:
+        # Sent without an API key, so it costs no quota; any answer below 500 means reachable
+        response = await resources.http.get(url, timeout=self.timeout)
+        if response.status_code >= 500:
+            raise ConnectionError(f"HTTP {response.status_code}")
+        return {}
+
+    async def _check(self, name: str, probe: Probe) -> None:
+        start = time.perf_counter()
+        status, details, error = HEALTHY, {}, None
+        try:
+            details = await asyncio.wait_for(probe(), self.timeout)
+            self._failures[name] = 0
+        except ProbeWarning as e:
+            status, error = DEGRADED, str(e)
+            self._failures[name] = 0
+        except Exception as e:
+            failures = self._failures[name] = self._failures.get(name, 0) + 1
+            status = UNHEALTHY if failures >= self.failure_threshold else DEGRADED
+            # httpx appends a documentation link on a second line
+            error = str(e).split("\n")[0] or type(e).__name__
+        latency = time.perf_counter() - start
+
+        previous = self._components.get(name, {}).get("status")
+        if previous != status and (previous is not None or status != HEALTHY):
+            log(f"Health: {name} is {status}" + (f" ({error})" if error else ""))
+        metrics.dependency_probe_duration.observe(latency, component=name)
+        metrics.dependency_up.set(1.0 if status != UNHEALTHY else 0.0, component=name)
+        self._components[name] = {
+            "status": status,
+            "latency_ms": round(latency * 1000, 1),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "consecutive_failures": self._failures[name],
+            "error": error,
+            **details,
+        }
+
+    async def probe_all(self) -> None:
+        """Probe every component once, concurrently"""
+        await asyncio.gather(*(self._check(name, probe) for name, probe in self.probes().items()))
+        self._last_round = time.monotonic()
+
+    async def _probe_loop(self) -> None:
+        while True:
+            start = time.monotonic()
+            try:
+                await self.probe_all()
+            except Exception as e:
+                log(f"Health probe round failed: {str(e)}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - start)))
+
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def stale(self) -> bool:
+        """Whether the last probe round is too old to trust (the prober stopped or the loop is stuck)"""
+        if not self.enabled():
+            return False
+        return self._last_round is None or time.monotonic() - self._last_round > 3 * self.interval + self.timeout
+
+    def components(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(self._components[name]) for name in sorted(self._components)}
+
+    def status(self) -> str:
+        """Overall status: the worst component, with unhealthy non-critical components counting as degraded"""
+        overall = HEALTHY
+        for name, component in self._components.items():
+            if component["status"] == UNHEALTHY and name in self.critical:
+                return UNHEALTHY
+            if component["status"] != HEALTHY:
+                overall = DEGRADED
+        return overall
+
+    def readiness(self, draining: bool = False) -> Dict[str, Any]:
+        """Whether this worker should receive traffic, and why not"""
+        reasons = []
+        if draining:
+            reasons.append("draining")
+        if self.enabled():
+            if self._last_round is None:
+                reasons.append("starting")
+            elif self.stale():
+                reasons.append("health probes are stale")
+            for name in self.critical:
+                component = self._components.get(name)
+                if component is not None and component["status"] == UNHEALTHY:
+                    reasons.append(f"{name} is unhealthy: {component['error']}")
+        return {"ready": not reasons, "reasons": reasons}
+
+    def start(self) -> None:
+        """Start probing in the background; the first round runs immediately"""
+        if self.enabled() and self._task is None:
+            self._task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
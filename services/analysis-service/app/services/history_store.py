@@ -0,0 +1,156 @@
+# services/analysis-service/app/services/history_store.py
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+OHLCV_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+class HistoryStore:
+    """Local SQLite store of OHLCV bars keyed by symbol and interval
+
+    Bars are returned as column arrays (one NumPy array per field) so indicator
+    code can run on them without per-row conversion.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._shared_conn: Optional[sqlite3.Connection] = None
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.path == ":memory:":
+            # A private in-memory database must be shared by every thread that uses the store
+            if self._shared_conn is None:
+                self._shared_conn = sqlite3.connect(self.path, check_same_thread=False)
+            return self._shared_conn
+
+        # One connection per thread; callers run store operations via asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL NOT NULL,
+                volume INTEGER,
+                PRIMARY KEY (symbol, interval, ts)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS sync_state (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (symbol, interval)
+            );
+        """)
+        conn.commit()
+
+    def upsert_bars(self, symbol: str, interval: str, columns: Dict[str, np.ndarray]) -> int:
+        """Insert or replace bars and mark the series as freshly synced"""
+        rows = list(zip(
+            [symbol] * len(columns["timestamp"]),
+            [interval] * len(columns["timestamp"]),
+            columns["timestamp"].tolist(),
+            columns["open"].tolist(),
+            columns["high"].tolist(),
+            columns["low"].tolist(),
+            columns["close"].tolist(),
+            columns["volume"].tolist()
+        ))
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO bars (symbol, interval, ts, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (symbol, interval, fetched_at) VALUES (?, ?, ?)",
+                (symbol, interval, time.time())
+            )
+        return len(rows)
+
+    def load_bars(self, symbol: str, interval: str, start_ts: Optional[int] = None,
+                  end_ts: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Load bars in ascending time order as column arrays"""
+        query = "SELECT ts, open, high, low, close, volume FROM bars WHERE symbol = ? AND interval = ?"
+        params = [symbol, interval]
+        if start_ts is not None:
+            query += " AND ts >= ?"
+            params.append(start_ts)
+        if end_ts is not None:
+            query += " AND ts <= ?"
+            params.append(end_ts)
+        query += " ORDER BY ts"
+
+        rows = self._connect().execute(query, params).fetchall()
+        if not rows:
+            return empty_columns()
+        data = np.array(rows, dtype=np.float64)
+        return {
+            "timestamp": data[:, 0].astype(np.int64),
+            "open": data[:, 1],
+            "high": data[:, 2],
+            "low": data[:, 3],
+            "close": data[:, 4],
+            "volume": data[:, 5].astype(np.int64)
+        }
+
+    def delete_bars(self, symbol: str, interval: str, before_ts: int) -> int:
+        """Drop bars older than ``before_ts``; returns the number removed"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM bars WHERE symbol = ? AND interval = ? AND ts < ?",
+                (symbol, interval, before_ts)
+            )
+        return cursor.rowcount
+
+    def last_fetched(self, symbol: str, interval: str) -> Optional[float]:
+        row = self._connect().execute(
+            "SELECT fetched_at FROM sync_state WHERE symbol = ? AND interval = ?",
+            (symbol, interval)
+        ).fetchone()
+        return row[0] if row else None
+
+    def latest_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        row = self._connect().execute(
+            "SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ?",
+            (symbol, interval)
+        ).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+
+def empty_columns() -> Dict[str, np.ndarray]:
+    return {
+        "timestamp": np.empty(0, dtype=np.int64),
+        "open": np.empty(0),
+        "high": np.empty(0),
+        "low": np.empty(0),
+        "close": np.empty(0),
+        "volume": np.empty(0, dtype=np.int64)
+    }
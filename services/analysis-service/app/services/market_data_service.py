@@ -0,0 +1,214 @@
+# services/analysis-service/app/services/market_data_service.py
+from __future__ import annotations
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+from app.resources import resources
+from app.services.history_store import HistoryStore, empty_columns
+from app.services.resampler import MINUTE_TIMEFRAMES, Resampler, can_resample
+from app.telemetry.metrics import track_upstream
+from app.utils import deadline
+from app.utils.cache import TTLCache
+from app.utils.hedging import hedger
+from app.utils.shared_state import Coalescer, RateLimitExceeded, alpha_vantage_limiter
+from app.utils.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+np = lazy_import("numpy")
+
+# interval -> (Alpha Vantage function, response key)
+INTERVAL_SOURCES = {
+    "1min": ("TIME_SERIES_INTRADAY", "Time Series (1min)"),
+    "5min": ("TIME_SERIES_INTRADAY", "Time Series (5min)"),
+    "15min": ("TIME_SERIES_INTRADAY", "Time Series (15min)"),
+    "60min": ("TIME_SERIES_INTRADAY", "Time Series (60min)"),
+    "daily": ("TIME_SERIES_DAILY", "Time Series (Daily)"),
+    "weekly": ("TIME_SERIES_WEEKLY", "Weekly Time Series"),
+    "monthly": ("TIME_SERIES_MONTHLY", "Monthly Time Series")
+}
+INTRADAY_INTERVALS = tuple(interval for interval in INTERVAL_SOURCES if interval in MINUTE_TIMEFRAMES)
+
+# A compact response covers the last 100 bars; beyond that gap we need the full history
+# (for intraday intervals, the last 30 days)
+COMPACT_BARS = 100
+
+
+def source_interval(timeframe: str, base: Optional[str] = None) -> str:
+    """Stored interval ``timeframe`` bars are built from
+
+    ``base`` when given, otherwise the timeframe itself when Alpha Vantage serves it,
+    else the coarsest intraday interval it rolls up from.
+    """
+    if base is None:
+        if timeframe in INTERVAL_SOURCES:
+            return timeframe
+        candidates = [interval for interval in INTRADAY_INTERVALS if can_resample(interval, timeframe)]
+        if not candidates:
+            raise ValueError(f"Unsupported interval: {timeframe}")
+        return candidates[-1]
+    if base not in INTERVAL_SOURCES:
+        raise ValueError(f"Unsupported base interval: {base}")
+    if not can_resample(base, timeframe):
+        raise ValueError(f"{base} bars cannot be rolled up into {timeframe} bars")
+    return base
+
+
+def sync_ttl(interval: str) -> float:
+    """Seconds a stored series counts as fresh"""
+    if interval in INTRADAY_INTERVALS:
+        return min(settings.CACHE_TTL, settings.INTRADAY_CACHE_TTL)
+    return settings.CACHE_TTL
+
+
+class MarketDataError(Exception):
+    """Raised when price history cannot be obtained"""
+
+
+def parse_time_series(series: Dict[str, Dict[str, str]], timezone_name: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """Convert an Alpha Vantage time series payload into ascending column arrays
+
+    Dates become midnight UTC; intraday times are read in ``timezone_name`` (the
+    exchange's, as reported by Alpha Vantage) and become true epoch seconds.
+    """
+    if not series:
+        return empty_columns()
+    dates = sorted(series.keys())
+    zone = ZoneInfo(timezone_name) if timezone_name else timezone.utc
+    timestamps = np.array([
+        int(datetime.fromisoformat(day).replace(tzinfo=zone).timestamp()) for day in dates
+    ], dtype=np.int64)
+    values = np.array([
+        [
+            float(series[day]["1. open"]),
+            float(series[day]["2. high"]),
+            float(series[day]["3. low"]),
+            float(series[day]["4. close"]),
+            float(series[day]["5. volume"])
+        ]
+        for day in dates
+    ], dtype=np.float64)
+    return {
+        "timestamp": timestamps,
+        "open": values[:, 0],
+        "high": values[:, 1],
+        "low": values[:, 2],
+        "close": values[:, 3],
+        "volume": values[:, 4].astype(np.int64)
+    }
+
+
+class MarketDataService:
+    """Price history served from memory, then the local store, then Alpha Vantage"""
+
+    def __init__(self, store: HistoryStore):
+        self.store = store
+        self.cache = TTLCache("price_history", maxsize=512, ttl=settings.CACHE_TTL)
+        self.resampler = Resampler(maxsize=512, ttl=settings.CACHE_TTL)
+        # Concurrent misses for one series (in any worker) trigger a single upstream sync
+        self.coalescer = Coalescer("price_history")
+
+    async def _fetch_series(self, symbol: str, interval: str, outputsize: str) -> Dict[str, np.ndarray]:
+        api_key = settings.ALPHA_VANTAGE_API_KEY
+        if not api_key:
+            raise MarketDataError("Alpha Vantage API key not configured")
+
+        function, key = INTERVAL_SOURCES[interval]
+        params = {"function": function, "symbol": symbol, "apikey": api_key}
+        if interval in INTRADAY_INTERVALS:
+            params.update(interval=interval, outputsize=outputsize)
+            if not settings.INTRADAY_EXTENDED_HOURS:
+                params["extended_hours"] = "false"
+        elif interval == "daily":
+            params["outputsize"] = outputsize
+
+        async def request():
+            with track_upstream("alpha_vantage", function):
+                response = await resources.http.get(
+                    settings.ALPHA_VANTAGE_URL, params=params, timeout=deadline.timeout(30.0)
+                )
+                response.raise_for_status()
+            return response
+
+        try:
+            await alpha_vantage_limiter.acquire()
+            # Idempotent GET: a slow call gets a second copy if the rate limit has room
+            response = await hedger(f"alpha_vantage:{function}:{outputsize}").run(
+                request, admit=alpha_vantage_limiter.try_acquire
+            )
+        except (httpx.HTTPError, RateLimitExceeded) as e:
+            if deadline.expired():
+                raise deadline.DeadlineExceeded(f"Deadline exceeded fetching {interval} history for {symbol}")
+            raise MarketDataError(f"Failed to fetch {interval} history for {symbol}: {str(e)}")
+
+        data = response.json()
+        if key not in data:
+            raise MarketDataError(data.get("Error Message") or data.get("Note") or f"No {interval} history for {symbol}")
+        if interval in INTRADAY_INTERVALS:
+            timezone_name = data.get("Meta Data", {}).get("6. Time Zone") or settings.MARKET_TIMEZONE
+            return parse_time_series(data[key], timezone_name)
+        return parse_time_series(data[key])
+
+    async def _sync(self, symbol: str, interval: str) -> None:
+        """Refresh the local store from Alpha Vantage when it is missing or stale"""
+        fetched_at = await asyncio.to_thread(self.store.last_fetched, symbol, interval)
+        if fetched_at is not None and time.time() - fetched_at < sync_ttl(interval):
+            return
+
+        latest = await asyncio.to_thread(self.store.latest_timestamp, symbol, interval)
+        # Incremental top-up when the stored series is recent enough for a compact response
+        bar_seconds = MINUTE_TIMEFRAMES.get(interval, 86400)
+        outputsize = "compact" if latest is not None and time.time() - latest < COMPACT_BARS * bar_seconds else "full"
+        try:
+            columns = await self._fetch_series(symbol, interval, outputsize)
+        except MarketDataError:
+            if latest is not None:
+                # Serve stale local history rather than failing outright
+                return
+            raise
+        await asyncio.to_thread(self.store.upsert_bars, symbol, interval, columns)
+        if interval in INTRADAY_INTERVALS and settings.INTRADAY_RETENTION_DAYS:
+            cutoff = int(time.time()) - settings.INTRADAY_RETENTION_DAYS * 86400
+            await asyncio.to_thread(self.store.delete_bars, symbol, interval, cutoff)
+
+    async def get_history(self, symbol: str, interval: str = "daily") -> Dict[str, np.ndarray]:
+        """Full stored history for a symbol as column arrays (timestamps in epoch seconds)"""
+        if interval not in INTERVAL_SOURCES:
+            raise ValueError(f"Unsupported interval: {interval}")
+        symbol = symbol.upper()
+        cache_key = (symbol, interval)
+
+        columns = self.cache.get(cache_key)
+        if columns is not None:
+            return columns
+
+        try:
+            await self.coalescer.run(f"{symbol}:{interval}", lambda: self._sync(symbol, interval))
+        except deadline.DeadlineExceeded:
+            # Out of time for the refresh (it carries on for later callers): serve stale history if any
+            columns = await asyncio.to_thread(self.store.load_bars, symbol, interval)
+            if len(columns["timestamp"]) == 0:
+                raise
+            deadline.skip("history_refresh")
+            return columns
+        columns = await asyncio.to_thread(self.store.load_bars, symbol, interval)
+        if len(columns["timestamp"]) == 0:
+            raise MarketDataError(f"No {interval} history available for {symbol}")
+        self.cache.set(cache_key, columns, ttl=sync_ttl(interval))
+        return columns
+
+    async def get_bars(self, symbol: str, timeframe: str = "daily", base: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """History in any supported timeframe, rolled up from a stored interval when needed
+
+        See ``source_interval`` for the interval used. Rolled-up series are cached and
+        extended as the stored one grows, not re-aggregated on every call.
+        """
+        interval = source_interval(timeframe, base)
+        history = await self.get_history(symbol, interval)
+        if interval == timeframe:
+            return history
+        timezone_name = settings.MARKET_TIMEZONE if interval in INTRADAY_INTERVALS else None
+        return self.resampler.roll((symbol.upper(), interval), history, timeframe, timezone_name)
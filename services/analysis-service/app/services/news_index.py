@@ -0,0 +1,306 @@
+# services/analysis-service/app/services/news_index.py
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Memory maps kept open for searches (each is a few MB at most)
+MAX_OPEN_MAPS = 64
+
+
+class NewsIndex:
+    """Embedded news and filing passages, one memory-mapped vector file per symbol
+
+    Vectors are unit-normalised float32 rows in ``<dir>/<SYMBOL>-<generation>.f32``;
+    passage text and article ids live in SQLite next to them, so an article is embedded
+    once no matter how often it is fetched again. Files are shared by every worker on a
+    host: appends are serialised by an immediate SQLite transaction, and vectors are
+    written before the row count that makes them visible is committed. When a symbol
+    exceeds ``max_passages`` its newest passages are copied to the next generation's
+    file, so searches holding the old map are never disturbed.
+    """
+
+    def __init__(self, directory: str, max_passages: int):
+        self.directory = directory
+        self.max_passages = max_passages
+        self.path = os.path.join(directory, "passages.db")
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._maps: "OrderedDict[Tuple[str, int], np.memmap]" = OrderedDict()
+        self._maps_lock = threading.Lock()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; callers run index operations via asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                symbol TEXT NOT NULL,
+                article_id TEXT NOT NULL,
+                published_at REAL NOT NULL,
+                PRIMARY KEY (symbol, article_id)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS passages (
+                symbol TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                article_id TEXT NOT NULL,
+                published_at REAL NOT NULL,
+                title TEXT,
+                source TEXT,
+                url TEXT,
+                text TEXT NOT NULL,
+                PRIMARY KEY (symbol, row)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS vector_files (
+                symbol TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                capacity INTEGER NOT NULL,
+                generation INTEGER NOT NULL
+            );
+        """)
+
+    def _file(self, symbol: str, generation: int) -> str:
+        return os.path.join(self.directory, f"{re.sub(r'[^A-Z0-9._-]', '_', symbol)}-{generation}.f32")
+
+    def known_articles(self, symbol: str, article_ids: Iterable[str]) -> Set[str]:
+        """The ids among ``article_ids`` that are already embedded for ``symbol``"""
+        ids = list(article_ids)
+        known: Set[str] = set()
+        conn = self._connect()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT article_id FROM articles WHERE symbol = ? AND article_id IN ({','.join('?' * len(chunk))})",
+                [symbol, *chunk]
+            ).fetchall()
+            known.update(row[0] for row in rows)
+        return known
+
+    def append(self, symbol: str, model: str, vectors: np.ndarray,
+               passages: Sequence[Dict[str, Any]]) -> int:
+        """Add embedded passages (one vector row each); returns how many were new
+
+        Each passage needs ``article_id``, ``published_at`` and ``text`` (``title``,
+        ``source`` and ``url`` are optional). Passages of articles another worker added
+        in the meantime are dropped.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(passages) > self.max_passages:
+            newest = sorted(range(len(passages)), key=lambda i: passages[i]["published_at"])[-self.max_passages:]
+            vectors, passages = vectors[newest], [passages[i] for i in newest]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1.0)
+        dim = vectors.shape[1] if vectors.ndim == 2 else 0
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        old_file = None
+        try:
+            known = self.known_articles(symbol, {p["article_id"] for p in passages})
+            keep = [i for i, p in enumerate(passages) if p["article_id"] not in known]
+            if not keep:
+                conn.execute("COMMIT")
+                return 0
+            vectors, passages = vectors[keep], [passages[i] for i in keep]
+
+            state = conn.execute(
+                "SELECT model, dim, rows, capacity, generation FROM vector_files WHERE symbol = ?", (symbol,)
+            ).fetchone()
+            if state is not None and (state[0] != model or state[1] != dim):
+                # Embedded with another model: the old vectors can't be compared with new ones
+                conn.execute("DELETE FROM passages WHERE symbol = ?", (symbol,))
+                conn.execute("DELETE FROM articles WHERE symbol = ?", (symbol,))
+                old_file = self._file(symbol, state[4])
+                state = (model, dim, 0, 0, state[4] + 1)
+            _, _, rows, capacity, generation = state or (model, dim, 0, 0, 0)
+
+            if rows + len(passages) > self.max_passages:
+                old_file = old_file or self._file(symbol, generation)
+                rows, capacity, generation = self._compact(conn, symbol, dim, generation, len(passages))
+            elif rows + len(passages) > capacity:
+                capacity = max(rows + len(passages), 2 * capacity, 256)
+                with open(self._file(symbol, generation), "ab") as f:
+                    f.truncate(capacity * dim * 4)
+
+            mapped = np.memmap(self._file(symbol, generation), dtype=np.float32, mode="r+", shape=(capacity, dim))
+            mapped[rows:rows + len(passages)] = vectors
+            mapped.flush()
+            del mapped
+
+            conn.executemany(
+                "INSERT INTO passages (symbol, row, article_id, published_at, title, source, url, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, rows + i, p["article_id"], p["published_at"], p.get("title"), p.get("source"),
+                  p.get("url"), p["text"]) for i, p in enumerate(passages)]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO articles (symbol, article_id, published_at) VALUES (?, ?, ?)",
+                [(symbol, p["article_id"], p["published_at"]) for p in passages]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO vector_files (symbol, model, dim, rows, capacity, generation) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (symbol, model, dim, rows + len(passages), capacity, generation)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if old_file and os.path.exists(old_file):
+            # Searches that still map it keep reading their copy until they drop it
+            os.unlink(old_file)
+        return len(passages)
+
+    def _compact(self, conn: sqlite3.Connection, symbol: str, dim: int, generation: int,
+                 incoming: int) -> Tuple[int, int, int]:
+        """Copy the newest passages to a new generation, leaving room for ``incoming``"""
+        keep = max(0, self.max_passages - incoming)
+        kept = [row for (row,) in conn.execute(
+            "SELECT row FROM passages WHERE symbol = ? ORDER BY published_at DESC LIMIT ?", (symbol, keep)
+        ).fetchall()]
+        kept.sort()
+
+        old_path = self._file(symbol, generation)
+        capacity = max(self.max_passages, 1)
+        new = np.memmap(self._file(symbol, generation + 1), dtype=np.float32, mode="w+", shape=(capacity, dim))
+        if kept and os.path.exists(old_path):
+            old = np.memmap(old_path, dtype=np.float32, mode="r")
+            new[:len(kept)] = old.reshape(-1, dim)[kept]
+            del old
+        new.flush()
+        del new
+
+        # Articles stay in ``articles`` so dropped ones are not embedded again
+        conn.execute(
+            f"DELETE FROM passages WHERE symbol = ? AND row NOT IN ({','.join('?' * len(kept)) or 'NULL'})",
+            [symbol, *kept]
+        )
+        # Renumber through negative rows so the primary key never collides
+        conn.executemany("UPDATE passages SET row = ? WHERE symbol = ? AND row = ?",
+                         [(-1 - new_row, symbol, old_row) for new_row, old_row in enumerate(kept)])
+        conn.execute("UPDATE passages SET row = -1 - row WHERE symbol = ? AND row < 0", (symbol,))
+        return len(kept), capacity, generation + 1
+
+    def _vectors(self, symbol: str, generation: int, capacity: int, dim: int) -> np.memmap:
+        key = (symbol, generation)
+        with self._maps_lock:
+            mapped = self._maps.get(key)
+            if mapped is not None and mapped.shape[0] >= capacity:
+                self._maps.move_to_end(key)
+                return mapped
+        mapped = np.memmap(self._file(symbol, generation), dtype=np.float32, mode="r", shape=(capacity, dim))
+        with self._maps_lock:
+            for stale in [k for k in self._maps if k[0] == symbol]:
+                del self._maps[stale]
+            self._maps[key] = mapped
+            while len(self._maps) > MAX_OPEN_MAPS:
+                self._maps.popitem(last=False)
+        return mapped
+
+    def search(self, symbol: str, model: str, query, k: int, min_score: float = 0.0,
+               max_age_seconds: Optional[float] = None, per_article: int = 2) -> List[Dict[str, Any]]:
+        """Up to ``k`` passages most similar to ``query``, best first
+
+        At most ``per_article`` passages come from one article, so one long story can't
+        crowd out the rest.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return []
+        query = query / norm
+
+        conn = self._connect()
+        for attempt in range(2):
+            # One read transaction, so the file, its rows and their text come from the same snapshot
+            conn.execute("BEGIN")
+            try:
+                return self._search_snapshot(conn, symbol, model, query, k, min_score, max_age_seconds, per_article)
+            except FileNotFoundError:
+                # Compacted between the snapshot and the open: read the new generation
+                if attempt == 1:
+                    return []
+            finally:
+                conn.execute("COMMIT")
+        return []
+
+    def _search_snapshot(self, conn: sqlite3.Connection, symbol: str, model: str, query: np.ndarray, k: int,
+                         min_score: float, max_age_seconds: Optional[float],
+                         per_article: int) -> List[Dict[str, Any]]:
+        state = conn.execute(
+            "SELECT model, dim, rows, capacity, generation FROM vector_files WHERE symbol = ?", (symbol,)
+        ).fetchone()
+        if state is None or state[0] != model or state[1] != query.shape[0] or state[2] == 0:
+            return []
+        _, dim, rows, capacity, generation = state
+        cutoff = time.time() - max_age_seconds if max_age_seconds else 0.0
+        candidates = conn.execute(
+            "SELECT row, article_id FROM passages WHERE symbol = ? AND row < ? AND published_at >= ?",
+            (symbol, rows, cutoff)
+        ).fetchall()
+        if not candidates:
+            return []
+
+        mapped = self._vectors(symbol, generation, capacity, dim)
+        row_ids = np.fromiter((row for row, _ in candidates), dtype=np.int64, count=len(candidates))
+        scores = mapped[row_ids] @ query
+        chosen: List[Tuple[int, float]] = []
+        per_article_count: Dict[str, int] = {}
+        for i in np.argsort(scores)[::-1]:
+            score = float(scores[i])
+            if score < min_score or len(chosen) >= k:
+                break
+            article_id = candidates[i][1]
+            if per_article_count.get(article_id, 0) >= per_article:
+                continue
+            per_article_count[article_id] = per_article_count.get(article_id, 0) + 1
+            chosen.append((int(row_ids[i]), score))
+        if not chosen:
+            return []
+
+        texts = {row[0]: row[1:] for row in conn.execute(
+            f"SELECT row, article_id, published_at, title, source, url, text FROM passages "
+            f"WHERE symbol = ? AND row IN ({','.join('?' * len(chosen))})",
+            [symbol, *(row for row, _ in chosen)]
+        ).fetchall()}
+        results = []
+        for row, score in chosen:
+            article_id, published_at, title, source, url, text = texts[row]
+            results.append({
+                "article_id": article_id, "published_at": published_at, "title": title, "source": source,
+                "url": url, "text": text, "score": round(score, 4)
+            })
+        return results
+
+    def stats(self, symbol: str) -> Dict[str, Any]:
+        conn = self._connect()
+        state = conn.execute(
+            "SELECT model, dim, rows, generation FROM vector_files WHERE symbol = ?", (symbol,)
+        ).fetchone()
+        articles = conn.execute("SELECT COUNT(*) FROM articles WHERE symbol = ?", (symbol,)).fetchone()[0]
+        if state is None:
+            return {"symbol": symbol, "articles": articles, "passages": 0, "model": None, "dimensions": None}
+        return {"symbol": symbol, "articles": articles, "passages": state[2], "model": state[0],
+                "dimensions": state[1]}
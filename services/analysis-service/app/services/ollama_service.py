@@ -1,121 +1,258 @@
 # services/analysis-service/app/services/ollama_service.py
-import httpx
+import asyncio
 import json
-from typing import Optional, Dict, Any
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, AsyncIterator, Type, Union
+from pydantic import BaseModel
 from app.config import settings
+from app.resources import resources
+from app.utils import deadline
+from app.utils.cache import TTLCache
+from app.utils.shared_state import Coalescer
+from app.services.prompt_builder import (
+    COMPARE_SYSTEM_PROMPT, SENTIMENT_SYSTEM_PROMPT, build_compare_prompt,
+    build_portfolio_prompt, build_sentiment_prompt, estimate_tokens, portfolio_system_prompt
+)
+from app.telemetry.log import log
+from app.telemetry.metrics import metrics, record_llm_generation, track_upstream
+from app.telemetry.tracing import tracer
+
+# Sentiment replies are a small JSON object; analyses are capped by MAX_ANALYSIS_LENGTH
+SENTIMENT_MAX_TOKENS = 256
 
 class OllamaService:
     def __init__(self):
         self.base_url = settings.OLLAMA_URL
         self.model = settings.OLLAMA_MODEL
+        fast_model = settings.OLLAMA_FAST_MODEL
+        self.fast_model = fast_model if fast_model and fast_model != self.model else None
+        # In-flight generations, tracked so shutdown can let them finish
+        self.active_jobs = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # Last time each model was used or pinged, so idle models get a keep-alive ping
+        self.last_used: Dict[str, float] = {}
+        self.keep_alive_coalescer = Coalescer("ollama_keep_alive")
+        self._keep_alive_task: Optional[asyncio.Task] = None
+        # Questions are embedded by the semantic cache and retrieval alike; once is enough
+        self.query_embeddings = TTLCache("query_embedding", maxsize=256, ttl=900)
+    
+    def models(self) -> List[str]:
+        """Models kept resident: the primary and, if configured, the fast tier"""
+        return [self.model] + ([self.fast_model] if self.fast_model else [])
+    
+    def select_model(self) -> str:
+        """Primary model, or the smaller tier while generations are queuing up"""
+        if self.fast_model and self.active_jobs >= settings.OLLAMA_FAST_MODEL_QUEUE_DEPTH:
+            return self.fast_model
+        return self.model
+    
+    def options(self, num_predict: Optional[int] = None) -> Dict[str, Any]:
+        """Runner options; num_ctx and num_thread must match on every call or Ollama reloads the model"""
+        options: Dict[str, Any] = {"num_ctx": settings.OLLAMA_NUM_CTX}
+        if settings.OLLAMA_NUM_THREAD:
+            options["num_thread"] = settings.OLLAMA_NUM_THREAD
+        if num_predict:
+            options["num_predict"] = num_predict
+        return options
+    
+    async def load(self, model: str, reason: str = "preload") -> None:
+        """Load a model into memory, or extend its keep-alive, without generating anything"""
+        payload = {"model": model, "keep_alive": settings.OLLAMA_KEEP_ALIVE, "options": self.options()}
+        response = await resources.http.post(
+            f"{self.base_url}/api/generate", json=payload, timeout=settings.OLLAMA_LOAD_TIMEOUT
+        )
+        response.raise_for_status()
+        self.last_used[model] = time.monotonic()
+        metrics.llm_model_loads_total.inc(model=model, reason=reason)
+    
+    async def _keep_alive_loop(self) -> None:
+        if settings.OLLAMA_PRELOAD:
+            for model in self.models():
+                try:
+                    await self.load(model, "preload")
+                    log(f"Ollama model {model} loaded")
+                except Exception as e:
+                    log(f"Ollama preload of {model} failed: {str(e)}")
         
-    async def generate(self, prompt: str, system_prompt: Optional[str] = None) -> str:
-        """Generate text using Ollama"""
-        url = f"{self.base_url}/api/generate"
+        interval = settings.OLLAMA_KEEP_ALIVE_INTERVAL
+        while interval > 0:
+            await asyncio.sleep(interval)
+            for model in self.models():
+                if time.monotonic() - self.last_used.get(model, 0.0) < interval:
+                    continue
+                try:
+                    # One worker pings per interval; the others reuse its result
+                    await self.keep_alive_coalescer.run(
+                        model, lambda: self.load(model, "keep_alive"), result_ttl=interval / 2
+                    )
+                    self.last_used[model] = time.monotonic()
+                except Exception as e:
+                    log(f"Ollama keep-alive for {model} failed: {str(e)}")
+    
+    def start(self) -> None:
+        """Preload the configured models and keep them resident while idle"""
+        if (settings.OLLAMA_PRELOAD or settings.OLLAMA_KEEP_ALIVE_INTERVAL > 0) and self._keep_alive_task is None:
+            self._keep_alive_task = asyncio.create_task(self._keep_alive_loop())
+    
+    async def stop(self) -> None:
+        if self._keep_alive_task is not None:
+            self._keep_alive_task.cancel()
+            try:
+                await self._keep_alive_task
+            except asyncio.CancelledError:
+                pass
+            self._keep_alive_task = None
+    
+    async def drain(self, timeout: float) -> bool:
+        """Stop accepting generations and wait for in-flight ones to finish"""
+        self.draining = True
+        if self.active_jobs:
+            log(f"Waiting up to {timeout}s for {self.active_jobs} LLM job(s) to finish")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            log(f"Shutdown drain timed out with {self.active_jobs} LLM job(s) still running")
+            return False
         
+    def response_format(self, schema_model: Type[BaseModel]) -> Union[str, Dict[str, Any]]:
+        """Ollama ``format`` for a structured reply: the model's JSON schema, or plain JSON mode"""
+        return schema_model.model_json_schema() if settings.OLLAMA_JSON_SCHEMA else "json"
+    
+    def _payload(self, model: str, prompt: str, system_prompt: Optional[str], max_tokens: Optional[int],
+                 response_format: Optional[Union[str, Dict[str, Any]]], stream: bool) -> Dict[str, Any]:
         payload = {
-            "model": self.model,
+            "model": model,
             "prompt": prompt,
-            "stream": False
+            "stream": stream,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+            "options": self.options(max_tokens or settings.MAX_ANALYSIS_LENGTH)
         }
-        
         if system_prompt:
             payload["system"] = system_prompt
+        if response_format:
+            payload["format"] = response_format
+        return payload
+    
+    @asynccontextmanager
+    async def _job(self, span_name: str, model: str, prompt: str, system_prompt: Optional[str]):
+        """Bookkeeping shared by every generation: drain tracking, tier and in-flight metrics, tracing"""
+        if self.draining:
+            raise Exception("Ollama generation failed: service is shutting down")
         
-        try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                result = response.json()
-                return result.get("response", "")
-        except Exception as e:
-            raise Exception(f"Ollama generation failed: {str(e)}")
-    
-    async def analyze_stock(self, symbol: str, data: Dict[str, Any]) -> str:
-        """Analyze stock using Ollama"""
-        system_prompt = """You are a professional financial analyst with expertise in stock market analysis.
-Provide clear, concise, and actionable insights based on the data provided.
-Focus on key metrics, trends, and potential risks/opportunities."""
+        tier = "fast" if model != self.model else "primary"
+        metrics.llm_tier_total.inc(model=model, tier=tier)
+        self.active_jobs += 1
+        self._idle.clear()
+        with tracer.start_as_current_span(
+            span_name,
+            kind="client",
+            attributes={
+                "llm.model": model,
+                "llm.tier": tier,
+                "llm.prompt_chars": len(prompt),
+                "llm.prompt_tokens_estimate": estimate_tokens(prompt) + estimate_tokens(system_prompt or "")
+            }
+        ) as span:
+            try:
+                with metrics.llm_in_flight.track_inprogress(model=model):
+                    yield span
+                self.last_used[model] = time.monotonic()
+            except Exception as e:
+                if isinstance(e, deadline.DeadlineExceeded) or deadline.expired():
+                    raise deadline.DeadlineExceeded("Deadline exceeded during LLM generation") from e
+                metrics.upstream_errors.inc(provider="ollama", endpoint="generate")
+                raise Exception(f"Ollama generation failed: {str(e)}")
+            finally:
+                self.active_jobs -= 1
+                if self.active_jobs == 0:
+                    self._idle.set()
+    
+    def _record(self, model: str, result: Dict[str, Any], span, elapsed: float) -> None:
+        record_llm_generation(model, result, elapsed)
+        span.set_attribute("llm.prompt_tokens", result.get("prompt_eval_count", 0))
+        span.set_attribute("llm.completion_tokens", result.get("eval_count", 0))
+    
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                       max_tokens: Optional[int] = None,
+                       response_format: Optional[Union[str, Dict[str, Any]]] = None) -> str:
+        """Generate text using Ollama"""
+        url = f"{self.base_url}/api/generate"
+        model = self.select_model()
+        payload = self._payload(model, prompt, system_prompt, max_tokens, response_format, stream=False)
+        timeout = deadline.timeout(120.0)
         
-        prompt = f"""Analyze the following stock: {symbol}
-
-Current Data:
-- Price: ${data.get('price', 'N/A')}
-- Change: {data.get('change_percent', 'N/A')}%
-- Volume: {data.get('volume', 'N/A')}
-- Market Cap: ${data.get('market_cap', 'N/A')}
-
-Technical Indicators:
-{json.dumps(data.get('technical_indicators', {}), indent=2)}
-
-Please provide:
-1. Overall assessment (2-3 sentences)
-2. Key strengths (bullet points)
-3. Key risks (bullet points)
-4. Recommendation (Buy/Hold/Sell with reasoning)
-
-Keep your response concise and actionable."""
+        start = time.perf_counter()
+        async with self._job("ollama_service.generate", model, prompt, system_prompt) as span:
+            response = await resources.http.post(url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            result = response.json()
+            self._record(model, result, span, time.perf_counter() - start)
+            return result.get("response", "")
+    
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None,
+                              max_tokens: Optional[int] = None,
+                              response_format: Optional[Union[str, Dict[str, Any]]] = None) -> AsyncIterator[str]:
+        """Yield response text as Ollama produces it"""
+        url = f"{self.base_url}/api/generate"
+        model = self.select_model()
+        payload = self._payload(model, prompt, system_prompt, max_tokens, response_format, stream=True)
+        timeout = deadline.timeout(120.0)
         
-        return await self.generate(prompt, system_prompt)
+        start = time.perf_counter()
+        async with self._job("ollama_service.generate_stream", model, prompt, system_prompt) as span:
+            async with resources.http.stream("POST", url, json=payload, timeout=timeout) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    # The read timeout applies per chunk; the deadline bounds the whole stream
+                    if deadline.expired():
+                        raise deadline.DeadlineExceeded("Deadline exceeded during LLM generation")
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise Exception(chunk["error"])
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        self._record(model, chunk, span, time.perf_counter() - start)
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embedding vectors for ``texts`` from the local embedding model (``OLLAMA_EMBED_MODEL``)"""
+        payload = {"model": settings.OLLAMA_EMBED_MODEL, "input": texts, "keep_alive": settings.OLLAMA_KEEP_ALIVE}
+        with track_upstream("ollama", "embed"):
+            response = await resources.http.post(
+                f"{self.base_url}/api/embed", json=payload, timeout=deadline.timeout(10.0)
+            )
+            response.raise_for_status()
+            return response.json()["embeddings"]
+    
+    async def embed_query(self, text: str) -> List[float]:
+        """Embedding of one question or prompt, memoised for a few minutes"""
+        key = (settings.OLLAMA_EMBED_MODEL, text.strip())
+        vector = self.query_embeddings.get(key)
+        if vector is None:
+            vector = (await self.embed([text.strip()]))[0]
+            self.query_embeddings.set(key, vector)
+        return vector
     
     async def compare_stocks(self, stocks_data: Dict[str, Any]) -> str:
         """Compare multiple stocks"""
-        system_prompt = """You are a financial analyst comparing investment opportunities.
-Provide objective comparisons focusing on key metrics and relative strengths."""
-        
-        prompt = f"""Compare the following stocks:
-
-{json.dumps(stocks_data, indent=2)}
-
-Provide:
-1. Comparative analysis of key metrics
-2. Best choice for growth potential
-3. Best choice for value investing
-4. Risk assessment for each
-5. Final recommendation
-
-Be concise and data-driven."""
-        
-        return await self.generate(prompt, system_prompt)
+        return await self.generate(build_compare_prompt(stocks_data), COMPARE_SYSTEM_PROMPT)
     
     async def portfolio_analysis(self, portfolio_data: Dict[str, Any]) -> str:
         """Analyze entire portfolio"""
-        system_prompt = """You are a portfolio management advisor.
-Analyze portfolio composition, diversification, and provide rebalancing recommendations."""
-        
-        prompt = f"""Analyze this investment portfolio:
-
-{json.dumps(portfolio_data, indent=2)}
-
-Provide:
-1. Portfolio health assessment
-2. Diversification analysis
-3. Risk assessment
-4. Rebalancing recommendations
-5. Potential improvements
-
-Be specific and actionable."""
-        
-        return await self.generate(prompt, system_prompt)
+        return await self.generate(build_portfolio_prompt(portfolio_data), portfolio_system_prompt(portfolio_data))
     
     async def sentiment_analysis(self, symbol: str, news_data: str) -> Dict[str, Any]:
         """Analyze sentiment from news/social media"""
-        system_prompt = """You are a sentiment analysis expert for financial markets.
-Analyze the sentiment and provide a clear classification."""
-        
-        prompt = f"""Analyze the sentiment for {symbol} based on this news:
-
-{news_data}
-
-Respond in JSON format:
-{{
-    "sentiment": "positive/negative/neutral",
-    "confidence": 0.0-1.0,
-    "summary": "Brief summary of overall sentiment",
-    "key_themes": ["theme1", "theme2"]
-}}"""
-        
-        response = await self.generate(prompt, system_prompt)
+        response = await self.generate(
+            build_sentiment_prompt(symbol, news_data), SENTIMENT_SYSTEM_PROMPT,
+            max_tokens=SENTIMENT_MAX_TOKENS, response_format="json"
+        )
         
         try:
             # Try to parse as JSON
@@ -128,6 +265,3 @@ Respond in JSON format:
                 "summary": response[:200],
                 "key_themes": []
             }
-
-# Singleton instance
-ollama_service = OllamaService()
\ No newline at end of file
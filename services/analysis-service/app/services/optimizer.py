@@ -0,0 +1,304 @@
+# services/analysis-service/app/services/optimizer.py
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.risk import TRADING_DAYS, RiskService
+from app.telemetry.metrics import stage
+from app.utils.cache import TTLCache
+from app.utils.compute import compute
+from app.utils.helpers import metric_value
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Stop once the constraint violation and the step between iterates are below this (in weight units)
+TOLERANCE = 1e-7
+# ADMM over-relaxation; 1.5-1.8 typically halves the iterations
+RELAXATION = 1.6
+# Golden-section steps refining the max-Sharpe risk aversion between two frontier points
+SHARPE_REFINE_STEPS = 12
+GOLDEN = 0.6180339887498949
+
+
+def project(v: np.ndarray, lower: np.ndarray, upper: np.ndarray, center: np.ndarray,
+            radius: Optional[float]) -> np.ndarray:
+    """Euclidean projection onto the box ``[lower, upper]`` within L1 distance ``radius`` of ``center``
+
+    Both sets are separable, so the projection moves each coordinate from ``center``
+    towards ``v`` by ``|v - center| - t`` (clipped to the box), for the smallest
+    shrinkage ``t >= 0`` that keeps the total distance within ``radius``. Each
+    coordinate's distance is ``clip(|v - center| - t, near, far)``, so the total is
+    piecewise linear in ``t`` and ``t`` is found exactly from its breakpoints.
+    """
+    boxed = np.clip(v, lower, upper)
+    if radius is None or np.abs(boxed - center).sum() <= radius:
+        return boxed
+    offset = v - center
+    size = np.abs(offset)
+    # Distance to the box (forced) and to its far side in the direction of the move
+    near = np.abs(np.clip(center, lower, upper) - center)
+    far = np.maximum(near, np.where(offset > 0, upper - center, center - lower))
+    if near.sum() >= radius:
+        t = float(size.max())
+    else:
+        breakpoints = np.unique(np.concatenate(([0.0], size - far, size - near)).clip(0.0))
+        totals = np.clip(size - breakpoints[:, None], near, far).sum(axis=1)
+        # totals fall with t: the first breakpoint within the radius closes the segment
+        j = int(np.argmax(totals <= radius))
+        t0, t1, f0, f1 = breakpoints[j - 1], breakpoints[j], totals[j - 1], totals[j]
+        t = float(t1 if f0 == f1 else t0 + (f0 - radius) * (t1 - t0) / (f0 - f1))
+    return np.clip(center + np.sign(offset) * np.clip(size - t, 0.0, None), lower, upper)
+
+
+def solve_qp(inverse: np.ndarray, rho: float, linear: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+             center: np.ndarray, radius: Optional[float], start: Optional[Tuple[np.ndarray, np.ndarray]],
+             max_iterations: int) -> Tuple[np.ndarray, Tuple, int, float]:
+    """min ``w'Σw + linear'w`` over fully invested weights in the box and turnover ball, by ADMM
+
+    ``inverse`` is ``(2Σ + rho·I)⁻¹``, computed once per covariance. The equality
+    ``sum(w) = 1`` is kept in the linear step and the box and turnover constraints in
+    the projection. ``start`` is the ``(z, u)`` state of an earlier solve; near the
+    answer, a warm start converges in a handful of iterations.
+
+    Returns (weights, state, iterations, constraint violation).
+    """
+    n = len(linear)
+    ones_solved = inverse.sum(axis=1)
+    ones_weight = ones_solved.sum()
+    if start is None:
+        z = project(np.full(n, 1.0 / n), lower, upper, center, radius)
+        u = np.zeros(n)
+    else:
+        z, u = start[0].copy(), start[1].copy()
+
+    for iteration in range(1, max_iterations + 1):
+        # x = argmin w'Σw + linear'w + rho/2 |w - z + u|² subject to sum(w) = 1
+        solved = inverse @ (rho * (z - u) - linear)
+        x = solved - ones_solved * ((solved.sum() - 1) / ones_weight)
+        relaxed = RELAXATION * x + (1 - RELAXATION) * z
+        previous = z
+        z = project(relaxed + u, lower, upper, center, radius)
+        u += relaxed - z
+        violation = float(np.abs(x - z).max())
+        if violation < TOLERANCE and float(np.abs(z - previous).max()) < TOLERANCE:
+            break
+    return z, (z, u), iteration, violation
+
+
+def portfolio_stats(weights: np.ndarray, mean: np.ndarray, covariance: np.ndarray,
+                    risk_free: float) -> Dict[str, float]:
+    expected = float(weights @ mean)
+    volatility = float(np.sqrt(max(weights @ covariance @ weights, 0.0)))
+    return {
+        "expected_return": expected,
+        "volatility": volatility,
+        "sharpe": (expected - risk_free) / volatility if volatility > 0 else 0.0
+    }
+
+
+def optimize(mean: np.ndarray, covariance: np.ndarray, current: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+             radius: Optional[float], risk_free: float, points: int, max_iterations: int,
+             warm: Optional[Dict[Any, Tuple]]) -> Dict[str, Any]:
+    """Efficient frontier, minimum-variance and max-Sharpe weights under the constraints
+
+    Annualized ``mean`` and ``covariance``. Each frontier point minimizes
+    ``w'Σw - γ·mean'w`` for a risk aversion ``γ`` on a fixed geometric grid (``γ = 0`` is
+    the minimum-variance portfolio); the max-Sharpe portfolio is refined between the
+    best point's neighbours by golden-section search over ``log γ``, since Sharpe is
+    unimodal along the frontier. Every solve starts from the matching solve in
+    ``warm`` (the previous run's state) and the refinement from its nearest frontier
+    point. Module-level so it can run on the compute executor.
+    """
+    warm = warm or {}
+    # Solver state per solve, the next run's warm start
+    state: Dict[Any, Tuple] = {}
+    n = len(mean)
+    rho = max(float(np.trace(covariance)) * 2 / n, 1e-8)
+    inverse = np.linalg.inv(2 * covariance + rho * np.eye(n))
+    iterations = 0
+    worst_violation = 0.0
+
+    def solve(key, gamma: float, start=None):
+        nonlocal iterations, worst_violation
+        weights, state[key], used, violation = solve_qp(
+            inverse, rho, -gamma * mean, lower, upper, current, radius, warm.get(key, start), max_iterations
+        )
+        iterations += used
+        worst_violation = max(worst_violation, violation)
+        return weights
+
+    # γ where return and variance terms are of similar size for a typical asset
+    spread = float(mean.max() - mean.min())
+    scale = 2 * float(np.trace(covariance)) / n / spread if spread > 0 else 0.0
+    gammas = [0.0] + ([scale * g for g in np.geomspace(0.02, 50, points - 1)] if scale > 0 else [])
+    frontier = []
+    for index, gamma in enumerate(gammas):
+        start = state.get(("frontier", index - 1)) if index else None
+        weights = solve(("frontier", index), gamma, start)
+        frontier.append((gamma, weights, portfolio_stats(weights, mean, covariance, risk_free)))
+
+    best = max(range(len(frontier)), key=lambda i: frontier[i][2]["sharpe"])
+    if len(frontier) > 1:
+        # Between the neighbouring grid points (below the first non-zero γ when the
+        # minimum-variance portfolio scores best)
+        low = np.log(frontier[best - 1][0] if best > 1 else frontier[1][0] / 100)
+        high = np.log(frontier[min(best + 1, len(frontier) - 1)][0] if best else frontier[1][0])
+        start = state[("frontier", best)]
+        candidates = [frontier[best]]
+
+        def sharpe_at(log_gamma: float, step: int):
+            weights = solve(("sharpe", step), float(np.exp(log_gamma)), start)
+            stats = portfolio_stats(weights, mean, covariance, risk_free)
+            candidates.append((float(np.exp(log_gamma)), weights, stats))
+            return stats["sharpe"]
+
+        a, b = high - GOLDEN * (high - low), low + GOLDEN * (high - low)
+        sharpe_a, sharpe_b = sharpe_at(a, 0), sharpe_at(b, 1)
+        for step in range(2, SHARPE_REFINE_STEPS):
+            if sharpe_a >= sharpe_b:
+                high, b, sharpe_b = b, a, sharpe_a
+                a = high - GOLDEN * (high - low)
+                sharpe_a = sharpe_at(a, step)
+            else:
+                low, a, sharpe_a = a, b, sharpe_b
+                b = low + GOLDEN * (high - low)
+                sharpe_b = sharpe_at(b, step)
+        max_sharpe = max(candidates, key=lambda candidate: candidate[2]["sharpe"])
+    else:
+        max_sharpe = frontier[best]
+
+    return {
+        "frontier": [(weights, stats) for _, weights, stats in frontier],
+        "min_variance": (frontier[0][1], frontier[0][2]),
+        "max_sharpe": (max_sharpe[1], max_sharpe[2]),
+        "iterations": iterations,
+        "violation": worst_violation,
+        "state": state
+    }
+
+
+def _clean(weights: np.ndarray) -> np.ndarray:
+    """Weights without solver dust: tiny values zeroed, renormalized to sum to 1"""
+    weights = np.where(np.abs(weights) < 1e-6, 0.0, weights)
+    return weights / weights.sum()
+
+
+class PortfolioOptimizer:
+    """Mean-variance optimization of a portfolio's holdings
+
+    Computes the efficient frontier, minimum-variance and max-Sharpe weights under
+    per-position bounds and a turnover limit, and the trades that reach the chosen
+    target. Solver state is kept per set of symbols for ``OPTIMIZER_WARM_START_TTL``
+    seconds, so re-optimizing after small price moves takes a few iterations per solve.
+    """
+
+    def __init__(self, risk_service: RiskService):
+        self.risk_service = risk_service
+        self.warm_starts = TTLCache("optimizer_warm_start", maxsize=256, ttl=settings.OPTIMIZER_WARM_START_TTL)
+
+    async def optimize(self, holdings: Dict[str, Dict[str, Optional[float]]], objective: str = "max_sharpe",
+                       min_weight: float = 0.0, max_weight: Optional[float] = None, max_turnover: Optional[float] = None,
+                       expected_returns: Optional[Dict[str, float]] = None, risk_free_rate: Optional[float] = None,
+                       lookback_days: int = 504, frontier_points: Optional[int] = None,
+                       refresh: bool = False) -> Dict[str, Any]:
+        """Optimal weights for the holdings and the trades from the current ones
+
+        Expected returns are the annualized historical means unless given per symbol in
+        ``expected_returns`` (historical means are noisy; views are better). ``max_turnover``
+        is the one-way fraction of the portfolio that may be traded (half the sum of the
+        absolute weight changes). ``objective`` (``max_sharpe`` or ``min_variance``)
+        picks the target the trades lead to.
+
+        Unless given, ``max_weight`` is OPTIMIZER_MAX_WEIGHT (raised to ``1 / holdings`` for
+        small portfolios) and ``max_turnover`` OPTIMIZER_MAX_TURNOVER (raised to what
+        moving into the weight bounds takes), so a default run never recommends
+        selling everything for one stock. Pass 1 for either to lift it.
+        """
+        portfolio = await self.risk_service.load_portfolio(holdings, lookback_days, refresh)
+        symbols, values, prices = portfolio["symbols"], portfolio["values"], portfolio["prices"]
+        n = len(symbols)
+        if max_weight is None:
+            max_weight = max(settings.OPTIMIZER_MAX_WEIGHT, min_weight, 1.0 / n)
+        if n * min_weight > 1 + 1e-9 or n * max_weight < 1 - 1e-9:
+            raise ValueError(f"No fully invested portfolio of {n} holdings fits weights in [{min_weight}, {max_weight}]")
+        risk_free = settings.RISK_FREE_RATE if risk_free_rate is None else risk_free_rate
+        points = frontier_points or settings.OPTIMIZER_FRONTIER_POINTS
+
+        returns = portfolio["returns"]
+        mean = returns.mean(axis=0) * TRADING_DAYS
+        views = {symbol.upper(): value for symbol, value in (expected_returns or {}).items()}
+        unknown = [symbol for symbol in views if symbol not in symbols]
+        if unknown:
+            raise ValueError(f"Expected returns given for symbols not held: {', '.join(unknown)}")
+        mean = np.array([views.get(symbol, mean[i]) for i, symbol in enumerate(symbols)])
+        covariance = np.atleast_2d(np.cov(returns, rowvar=False)) * TRADING_DAYS
+        total = float(values.sum())
+        current = values / total
+        if max_turnover is None:
+            # One-way turnover needed to bring every weight within its bounds
+            needed = max(np.clip(current - max_weight, 0.0, None).sum(), np.clip(min_weight - current, 0.0, None).sum())
+            max_turnover = max(settings.OPTIMIZER_MAX_TURNOVER, float(needed))
+        radius = 2 * max_turnover if max_turnover < 1 else None
+
+        key = tuple(symbols)
+        warm = self.warm_starts.get(key)
+        with stage("portfolio_optimization"):
+            result = await compute.run(
+                optimize, mean, covariance, current, np.full(n, min_weight), np.full(n, max_weight), radius,
+                risk_free, points, settings.OPTIMIZER_MAX_ITERATIONS, warm,
+                # About 100 ADMM iterations of an n × n product per solve
+                cost=n * n * (points + SHARPE_REFINE_STEPS) * 100
+            )
+        if result["violation"] > 1e-4:
+            raise ValueError("The bounds and turnover limit can't all be met from the current weights")
+        self.warm_starts.set(key, result["state"])
+
+        def described(weights: np.ndarray, stats: Dict[str, float]) -> Dict[str, Any]:
+            weights = _clean(weights)
+            return {
+                "weights": {symbol: metric_value(weight) for symbol, weight in zip(symbols, weights)},
+                "expected_return": metric_value(stats["expected_return"]),
+                "volatility": metric_value(stats["volatility"]),
+                "sharpe": metric_value(stats["sharpe"]),
+                "turnover": metric_value(np.abs(weights - current).sum() / 2)
+            }
+
+        target = _clean(result[objective][0])
+        trades = [
+            {
+                "symbol": symbol,
+                "action": "buy" if change > 0 else "sell",
+                "current_weight": metric_value(current[i]),
+                "target_weight": metric_value(target[i]),
+                "value": round(float(change * total), 2),
+                "shares": metric_value(change * total / prices[i], 2) if prices[i] > 0 else None
+            }
+            for i, (symbol, change) in enumerate(zip(symbols, target - current))
+            if abs(change) >= settings.OPTIMIZER_MIN_TRADE_WEIGHT
+        ]
+        trades.sort(key=lambda trade: -abs(trade["value"]))
+        return {
+            "symbols": symbols,
+            "portfolio_value": round(total, 2),
+            "objective": objective,
+            "risk_free_rate": risk_free,
+            "constraints": {"min_weight": min_weight, "max_weight": metric_value(max_weight),
+                            "max_turnover": metric_value(max_turnover)},
+            "observations": len(returns),
+            "window": portfolio["window"],
+            "expected_returns": {symbol: metric_value(value) for symbol, value in zip(symbols, mean)},
+            "current": {
+                "weights": {symbol: metric_value(weight) for symbol, weight in zip(symbols, current)},
+                **{name: metric_value(value) for name, value in portfolio_stats(current, mean, covariance, risk_free).items()}
+            },
+            "min_variance": described(*result["min_variance"]),
+            "max_sharpe": described(*result["max_sharpe"]),
+            "frontier": [
+                {name: metric_value(value) for name, value in stats.items()}
+                for _, stats in result["frontier"]
+            ],
+            "trades": trades,
+            "iterations": result["iterations"],
+            "warm_start": warm is not None
+        }
@@ -0,0 +1,343 @@
+# services/analysis-service/app/services/prompt_builder.py
+import math
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import settings
+
+# System prompts never vary per request: with the data placed after them, every call of
+# one kind shares a long identical prefix the model server can reuse from its KV cache.
+STOCK_SYSTEM_PROMPT = """You are a professional financial analyst with expertise in stock market analysis.
+You receive a compact data sheet for one stock. Fields without data are omitted; do not guess them.
+A News section, when present, holds dated passages from recent articles and filings, most relevant first.
+
+Respond with a JSON object with these fields:
+- recommendation: one of "Strong Buy", "Buy", "Hold", "Sell", "Strong Sell"
+- confidence: 0.0-1.0
+- price_target: 12-month price target (number, or null)
+- summary: 2-4 sentence assessment with your reasoning
+- key_points: key strengths and weaknesses
+- risks: risk factors to consider, including dividend sustainability if applicable
+- opportunities: upside drivers
+- investor_profile: best suited investor type (growth, value, dividend, day trader, etc.)"""
+
+COMPARE_SYSTEM_PROMPT = """You are a financial analyst comparing investment opportunities.
+Provide objective comparisons focusing on key metrics and relative strengths.
+You receive a table with one row per stock; '-' marks missing data.
+
+Provide:
+1. Comparative analysis of key metrics
+2. Best choice for growth potential
+3. Best choice for value investing
+4. Risk assessment for each
+5. Final recommendation
+
+Be concise and data-driven."""
+
+PORTFOLIO_SYSTEM_PROMPT = """You are a portfolio management advisor.
+Analyze portfolio composition, diversification, and provide rebalancing recommendations.
+You receive portfolio totals and a holdings table sorted by weight; '-' marks missing data.
+
+Provide:
+1. Portfolio health assessment
+2. Diversification analysis
+3. Risk assessment
+4. Rebalancing recommendations
+5. Potential improvements
+
+Be specific and actionable."""
+
+REBALANCE_SYSTEM_PROMPT = """You are a portfolio management advisor.
+You receive portfolio totals, a holdings table sorted by weight and its simulated risk; '-' marks missing data.
+Simulated risk comes from a Monte Carlo simulation over horizon_days trading days: var and cvar are
+fractions of the portfolio value lost at each confidence level, and risk_share is each holding's
+share of portfolio variance. When rebalancing was requested you also receive the trades a
+mean-variance optimizer computed, and the portfolio's expected return, volatility and Sharpe
+ratio before and after them.
+
+Provide:
+1. Portfolio health assessment
+2. Diversification and risk assessment, based on the simulated figures
+3. For each listed trade, why it moves the portfolio toward the optimizer's target
+4. What the trades change in expected return, volatility and Sharpe ratio
+
+Only explain the listed trades. Never propose other trades, sizes or symbols; without a
+Trades section, make no trade recommendations."""
+
+SENTIMENT_SYSTEM_PROMPT = """You are a sentiment analysis expert for financial markets.
+Analyze the sentiment of the news provided and give a clear classification.
+
+Respond in JSON format:
+{
+    "sentiment": "positive/negative/neutral",
+    "confidence": 0.0-1.0,
+    "summary": "Brief summary of overall sentiment",
+    "key_themes": ["theme1", "theme2"]
+}"""
+
+MISSING_VALUES = {"", "n/a", "na", "none", "null", "-"}
+
+# Rough SentencePiece/BPE behaviour: ~4 letters per token, digits and symbols one each
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Local estimate of the model token count, erring high so budgets hold"""
+    return sum(math.ceil(len(piece) / 4) if piece[0].isalpha() else 1 for piece in _TOKEN_PIECES.findall(text))
+
+
+def is_missing(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() in MISSING_VALUES
+    if isinstance(value, (dict, list, tuple)):
+        return not value
+    return False
+
+
+def compact_value(value: Any) -> str:
+    """Short text for a value: 2.41T, 52.3M, 150.25, 0.031"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value)
+    magnitude = abs(value)
+    for threshold, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if magnitude >= threshold:
+            return f"{value / threshold:.3g}{suffix}"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    if magnitude >= 1:
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return f"{value:.3g}"
+
+
+def percent(ratio: Any, decimals: int = 1) -> Optional[str]:
+    """0.0315 -> '3.2%'; falsy and missing ratios become None so they are dropped"""
+    if is_missing(ratio) or not ratio:
+        return None
+    return f"{ratio * 100:.{decimals}f}%"
+
+
+def flatten(values: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Nested dicts become dotted keys: {'macd': {'signal': 1}} -> {'macd.signal': 1}"""
+    flat: Dict[str, Any] = {}
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+class _Section:
+    def __init__(self, title: str, lines: List[str], priority: int, required: bool, inline: bool = False,
+                 trim: bool = True):
+        self.title = title
+        self.lines = lines
+        self.priority = priority
+        self.required = required
+        self.inline = inline
+        self.trim = trim
+        self.omitted = 0
+
+    def render(self) -> str:
+        if self.inline:
+            return f"{self.title}: {self.lines[0]}"
+        lines = [f"{self.title}:"] + self.lines
+        if self.omitted:
+            lines.append(f"(+{self.omitted} more rows)")
+        return "\n".join(lines)
+
+
+class PromptBuilder:
+    """Compact LLM prompt built from data sections under a token budget
+
+    Missing values are dropped, key/value groups are rendered on one line and row data
+    as pipe-separated tables. When the estimate exceeds the budget, optional sections
+    are dropped lowest priority first, then the longest remaining table or text loses
+    its last rows. Sections added with ``trim=False`` are never shortened: their whole
+    cost is reserved, even past the budget, before anything else is fitted.
+    """
+
+    def __init__(self, system_prompt: str, header: str, budget: Optional[int] = None):
+        self.system_prompt = system_prompt
+        self.header = header
+        self.budget = settings.PROMPT_TOKEN_BUDGET if budget is None else budget
+        self.sections: List[_Section] = []
+        self.dropped: List[str] = []
+        self.estimated_tokens = 0
+
+    def fields(self, title: str, values: Dict[str, Any], priority: int = 1,
+               required: bool = False) -> "PromptBuilder":
+        """One line of ``name value`` pairs, skipping missing values"""
+        pairs = [f"{name} {compact_value(value)}" for name, value in flatten(values).items() if not is_missing(value)]
+        if pairs:
+            self.sections.append(_Section(title, [", ".join(pairs)], priority, required, inline=True))
+        return self
+
+    def table(self, title: str, rows: Iterable[Dict[str, Any]], priority: int = 1,
+              required: bool = False, trim: bool = True) -> "PromptBuilder":
+        """Pipe-separated rows under a single header; columns with no data are left out"""
+        rows = [flatten(row) for row in rows]
+        columns: List[str] = []
+        for row in rows:
+            columns.extend(name for name, value in row.items() if name not in columns and not is_missing(value))
+        if rows and columns:
+            lines = ["|".join("-" if is_missing(row.get(name)) else compact_value(row[name]) for name in columns)
+                     for row in rows]
+            self.sections.append(_Section(f"{title} ({'|'.join(columns)})", lines, priority, required, trim=trim))
+        return self
+
+    def text(self, title: str, body: str, priority: int = 1, required: bool = False,
+             trim: bool = True) -> "PromptBuilder":
+        body = body.strip()
+        if body:
+            self.sections.append(_Section(title, body.splitlines(), priority, required, trim=trim))
+        return self
+
+    def build(self) -> str:
+        available = self.budget - estimate_tokens(self.system_prompt) - estimate_tokens(self.header)
+        sections = list(self.sections)
+        costs = [estimate_tokens(section.render()) for section in sections]
+
+        while sum(costs) > available:
+            droppable = [i for i, section in enumerate(sections) if not section.required]
+            if not droppable:
+                break
+            # Lowest priority first; among equals the one added last
+            index = min(droppable, key=lambda i: (sections[i].priority, -i))
+            self.dropped.append(sections.pop(index).title)
+            costs.pop(index)
+
+        while sum(costs) > available:
+            trimmable = [i for i, section in enumerate(sections)
+                         if section.trim and not section.inline and len(section.lines) > 1]
+            if not trimmable:
+                break
+            index = max(trimmable, key=lambda i: costs[i])
+            section = sections[index]
+            # Trim proportionally to the overshoot rather than one row per re-estimate
+            per_line = costs[index] / len(section.lines)
+            trim = min(len(section.lines) - 1, max(1, math.ceil((sum(costs) - available) / per_line)))
+            del section.lines[-trim:]
+            section.omitted += trim
+            costs[index] = estimate_tokens(section.render())
+
+        prompt = "\n".join([self.header] + [section.render() for section in sections])
+        self.estimated_tokens = estimate_tokens(self.system_prompt) + estimate_tokens(prompt)
+        return prompt
+
+
+def build_stock_prompt(symbol: str, stock_data: Dict[str, Any], technical_indicators=None,
+                       budget: Optional[int] = None) -> str:
+    """Data sheet for a single-stock analysis; pair it with ``STOCK_SYSTEM_PROMPT``"""
+    # Alpha Vantage parsing maps absent numbers to 0, so falsy ratios read as missing
+    def number(key: str) -> Optional[float]:
+        return stock_data.get(key) or None
+
+    low, high = number("52_week_low"), number("52_week_high")
+    builder = PromptBuilder(STOCK_SYSTEM_PROMPT, "STOCK DATA SHEET", budget)
+    builder.fields("Company", {
+        "name": stock_data.get("name"),
+        "symbol": symbol,
+        "sector": stock_data.get("sector"),
+        "industry": stock_data.get("industry"),
+        "market cap": number("market_cap")
+    }, required=True)
+    builder.fields("Price", {
+        "last": stock_data.get("price"),
+        "change": f"{stock_data['change_percent']:+.2f}%" if stock_data.get("change_percent") is not None else None,
+        "52w range": f"{compact_value(low)}-{compact_value(high)}" if low and high else None,
+        "volume": number("volume")
+    }, required=True)
+    builder.fields("Valuation", {
+        "P/E": number("pe_ratio"),
+        "PEG": number("peg_ratio"),
+        "P/B": number("price_to_book"),
+        "P/S": number("price_to_sales")
+    }, priority=3)
+    builder.fields("Dividend", {
+        "yield": percent(stock_data.get("dividend_yield"), 2) or "none",
+        "per share": number("dividend_per_share"),
+        "payout": percent(stock_data.get("payout_ratio")),
+        "ex-date": stock_data.get("ex_dividend_date")
+    }, priority=1)
+    builder.fields("Health", {
+        "profit margin": percent(stock_data.get("profit_margin")),
+        "ROE": percent(stock_data.get("return_on_equity")),
+        "debt/equity": number("debt_to_equity"),
+        "current ratio": number("current_ratio")
+    }, priority=2)
+    builder.fields("Growth", {
+        "revenue q/q yoy": percent(stock_data.get("quarterly_revenue_growth")),
+        "earnings q/q yoy": percent(stock_data.get("quarterly_earnings_growth")),
+        "EPS": number("eps")
+    }, priority=2)
+    builder.fields("Technical", {
+        "RSI": round(technical_indicators.rsi, 1) if technical_indicators and technical_indicators.rsi else None,
+        "volume trend": technical_indicators.volume_trend if technical_indicators else None,
+        "MA50": number("50_day_ma"),
+        "MA200": number("200_day_ma")
+    }, priority=1)
+    builder.fields("Analyst", {"target": number("analyst_target_price")}, priority=1)
+    builder.text("News", "\n".join(passage_line(p) for p in stock_data.get("news_context") or []), priority=2)
+    return builder.build()
+
+
+def passage_line(passage: Dict[str, Any]) -> str:
+    """One retrieved passage as a prompt line: ``[2024-05-01 Reuters] text``"""
+    date = datetime.fromtimestamp(passage["published_at"], timezone.utc).strftime("%Y-%m-%d")
+    source = f" {passage['source']}" if passage.get("source") else ""
+    return f"[{date}{source}] {passage['text']}"
+
+
+def build_custom_prompt(question: str, passages: Optional[List[Dict[str, Any]]] = None,
+                        budget: Optional[int] = None) -> str:
+    """A user's own question, preceded by the retrieved passages relevant to it"""
+    if not passages:
+        return question
+    builder = PromptBuilder("", "Use the news below where it is relevant, then answer the question.", budget)
+    builder.text("News", "\n".join(passage_line(p) for p in passages), priority=1)
+    builder.text("Question", question, required=True)
+    return builder.build()
+
+
+def build_compare_prompt(stocks_data: Dict[str, Dict[str, Any]], budget: Optional[int] = None) -> str:
+    """One table row per symbol; pair it with ``COMPARE_SYSTEM_PROMPT``"""
+    builder = PromptBuilder(COMPARE_SYSTEM_PROMPT, "STOCK COMPARISON", budget)
+    builder.table("Stocks", ({"symbol": symbol, **data} for symbol, data in stocks_data.items()), required=True)
+    return builder.build()
+
+
+def portfolio_system_prompt(portfolio_data: Dict[str, Any]) -> str:
+    """``REBALANCE_SYSTEM_PROMPT`` for real holdings (with simulated risk), else ``PORTFOLIO_SYSTEM_PROMPT``"""
+    return REBALANCE_SYSTEM_PROMPT if "risk" in portfolio_data else PORTFOLIO_SYSTEM_PROMPT
+
+
+def build_portfolio_prompt(portfolio_data: Dict[str, Any], budget: Optional[int] = None) -> str:
+    """Totals plus a holdings table, largest weights first, then any simulated risk and computed
+    trades; pair it with ``portfolio_system_prompt(portfolio_data)``"""
+    holdings = sorted(portfolio_data.get("holdings", []), key=lambda h: -(h.get("weight") or 0))
+    extras = ("holdings", "risk", "rebalancing", "trades")
+    totals = {key: value for key, value in portfolio_data.items() if key not in extras}
+    builder = PromptBuilder(portfolio_system_prompt(portfolio_data), "PORTFOLIO", budget)
+    builder.fields("Totals", totals, required=True)
+    builder.table("Holdings", holdings, required=True)
+    # The system prompt has the model explain var and cvar from it
+    builder.fields("Simulated risk", portfolio_data.get("risk") or {}, required=True)
+    if portfolio_data.get("trades") is not None:
+        builder.fields("Rebalancing", portfolio_data.get("rebalancing") or {}, required=True)
+        # Every trade, untrimmed: the model must never fill in trades of its own
+        builder.table("Trades", portfolio_data["trades"], required=True, trim=False)
+    return builder.build()
+
+
+def build_sentiment_prompt(symbol: str, news_data: str, budget: Optional[int] = None) -> str:
+    """Headlines for one symbol, trimmed to the budget; pair it with ``SENTIMENT_SYSTEM_PROMPT``"""
+    builder = PromptBuilder(SENTIMENT_SYSTEM_PROMPT, f"NEWS FOR {symbol}", budget)
+    builder.text("Articles", news_data, required=True)
+    return builder.build()
@@ -0,0 +1,169 @@
+# services/analysis-service/app/services/resampler.py
+"""Rolling OHLCV bars up into higher timeframes
+
+Bars are grouped by the bucket their timestamp falls in, found with vectorized
+arithmetic on the timestamps, and every bucket is reduced in one ``reduceat`` per
+column: first open, highest high, lowest low, last close, summed volume.
+
+Intraday buckets follow the exchange's local clock (``MARKET_TIMEZONE``), so days,
+weeks and months split at local midnight whatever the DST offset. Rolled-up bars are
+labelled with the start of their bucket: minute bars with its epoch time, daily and
+longer bars with midnight UTC of their first calendar day, like stored daily bars.
+A label never moves as bars are added to the bucket, which is what lets ``Resampler``
+extend a cached series instead of rebuilding it.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, Hashable, Optional
+from zoneinfo import ZoneInfo
+
+from app.services.history_store import OHLCV_COLUMNS, empty_columns
+from app.utils.cache import TTLCache
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Fixed-length timeframes, in seconds
+MINUTE_TIMEFRAMES = {
+    "1min": 60,
+    "5min": 300,
+    "15min": 900,
+    "30min": 1800,
+    "60min": 3600,
+    "240min": 14400
+}
+CALENDAR_TIMEFRAMES = ("daily", "weekly", "monthly")
+TIMEFRAMES = (*MINUTE_TIMEFRAMES, *CALENDAR_TIMEFRAMES)
+
+# Thursday 1970-01-01 + 3 days is a Monday: weeks start on Mondays
+_WEEK_SHIFT = 3
+
+
+def can_resample(base: str, timeframe: str) -> bool:
+    """Whether every ``timeframe`` bucket is a whole number of ``base`` bars"""
+    if base not in TIMEFRAMES or timeframe not in TIMEFRAMES:
+        return False
+    if base in MINUTE_TIMEFRAMES:
+        if timeframe in MINUTE_TIMEFRAMES:
+            return MINUTE_TIMEFRAMES[timeframe] % MINUTE_TIMEFRAMES[base] == 0
+        return True
+    if timeframe in MINUTE_TIMEFRAMES:
+        return False
+    # Weeks straddle month ends, so weekly bars only roll up into weekly bars
+    return base == timeframe or base == "daily"
+
+
+def utc_offsets(timestamps: np.ndarray, timezone_name: Optional[str]) -> np.ndarray:
+    """UTC offset in seconds of ``timezone_name`` at each timestamp
+
+    Offsets only change on the hour, so they are looked up once per distinct hour.
+    """
+    if not timezone_name or len(timestamps) == 0:
+        return np.zeros(len(timestamps), dtype=np.int64)
+    zone = ZoneInfo(timezone_name)
+    hours, inverse = np.unique(timestamps // 3600, return_inverse=True)
+    offsets = np.array([
+        int(datetime.fromtimestamp(int(hour) * 3600, zone).utcoffset().total_seconds()) for hour in hours
+    ], dtype=np.int64)
+    return offsets[inverse]
+
+
+def bucket_keys(timestamps: np.ndarray, timeframe: str, timezone_name: Optional[str] = None):
+    """Bucket number and bucket label of every timestamp
+
+    Keys are non-decreasing for ascending timestamps; equal keys share a bucket.
+    """
+    offsets = utc_offsets(timestamps, timezone_name)
+    local = timestamps + offsets
+    seconds = MINUTE_TIMEFRAMES.get(timeframe)
+    if seconds is not None:
+        keys = local // seconds
+        return keys, keys * seconds - offsets
+
+    days = local // 86400
+    if timeframe == "daily":
+        return days, days * 86400
+    if timeframe == "weekly":
+        keys = (days + _WEEK_SHIFT) // 7
+        return keys, (keys * 7 - _WEEK_SHIFT) * 86400
+    if timeframe == "monthly":
+        keys = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        return keys, keys.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) * 86400
+    raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+
+def resample(columns: Dict[str, np.ndarray], timeframe: str,
+             timezone_name: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """Roll ascending OHLCV column arrays up into ``timeframe`` bars
+
+    The returned arrays carry one extra entry, ``first_bar``: the index of each
+    bucket's first input bar.
+    """
+    timestamps = columns["timestamp"]
+    if len(timestamps) == 0:
+        return {**empty_columns(), "first_bar": np.empty(0, dtype=np.int64)}
+    keys, labels = bucket_keys(timestamps, timeframe, timezone_name)
+    starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+    ends = np.append(starts[1:], len(timestamps))
+    return {
+        "timestamp": labels[starts],
+        "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][ends - 1],
+        "volume": np.add.reduceat(columns["volume"], starts),
+        "first_bar": starts
+    }
+
+
+class Resampler:
+    """Rolled-up series kept per source series and extended as it grows
+
+    Stored bars only ever gain newer bars (and a revised latest bar), so bars before
+    the last cached bucket are final: a refresh re-aggregates from that bucket's first
+    source bar onwards. Anything else (older bars inserted, history pruned) rebuilds
+    the series.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600):
+        self.cache = TTLCache("resampled_history", maxsize=maxsize, ttl=ttl)
+
+    def roll(self, key: Hashable, columns: Dict[str, np.ndarray], timeframe: str,
+             timezone_name: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """``columns`` rolled up into ``timeframe`` bars; ``key`` identifies the source series"""
+        cache_key = (key, timeframe, timezone_name)
+        entry = self.cache.get(cache_key)
+        if entry is not None and entry["source"] is columns:
+            return entry["bars"]
+
+        timestamps = columns["timestamp"]
+        tail_start = 0
+        if entry is not None:
+            last_bar, seen = entry["last_bar"], entry["seen"]
+            if (len(timestamps) >= seen and seen > 0 and timestamps[0] == entry["first_ts"]
+                    and timestamps[last_bar] == entry["last_bar_ts"] and timestamps[seen - 1] == entry["last_ts"]):
+                tail_start = last_bar
+
+        tail = resample({name: columns[name][tail_start:] for name in OHLCV_COLUMNS}, timeframe, timezone_name)
+        if tail_start:
+            previous = entry["bars"]
+            kept = len(previous["timestamp"]) - 1
+            bars = {name: np.concatenate((previous[name][:kept], tail[name])) for name in OHLCV_COLUMNS}
+            first_bars = np.concatenate((entry["first_bars"][:kept], tail["first_bar"] + tail_start))
+        else:
+            bars = {name: tail[name] for name in OHLCV_COLUMNS}
+            first_bars = tail["first_bar"]
+
+        if len(first_bars):
+            last_bar = int(first_bars[-1])
+            self.cache.set(cache_key, {
+                "source": columns,
+                "bars": bars,
+                "first_bars": first_bars,
+                "seen": len(timestamps),
+                "first_ts": int(timestamps[0]),
+                "last_ts": int(timestamps[-1]),
+                "last_bar": last_bar,
+                "last_bar_ts": int(timestamps[last_bar])
+            })
+        return bars
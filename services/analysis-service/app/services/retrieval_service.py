@@ -0,0 +1,180 @@
+# services/analysis-service/app/services/retrieval_service.py
+"""Retrieval of news and filing passages for prompts
+
+Articles are split into passages of about ``RETRIEVAL_CHUNK_TOKENS``, embedded with
+``OLLAMA_EMBED_MODEL`` and stored in the ``NewsIndex`` once; fetching the same article
+again costs one SQLite lookup. At request time the analysis question is embedded and
+the most similar recent passages are returned, best first, until ``RETRIEVAL_TOKEN_BUDGET``
+is spent, so prompts gain context without growing without bound.
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.news_index import NewsIndex
+from app.services.ollama_service import OllamaService
+from app.services.prompt_builder import estimate_tokens, passage_line
+from app.telemetry.log import log
+from app.telemetry.metrics import metrics
+from app.utils import deadline
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# NewsAPI truncates ``content`` and appends e.g. "… [+2817 chars]"
+_TRUNCATION = re.compile(r"\s*(…|\.\.\.)?\s*\[\+\d+ chars\]\s*$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# Passages sent to Ollama per embedding call
+EMBED_BATCH = 32
+
+
+def article_id(article: Dict[str, Any]) -> str:
+    """Stable id of an article: its URL, or its title and date when it has none"""
+    key = article.get("url") or f"{article.get('title', '')}|{article.get('publishedAt', '')}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def published_at(article: Dict[str, Any]) -> float:
+    value = article.get("publishedAt")
+    if value:
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc).timestamp()
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split text into passages of whole sentences, each at most about ``max_tokens``"""
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for sentence in _SENTENCE_END.split(" ".join(text.split())):
+        cost = estimate_tokens(sentence)
+        if current and used + cost > max_tokens:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+        if cost > max_tokens:
+            # A run-on "sentence" (tables, lists): cut it by words
+            words = sentence.split()
+            step = max(1, len(words) * max_tokens // cost)
+            chunks.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+            continue
+        current.append(sentence)
+        used += cost
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def article_passages(article: Dict[str, Any], max_tokens: int) -> List[Dict[str, Any]]:
+    """Passages of one NewsAPI-shaped article (``title``, ``description``, ``content``, ...)"""
+    title = (article.get("title") or "").strip()
+    parts = [title]
+    for field in ("description", "content"):
+        body = _TRUNCATION.sub("", (article.get(field) or "").strip())
+        # ``content`` often repeats the description
+        if body and not any(body[:80] in part for part in parts):
+            parts.append(body)
+    text = ". ".join(part.rstrip(".") for part in parts if part) + "."
+    source = article.get("source")
+    meta = {
+        "article_id": article_id(article),
+        "published_at": published_at(article),
+        "title": title or None,
+        "source": source.get("name") if isinstance(source, dict) else source,
+        "url": article.get("url"),
+    }
+    return [{**meta, "text": chunk} for chunk in chunk_text(text, max_tokens) if chunk.strip(" .")]
+
+
+class RetrievalService:
+    def __init__(self, index: NewsIndex, ollama_service: OllamaService):
+        self.index = index
+        self.ollama_service = ollama_service
+        # Background ingestions per symbol; a retrieval for the symbol waits for them
+        self._pending: Dict[str, Set[asyncio.Task]] = {}
+
+    async def ingest(self, symbol: str, articles: List[Dict[str, Any]]) -> int:
+        """Embed and index the articles not indexed yet; returns the number of new passages"""
+        symbol = symbol.upper()
+        by_id = {article_id(article): article for article in articles if article.get("title")}
+        if not by_id:
+            return 0
+        known = await asyncio.to_thread(self.index.known_articles, symbol, list(by_id))
+        passages = [
+            passage
+            for article_key, article in by_id.items() if article_key not in known
+            for passage in article_passages(article, settings.RETRIEVAL_CHUNK_TOKENS)
+        ]
+        if not passages:
+            return 0
+
+        vectors = []
+        for start in range(0, len(passages), EMBED_BATCH):
+            batch = passages[start:start + EMBED_BATCH]
+            # Embedded with the title so a passage keeps its subject
+            vectors.extend(await self.ollama_service.embed([
+                p["text"] if not p["title"] or p["text"].startswith(p["title"]) else f"{p['title']}. {p['text']}"
+                for p in batch
+            ]))
+        added = await asyncio.to_thread(
+            self.index.append, symbol, settings.OLLAMA_EMBED_MODEL, np.asarray(vectors, dtype=np.float32), passages
+        )
+        metrics.retrieval_passages_indexed.inc(added)
+        return added
+
+    def ingest_later(self, symbol: str, articles: List[Dict[str, Any]]) -> None:
+        """Index articles in the background, so fetching news never waits for embeddings"""
+        symbol = symbol.upper()
+
+        async def run() -> None:
+            try:
+                with deadline.unbounded():
+                    await self.ingest(symbol, articles)
+            except Exception as e:
+                metrics.errors_total.inc(stage="news_ingest", error=type(e).__name__)
+                log(f"News indexing for {symbol} failed: {str(e)}")
+
+        task = asyncio.create_task(run())
+        pending = self._pending.setdefault(symbol, set())
+        pending.add(task)
+
+        def done(finished: asyncio.Task) -> None:
+            pending.discard(finished)
+            if not pending and self._pending.get(symbol) is pending:
+                del self._pending[symbol]
+
+        task.add_done_callback(done)
+
+    async def retrieve(self, symbol: str, question: str, budget: Optional[int] = None,
+                       k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Passages most relevant to ``question``, best first, within ``budget`` estimated tokens
+
+        Articles still being indexed for the symbol are waited for, within the request deadline.
+        """
+        budget = settings.RETRIEVAL_TOKEN_BUDGET if budget is None else budget
+        pending = self._pending.get(symbol.upper())
+        if pending:
+            await asyncio.wait(set(pending), timeout=deadline.timeout(10.0))
+        query = await self.ollama_service.embed_query(question)
+        found = await asyncio.to_thread(
+            self.index.search, symbol.upper(), settings.OLLAMA_EMBED_MODEL, query,
+            k or settings.RETRIEVAL_TOP_K, settings.RETRIEVAL_MIN_SCORE,
+            settings.RETRIEVAL_MAX_AGE_DAYS * 86400 if settings.RETRIEVAL_MAX_AGE_DAYS else None
+        )
+
+        selected, used = [], 0
+        for passage in found:
+            cost = estimate_tokens(passage_line(passage))
+            if used + cost > budget:
+                continue
+            selected.append(passage)
+            used += cost
+        metrics.retrieval_passages.observe(len(selected))
+        return selected
+
@@ -0,0 +1,275 @@
+# services/analysis-service/app/services/risk.py
+from __future__ import annotations
+import asyncio
+import secrets
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.backtest import align_histories, bar_date, load_histories
+from app.services.history_store import HistoryStore
+from app.services.market_data_service import MarketDataService, MarketDataError
+from app.telemetry.metrics import stage
+from app.utils.compute import compute
+from app.utils.helpers import metric_value
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Paths drawn from one RNG stream. Streams are spawned from the seed per block, not per
+# job, so a seed gives the same paths whatever the number of compute workers
+BLOCK_PATHS = 5000
+# Fewest common daily returns a covariance is estimated from
+MIN_OBSERVATIONS = 60
+TRADING_DAYS = 252
+# Fewest paths a simulation without ``paths`` draws, whatever RISK_DEFAULT_DRAWS allows
+MIN_DEFAULT_PATHS = 2000
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+DRAWDOWN_THRESHOLDS = (0.05, 0.1, 0.2, 0.3, 0.5)
+
+
+def common_returns(closes: np.ndarray, first: np.ndarray, lookback: int) -> np.ndarray:
+    """Daily log returns over the last ``lookback`` bars every symbol has, as (observations, symbols)"""
+    start = max(int(first.max()), closes.shape[1] - 1 - lookback)
+    window = closes[:, start:]
+    return np.diff(np.log(window), axis=1).T
+
+
+def covariance_factor(covariance: np.ndarray) -> np.ndarray:
+    """A matrix ``L`` with ``L @ L.T == covariance``
+
+    The Cholesky factor when the covariance is positive definite. With more holdings
+    than observations, or perfectly correlated ones, it is only semi-definite: the
+    eigendecomposition with negative rounding noise clipped to zero is used instead.
+    """
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+def _path_outcomes(steps: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(terminal return, max drawdown) per path from daily log returns (paths, days, holdings); overwrites ``steps``"""
+    # Day by day: each add runs over a contiguous (paths, holdings) slab, which is
+    # faster than np.cumsum along the strided middle axis
+    for day in range(1, steps.shape[1]):
+        np.add(steps[:, day], steps[:, day - 1], out=steps[:, day])
+    np.exp(steps, out=steps)
+    # Portfolio value relative to today, (paths, days)
+    portfolio = steps @ weights
+    peak = np.maximum.accumulate(portfolio, axis=1)
+    np.maximum(peak, 1.0, out=peak)
+    return portfolio[:, -1] - 1, (1 - portfolio / peak).max(axis=1)
+
+
+def simulate_paths(drift: np.ndarray, factor: np.ndarray, values: np.ndarray, horizon: int,
+                   streams: List[Any], paths: List[int], chunk_elements: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(terminal returns, max drawdowns) of the portfolio on every simulated path
+
+    Each holding's daily log return is ``drift + factor @ z`` with ``z`` standard normal,
+    and holdings are bought and held (weights drift with prices). Paths come in
+    antithetic pairs (``z`` and ``-z``), which halves the random draws and matrix
+    products and narrows the error of the mean. ``streams[i]`` (a ``SeedSequence``)
+    draws ``paths[i]`` paths, in chunks of about ``chunk_elements`` draws, so memory
+    stays bounded however many paths are asked for. Chunks hold whole antithetic
+    pairs, so the chunk size only changes the order paths come out in, not which
+    paths are drawn. Module-level so it can run on the compute executor.
+    """
+    holdings = len(values)
+    chunk = max(2, chunk_elements // (horizon * holdings))
+    chunk -= chunk % 2
+    factor_t = np.ascontiguousarray(factor.T, dtype=np.float32)
+    drift = drift.astype(np.float32)
+    weights = (values / values.sum()).astype(np.float32)
+    terminal = np.empty(sum(paths), dtype=np.float32)
+    drawdown = np.empty(sum(paths), dtype=np.float32)
+    noise = np.empty((chunk, horizon, holdings), dtype=np.float32)
+    steps = np.empty((chunk, horizon, holdings), dtype=np.float32)
+
+    row = 0
+    for stream, count in zip(streams, paths):
+        rng = np.random.Generator(np.random.PCG64(stream))
+        done = 0
+        while done < count:
+            size = min(chunk, count - done)
+            draws = (size + 1) // 2
+            z = rng.standard_normal((draws, horizon, holdings), dtype=np.float32)
+            np.matmul(z, factor_t, out=noise[:draws])
+            for sign, part in ((1, draws), (-1, size - draws)):
+                if part:
+                    np.multiply(noise[:part], sign, out=steps[:part])
+                    steps[:part] += drift
+                    outcomes = _path_outcomes(steps[:part], weights)
+                    terminal[row:row + part], drawdown[row:row + part] = outcomes
+                    row += part
+            done += size
+    return terminal, drawdown
+
+
+def default_paths(horizon: int, holdings: int) -> int:
+    """RISK_DEFAULT_PATHS, or fewer (an even number) when that would exceed RISK_DEFAULT_DRAWS"""
+    budget = settings.RISK_DEFAULT_DRAWS // (horizon * holdings)
+    return max(MIN_DEFAULT_PATHS, min(settings.RISK_DEFAULT_PATHS, budget - budget % 2))
+
+
+def tail_risk(terminal: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """(VaR, CVaR) as fractions of the portfolio value lost at ``confidence``"""
+    losses = -terminal.astype(np.float64)
+    var = float(np.quantile(losses, confidence))
+    return var, float(losses[losses >= var].mean())
+
+
+class RiskService:
+    """Monte Carlo value at risk, expected shortfall and drawdowns for a portfolio
+
+    Correlated daily returns are drawn from the holdings' historical covariance (via
+    its Cholesky factor) and simulated in bounded chunks; large simulations are split
+    across the compute executor's processes, one independent RNG stream per block of paths.
+    """
+
+    def __init__(self, market_data: MarketDataService, store: HistoryStore):
+        self.market_data = market_data
+        self.store = store
+
+    async def load_portfolio(self, holdings: Dict[str, Dict[str, Optional[float]]], lookback_days: int = 504,
+                             refresh: bool = False) -> Dict[str, Any]:
+        """Values and common daily log returns of the holdings
+
+        ``holdings`` maps symbols to a ``value`` or a ``quantity`` (valued at the last
+        stored close). Returns cover the last ``lookback_days`` days all holdings have,
+        as an (observations, symbols) matrix. Symbols never synced are fetched first.
+        Raises ``ValueError`` when a symbol has no history or there are too few
+        common days.
+        """
+        holdings = {symbol.strip().upper(): holding for symbol, holding in holdings.items() if symbol.strip()}
+        if len(holdings) > settings.RISK_MAX_HOLDINGS:
+            raise ValueError(f"At most {settings.RISK_MAX_HOLDINGS} holdings per portfolio")
+        symbols = list(holdings)
+
+        with stage("fetch_history"):
+            fetched = await load_histories(self.market_data, self.store, symbols, "daily", refresh)
+        histories = []
+        for symbol, result in zip(symbols, fetched):
+            if isinstance(result, MarketDataError):
+                raise ValueError(str(result))
+            if isinstance(result, BaseException):
+                raise result
+            histories.append(result)
+
+        timestamps, closes, _, first = await asyncio.to_thread(align_histories, histories)
+        returns = common_returns(closes, first, lookback_days)
+        if len(returns) < MIN_OBSERVATIONS:
+            raise ValueError(
+                f"Only {len(returns)} daily returns common to all holdings; at least {MIN_OBSERVATIONS} are needed"
+            )
+        prices = closes[:, -1]
+        values = np.array([
+            holding["value"] if holding.get("value") is not None else holding["quantity"] * price
+            for holding, price in zip(holdings.values(), prices)
+        ], dtype=np.float64)
+        if values.sum() <= 0:
+            raise ValueError("The portfolio has no value")
+        return {
+            "symbols": symbols,
+            "values": values,
+            "prices": prices,
+            "returns": returns,
+            "window": {"start": bar_date(timestamps[len(timestamps) - 1 - len(returns)]),
+                       "end": bar_date(timestamps[-1])}
+        }
+
+    async def simulate(self, holdings: Dict[str, Dict[str, Optional[float]]], paths: Optional[int] = None,
+                       horizon_days: int = 21, confidence: Optional[List[float]] = None, lookback_days: int = 504,
+                       include_drift: bool = False, seed: Optional[int] = None,
+                       refresh: bool = False) -> Dict[str, Any]:
+        """Simulate ``paths`` paths of ``horizon_days`` trading days
+
+        Without ``paths``, the default keeps the simulation within RISK_DEFAULT_DRAWS
+        random draws. Holdings and returns are as in ``load_portfolio``. The mean return is used as
+        drift only with ``include_drift`` (it is a noisy estimate), otherwise log
+        prices are driftless. The seed is returned so a run can be repeated exactly.
+        """
+        paths = paths or default_paths(horizon_days, len(holdings))
+        if paths > settings.RISK_MAX_PATHS:
+            raise ValueError(f"At most {settings.RISK_MAX_PATHS} paths per simulation")
+        if paths * horizon_days * len(holdings) > settings.RISK_MAX_DRAWS:
+            raise ValueError(f"paths × horizon_days × holdings is limited to {settings.RISK_MAX_DRAWS}")
+        confidence = sorted(set(confidence or [0.95, 0.99]))
+
+        portfolio = await self.load_portfolio(holdings, lookback_days, refresh)
+        symbols, values, returns = portfolio["symbols"], portfolio["values"], portfolio["returns"]
+        total = float(values.sum())
+
+        covariance = np.atleast_2d(np.cov(returns, rowvar=False))
+        drift = returns.mean(axis=0) if include_drift else np.zeros(len(symbols))
+        factor = covariance_factor(covariance)
+        if seed is None:
+            # 53 bits, so the seed survives a round trip through a JavaScript client
+            seed = secrets.randbits(53)
+        seed_sequence = np.random.SeedSequence(seed)
+        counts = [BLOCK_PATHS] * (paths // BLOCK_PATHS) + ([paths % BLOCK_PATHS] if paths % BLOCK_PATHS else [])
+        streams = seed_sequence.spawn(len(counts))
+
+        with stage("risk_simulation"):
+            terminal, drawdown = await self._simulate(drift, factor, values, horizon_days, streams, counts)
+
+        weights = values / total
+        variance = float(weights @ covariance @ weights)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            contributions = weights * (covariance @ weights) / variance if variance > 0 else np.zeros(len(symbols))
+        tails = {level: tail_risk(terminal, level) for level in confidence}
+        return {
+            "symbols": symbols,
+            "portfolio_value": round(total, 2),
+            "holdings": {
+                symbol: {"value": round(float(value), 2), "weight": metric_value(weight),
+                         "risk_contribution": metric_value(contribution)}
+                for symbol, value, weight, contribution in zip(symbols, values, weights, contributions)
+            },
+            "paths": paths,
+            "horizon_days": horizon_days,
+            "seed": seed,
+            "observations": len(returns),
+            "window": portfolio["window"],
+            "annual_volatility": metric_value(np.sqrt(variance * TRADING_DAYS)),
+            "expected_return": metric_value(terminal.mean(dtype=np.float64)),
+            "probability_of_loss": metric_value((terminal < 0).mean()),
+            "var": {
+                f"{level:g}": {"percent": metric_value(var), "amount": round(var * total, 2)}
+                for level, (var, _) in tails.items()
+            },
+            "cvar": {
+                f"{level:g}": {"percent": metric_value(cvar), "amount": round(cvar * total, 2)}
+                for level, (_, cvar) in tails.items()
+            },
+            "return_percentiles": {
+                f"p{p}": metric_value(value) for p, value in zip(PERCENTILES, np.percentile(terminal, PERCENTILES))
+            },
+            "max_drawdown": {
+                "mean": metric_value(drawdown.mean(dtype=np.float64)),
+                "percentiles": {
+                    f"p{p}": metric_value(value) for p, value in zip(PERCENTILES, np.percentile(drawdown, PERCENTILES))
+                },
+                "probability_over": {f"{threshold:g}": metric_value((drawdown > threshold).mean())
+                                     for threshold in DRAWDOWN_THRESHOLDS}
+            }
+        }
+
+    @staticmethod
+    async def _simulate(drift: np.ndarray, factor: np.ndarray, values: np.ndarray, horizon: int,
+                        streams: List[Any], counts: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """simulate_paths on the compute executor, one job per compute worker
+
+        Jobs take contiguous runs of blocks and their results are concatenated in
+        block order, so the output depends only on the seed.
+        """
+        holdings = len(values)
+        jobs = [job.tolist() for job in np.array_split(np.arange(len(counts)), max(1, compute.workers)) if len(job)]
+        parts = await asyncio.gather(*(
+            compute.run(simulate_paths, drift, factor, values, horizon, [streams[i] for i in job],
+                        [counts[i] for i in job], settings.RISK_CHUNK_ELEMENTS,
+                        cost=sum(counts[i] for i in job) * horizon * holdings)
+            for job in jobs
+        ))
+        return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
@@ -0,0 +1,64 @@
+# services/analysis-service/app/services/semantic_cache.py
+"""Semantic cache for custom-prompt answers
+
+Prompts are embedded with the local Ollama embedding model and kept in a per-worker
+``VectorIndex`` scoped by symbol. A new prompt about the same symbol whose embedding is
+at least ``SEMANTIC_CACHE_THRESHOLD`` similar to an earlier one gets that earlier answer,
+as long as it is younger than ``SEMANTIC_CACHE_TTL`` and the price hasn't moved more than
+``SEMANTIC_CACHE_MAX_PRICE_MOVE`` since. The cache only saves work: an embedding failure
+is a miss, never an error.
+"""
+from typing import List, Optional
+
+from app.services.ollama_service import OllamaService
+from app.telemetry.metrics import metrics
+from app.utils.vector_index import VectorIndex
+
+
+class SemanticCache:
+    def __init__(self, ollama_service: OllamaService, capacity: int, ttl: float, threshold: float,
+                 max_price_move: float):
+        self.ollama_service = ollama_service
+        self.threshold = threshold
+        self.max_price_move = max_price_move
+        self.index = VectorIndex(capacity, ttl)
+
+    @staticmethod
+    def _scope(symbol: str) -> str:
+        return symbol.upper()
+
+    async def _embed(self, prompt: str) -> Optional[List[float]]:
+        # A lookup that misses is followed by a store of the same prompt; embed_query memoises it
+        try:
+            return await self.ollama_service.embed_query(prompt)
+        except Exception as e:
+            metrics.errors_total.inc(stage="semantic_cache", error=type(e).__name__)
+            return None
+
+    def _fresh(self, price: Optional[float]):
+        def accept(entry) -> bool:
+            cached_price = entry["price"]
+            if not price or not cached_price:
+                return price == cached_price
+            return abs(price - cached_price) / cached_price <= self.max_price_move
+        return accept
+
+    async def lookup(self, symbol: str, prompt: str, price: Optional[float]) -> Optional[str]:
+        """An earlier answer to a similar prompt about ``symbol``, if still fresh"""
+        vector = await self._embed(prompt)
+        match = None
+        if vector is not None:
+            match = self.index.search(self._scope(symbol), vector, self.threshold, self._fresh(price))
+        metrics.record_cache("semantic", match is not None)
+        if match is None:
+            return None
+        entry, score = match
+        metrics.semantic_cache_similarity.observe(score)
+        return entry["answer"]
+
+    async def store(self, symbol: str, prompt: str, price: Optional[float], answer: str) -> None:
+        if not answer.strip():
+            return
+        vector = await self._embed(prompt)
+        if vector is not None:
+            self.index.add(self._scope(symbol), vector, {"prompt": prompt, "price": price, "answer": answer})
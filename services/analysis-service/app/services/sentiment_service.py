@@ -1,15 +1,48 @@
 # services/analysis-service/app/services/sentiment_service.py
-import httpx
-from typing import List, Dict, Optional
+from __future__ import annotations
+import asyncio
+from typing import TYPE_CHECKING, List, Dict, Optional
 from datetime import datetime, timedelta
 from app.config import settings
+from app.resources import resources
+from app.telemetry.log import log
+from app.telemetry.metrics import metrics, track_upstream
+from app.telemetry.tracing import tracer
+from app.utils import deadline
+from app.utils.shared_state import news_api_limiter
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+if TYPE_CHECKING:
+    from app.services.retrieval_service import RetrievalService
+
+# Articles scored for sentiment per symbol (all fetched articles are indexed for retrieval)
+SENTIMENT_ARTICLES = 10
+
+# Inputs understood by the Fear & Greed calculation
+FEAR_GREED_INPUTS = (
+    'momentum_percent', 'price_change_percent', 'volume_ratio', 'rsi', 'volatility_ratio', 'news_sentiment'
+)
+# Legacy categorical volume trend mapped onto a volume ratio
+VOLUME_TREND_RATIOS = {'increasing': 1.5, 'decreasing': 0.5, 'stable': 1.0}
+
+def fear_greed_labels(scores: np.ndarray) -> np.ndarray:
+    """Map Fear & Greed scores to their sentiment labels"""
+    scores = np.asarray(scores)
+    return np.select(
+        [scores >= 75, scores >= 60, scores >= 45, scores >= 25],
+        ["Extreme Greed", "Greed", "Neutral", "Fear"],
+        "Extreme Fear"
+    )
 
 class SentimentService:
     """Service for analyzing market sentiment from news and social media"""
     
-    def __init__(self):
+    def __init__(self, retrieval: Optional[RetrievalService] = None):
         self.news_api_key = settings.NEWS_API_KEY
-        self.news_api_url = "https://newsapi.org/v2/everything"
+        self.news_api_url = settings.NEWS_API_URL
+        self.retrieval = retrieval
     
     async def fetch_news(self, symbol: str, company_name: Optional[str] = None, days: int = 7) -> List[Dict]:
         """Fetch news articles for a stock"""
@@ -28,18 +61,33 @@ class SentimentService:
             "from": from_date,
             "sortBy": "relevancy",
             "language": "en",
+            "pageSize": settings.NEWS_PAGE_SIZE,
             "apiKey": self.news_api_key
         }
         
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(self.news_api_url, params=params)
-                response.raise_for_status()
+        with tracer.start_as_current_span("sentiment_service.fetch_news", attributes={"symbol": symbol}) as span:
+            try:
+                await news_api_limiter.acquire()
+                with track_upstream("newsapi", "everything"):
+                    response = await resources.http.get(
+                        self.news_api_url, params=params, timeout=deadline.timeout(30.0)
+                    )
+                    response.raise_for_status()
                 data = response.json()
-                return data.get("articles", [])[:10]  # Limit to 10 articles
-        except Exception as e:
-            print(f"Error fetching news: {str(e)}")
-            return []
+                articles = data.get("articles", [])
+                span.set_attribute("news.article_count", len(articles))
+                # Market-wide news (MARKET_NEWS_QUERY) is not about one symbol: nothing to retrieve it for
+                if self.retrieval is not None and articles and symbol != settings.MARKET_NEWS_QUERY:
+                    self.retrieval.ingest_later(symbol, articles)
+                return articles[:SENTIMENT_ARTICLES]
+            except Exception as e:
+                span.record_exception(e)
+                if isinstance(e, deadline.DeadlineExceeded) or deadline.expired():
+                    # Out of time is not the same as no news: let the caller leave sentiment out
+                    raise deadline.DeadlineExceeded("Deadline exceeded fetching news") from e
+                metrics.errors_total.inc(stage="fetch_news", error=type(e).__name__)
+                log(f"Error fetching news: {str(e)}")
+                return []
     
     def analyze_text_sentiment(self, text: str) -> Dict[str, any]:
         """Simple rule-based sentiment analysis"""
@@ -94,6 +142,7 @@ class SentimentService:
             return {
                 'overall_sentiment': 'neutral',
                 'confidence': 0.0,
+                'score': 0.0,
                 'article_count': 0,
                 'sources': [],
                 'summary': 'No recent news available for analysis'
@@ -144,6 +193,7 @@ class SentimentService:
         return {
             'overall_sentiment': overall_sentiment,
             'confidence': round(confidence, 2),
+            'score': round(sum(s['score'] for s in sentiments) / total_articles, 3),
             'article_count': total_articles,
             'positive_count': positive_count,
             'negative_count': negative_count,
@@ -161,51 +211,89 @@ class SentimentService:
             ]
         }
     
+    async def analyze_news_sentiment_bulk(self, symbols: List[str], concurrency: int = 8) -> Dict[str, Dict]:
+        """News sentiment for many symbols, fetched concurrently (at most ``concurrency`` at a time)
+
+        Symbols whose news could not be fetched before the request deadline are left out.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def analyze(symbol: str) -> Optional[Dict]:
+            async with semaphore:
+                try:
+                    return await self.analyze_news_sentiment(symbol)
+                except deadline.DeadlineExceeded:
+                    deadline.skip("sentiment")
+                    return None
+        
+        symbols = list(dict.fromkeys(symbols))
+        results = await asyncio.gather(*(analyze(symbol) for symbol in symbols))
+        return {symbol: result for symbol, result in zip(symbols, results) if result is not None}
+    
+    def calculate_fear_greed_bulk(self, components: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Vectorized Fear & Greed scores for many symbols at once
+        
+        Each component is an array with one value per symbol; NaN (missing data)
+        contributes nothing, so a symbol without news or short history still scores.
+        """
+        def component(name: str) -> Optional[np.ndarray]:
+            if name not in components:
+                return None
+            return np.asarray(components[name], dtype=np.float64)
+        
+        arrays = [value for value in (component(name) for name in FEAR_GREED_INPUTS) if value is not None]
+        size = max((value.size for value in arrays), default=1)
+        
+        def points(name: str, transform) -> np.ndarray:
+            value = component(name)
+            if value is None:
+                return np.zeros(size)
+            with np.errstate(invalid="ignore"):
+                return np.nan_to_num(transform(np.broadcast_to(value, (size,))), nan=0.0)
+        
+        # Price momentum (±20 points): percent above/below the recent average
+        momentum_key = 'momentum_percent' if 'momentum_percent' in components else 'price_change_percent'
+        momentum = points(momentum_key, lambda v: np.clip(v * 2, -20, 20))
+        
+        # Volume trend (±10 points): rising participation reads as greed
+        volume = points('volume_ratio', lambda v: np.select([v > 1.2, v < 0.8], [10.0, -10.0], 0.0))
+        
+        # RSI (±15 points): linear between oversold (30) and overbought (70)
+        rsi = points('rsi', lambda v: np.clip((v - 50) * 0.75, -15, 15))
+        
+        # Volatility (±15 points): short-term volatility above its longer-run level is fear
+        volatility = points('volatility_ratio', lambda v: np.clip((1 - v) * 30, -15, 15))
+        
+        # News sentiment (±10 points): mean article score in [-1, 1]
+        news = points('news_sentiment', lambda v: np.clip(v, -1, 1) * 10)
+        
+        score = np.clip(50 + momentum + volume + rsi + volatility + news, 0, 100)
+        return {
+            'score': score,
+            'sentiment': fear_greed_labels(score),
+            'components': {
+                'momentum': momentum,
+                'volume': volume,
+                'rsi': rsi,
+                'volatility': volatility,
+                'news_sentiment': news
+            }
+        }
+    
     def calculate_fear_greed_index(self, market_data: Dict) -> Dict:
-        """Calculate a simplified Fear & Greed Index"""
-        # This is a simplified version - production would use more sophisticated metrics
-        
-        score = 50  # Neutral starting point
-        
-        # Price momentum (±20 points)
-        if 'price_change_percent' in market_data:
-            change = market_data['price_change_percent']
-            score += min(20, max(-20, change * 2))
-        
-        # Volume (±15 points)
-        if 'volume_trend' in market_data:
-            if market_data['volume_trend'] == 'increasing':
-                score += 10
-            elif market_data['volume_trend'] == 'decreasing':
-                score -= 10
-        
-        # RSI (±15 points)
-        if 'rsi' in market_data:
-            rsi = market_data['rsi']
-            if rsi > 70:
-                score += 15  # Overbought = Greed
-            elif rsi < 30:
-                score -= 15  # Oversold = Fear
-        
-        # Ensure score is between 0 and 100
-        score = max(0, min(100, score))
-        
-        # Determine sentiment
-        if score >= 75:
-            sentiment = "Extreme Greed"
-        elif score >= 60:
-            sentiment = "Greed"
-        elif score >= 45:
-            sentiment = "Neutral"
-        elif score >= 25:
-            sentiment = "Fear"
-        else:
-            sentiment = "Extreme Fear"
+        """Calculate the Fear & Greed Index for a single symbol"""
+        components = {key: [market_data[key]] for key in FEAR_GREED_INPUTS if market_data.get(key) is not None}
+        if 'volume_ratio' not in components and 'volume_trend' in market_data:
+            components['volume_ratio'] = [VOLUME_TREND_RATIOS.get(market_data['volume_trend'], 1.0)]
+        
+        result = self.calculate_fear_greed_bulk(components)
+        score = float(result['score'][0])
         
         return {
             'score': round(score, 1),
-            'sentiment': sentiment,
-            'interpretation': self._get_fear_greed_interpretation(score)
+            'sentiment': str(result['sentiment'][0]),
+            'interpretation': self._get_fear_greed_interpretation(score),
+            'components': {name: round(float(value[0]), 1) for name, value in result['components'].items()}
         }
     
     def _get_fear_greed_interpretation(self, score: float) -> str:
@@ -220,5 +308,3 @@ class SentimentService:
             return "Market shows fear. Could be buying opportunity for quality stocks."
         else:
             return "Extreme fear in the market. Historically good time for long-term investors to buy."
-
-sentiment_service = SentimentService()
\ No newline at end of file
@@ -1,7 +1,10 @@
 # services/analysis-service/app/services/technical_analysis.py
-import numpy as np
+from __future__ import annotations
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
 
 class TechnicalAnalysisService:
     
@@ -109,15 +112,299 @@ class TechnicalAnalysisService:
         else:
             return "stable"
     
+    # --- Full-series indicators -------------------------------------------
+    # These return one value per input bar (NaN during the warm-up window) and are
+    # used when the caller needs the whole indicator history, e.g. for charting.
+    
     @staticmethod
-    def get_comprehensive_analysis(prices: List[float], volumes: List[int]) -> Dict:
-        """Get all technical indicators"""
+    def _ewm(values: np.ndarray, alpha: float, seed) -> np.ndarray:
+        """Exponentially weighted recursion y[t] = alpha*x[t] + (1-alpha)*y[t-1], y[-1] = seed
+        
+        Runs along the last axis, so a (symbols, bars) matrix is processed in one pass.
+        Evaluated block-wise in closed form so it runs in NumPy rather than a Python loop;
+        the block length keeps (1-alpha)^-block well inside float64 range.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n = values.shape[-1]
+        out = np.empty(values.shape, dtype=np.float64)
+        if n == 0:
+            return out
+        decay = 1.0 - alpha
+        if decay <= 0:
+            out[...] = values
+            return out
+        
+        block = max(1, min(n, int(300 / -np.log(decay))))
+        powers = decay ** np.arange(1, block + 1)
+        inverse = 1.0 / decay ** np.arange(block)
+        prev = np.asarray(seed, dtype=np.float64)[..., None]
+        for start in range(0, n, block):
+            chunk = values[..., start:start + block]
+            size = chunk.shape[-1]
+            weighted = np.cumsum(chunk * inverse[:size], axis=-1)
+            out[..., start:start + size] = powers[:size] * prev + alpha * (powers[:size] / decay) * weighted
+            prev = out[..., start + size - 1:start + size]
+        return out
+    
+    @staticmethod
+    def sma_series(values: np.ndarray, period: int) -> np.ndarray:
+        """Simple moving average over a trailing window"""
+        values = np.asarray(values, dtype=np.float64)
+        out = np.full(len(values), np.nan)
+        if len(values) < period:
+            return out
+        cumulative = np.cumsum(np.insert(values, 0, 0.0))
+        out[period - 1:] = (cumulative[period:] - cumulative[:-period]) / period
+        return out
+    
+    @staticmethod
+    def ema_series(values: np.ndarray, period: int) -> np.ndarray:
+        """Exponential moving average seeded with the first value (matches _calculate_ema)"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return values.copy()
+        return TechnicalAnalysisService._ewm(values, 2 / (period + 1), values[0])
+    
+    @staticmethod
+    def rsi_series(prices: np.ndarray, period: int = 14) -> np.ndarray:
+        """Wilder-smoothed Relative Strength Index along the last axis"""
+        prices = np.asarray(prices, dtype=np.float64)
+        out = np.full(prices.shape, np.nan)
+        if prices.shape[-1] < period + 1:
+            return out
+        
+        deltas = np.diff(prices, axis=-1)
+        gains = np.where(deltas > 0, deltas, 0.0)
+        losses = np.where(deltas < 0, -deltas, 0.0)
+        
+        avg_gain = np.empty(deltas.shape)
+        avg_loss = np.empty(deltas.shape)
+        avg_gain[..., period - 1] = gains[..., :period].mean(axis=-1)
+        avg_loss[..., period - 1] = losses[..., :period].mean(axis=-1)
+        avg_gain[..., period:] = TechnicalAnalysisService._ewm(gains[..., period:], 1 / period, avg_gain[..., period - 1])
+        avg_loss[..., period:] = TechnicalAnalysisService._ewm(losses[..., period:], 1 / period, avg_loss[..., period - 1])
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = avg_gain[..., period - 1:] / avg_loss[..., period - 1:]
+            rsi = np.where(avg_loss[..., period - 1:] == 0, 100.0, 100 - (100 / (1 + rs)))
+        out[..., period:] = rsi
+        return out
+    
+    @staticmethod
+    def macd_series(prices: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+        """MACD line, signal line (EMA of MACD) and histogram"""
+        prices = np.asarray(prices, dtype=np.float64)
+        n = len(prices)
+        macd_line = np.full(n, np.nan)
+        signal_line = np.full(n, np.nan)
+        if n >= slow:
+            full_macd = TechnicalAnalysisService.ema_series(prices, fast) - TechnicalAnalysisService.ema_series(prices, slow)
+            macd_line[slow - 1:] = full_macd[slow - 1:]
+            if n >= slow + signal - 1:
+                signal_values = TechnicalAnalysisService.ema_series(full_macd[slow - 1:], signal)
+                signal_line[slow + signal - 2:] = signal_values[signal - 1:]
         return {
-            'rsi': TechnicalAnalysisService.calculate_rsi(prices),
-            'moving_averages': TechnicalAnalysisService.calculate_moving_averages(prices),
-            'macd': TechnicalAnalysisService.calculate_macd(prices),
-            'bollinger_bands': TechnicalAnalysisService.calculate_bollinger_bands(prices),
-            'volume_trend': TechnicalAnalysisService.analyze_volume_trend(volumes)
+            'macd': macd_line,
+            'signal': signal_line,
+            'histogram': macd_line - signal_line
         }
-
-technical_service = TechnicalAnalysisService()
\ No newline at end of file
+    
+    @staticmethod
+    def bollinger_series(prices: np.ndarray, period: int = 20, num_std: float = 2.0) -> Dict[str, np.ndarray]:
+        """Bollinger Bands over a trailing window (population standard deviation, like np.std)"""
+        prices = np.asarray(prices, dtype=np.float64)
+        n = len(prices)
+        middle = np.full(n, np.nan)
+        std = np.full(n, np.nan)
+        if n >= period:
+            windows = np.lib.stride_tricks.sliding_window_view(prices, period)
+            middle[period - 1:] = windows.mean(axis=1)
+            std[period - 1:] = windows.std(axis=1)
+        return {
+            'upper': middle + num_std * std,
+            'middle': middle,
+            'lower': middle - num_std * std
+        }
+    
+    @staticmethod
+    def fear_greed_components(closes: np.ndarray, volumes: np.ndarray) -> Dict[str, np.ndarray]:
+        """Fear & Greed inputs for a (symbols, bars) matrix, one value per symbol
+        
+        - momentum_percent: last close vs. its 50-bar average
+        - rsi: latest 14-bar Wilder RSI
+        - volume_ratio: last 5 bars' average volume vs. the 5 before
+        - volatility_ratio: 20-bar vs. 100-bar realized volatility
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+        volumes = np.atleast_2d(np.asarray(volumes, dtype=np.float64))
+        count, bars = closes.shape
+        nan = np.full(count, np.nan)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            momentum = (closes[:, -1] / closes[:, -50:].mean(axis=1) - 1) * 100 if bars >= 2 else nan
+            rsi = TechnicalAnalysisService.rsi_series(closes)[:, -1] if bars >= 15 else nan
+            volume_ratio = (volumes[:, -5:].mean(axis=1) / volumes[:, -10:-5].mean(axis=1)) if bars >= 10 else nan
+            if bars >= 22:
+                log_returns = np.diff(np.log(closes), axis=1)
+                volatility_ratio = log_returns[:, -20:].std(axis=1) / log_returns[:, -100:].std(axis=1)
+            else:
+                volatility_ratio = nan
+        
+        return {
+            'momentum_percent': momentum,
+            'rsi': rsi,
+            'volume_ratio': volume_ratio,
+            'volatility_ratio': volatility_ratio
+        }
+    
+    @staticmethod
+    def get_indicator_series(prices: np.ndarray, volumes: np.ndarray, indicators) -> Dict[str, np.ndarray]:
+        """Compute only the requested indicator series
+        
+        ``indicators`` is any subset of rsi, sma, ema, macd, bollinger and volume.
+        """
+        tas = TechnicalAnalysisService
+        series: Dict[str, np.ndarray] = {}
+        
+        if 'rsi' in indicators:
+            series['rsi'] = tas.rsi_series(prices)
+        if 'sma' in indicators:
+            for period in (20, 50, 200):
+                series[f'sma_{period}'] = tas.sma_series(prices, period)
+        if 'ema' in indicators:
+            for period in (12, 26):
+                series[f'ema_{period}'] = tas.ema_series(prices, period)
+        if 'macd' in indicators:
+            macd = tas.macd_series(prices)
+            series['macd'] = macd['macd']
+            series['macd_signal'] = macd['signal']
+            series['macd_histogram'] = macd['histogram']
+        if 'bollinger' in indicators:
+            bands = tas.bollinger_series(prices)
+            series['bb_upper'] = bands['upper']
+            series['bb_middle'] = bands['middle']
+            series['bb_lower'] = bands['lower']
+        if 'volume' in indicators:
+            series['volume_sma_20'] = tas.sma_series(volumes, 20)
+        
+        return series
+    
+    @staticmethod
+    def summarize_series(series: Dict[str, np.ndarray], volumes) -> Dict:
+        """Latest indicator values, in the same shape as get_comprehensive_analysis"""
+        def last(name: str) -> Optional[float]:
+            values = series.get(name)
+            if values is None or len(values) == 0 or np.isnan(values[-1]):
+                return None
+            return float(values[-1])
+        
+        summary: Dict = {}
+        if 'rsi' in series:
+            summary['rsi'] = last('rsi')
+        moving_averages = {
+            name: last(name) for name in ('sma_20', 'sma_50', 'sma_200', 'ema_12', 'ema_26')
+            if name in series and last(name) is not None
+        }
+        if moving_averages or 'sma_20' in series or 'ema_12' in series:
+            summary['moving_averages'] = moving_averages
+        if 'macd' in series:
+            macd = last('macd')
+            signal = last('macd_signal')
+            summary['macd'] = None if macd is None or signal is None else {
+                'macd': macd,
+                'signal': signal,
+                'histogram': macd - signal
+            }
+        if 'bb_middle' in series:
+            middle = last('bb_middle')
+            summary['bollinger_bands'] = None if middle is None else {
+                'upper': last('bb_upper'),
+                'middle': middle,
+                'lower': last('bb_lower')
+            }
+        if 'volume_sma_20' in series:
+            summary['volume_trend'] = TechnicalAnalysisService.analyze_volume_trend(list(volumes[-10:]))
+        return summary
+    
+    @staticmethod
+    def get_comprehensive_analysis(prices: List[float], volumes: List[int]) -> Dict:
+        """Get all technical indicators"""
+        return TechnicalAnalysisService.get_comprehensive_analysis_batch([prices], [volumes])[0]
+    
+    @staticmethod
+    def get_comprehensive_analysis_batch(price_rows: List[List[float]], volume_rows: List[List[int]]) -> List[Dict]:
+        """get_comprehensive_analysis for many symbols at once
+        
+        Rows may be lists or arrays, or a ready (symbols, bars) matrix. Series of equal
+        length are stacked into one matrix and every indicator is computed for the whole
+        matrix, with the same definitions as the single-value methods above.
+        """
+        tas = TechnicalAnalysisService
+        results: List[Optional[Dict]] = [None] * len(price_rows)
+        groups: Dict[tuple, List[int]] = {}
+        for i, (prices, volumes) in enumerate(zip(price_rows, volume_rows)):
+            groups.setdefault((len(prices), len(volumes)), []).append(i)
+        
+        for (n, m), rows in groups.items():
+            count = len(rows)
+            closes = np.asarray([price_rows[i] for i in rows], dtype=np.float64).reshape(count, n)
+            volumes = np.asarray([volume_rows[i] for i in rows], dtype=np.float64).reshape(count, m)
+            
+            # RSI from the simple average of the first 14 changes (calculate_rsi)
+            rsi = [None] * count
+            if n >= 15:
+                deltas = np.diff(closes, axis=1)[:, :14]
+                avg_gain = np.where(deltas > 0, deltas, 0.0).mean(axis=1)
+                avg_loss = np.where(deltas < 0, -deltas, 0.0).mean(axis=1)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    rsi = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss))).tolist()
+            
+            moving_averages: List[Dict[str, float]] = [{} for _ in rows]
+            for period in (20, 50, 200):
+                if n >= period:
+                    for averages, value in zip(moving_averages, closes[:, -period:].mean(axis=1).tolist()):
+                        averages[f'sma_{period}'] = value
+            ema = {}
+            for period in (12, 26):
+                if n >= period:
+                    ema[period] = tas._ewm(closes, 2 / (period + 1), closes[:, 0])[:, -1]
+                    for averages, value in zip(moving_averages, ema[period].tolist()):
+                        averages[f'ema_{period}'] = value
+            
+            # Simplified signal line (90% of MACD), as in calculate_macd
+            macd = [None] * count
+            if n >= 26:
+                line = ema[12] - ema[26]
+                signal = line * 0.9
+                macd = [
+                    {'macd': l, 'signal': s, 'histogram': h}
+                    for l, s, h in zip(line.tolist(), signal.tolist(), (line - signal).tolist())
+                ]
+            
+            bollinger = [None] * count
+            if n >= 20:
+                window = closes[:, -20:]
+                middle = window.mean(axis=1)
+                std = window.std(axis=1)
+                bollinger = [
+                    {'upper': u, 'middle': c, 'lower': l}
+                    for u, c, l in zip((middle + 2 * std).tolist(), middle.tolist(), (middle - 2 * std).tolist())
+                ]
+            
+            volume_trend = ["insufficient_data"] * count
+            if m >= 10:
+                recent = volumes[:, -5:].mean(axis=1)
+                older = volumes[:, -10:-5].mean(axis=1)
+                volume_trend = np.select(
+                    [recent > older * 1.2, recent < older * 0.8], ["increasing", "decreasing"], "stable"
+                ).tolist()
+            
+            for j, i in enumerate(rows):
+                results[i] = {
+                    'rsi': rsi[j],
+                    'moving_averages': moving_averages[j],
+                    'macd': macd[j],
+                    'bollinger_bands': bollinger[j],
+                    'volume_trend': volume_trend[j]
+                }
+        return results
@@ -0,0 +1,14 @@
+from .metrics import metrics, stage, track_upstream, record_llm_generation
+from .loop_monitor import loop_monitor
+from .tracing import tracer, InMemorySpanExporter, SimpleSpanProcessor
+
+__all__ = [
+    'metrics',
+    'stage',
+    'track_upstream',
+    'record_llm_generation',
+    'loop_monitor',
+    'tracer',
+    'InMemorySpanExporter',
+    'SimpleSpanProcessor'
+]
@@ -0,0 +1,60 @@
+# services/analysis-service/app/telemetry/log.py
+import atexit
+import queue
+import sys
+import threading
+from typing import Optional
+
+
+class _LogWriter:
+    """Writes log lines to stdout from a background thread
+
+    ``print`` blocks the calling thread when stdout is a slow pipe (a container log
+    driver, a full terminal), which stalls the event loop when it happens there. Lines
+    are queued instead; past ``max_queue_size`` pending lines they are dropped and counted.
+    """
+
+    def __init__(self, max_queue_size: int = 10000):
+        self.dropped_lines = 0
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def write(self, message: str) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker, name="log-writer", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped_lines += 1
+
+    def _emit(self, lines) -> None:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+    def _worker(self) -> None:
+        while True:
+            lines = [self._queue.get()]
+            while not self._queue.empty() and len(lines) < 512:
+                lines.append(self._queue.get_nowait())
+            self._emit(lines)
+
+    def flush(self) -> None:
+        """Write out whatever is still queued (at interpreter exit)"""
+        lines = []
+        while not self._queue.empty():
+            lines.append(self._queue.get_nowait())
+        if lines:
+            self._emit(lines)
+
+
+_writer = _LogWriter()
+atexit.register(_writer.flush)
+
+
+def log(message: str) -> None:
+    """Non-blocking ``print`` for code that runs on the event loop"""
+    _writer.write(message)
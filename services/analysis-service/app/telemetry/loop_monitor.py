@@ -0,0 +1,155 @@
+# services/analysis-service/app/telemetry/loop_monitor.py
+"""Event-loop health
+
+A task on the loop sleeps for ``LOOP_MONITOR_INTERVAL`` and records how late it wakes
+up: that lateness is the scheduling lag every other coroutine sees. A watchdog thread
+checks the task's deadline. Once the loop is ``LOOP_SLOW_THRESHOLD`` past it, the
+watchdog samples the loop thread's stack, which shows the callback that is blocking it.
+Samples are grouped by stack, and the worst of them are kept for ``GET /debug/loop``.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.telemetry.metrics import metrics
+
+# Skip the innermost asyncio frames (run_forever, _run_once, Handle._run) in reported stacks
+_LOOP_FRAMES = ("asyncio/base_events.py", "asyncio/events.py", "asyncio/runners.py", "uvloop/")
+
+
+def _format_stack(frame, limit: int) -> List[str]:
+    entries = [
+        entry for entry in traceback.extract_stack(frame)
+        if not any(part in entry.filename.replace("\\", "/") for part in _LOOP_FRAMES)
+    ]
+    return [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in entries[-limit:]]
+
+
+class LoopMonitor:
+    """Measures event-loop lag and samples the stacks of callbacks that block it"""
+
+    def __init__(self, interval: float, threshold: float, max_offenders: int = 50,
+                 stack_depth: int = 30, window: int = 1000):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_offenders = max_offenders
+        self.stack_depth = stack_depth
+        self.stalls = 0
+        self._recent = deque(maxlen=window)
+        # Stack (as a tuple of frames) -> aggregated stall stats
+        self._offenders: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._deadline: Optional[float] = None
+        self._stall: Optional[Dict[str, Any]] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def _tick(self) -> None:
+        while True:
+            deadline = time.perf_counter() + self.interval
+            self._deadline = deadline
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - deadline)
+            metrics.loop_lag.observe(lag)
+            self._recent.append(lag)
+            with self._lock:
+                stall, self._stall = self._stall, None
+            if stall is not None:
+                self._record(stall, lag)
+
+    def _watch(self) -> None:
+        poll = max(0.005, self.threshold / 4)
+        while not self._stop.wait(poll):
+            deadline = self._deadline
+            if deadline is None or time.perf_counter() - deadline < self.threshold:
+                continue
+            with self._lock:
+                if self._stall is not None and self._stall["deadline"] == deadline:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = _format_stack(frame, self.stack_depth)
+            del frame
+            with self._lock:
+                self._stall = {"deadline": deadline, "stack": stack}
+
+    def _record(self, stall: Dict[str, Any], lag: float) -> None:
+        self.stalls += 1
+        metrics.loop_stalls_total.inc()
+        key = tuple(stall["stack"])
+        with self._lock:
+            offender = self._offenders.get(key)
+            if offender is None:
+                if len(self._offenders) >= self.max_offenders:
+                    # Evict the mildest offender to make room
+                    mildest = min(self._offenders, key=lambda k: self._offenders[k]["max_blocked_seconds"])
+                    if self._offenders[mildest]["max_blocked_seconds"] >= lag:
+                        return
+                    del self._offenders[mildest]
+                offender = self._offenders[key] = {
+                    "count": 0, "total_blocked_seconds": 0.0, "max_blocked_seconds": 0.0,
+                    "last_seen": 0.0, "stack": stall["stack"]
+                }
+            offender["count"] += 1
+            offender["total_blocked_seconds"] += lag
+            offender["max_blocked_seconds"] = max(offender["max_blocked_seconds"], lag)
+            offender["last_seen"] = time.time()
+
+    def report(self, limit: int = 10) -> Dict[str, Any]:
+        """Lag summary over the recent window and the worst offenders by longest stall"""
+        recent = sorted(self._recent)
+
+        def quantile(q: float) -> float:
+            return round(recent[min(len(recent) - 1, int(q * len(recent)))], 6) if recent else 0.0
+
+        with self._lock:
+            offenders = sorted(self._offenders.values(), key=lambda o: o["max_blocked_seconds"], reverse=True)
+            offenders = [{**offender, "stack": list(offender["stack"])} for offender in offenders[:limit]]
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "threshold_seconds": self.threshold,
+            "lag_seconds": {
+                "samples": len(recent), "p50": quantile(0.5), "p99": quantile(0.99),
+                "max": round(recent[-1], 6) if recent else 0.0
+            },
+            "stalls": self.stalls,
+            "offenders": offenders,
+        }
+
+    def start(self) -> None:
+        """Start measuring the running loop"""
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._deadline = None
+        await asyncio.to_thread(self._watchdog.join, 1.0)
+        self._watchdog = None
+
+
+loop_monitor = LoopMonitor(
+    settings.LOOP_MONITOR_INTERVAL, settings.LOOP_SLOW_THRESHOLD, settings.LOOP_MONITOR_MAX_OFFENDERS
+)
@@ -0,0 +1,393 @@
+# services/analysis-service/app/telemetry/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.telemetry.tracing import tracer
+
+# Latency buckets cover both sub-millisecond indicator math and multi-minute LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+LOOP_LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+SIMILARITY_BUCKETS = (0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99, 1.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 400)
+
+# Per-request list of (name, duration_ms) entries rendered into the Server-Timing header
+_server_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timings", default=None)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed histogram"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(self.labelnames + ("le",), key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {state[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics registry rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+        # HTTP surface
+        self.http_requests_total = self.counter(
+            "analysis_http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+        self.http_request_duration = self.histogram(
+            "analysis_http_request_duration_seconds", "End-to-end HTTP request latency", ("method", "route"))
+        self.http_in_flight = self.gauge(
+            "analysis_http_requests_in_flight", "HTTP requests currently being handled")
+
+        # Pipeline stages (technical analysis, sentiment, prompt build, LLM generation, ...)
+        self.stage_duration = self.histogram(
+            "analysis_stage_duration_seconds", "Latency of individual analysis pipeline stages", ("stage",))
+        self.errors_total = self.counter(
+            "analysis_errors_total", "Errors raised while serving analysis requests", ("stage", "error"))
+
+        # Upstream providers
+        self.upstream_duration = self.histogram(
+            "analysis_upstream_request_duration_seconds", "Latency of upstream HTTP calls",
+            ("provider", "endpoint"))
+        self.upstream_errors = self.counter(
+            "analysis_upstream_errors_total", "Failed upstream HTTP calls", ("provider", "endpoint"))
+        self.upstream_in_flight = self.gauge(
+            "analysis_upstream_requests_in_flight", "Upstream HTTP calls currently in flight", ("provider",))
+
+        # LLM generation
+        self.llm_duration = self.histogram(
+            "analysis_llm_generation_duration_seconds", "Wall-clock duration of Ollama generations", ("model",))
+        self.llm_tokens_per_second = self.histogram(
+            "analysis_llm_tokens_per_second", "Generation throughput reported by Ollama", ("model", "phase"),
+            buckets=TOKENS_PER_SECOND_BUCKETS)
+        self.llm_tokens_total = self.counter(
+            "analysis_llm_tokens_total", "Tokens processed by Ollama", ("model", "phase"))
+        self.llm_in_flight = self.gauge(
+            "analysis_llm_requests_in_flight", "Ollama generations currently in flight", ("model",))
+        self.llm_load_duration = self.histogram(
+            "analysis_llm_load_duration_seconds", "Model load time reported by Ollama per generation", ("model",))
+        self.llm_model_loads_total = self.counter(
+            "analysis_llm_model_loads_total", "Preload and keep-alive requests sent to Ollama", ("model", "reason"))
+        self.llm_tier_total = self.counter(
+            "analysis_llm_generations_by_tier_total", "Generations by model tier (primary or fast)", ("model", "tier"))
+
+        # Alerts
+        self.alert_rules = self.gauge(
+            "analysis_alert_rules", "Alert rules compiled into this worker's engine")
+        self.alerts_fired_total = self.counter(
+            "analysis_alerts_fired_total", "Alerts delivered to sinks")
+
+        # Compute executor
+        self.compute_jobs_total = self.counter(
+            "analysis_compute_jobs_total", "CPU-bound jobs by where they ran (inline, thread or process)", ("mode",))
+        self.compute_duration = self.histogram(
+            "analysis_compute_duration_seconds", "CPU-bound job latency, including any hand-off", ("mode",))
+
+        # Event loop
+        self.loop_lag = self.histogram(
+            "analysis_event_loop_lag_seconds", "How late the loop ran a timer scheduled for a known time",
+            buckets=LOOP_LAG_BUCKETS)
+        self.loop_stalls_total = self.counter(
+            "analysis_event_loop_stalls_total", "Times a callback blocked the loop past LOOP_SLOW_THRESHOLD")
+
+        # Dependency health
+        self.dependency_up = self.gauge(
+            "analysis_dependency_up", "Whether the last health probe found a dependency usable (1) or not (0)",
+            ("component",))
+        self.dependency_probe_duration = self.histogram(
+            "analysis_dependency_probe_duration_seconds", "Latency of background health probes", ("component",))
+
+        # Retrieval (news and filing passages)
+        self.retrieval_passages_indexed = self.counter(
+            "analysis_retrieval_passages_indexed_total", "Passages embedded and added to the news index")
+        self.retrieval_passages = self.histogram(
+            "analysis_retrieval_passages", "Passages added to a prompt per retrieval", buckets=COUNT_BUCKETS)
+
+        # Caches
+        self.cache_requests = self.counter(
+            "analysis_cache_requests_total", "Cache lookups by outcome", ("cache", "result"))
+        self.semantic_cache_similarity = self.histogram(
+            "analysis_semantic_cache_similarity", "Prompt similarity of semantic cache hits",
+            buckets=SIMILARITY_BUCKETS)
+
+        # Cross-worker shared state
+        self.coalesced_total = self.counter(
+            "analysis_coalesced_requests_total", "Calls served by another caller's in-flight work",
+            ("name", "scope"))
+        self.rate_limited_total = self.counter(
+            "analysis_rate_limited_total", "Upstream calls delayed or rejected by a rate limiter",
+            ("limiter", "outcome"))
+
+        # Deadlines and hedging
+        self.hedged_requests_total = self.counter(
+            "analysis_hedged_requests_total", "Hedged upstream calls: copies sent and copies that won",
+            ("name", "outcome"))
+        self.deadline_skipped_total = self.counter(
+            "analysis_deadline_skipped_total", "Stages left out of a response because its deadline was near",
+            ("stage",))
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Count a cache lookup as a hit or a miss"""
+        self.cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+    def cache_hit_ratios(self) -> Dict[str, float]:
+        """Hit ratio per cache since process start"""
+        totals: Dict[str, List[float]] = {}
+        with self.cache_requests._lock:
+            items = list(self.cache_requests._values.items())
+        for (cache, result), value in items:
+            hits_and_total = totals.setdefault(cache, [0.0, 0.0])
+            if result == "hit":
+                hits_and_total[0] += value
+            hits_and_total[1] += value
+        return {cache: (hits / total if total else 0.0) for cache, (hits, total) in totals.items()}
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        ratios = self.cache_hit_ratios()
+        lines.append("# HELP analysis_cache_hit_ratio Cache hit ratio since process start")
+        lines.append("# TYPE analysis_cache_hit_ratio gauge")
+        for cache, ratio in ratios.items():
+            lines.append(f"analysis_cache_hit_ratio{_format_labels(('cache',), (cache,))} {ratio}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def add_server_timing(name: str, duration_ms: float) -> None:
+    """Append an entry to the current request's Server-Timing header"""
+    timings = _server_timings.get()
+    if timings is not None:
+        timings.append((name, duration_ms))
+
+
+def begin_server_timing() -> object:
+    """Start collecting Server-Timing entries for the current request"""
+    return _server_timings.set([])
+
+
+def end_server_timing(token: object) -> None:
+    _server_timings.reset(token)
+
+
+def current_server_timings() -> List[Tuple[str, float]]:
+    return list(_server_timings.get() or [])
+
+
+def observe_stage(name: str, elapsed: float) -> None:
+    """Record an already-measured stage duration in seconds"""
+    metrics.stage_duration.observe(elapsed, stage=name)
+    add_server_timing(name, elapsed * 1000)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into the stage histogram, the Server-Timing header and a trace span"""
+    start = time.perf_counter()
+    with tracer.start_as_current_span(name):
+        try:
+            yield
+        except Exception as e:
+            metrics.errors_total.inc(stage=name, error=type(e).__name__)
+            raise
+        finally:
+            observe_stage(name, time.perf_counter() - start)
+
+
+@contextmanager
+def track_upstream(provider: str, endpoint: str) -> Iterator[None]:
+    """Time an upstream HTTP call, trace it as a client span and count it as an error if it raises"""
+    start = time.perf_counter()
+    metrics.upstream_in_flight.inc(provider=provider)
+    span = tracer.start_as_current_span(
+        f"{provider} {endpoint}",
+        kind="client",
+        attributes={"upstream.provider": provider, "upstream.endpoint": endpoint}
+    )
+    with span:
+        try:
+            yield
+        except Exception:
+            metrics.upstream_errors.inc(provider=provider, endpoint=endpoint)
+            raise
+        finally:
+            metrics.upstream_in_flight.dec(provider=provider)
+            elapsed = time.perf_counter() - start
+            metrics.upstream_duration.observe(elapsed, provider=provider, endpoint=endpoint)
+            add_server_timing(f"{provider}_{endpoint}".lower(), elapsed * 1000)
+
+
+def record_llm_generation(model: str, result: Dict, elapsed: float) -> None:
+    """Record duration and token throughput from an Ollama /api/generate response"""
+    metrics.llm_duration.observe(elapsed, model=model)
+    # Near zero while the model stays resident; seconds after an idle unload
+    if result.get("load_duration"):
+        metrics.llm_load_duration.observe(result["load_duration"] / 1e9, model=model)
+
+    for phase, count_key, duration_key in (
+        ("prompt", "prompt_eval_count", "prompt_eval_duration"),
+        ("completion", "eval_count", "eval_duration"),
+    ):
+        count = result.get(count_key) or 0
+        duration_ns = result.get(duration_key) or 0
+        if count:
+            metrics.llm_tokens_total.inc(count, model=model, phase=phase)
+        if count and duration_ns:
+            metrics.llm_tokens_per_second.observe(count / (duration_ns / 1e9), model=model, phase=phase)
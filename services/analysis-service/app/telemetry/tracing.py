@@ -0,0 +1,455 @@
+# services/analysis-service/app/telemetry/tracing.py
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.telemetry.log import log
+
+# W3C trace-context header (https://www.w3.org/TR/trace-context/)
+TRACEPARENT_HEADER = "traceparent"
+TRACESTATE_HEADER = "tracestate"
+
+_INVALID_TRACE_ID = 0
+_INVALID_SPAN_ID = 0
+
+
+class SpanContext:
+    """Identifiers shared by a span and its children"""
+    __slots__ = ("trace_id", "span_id", "sampled", "is_remote", "trace_state")
+
+    def __init__(self, trace_id: int, span_id: int, sampled: bool, is_remote: bool = False,
+                 trace_state: str = ""):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+        self.is_remote = is_remote
+        self.trace_state = trace_state
+
+    @property
+    def trace_id_hex(self) -> str:
+        return f"{self.trace_id:032x}"
+
+    @property
+    def span_id_hex(self) -> str:
+        return f"{self.span_id:016x}"
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id_hex}-{self.span_id_hex}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str], tracestate: str = "") -> Optional[SpanContext]:
+    """Parse a W3C traceparent header, returning None when it is missing or malformed"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        trace_id_int = int(trace_id, 16)
+        span_id_int = int(span_id, 16)
+        flags_int = int(flags, 16)
+    except ValueError:
+        return None
+    if trace_id_int == _INVALID_TRACE_ID or span_id_int == _INVALID_SPAN_ID:
+        return None
+    return SpanContext(trace_id_int, span_id_int, bool(flags_int & 0x01), is_remote=True,
+                       trace_state=tracestate or "")
+
+
+class Span:
+    """A timed operation, exported in the OpenTelemetry span data model"""
+
+    def __init__(self, tracer: "Tracer", name: str, context: SpanContext,
+                 parent: Optional[SpanContext], kind: str, attributes: Optional[Dict[str, Any]]):
+        self._tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent = parent
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.status_code = "UNSET"
+        self.status_message = ""
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano: Optional[int] = None
+        self._token = None
+
+    @property
+    def is_recording(self) -> bool:
+        return self.end_time_unix_nano is None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append({
+            "name": name,
+            "timeUnixNano": time.time_ns(),
+            "attributes": dict(attributes or {})
+        })
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.add_event("exception", {
+            "exception.type": type(exc).__name__,
+            "exception.message": str(exc)
+        })
+        self.status_code = "ERROR"
+        self.status_message = str(exc)
+
+    def end(self) -> None:
+        if self.end_time_unix_nano is not None:
+            return
+        self.end_time_unix_nano = time.time_ns()
+        self._tracer._on_end(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time_unix_nano or time.time_ns()
+        return (end - self.start_time_unix_nano) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize using OTLP/JSON field names"""
+        return {
+            "traceId": self.context.trace_id_hex,
+            "spanId": self.context.span_id_hex,
+            "parentSpanId": self.parent.span_id_hex if self.parent else "",
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind.upper()}",
+            "startTimeUnixNano": self.start_time_unix_nano,
+            "endTimeUnixNano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": f"STATUS_CODE_{self.status_code}", "message": self.status_message},
+            "resource": {"service.name": self._tracer.service_name}
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.record_exception(exc)
+        _current_span.reset(self._token)
+        self.end()
+
+
+class _NoopSpan:
+    """Shared span returned when a trace is not sampled; every operation is a no-op"""
+    is_recording = False
+    context = None
+    name = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+# Remote parent extracted from incoming headers, used when no local span is active
+_remote_parent: ContextVar[Optional[SpanContext]] = ContextVar("remote_parent", default=None)
+
+
+# --- Samplers -------------------------------------------------------------
+
+class TraceIdRatioSampler:
+    """Sample a deterministic fraction of traces based on the trace id"""
+
+    def __init__(self, rate: float):
+        self.rate = max(0.0, min(1.0, rate))
+        self._bound = int(self.rate * (1 << 64))
+
+    def should_sample(self, trace_id: int) -> bool:
+        return (trace_id & 0xFFFFFFFFFFFFFFFF) < self._bound
+
+
+class ParentBasedSampler:
+    """Follow a sampled parent; otherwise apply the root sampler
+
+    Unsampled remote parents (e.g. trace ids minted by the API gateway, which does
+    not record spans itself) fall back to the ratio sampler so gateway traffic is
+    still sampled at the configured rate.
+    """
+
+    def __init__(self, root: TraceIdRatioSampler):
+        self.root = root
+
+    def should_sample(self, trace_id: int, parent: Optional[SpanContext]) -> bool:
+        if parent is None:
+            return self.root.should_sample(trace_id)
+        if parent.sampled:
+            return True
+        if parent.is_remote:
+            return self.root.should_sample(trace_id)
+        return False
+
+
+# --- Exporters ------------------------------------------------------------
+
+class InMemorySpanExporter:
+    """Keep finished spans in memory (for tests and the debug endpoint)"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+            if len(self._spans) > self.max_spans:
+                del self._spans[:len(self._spans) - self.max_spans]
+
+    def get_finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonFileSpanExporter:
+    """Append spans as OTLP/JSON lines to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ConsoleSpanExporter:
+    """Print spans as OTLP/JSON lines to stdout"""
+
+    def export(self, spans: List[Span]) -> None:
+        for span in spans:
+            print(json.dumps(span.to_dict(), default=str), flush=True)
+
+    def shutdown(self) -> None:
+        pass
+
+
+# --- Processors -----------------------------------------------------------
+
+class SimpleSpanProcessor:
+    """Export each span synchronously as it ends"""
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    def on_end(self, span: Span) -> None:
+        self.exporter.export([span])
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+
+class BatchSpanProcessor:
+    """Queue finished spans and export them from a background thread
+
+    Keeps file and console I/O off the event loop.
+    """
+
+    def __init__(self, exporter, max_queue_size: int = 2048, export_interval: float = 2.0,
+                 max_batch_size: int = 512):
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.export_interval = export_interval
+        self.dropped_spans = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped_spans += 1
+
+    def _drain(self) -> None:
+        batch: List[Span] = []
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                log(f"Span export failed: {str(e)}")
+
+    def _worker(self) -> None:
+        while not self._stop.wait(self.export_interval):
+            while not self._queue.empty():
+                self._drain()
+
+    def force_flush(self) -> None:
+        while not self._queue.empty():
+            self._drain()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.export_interval + 1)
+        self.force_flush()
+        self.exporter.shutdown()
+
+
+# --- Tracer ---------------------------------------------------------------
+
+class Tracer:
+    """Minimal OpenTelemetry-compatible tracer
+
+    When tracing is disabled ``start_as_current_span`` returns a shared no-op span,
+    so instrumented code paths cost one attribute check.
+    """
+
+    def __init__(self, service_name: str = "analysis-service", enabled: bool = False,
+                 sample_rate: float = 1.0, processor=None):
+        self.service_name = service_name
+        self.enabled = enabled and processor is not None
+        self.sampler = ParentBasedSampler(TraceIdRatioSampler(sample_rate))
+        self.processor = processor
+        self._rng = random.Random()
+
+    def configure(self, enabled: bool, sample_rate: float = 1.0, processor=None) -> None:
+        """Replace the sampling and export configuration (tests use an in-memory exporter)"""
+        if self.processor is not None and self.processor is not processor:
+            self.processor.shutdown()
+        self.processor = processor
+        self.sampler = ParentBasedSampler(TraceIdRatioSampler(sample_rate))
+        self.enabled = enabled and processor is not None
+
+    def _parent(self) -> Optional[SpanContext]:
+        span = _current_span.get()
+        if span is not None:
+            return span.context
+        return _remote_parent.get()
+
+    def start_as_current_span(self, name: str, kind: str = "internal",
+                              attributes: Optional[Dict[str, Any]] = None):
+        """Start a span and make it current for the duration of a ``with`` block"""
+        if not self.enabled:
+            return NOOP_SPAN
+
+        parent = self._parent()
+        if parent is not None and not parent.is_remote and not parent.sampled:
+            return NOOP_SPAN
+
+        trace_id = parent.trace_id if parent is not None else self._rng.getrandbits(128) or 1
+        if parent is None or parent.is_remote:
+            # Sampling decisions are only made at the service's root span
+            if not self.sampler.should_sample(trace_id, parent):
+                return _UnsampledSpan(SpanContext(trace_id, self._rng.getrandbits(64) or 1, False))
+
+        context = SpanContext(trace_id, self._rng.getrandbits(64) or 1, True,
+                              trace_state=parent.trace_state if parent else "")
+        return Span(self, name, context, parent, kind, attributes)
+
+    def current_span(self):
+        return _current_span.get() or NOOP_SPAN
+
+    def _on_end(self, span: Span) -> None:
+        if self.processor is not None:
+            self.processor.on_end(span)
+
+    def shutdown(self) -> None:
+        if self.processor is not None:
+            self.processor.shutdown()
+
+
+class _UnsampledSpan(_NoopSpan):
+    """Non-recording span that still carries context so children skip sampling"""
+
+    def __init__(self, context: SpanContext):
+        self.context = context
+        self._token = None
+
+    def __enter__(self) -> "_UnsampledSpan":
+        # Register a lightweight placeholder so children inherit the negative decision
+        self._token = _remote_parent.set(self.context)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _remote_parent.reset(self._token)
+
+
+def set_remote_parent(context: Optional[SpanContext]):
+    """Install an extracted remote parent for the current request"""
+    return _remote_parent.set(context)
+
+
+def reset_remote_parent(token) -> None:
+    _remote_parent.reset(token)
+
+
+def inject_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add the current trace context to outgoing request headers
+
+    Inside an unsampled span the context still goes out, flagged as not sampled,
+    so downstream services make the same sampling decision.
+    """
+    span = _current_span.get()
+    context = span.context if span is not None else _remote_parent.get()
+    if context is not None:
+        headers[TRACEPARENT_HEADER] = context.to_traceparent()
+        if context.trace_state:
+            headers[TRACESTATE_HEADER] = context.trace_state
+    return headers
+
+
+def _build_processor():
+    exporter_name = settings.TRACING_EXPORTER.lower()
+    if exporter_name == "memory":
+        return SimpleSpanProcessor(InMemorySpanExporter())
+    if exporter_name == "file":
+        return BatchSpanProcessor(JsonFileSpanExporter(settings.TRACING_EXPORT_PATH))
+    if exporter_name == "console":
+        return BatchSpanProcessor(ConsoleSpanExporter())
+    return None
+
+
+tracer = Tracer(
+    service_name="analysis-service",
+    enabled=settings.TRACING_ENABLED,
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+    processor=_build_processor() if settings.TRACING_ENABLED else None
+)
@@ -0,0 +1,199 @@
+# services/analysis-service/app/utils/compute.py
+"""CPU-bound work off the event loop
+
+``await compute.run(fn, *args)`` estimates the job's cost from the size of its
+arguments. Jobs below ``COMPUTE_INLINE_COST`` run inline, since a thread or process
+hop would cost more than the work. Larger jobs go to a pool of ``COMPUTE_WORKERS``
+processes, or to a thread when there is none.
+
+NumPy arguments of at least ``COMPUTE_SHM_MIN_BYTES`` reach worker processes through
+shared memory. Each is copied once into a block that the worker maps; nothing is
+pickled. ``fn`` must be a module-level function (or staticmethod) so a worker can
+import it, and must not modify its array arguments.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.telemetry.metrics import metrics
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+def _is_array(value: Any) -> bool:
+    return hasattr(value, "__array_interface__")
+
+
+def job_cost(*args: Any) -> int:
+    """Rough work estimate: array elements, plus list items (sized from the first item)"""
+    cost = 0
+    for arg in args:
+        if _is_array(arg) or isinstance(arg, SharedArray):
+            cost += int(arg.size)
+        elif isinstance(arg, (list, tuple)) and arg:
+            cost += len(arg) * max(1, job_cost(arg[0]))
+        elif isinstance(arg, dict):
+            cost += job_cost(*arg.values())
+    return cost
+
+
+class SharedArray:
+    """Picklable handle to an array held in a shared memory block"""
+
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: str, local=None):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        # The original array, for jobs that end up running in this process
+        self.local = local
+
+    def __getstate__(self):
+        return {**self.__dict__, "local": None}
+
+    @property
+    def size(self) -> int:
+        size = 1
+        for dim in self.shape:
+            size *= dim
+        return size
+
+    def attach(self):
+        """(block, read-only array view); close the block once the view is dropped"""
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(name=self.name)
+        array = np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+        array.flags.writeable = False
+        return block, array
+
+
+def _release(blocks: List[Any]) -> None:
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def _local(value: Any) -> Any:
+    return value.local if isinstance(value, SharedArray) else value
+
+
+def _call(fn: Callable, args: Tuple, kwargs: Dict[str, Any]) -> bytes:
+    """Worker-side entry point: map shared arrays, run ``fn``, return the pickled result
+
+    The result is pickled while the blocks are still mapped, so a result that is a
+    view of an input can never outlive its memory.
+    """
+    blocks = []
+
+    def resolve(value):
+        if isinstance(value, SharedArray):
+            block, array = value.attach()
+            blocks.append(block)
+            return array
+        return value
+
+    try:
+        args = tuple(resolve(arg) for arg in args)
+        kwargs = {name: resolve(value) for name, value in kwargs.items()}
+        return pickle.dumps(fn(*args, **kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        del args, kwargs
+        for block in blocks:
+            block.close()
+
+
+class ComputeExecutor:
+    """Routes CPU-bound jobs inline, to a thread or to a process pool by estimated cost"""
+
+    def __init__(self, workers: int, inline_cost: int, shm_min_bytes: int):
+        self.workers = workers
+        self.inline_cost = inline_cost
+        self.shm_min_bytes = shm_min_bytes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def pool(self) -> ProcessPoolExecutor:
+        """The worker processes, started on first use"""
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs an event loop and thread pools is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _export(self, values: Tuple) -> Tuple[List[Any], List[Any]]:
+        """(blocks, handles): large arrays copied into new shared memory blocks, the rest as is"""
+        from multiprocessing import shared_memory
+        blocks, handles = [], []
+        try:
+            for value in values:
+                if (self.workers <= 0 or not _is_array(value) or value.dtype.hasobject
+                        or value.nbytes < self.shm_min_bytes):
+                    handles.append(value)
+                    continue
+                array = np.ascontiguousarray(value)
+                block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+                blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                handles.append(SharedArray(block.name, array.shape, array.dtype.str, local=value))
+        except BaseException:
+            _release(blocks)
+            raise
+        return blocks, handles
+
+    @asynccontextmanager
+    async def share(self, *arrays) -> AsyncIterator[List[Any]]:
+        """Copy arrays into shared memory for the duration of the block
+
+        Yields one handle per array (small arrays are passed through unchanged). Pass
+        the handles to any number of ``run`` calls; the blocks are freed on exit.
+        Copying runs off the event loop (page-faulting in a large block is not free).
+        """
+        blocks, handles = await asyncio.to_thread(self._export, arrays)
+        try:
+            yield handles
+        finally:
+            await asyncio.to_thread(_release, blocks)
+
+    async def run(self, fn: Callable, *args: Any, cost: Optional[int] = None, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` where its cost says it belongs"""
+        cost = job_cost(*args, *kwargs.values()) if cost is None else cost
+        start = time.perf_counter()
+        if cost < self.inline_cost or self.workers <= 0:
+            args = tuple(_local(arg) for arg in args)
+            kwargs = {name: _local(value) for name, value in kwargs.items()}
+        if cost < self.inline_cost:
+            mode = "inline"
+            result = fn(*args, **kwargs)
+        elif self.workers <= 0:
+            mode = "thread"
+            result = await asyncio.to_thread(fn, *args, **kwargs)
+        else:
+            mode = "process"
+            names = list(kwargs)
+            async with self.share(*args, *kwargs.values()) as handles:
+                shared_args = tuple(handles[:len(args)])
+                shared_kwargs = dict(zip(names, handles[len(args):]))
+                loop = asyncio.get_running_loop()
+                payload = await loop.run_in_executor(self.pool(), _call, fn, shared_args, shared_kwargs)
+            result = pickle.loads(payload)
+        metrics.compute_jobs_total.inc(mode=mode)
+        metrics.compute_duration.observe(time.perf_counter() - start, mode=mode)
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+compute = ComputeExecutor(settings.COMPUTE_WORKERS, settings.COMPUTE_INLINE_COST, settings.COMPUTE_SHM_MIN_BYTES)
@@ -0,0 +1,85 @@
+# services/analysis-service/app/utils/deadline.py
+"""Per-request deadlines
+
+``DeadlineMiddleware`` gives each request an absolute deadline, taken from the caller's
+``X-Request-Timeout`` header and the route's budget. Upstream calls size their timeouts
+from the time that is left (``timeout(30.0)``). Optional stages call ``ensure`` before
+they start; when it raises ``DeadlineExceeded`` they are ``skip``-ped and the response
+carries whatever was finished.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from app.telemetry.metrics import metrics
+
+# time.monotonic() by which the current request must be answered
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+# Stages the current request skipped for lack of time
+_skipped: ContextVar[Optional[List[str]]] = ContextVar("deadline_skipped", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the current request has no time left for a stage or call"""
+
+
+def begin(seconds: Optional[float]) -> Tuple[object, object]:
+    """Start a request with ``seconds`` to run (None for no deadline)"""
+    at = time.monotonic() + seconds if seconds is not None else None
+    return _deadline.set(at), _skipped.set([])
+
+
+def end(tokens: Tuple[object, object]) -> None:
+    _deadline.reset(tokens[0])
+    _skipped.reset(tokens[1])
+
+
+@contextmanager
+def unbounded() -> Iterator[None]:
+    """Run a block without a deadline (background work started by a request)"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None when it has no deadline"""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def ensure(seconds: float, what: str) -> None:
+    """Raise ``DeadlineExceeded`` unless at least ``seconds`` are left for ``what``"""
+    left = remaining()
+    if left is not None and left < seconds:
+        raise DeadlineExceeded(f"Not enough time left for {what} ({max(left, 0.0):.2f}s)")
+
+
+def timeout(default: float) -> float:
+    """Timeout for an upstream call: ``default``, capped by the time left"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, left)
+
+
+def skip(stage: str) -> None:
+    """Record that ``stage`` was left out of the current response for lack of time"""
+    metrics.deadline_skipped_total.inc(stage=stage)
+    skipped = _skipped.get()
+    if skipped is not None and stage not in skipped:
+        skipped.append(stage)
+
+
+def skipped() -> List[str]:
+    return list(_skipped.get() or [])
@@ -0,0 +1,89 @@
+# services/analysis-service/app/utils/hedging.py
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.telemetry.metrics import metrics
+from app.utils import deadline
+
+
+class Hedger:
+    """Hedged requests for one idempotent upstream call
+
+    ``run`` starts the call and, if it hasn't answered within the recent p95 latency,
+    starts a second copy; the first to succeed wins and the other is cancelled. Nothing
+    is hedged until ``min_samples`` latencies have been seen, and at most ``max_ratio``
+    of calls are hedged so a slow upstream doesn't get twice the load.
+    """
+
+    def __init__(self, name: str, quantile: float, max_ratio: float, min_samples: int, window: int = 256):
+        self.name = name
+        self.quantile = quantile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.calls = 0
+        self.hedged = 0
+        self._latencies = deque(maxlen=window)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+    async def _timed(self, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        result = await attempt()
+        self._latencies.append(time.perf_counter() - start)
+        return result
+
+    async def run(self, attempt: Callable[[], Awaitable[Any]],
+                  admit: Optional[Callable[[], Awaitable[bool]]] = None) -> Any:
+        """Await ``attempt()``, hedged; ``admit`` may veto the second copy (e.g. no rate-limit slot)"""
+        self.calls += 1
+        delay = self.delay()
+        left = deadline.remaining()
+        if (not settings.HEDGE_ENABLED or delay is None or self.hedged >= self.max_ratio * self.calls
+                or (left is not None and left <= delay)):
+            return await self._timed(attempt)
+
+        first = asyncio.ensure_future(self._timed(attempt))
+        second = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done or (admit is not None and not await admit()):
+                return await first
+
+            self.hedged += 1
+            metrics.hedged_requests_total.inc(name=self.name, outcome="sent")
+            second = asyncio.ensure_future(self._timed(attempt))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            metrics.hedged_requests_total.inc(name=self.name, outcome="won")
+                        return task.result()
+            # Both copies failed: report the original's error
+            raise first.exception()
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+
+
+_hedgers: Dict[str, Hedger] = {}
+
+
+def hedger(name: str) -> Hedger:
+    """The shared hedger for one upstream endpoint (latencies are tracked per name)"""
+    instance = _hedgers.get(name)
+    if instance is None:
+        instance = _hedgers[name] = Hedger(
+            name, settings.HEDGE_QUANTILE, settings.HEDGE_MAX_RATIO, settings.HEDGE_MIN_SAMPLES
+        )
+    return instance
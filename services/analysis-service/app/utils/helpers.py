@@ -3,6 +3,7 @@ from typing import Any, Dict, List, Optional
 import json
 from datetime import datetime, timedelta
 import hashlib
+import math
 
 def generate_cache_key(prefix: str, params: Dict) -> str:
     """Generate a cache key from parameters"""
@@ -10,6 +11,10 @@ def generate_cache_key(prefix: str, params: Dict) -> str:
     hash_obj = hashlib.md5(params_str.encode())
     return f"{prefix}:{hash_obj.hexdigest()}"
 
+def ndjson(obj: Any) -> str:
+    """One line of newline-delimited JSON for streaming responses"""
+    return json.dumps(obj, default=str) + "\n"
+
 def format_large_number(number: float) -> str:
     """Format large numbers with K, M, B suffixes"""
     if number >= 1_000_000_000:
@@ -115,4 +120,58 @@ def safe_divide(numerator: float, denominator: float, default: float = 0.0) -> f
             return default
         return numerator / denominator
     except (TypeError, ZeroDivisionError):
-        return default
\ No newline at end of file
+        return default
+
+def lttb_indices(x, y, threshold: int):
+    """Largest-Triangle-Three-Buckets downsampling
+    
+    Returns the indices of ``threshold`` points that best preserve the visual shape
+    of the ``(x, y)`` line. Apply the same indices to every column of a series so
+    indicator values stay aligned with the sampled prices.
+    """
+    import numpy as np
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    every = (n - 2) / (threshold - 2)
+    selected = 0
+    
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+        
+        range_start = int(np.floor(i * every)) + 1
+        range_end = int(np.floor((i + 1) * every)) + 1
+        area = np.abs(
+            (x[selected] - avg_x) * (y[range_start:range_end] - y[selected])
+            - (x[selected] - x[range_start:range_end]) * (avg_y - y[selected])
+        )
+        selected = range_start + int(np.argmax(area))
+        indices[i + 1] = selected
+    
+    return indices
+
+def series_to_list(values, decimals: int = 4) -> List[Optional[float]]:
+    """Convert a NumPy series to a JSON-ready list, rounding and mapping NaN to None"""
+    import numpy as np
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        return values.tolist()
+    rounded = np.round(values.astype(np.float64), decimals)
+    return [None if v != v else v for v in rounded.tolist()]
+
+def metric_value(value: float, digits: int = 4) -> Optional[float]:
+    """Round a (NumPy) scalar for a JSON response, mapping None, NaN and infinities to None"""
+    if value is None:
+        return None
+    value = float(value)
+    return round(value, digits) if math.isfinite(value) else None
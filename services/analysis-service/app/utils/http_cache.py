@@ -0,0 +1,55 @@
+# services/analysis-service/app/utils/http_cache.py
+"""ETags and conditional requests
+
+Validators are weak (``W/"..."``): they are derived from a response's inputs rather than
+its bytes, so fields such as ``timestamp`` and ``processing_time`` may differ between two
+responses with the same tag. Being weak also keeps them valid across content encodings.
+"""
+import hashlib
+import json
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over JSON-serializable parts; NumPy arrays are hashed by their bytes"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if hasattr(part, "__array_interface__"):
+            digest.update(part.dtype.str.encode())
+            digest.update(part.tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b"\x00")
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Whether ``If-None-Match`` already names ``etag`` (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    if settings.RESPONSE_MAX_AGE > 0:
+        cache_control = f"private, max-age={settings.RESPONSE_MAX_AGE}"
+    else:
+        # Cacheable, but revalidated with If-None-Match on every use
+        cache_control = "private, no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
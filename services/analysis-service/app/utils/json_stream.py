@@ -0,0 +1,104 @@
+# services/analysis-service/app/utils/json_stream.py
+import json
+from typing import Any, Dict, List, Tuple
+
+
+class IncrementalJSONParser:
+    """Parses a JSON object fed in chunks, reporting each top-level field as soon as it is complete
+
+    Every character is scanned once; a field's value is decoded with ``json.loads`` the moment
+    its closing quote, bracket or delimiter arrives. Text before the opening ``{`` (a stray code
+    fence, say) is ignored. Malformed JSON raises ``ValueError``.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = "key"  # key -> colon -> value -> after -> key ...
+        self._key = None
+        self._start = 0
+
+    def _complete(self, end: int, completed: List[Tuple[str, Any]]) -> None:
+        raw = self.buffer[self._start:end].strip()
+        if not raw:
+            raise ValueError(f"Missing value for field {self._key!r}")
+        value = json.loads(raw)
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._state = "after"
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume more text; returns the ``(field, value)`` pairs completed by it"""
+        if self.done:
+            return []
+        self.buffer += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self.buffer
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._state == "key":
+                            self._key = json.loads(text[self._start:i + 1])
+                            self._state = "colon"
+                        elif self._state == "value":
+                            self._complete(i + 1, completed)
+            elif self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._state == "key":
+                    self._start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._state == "value":
+                    self._complete(i + 1, completed)
+                elif self._depth == 0:
+                    if self._state == "value":
+                        self._complete(i, completed)
+                    elif self._state == "colon":
+                        raise ValueError(f"Missing value for field {self._key!r}")
+                    self.done = True
+                    self._pos = i + 1
+                    return completed
+            elif self._depth == 1:
+                if ch == ":" and self._state == "colon":
+                    self._state = "value"
+                    self._start = i + 1
+                elif ch == ",":
+                    if self._state == "value":
+                        self._complete(i, completed)
+                    self._state = "key"
+                elif not ch.isspace() and self._state in ("key", "colon", "after"):
+                    raise ValueError(f"Unexpected {ch!r} at position {i}")
+            i += 1
+        self._pos = i
+        return completed
+
+    def result(self) -> Dict[str, Any]:
+        """All fields of the finished object"""
+        if not self.done:
+            raise ValueError("Incomplete JSON object")
+        return self.fields
+
+
+def parse_json_object(text: str) -> Dict[str, Any]:
+    """One-shot use of ``IncrementalJSONParser`` for a complete reply"""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.result()
@@ -0,0 +1,60 @@
+# services/analysis-service/app/utils/lazy.py
+import importlib
+import threading
+import types
+from typing import Dict, Iterable, Optional
+
+_lock = threading.Lock()
+_lazy_modules: Dict[str, "LazyModule"] = {}
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access
+
+    Unlike ``importlib.util.LazyLoader`` it never puts a half-initialised module in
+    ``sys.modules``, so first use is safe from the event loop and worker threads at once.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lazy_target: Optional[types.ModuleType] = None
+
+    def _load(self) -> types.ModuleType:
+        if self._lazy_target is None:
+            with _lock:
+                if self._lazy_target is None:
+                    module = importlib.import_module(self.__name__)
+                    # Later lookups hit the copied attributes directly instead of __getattr__
+                    self.__dict__.update({k: v for k, v in module.__dict__.items() if not k.startswith("__")})
+                    self._lazy_target = module
+        return self._lazy_target
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._lazy_target is not None else "deferred"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """``np = lazy_import("numpy")`` defers the real import until ``np`` is first used
+
+    Modules using it in annotations need ``from __future__ import annotations``.
+    """
+    with _lock:
+        module = _lazy_modules.get(name)
+        if module is None:
+            module = _lazy_modules[name] = LazyModule(name)
+    return module
+
+
+def deferred_modules() -> Iterable[str]:
+    """Names of lazily imported modules that have not been loaded yet"""
+    return [name for name, module in _lazy_modules.items() if module._lazy_target is None]
+
+
+def preload(names: Optional[Iterable[str]] = None) -> None:
+    """Import deferred modules now; run off the event loop once the worker is serving"""
+    for name in list(names if names is not None else deferred_modules()):
+        lazy_import(name)._load()
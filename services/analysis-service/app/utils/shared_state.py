@@ -0,0 +1,245 @@
+# services/analysis-service/app/utils/shared_state.py
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.resources import resources
+from app.telemetry.metrics import metrics
+from app.utils import deadline
+from app.utils.cache import TTLCache
+
+# Delete a lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a rate limiter cannot grant a slot within the allowed wait"""
+
+
+class RateLimiter:
+    """Fixed-window limiter shared by every worker through Redis
+
+    Without Redis each worker enforces the limit on its own.
+    """
+
+    def __init__(self, name: str, limit: int, period: float = 60.0):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self._window = -1
+        self._count = 0
+
+    async def _take(self) -> float:
+        """Claim a slot; returns 0 when granted, else seconds until the window resets"""
+        now = time.time()
+        window = int(now // self.period)
+        reset = (window + 1) * self.period - now
+
+        redis = resources.redis
+        if redis is not None:
+            key = f"ratelimit:{self.name}:{window}"
+            try:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.incr(key)
+                    pipe.expire(key, int(self.period) + 1)
+                    count, _ = await pipe.execute()
+                return 0.0 if count <= self.limit else reset
+            except Exception:
+                pass
+
+        if window != self._window:
+            self._window = window
+            self._count = 0
+        if self._count < self.limit:
+            self._count += 1
+            return 0.0
+        return reset
+
+    async def acquire(self, max_wait: Optional[float] = None) -> None:
+        """Wait for a slot, raising ``RateLimitExceeded`` if that would take longer than ``max_wait``
+
+        Raises ``DeadlineExceeded`` instead when the wait would outlast the request's deadline.
+        """
+        if self.limit <= 0:
+            return
+        max_wait = settings.RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        left = deadline.remaining()
+        wait_until = time.monotonic() + (max_wait if left is None else min(max_wait, left))
+        delayed = False
+        while True:
+            wait = await self._take()
+            if wait == 0:
+                if delayed:
+                    metrics.rate_limited_total.inc(limiter=self.name, outcome="delayed")
+                return
+            if time.monotonic() + wait > wait_until:
+                metrics.rate_limited_total.inc(limiter=self.name, outcome="rejected")
+                if left is not None and left < max_wait:
+                    raise deadline.DeadlineExceeded(f"{self.name} rate limit wait would pass the request deadline")
+                raise RateLimitExceeded(f"{self.name} rate limit of {self.limit} per {self.period:g}s reached")
+            delayed = True
+            await asyncio.sleep(wait)
+
+    async def try_acquire(self) -> bool:
+        """Claim a slot only if one is free now (for optional calls such as hedges)"""
+        return self.limit <= 0 or await self._take() == 0
+
+
+class Coalescer:
+    """Single-flight execution of identical work across tasks and workers
+
+    Concurrent callers with the same key in one worker share a single await; across
+    workers a Redis lock elects one leader while the others wait. With ``result_ttl``
+    the leader's (JSON-serializable) result is also published for that long, so late
+    callers in any worker reuse it instead of repeating the work.
+
+    The shared work belongs to no single caller: it runs without a request deadline and
+    is not cancelled when a caller goes away. Each caller waits for it only as long as
+    its own deadline allows.
+    """
+
+    def __init__(self, name: str, lock_ttl: float = 60.0, poll_interval: float = 0.05):
+        self.name = name
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]],
+                  result_ttl: Optional[float] = None) -> Any:
+        """``factory()``, or the result of the identical call in flight
+
+        Raises ``DeadlineExceeded`` when the caller's deadline passes first; the
+        work carries on for the other callers.
+        """
+        left = deadline.remaining()
+        if left is not None and left <= 0:
+            raise deadline.DeadlineExceeded(f"No time left to wait for {self.name}")
+
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.coalesced_total.inc(name=self.name, scope="local")
+        else:
+            task = asyncio.create_task(self._run_detached(key, factory, result_ttl))
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished: self._finished(key, finished))
+
+        if left is None:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), left)
+        except asyncio.TimeoutError:
+            if task.done():
+                # The work itself timed out
+                raise
+            raise deadline.DeadlineExceeded(f"Deadline exceeded waiting for {self.name}") from None
+
+    async def _run_detached(self, key: str, factory: Callable[[], Awaitable[Any]],
+                            result_ttl: Optional[float]) -> Any:
+        with deadline.unbounded():
+            return await self._run_shared(key, factory, result_ttl)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Callers re-raise it; mark it retrieved so work nobody waited for doesn't log a warning
+            task.exception()
+
+    async def _run_shared(self, key: str, factory: Callable[[], Awaitable[Any]],
+                          result_ttl: Optional[float]) -> Any:
+        redis = resources.redis
+        if redis is None:
+            return await factory()
+
+        result_key = f"coalesce:{self.name}:result:{key}"
+        lock_key = f"coalesce:{self.name}:lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            if result_ttl:
+                cached = await redis.get(result_key)
+                if cached is not None:
+                    metrics.coalesced_total.inc(name=self.name, scope="shared")
+                    return json.loads(cached)
+            acquired = await redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except Exception:
+            # Redis trouble must never fail the request; just do the work locally
+            return await factory()
+
+        if acquired:
+            try:
+                result = await factory()
+                if result_ttl:
+                    try:
+                        await redis.set(result_key, json.dumps(result), px=int(result_ttl * 1000))
+                    except Exception:
+                        pass
+                return result
+            finally:
+                try:
+                    await redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception:
+                    pass
+
+        # Another worker is doing the work: wait for its result or for the lock to clear
+        metrics.coalesced_total.inc(name=self.name, scope="shared")
+        deadline = time.monotonic() + self.lock_ttl
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                # Check the lock before the result: the leader publishes first, then releases
+                released = not await redis.exists(lock_key)
+                if result_ttl:
+                    cached = await redis.get(result_key)
+                    if cached is not None:
+                        return json.loads(cached)
+                if released:
+                    break
+        except Exception:
+            pass
+        return await factory()
+
+
+class SharedStore:
+    """JSON values with a TTL, visible to every worker through Redis
+
+    Without Redis (or when it errors) values live in a per-worker ``TTLCache``.
+    """
+
+    def __init__(self, name: str, ttl: float = 3600, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self._local = TTLCache(name, maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Any:
+        redis = resources.redis
+        if redis is not None:
+            try:
+                cached = await redis.get(f"store:{self.name}:{key}")
+                metrics.record_cache(self.name, cached is not None)
+                return json.loads(cached) if cached is not None else None
+            except Exception:
+                pass
+        return self._local.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._local.set(key, value, ttl)
+        redis = resources.redis
+        if redis is not None:
+            try:
+                await redis.set(f"store:{self.name}:{key}", json.dumps(value), px=int(ttl * 1000))
+            except Exception:
+                pass
+
+
+# Upstream quotas are per API key, so they are enforced across all workers
+alpha_vantage_limiter = RateLimiter("alpha_vantage", settings.ALPHA_VANTAGE_RATE_LIMIT)
+news_api_limiter = RateLimiter("newsapi", settings.NEWS_API_RATE_LIMIT)
@@ -0,0 +1,115 @@
+# services/analysis-service/app/utils/vector_index.py
+from __future__ import annotations
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+class VectorIndex:
+    """In-process cosine-similarity index with a size limit and per-entry expiry
+
+    Vectors are normalised on insert into one preallocated float32 matrix, so a search is a
+    single matrix-vector product over the rows of the query's scope. Brute force is exact
+    and, at a few thousand rows, faster than maintaining a graph index. When the index is
+    full an expired row is reused, or else the least recently used one.
+    """
+
+    def __init__(self, capacity: int, ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.dim: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None
+        # Per-row expiry and last use (monotonic); free rows have expiry 0
+        self._expires = np.zeros(capacity)
+        self._last_used = np.zeros(capacity)
+        self._payloads: List[Any] = [None] * capacity
+        self._row_scopes: List[Optional[Hashable]] = [None] * capacity
+        self._scopes: Dict[Hashable, List[int]] = {}
+
+    def _allocate(self, dim: int) -> None:
+        # A different dimension means the embedding model changed: old vectors can't be compared
+        self.clear()
+        self.dim = dim
+        self._vectors = np.zeros((self.capacity, dim), dtype=np.float32)
+
+    @staticmethod
+    def _normalise(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def _drop(self, row: int) -> None:
+        scope = self._row_scopes[row]
+        rows = self._scopes.get(scope)
+        if rows is not None:
+            rows.remove(row)
+            if not rows:
+                del self._scopes[scope]
+        self._row_scopes[row] = None
+        self._payloads[row] = None
+        self._expires[row] = 0.0
+
+    def _free_row(self, now: float) -> int:
+        free = np.flatnonzero(self._expires <= now)
+        if len(free):
+            row = int(free[0])
+        else:
+            row = int(np.argmin(self._last_used))
+        if self._row_scopes[row] is not None:
+            self._drop(row)
+        return row
+
+    def add(self, scope: Hashable, vector, payload: Any) -> None:
+        vector = self._normalise(vector)
+        if self.dim != vector.shape[0]:
+            self._allocate(vector.shape[0])
+        now = time.monotonic()
+        row = self._free_row(now)
+        self._vectors[row] = vector
+        self._expires[row] = now + self.ttl
+        self._last_used[row] = now
+        self._payloads[row] = payload
+        self._row_scopes[row] = scope
+        self._scopes.setdefault(scope, []).append(row)
+
+    def search(self, scope: Hashable, vector, threshold: float,
+               accept: Optional[Callable[[Any], bool]] = None) -> Optional[Tuple[Any, float]]:
+        """Most similar live entry in ``scope`` scoring at least ``threshold`` (and passing ``accept``)"""
+        rows = self._scopes.get(scope)
+        if not rows or self.dim is None:
+            return None
+        vector = self._normalise(vector)
+        if vector.shape[0] != self.dim:
+            return None
+
+        now = time.monotonic()
+        for row in [row for row in rows if self._expires[row] <= now]:
+            self._drop(row)
+        rows = self._scopes.get(scope)
+        if not rows:
+            return None
+
+        candidates = np.asarray(rows)
+        scores = self._vectors[candidates] @ vector
+        for i in np.argsort(scores)[::-1]:
+            score = float(scores[i])
+            if score < threshold:
+                break
+            row = int(candidates[i])
+            if accept is None or accept(self._payloads[row]):
+                self._last_used[row] = now
+                return self._payloads[row], score
+        return None
+
+    def clear(self) -> None:
+        self._expires[:] = 0.0
+        self._last_used[:] = 0.0
+        self._payloads = [None] * self.capacity
+        self._row_scopes = [None] * self.capacity
+        self._scopes.clear()
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self._scopes.values())
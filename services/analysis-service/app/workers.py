@@ -0,0 +1,14 @@
+# services/analysis-service/app/workers.py
+from uvicorn.workers import UvicornWorker
+
+from app.config import settings
+
+
+class AnalysisWorker(UvicornWorker):
+    """Gunicorn worker running uvicorn with the UVICORN_LOOP / UVICORN_HTTP settings"""
+    CONFIG_KWARGS = {
+        "loop": settings.UVICORN_LOOP,
+        "http": settings.UVICORN_HTTP,
+        "lifespan": "on",
+        "timeout_graceful_shutdown": settings.SHUTDOWN_DRAIN_TIMEOUT
+    }
@@ -0,0 +1,6 @@
+"""
+Natols Analysis Service benchmarks
+
+Micro-benchmarks for the analysis hot paths and end-to-end load benchmarks
+against local mock upstream servers. Run with ``python -m benchmarks.run``.
+"""
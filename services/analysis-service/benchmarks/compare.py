@@ -0,0 +1,60 @@
+# services/analysis-service/benchmarks/compare.py
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+# Metric compared for each kind of result; lower is better for both
+MICRO_METRIC = "median_ms"
+LOAD_METRIC = "p95_ms"
+
+
+def _metric_for(name: str) -> str:
+    return LOAD_METRIC if name.startswith("load.") else MICRO_METRIC
+
+
+def compare_results(baseline: Dict, candidate: Dict, threshold: float = 0.10) -> List[Tuple[str, float, float, float]]:
+    """Return (name, baseline, candidate, relative change) for every shared benchmark"""
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, result in sorted(candidate.get("results", {}).items()):
+        if name not in base_results:
+            continue
+        metric = _metric_for(name)
+        old = base_results[name].get(metric)
+        new = result.get(metric)
+        if not old or new is None:
+            continue
+        rows.append((name, old, new, (new - old) / old))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown reported as a regression (default 0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline.get('commit')}  ->  candidate {candidate.get('commit')}")
+    regressions = 0
+    for name, old, new, change in compare_results(baseline, candidate, args.threshold):
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  improved"
+        print(f"{name:<55} {old:>10.3f} -> {new:>10.3f} ms  {change:+7.1%}{flag}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
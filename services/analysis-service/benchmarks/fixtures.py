@@ -0,0 +1,246 @@
+# services/analysis-service/benchmarks/fixtures.py
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+SEED = 20240101
+
+HEADLINE_TEMPLATES = [
+    "{company} shares surge after record quarterly profit",
+    "{company} faces downgrade amid weak guidance and rising debt",
+    "Analysts see strong growth ahead for {company}",
+    "{company} stock drops as investors weigh regulatory risk",
+    "{company} announces buyback, stock rallies to new high",
+    "{company} misses revenue estimates, shares fall",
+    "{company} unveils breakthrough innovation at annual event",
+    "Concern grows over {company} supply chain struggle",
+    "{company} holds steady as market awaits Fed decision",
+    "{company} beats earnings expectations, upgrade follows"
+]
+
+
+def _rng(symbol: str = "", seed: int = SEED) -> np.random.Generator:
+    # crc32 rather than hash() so series are identical across processes and runs
+    return np.random.default_rng(seed + zlib.crc32(symbol.encode()))
+
+
+def price_series(n: int, symbol: str = "BENCH", start_price: float = 150.0) -> Tuple[List[float], List[int]]:
+    """Deterministic geometric-random-walk closes and volumes"""
+    rng = _rng(symbol)
+    returns = rng.normal(0.0004, 0.018, n)
+    prices = start_price * np.exp(np.cumsum(returns))
+    volumes = rng.integers(20_000_000, 80_000_000, n)
+    return prices.round(2).tolist(), volumes.tolist()
+
+
+def headlines(n: int, company: str = "Acme Corp") -> List[str]:
+    """Deterministic corpus of synthetic news headlines"""
+    rng = _rng(company)
+    picks = rng.integers(0, len(HEADLINE_TEMPLATES), n)
+    return [HEADLINE_TEMPLATES[i].format(company=company) for i in picks]
+
+
+def news_articles(n: int, symbol: str) -> List[Dict]:
+    """NewsAPI-shaped articles, published over the last ``n`` days so none is too old to retrieve"""
+    rng = _rng(symbol)
+    end = date.today()
+    result = []
+    for i, title in enumerate(headlines(n, company=symbol)):
+        result.append({
+            "source": {"id": None, "name": ["Reuters", "Bloomberg", "CNBC", "WSJ"][int(rng.integers(0, 4))]},
+            "title": title,
+            "description": f"{title}. Full coverage of {symbol} and the broader market.",
+            "url": f"https://news.example.com/{symbol.lower()}/{i}",
+            "publishedAt": f"{(end - timedelta(days=i % 28)).isoformat()}T12:00:00Z"
+        })
+    return result
+
+
+def daily_time_series(symbol: str, n: int = 100, step_days: int = 1) -> Dict[str, Dict[str, str]]:
+    """Alpha Vantage TIME_SERIES_DAILY payload (or weekly/monthly with ``step_days``)
+
+    Values depend only on the bar index; dates end today so range queries always hit data.
+    """
+    prices, volumes = price_series(n, symbol)
+    end = date.today()
+    series = {}
+    for i, (close, volume) in enumerate(zip(prices, volumes)):
+        day = (end - timedelta(days=(n - 1 - i) * step_days)).isoformat()
+        series[day] = {
+            "1. open": f"{close * 0.995:.4f}",
+            "2. high": f"{close * 1.01:.4f}",
+            "3. low": f"{close * 0.99:.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(volume)
+        }
+    return series
+
+
+def intraday_time_series(symbol: str, n: int = 100, minutes: int = 5) -> Dict[str, Dict[str, str]]:
+    """Alpha Vantage TIME_SERIES_INTRADAY payload: ``n`` regular-session bars in US/Eastern time
+
+    Values depend only on the bar index; the last bar is the latest session bar by now,
+    so intraday range queries always hit data.
+    """
+    prices, volumes = price_series(n, symbol)
+    zone = ZoneInfo("US/Eastern")
+    at = datetime.now(zone).replace(second=0, microsecond=0, tzinfo=None)
+    at -= timedelta(minutes=at.minute % minutes)
+    times = []
+    while len(times) < n:
+        session = at.replace(hour=9, minute=30) <= at < at.replace(hour=16, minute=0)
+        if at.weekday() < 5 and session:
+            times.append(at)
+        at -= timedelta(minutes=minutes)
+    series = {}
+    for i, (close, volume) in enumerate(zip(prices, volumes)):
+        series[times[n - 1 - i].strftime("%Y-%m-%d %H:%M:%S")] = {
+            "1. open": f"{close * 0.999:.4f}",
+            "2. high": f"{close * 1.002:.4f}",
+            "3. low": f"{close * 0.998:.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(volume // 100)
+        }
+    return series
+
+
+def embedding(text: str, dims: int = 64) -> List[float]:
+    """Deterministic unit-length bag-of-words vector; texts sharing words are similar"""
+    vector = np.zeros(dims)
+    for word in text.lower().split():
+        vector[zlib.crc32(word.strip(".,:;!?").encode()) % dims] += 1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def global_quote(symbol: str) -> Dict[str, str]:
+    """Alpha Vantage GLOBAL_QUOTE payload"""
+    prices, volumes = price_series(20, symbol)
+    price, previous = prices[-1], prices[-2]
+    return {
+        "01. symbol": symbol,
+        "02. open": f"{previous:.4f}",
+        "03. high": f"{price * 1.01:.4f}",
+        "04. low": f"{price * 0.99:.4f}",
+        "05. price": f"{price:.4f}",
+        "06. volume": str(volumes[-1]),
+        "07. latest trading day": "2024-06-28",
+        "08. previous close": f"{previous:.4f}",
+        "09. change": f"{price - previous:.4f}",
+        "10. change percent": f"{(price / previous - 1) * 100:.4f}%"
+    }
+
+
+def company_overview(symbol: str) -> Dict[str, str]:
+    """Alpha Vantage OVERVIEW payload"""
+    rng = _rng(symbol)
+    price = price_series(20, symbol)[0][-1]
+    return {
+        "Symbol": symbol,
+        "Name": f"{symbol} Holdings Inc",
+        "Exchange": "NASDAQ",
+        "Currency": "USD",
+        "Sector": "TECHNOLOGY",
+        "Industry": "SOFTWARE",
+        "Description": f"{symbol} Holdings builds software for benchmarks.",
+        "MarketCapitalization": str(int(rng.integers(10**9, 3 * 10**12))),
+        "PERatio": f"{rng.uniform(8, 45):.2f}",
+        "PEGRatio": f"{rng.uniform(0.5, 3):.2f}",
+        "PriceToBookRatio": f"{rng.uniform(0.8, 12):.2f}",
+        "PriceToSalesRatioTTM": f"{rng.uniform(1, 15):.2f}",
+        "EVToRevenue": f"{rng.uniform(1, 15):.2f}",
+        "EVToEBITDA": f"{rng.uniform(5, 30):.2f}",
+        "DividendYield": f"{rng.uniform(0, 0.05):.4f}",
+        "DividendPerShare": f"{rng.uniform(0, 4):.2f}",
+        "ExDividendDate": "2024-05-10",
+        "DividendDate": "2024-05-16",
+        "PayoutRatio": f"{rng.uniform(0.1, 0.9):.3f}",
+        "ProfitMargin": f"{rng.uniform(-0.05, 0.35):.3f}",
+        "OperatingMarginTTM": f"{rng.uniform(0, 0.4):.3f}",
+        "ReturnOnEquityTTM": f"{rng.uniform(0, 0.5):.3f}",
+        "ReturnOnAssetsTTM": f"{rng.uniform(0, 0.2):.3f}",
+        "DebtToEquity": f"{rng.uniform(0, 3):.2f}",
+        "CurrentRatio": f"{rng.uniform(0.5, 3):.2f}",
+        "BookValue": f"{rng.uniform(5, 80):.2f}",
+        "RevenueTTM": str(int(rng.integers(10**8, 4 * 10**11))),
+        "RevenuePerShareTTM": f"{rng.uniform(5, 100):.2f}",
+        "QuarterlyEarningsGrowthYOY": f"{rng.uniform(-0.2, 0.5):.3f}",
+        "QuarterlyRevenueGrowthYOY": f"{rng.uniform(-0.1, 0.4):.3f}",
+        "EPS": f"{rng.uniform(0.5, 12):.2f}",
+        "DilutedEPSTTM": f"{rng.uniform(0.5, 12):.2f}",
+        "AnalystTargetPrice": f"{price * rng.uniform(0.85, 1.3):.2f}",
+        "52WeekHigh": f"{price * 1.2:.2f}",
+        "52WeekLow": f"{price * 0.75:.2f}",
+        "50DayMovingAverage": f"{price * 0.98:.2f}",
+        "200DayMovingAverage": f"{price * 0.93:.2f}",
+        "SharesOutstanding": str(int(rng.integers(10**8, 10**10))),
+        "Beta": f"{rng.uniform(0.5, 2):.2f}",
+        "ForwardPE": f"{rng.uniform(8, 40):.2f}"
+    }
+
+
+def stock_snapshot(symbol: str = "BENCH", bars: int = 20) -> Dict:
+    """A fully populated ``fetch_stock_data`` result without any network I/O"""
+    def safe_float(value, default=0.0):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+
+    quote = global_quote(symbol)
+    overview = company_overview(symbol)
+    prices, volumes = price_series(bars, symbol)
+    return {
+        "symbol": symbol,
+        "name": overview["Name"],
+        "exchange": overview["Exchange"],
+        "currency": overview["Currency"],
+        "sector": overview["Sector"],
+        "industry": overview["Industry"],
+        "price": float(quote["05. price"]),
+        "change_percent": float(quote["10. change percent"].rstrip("%")),
+        "volume": int(quote["06. volume"]),
+        "high": float(quote["03. high"]),
+        "low": float(quote["04. low"]),
+        "open": float(quote["02. open"]),
+        "previous_close": float(quote["08. previous close"]),
+        "market_cap": int(overview["MarketCapitalization"]),
+        "pe_ratio": safe_float(overview["PERatio"]),
+        "peg_ratio": safe_float(overview["PEGRatio"]),
+        "price_to_book": safe_float(overview["PriceToBookRatio"]),
+        "price_to_sales": safe_float(overview["PriceToSalesRatioTTM"]),
+        "ev_to_revenue": safe_float(overview["EVToRevenue"]),
+        "ev_to_ebitda": safe_float(overview["EVToEBITDA"]),
+        "dividend_yield": safe_float(overview["DividendYield"]),
+        "dividend_per_share": safe_float(overview["DividendPerShare"]),
+        "ex_dividend_date": overview["ExDividendDate"],
+        "dividend_date": overview["DividendDate"],
+        "payout_ratio": safe_float(overview["PayoutRatio"]),
+        "profit_margin": safe_float(overview["ProfitMargin"]),
+        "operating_margin": safe_float(overview["OperatingMarginTTM"]),
+        "return_on_equity": safe_float(overview["ReturnOnEquityTTM"]),
+        "return_on_assets": safe_float(overview["ReturnOnAssetsTTM"]),
+        "debt_to_equity": safe_float(overview["DebtToEquity"]),
+        "current_ratio": safe_float(overview["CurrentRatio"]),
+        "book_value": safe_float(overview["BookValue"]),
+        "revenue_ttm": int(overview["RevenueTTM"]),
+        "revenue_per_share": safe_float(overview["RevenuePerShareTTM"]),
+        "quarterly_earnings_growth": safe_float(overview["QuarterlyEarningsGrowthYOY"]),
+        "quarterly_revenue_growth": safe_float(overview["QuarterlyRevenueGrowthYOY"]),
+        "eps": safe_float(overview["EPS"]),
+        "diluted_eps": safe_float(overview["DilutedEPSTTM"]),
+        "analyst_target_price": safe_float(overview["AnalystTargetPrice"]),
+        "52_week_high": safe_float(overview["52WeekHigh"]),
+        "52_week_low": safe_float(overview["52WeekLow"]),
+        "50_day_ma": safe_float(overview["50DayMovingAverage"]),
+        "200_day_ma": safe_float(overview["200DayMovingAverage"]),
+        "shares_outstanding": int(overview["SharesOutstanding"]),
+        "beta": safe_float(overview["Beta"]),
+        "forward_pe": safe_float(overview["ForwardPE"]),
+        "description": overview["Description"],
+        "prices": prices,
+        "volumes": volumes
+    }
@@ -0,0 +1,98 @@
+# services/analysis-service/benchmarks/harness.py
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summary statistics for a list of durations in seconds"""
+    return {
+        "runs": len(samples),
+        "min_ms": min(samples) * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "max_ms": max(samples) * 1000,
+        "stdev_ms": (statistics.stdev(samples) * 1000) if len(samples) > 1 else 0.0
+    }
+
+
+def time_callable(func: Callable[[], Any], min_time: float = 0.2, max_runs: int = 1000,
+                  min_runs: int = 5, warmup: int = 2) -> Dict[str, float]:
+    """Run ``func`` repeatedly until ``min_time`` has elapsed and summarize per-call latency"""
+    for _ in range(warmup):
+        func()
+
+    samples: List[float] = []
+    budget_start = time.perf_counter()
+    while len(samples) < max_runs:
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+        if len(samples) >= min_runs and time.perf_counter() - budget_start >= min_time:
+            break
+    return summarize(samples)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def environment() -> Dict[str, Any]:
+    """Machine and library details recorded with every result file"""
+    info = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+    try:
+        import numpy
+        info["numpy"] = numpy.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def save_results(suite: str, results: Dict[str, Any], output: Optional[str] = None) -> str:
+    """Write benchmark results as JSON and return the file path"""
+    commit = git_commit()
+    payload = {
+        "suite": suite,
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(),
+        "environment": environment(),
+        "results": results
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{suite}-{commit}-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    return output
@@ -0,0 +1,169 @@
+# services/analysis-service/benchmarks/load.py
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.harness import summarize
+from benchmarks.mock_servers import free_port
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "JPM", "V", "KO"]
+
+# name -> (method, path, body factory)
+SCENARIOS: Dict[str, Tuple[str, Callable[[int], str], Callable[[int], Optional[Dict]]]] = {
+    "stock": (
+        "POST",
+        lambda i: "/analysis/stock",
+        lambda i: {"symbol": SYMBOLS[i % len(SYMBOLS)], "include_technical": True, "include_sentiment": True}
+    ),
+    "compare": (
+        "POST",
+        lambda i: "/analysis/compare",
+        lambda i: {"symbols": [SYMBOLS[i % len(SYMBOLS)], SYMBOLS[(i + 1) % len(SYMBOLS)], SYMBOLS[(i + 2) % len(SYMBOLS)]]}
+    ),
+    "technical": (
+        "POST",
+        lambda i: f"/analysis/technical/{SYMBOLS[i % len(SYMBOLS)]}",
+        lambda i: None
+    ),
+    # Hourly bars rolled up from stored 5-minute bars (MarketDataService.get_bars)
+    "technical_intraday": (
+        "POST",
+        lambda i: f"/analysis/technical/{SYMBOLS[i % len(SYMBOLS)]}?interval=60min&base=5min&period=1m",
+        lambda i: None
+    )
+}
+
+
+class ManagedProcess:
+    """Run a uvicorn app in a subprocess and wait until it answers ``health_path``"""
+
+    def __init__(self, args: List[str], port: int, env: Dict[str, str], health_path: str):
+        self.args = args
+        self.port = port
+        self.env = env
+        self.health_path = health_path
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "ManagedProcess":
+        self.process = subprocess.Popen(self.args, cwd=SERVICE_DIR, env=self.env)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{' '.join(self.args)} exited during startup")
+            try:
+                if httpx.get(f"{self.url}{self.health_path}", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError(f"{' '.join(self.args)} did not become healthy")
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def mock_upstream_process(latency: Optional[Dict[str, float]] = None) -> ManagedProcess:
+    """Mock Alpha Vantage, NewsAPI and Ollama in their own process so they never compete with the driver"""
+    port = free_port()
+    return ManagedProcess(
+        [sys.executable, "-m", "benchmarks.mock_servers", "--port", str(port), "--latency", json.dumps(latency or {})],
+        port,
+        {**os.environ, "PYTHONPATH": SERVICE_DIR},
+        "/api/tags"
+    )
+
+
+def service_process(upstream_url: str, extra_env: Optional[Dict[str, str]] = None) -> ManagedProcess:
+    """The analysis service pointed at the mock upstreams"""
+    port = free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": SERVICE_DIR,
+        "ALPHA_VANTAGE_API_KEY": "bench",
+        "ALPHA_VANTAGE_URL": f"{upstream_url}/query",
+        "NEWS_API_KEY": "bench",
+        "NEWS_API_URL": f"{upstream_url}/v2/everything",
+        "OLLAMA_URL": upstream_url,
+        "OLLAMA_MODEL": "mock",
+        "OLLAMA_EMBED_MODEL": "mock-embed",
+        **(extra_env or {})
+    }
+    return ManagedProcess(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        port,
+        env,
+        "/health"
+    )
+
+
+async def run_scenario(base_url: str, scenario: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Issue ``requests`` calls with ``concurrency`` workers and summarize latency and throughput"""
+    method, path_for, body_for = SCENARIOS[scenario]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    failures = 0
+    counter = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal failures
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path_for(i), json=body_for(i))
+                latencies.append(time.perf_counter() - start)
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+                if response.status_code != 200 or response.json().get("success") is False:
+                    failures += 1
+            except httpx.HTTPError:
+                latencies.append(time.perf_counter() - start)
+                statuses["error"] = statuses.get("error", 0) + 1
+                failures += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - wall_start
+
+    result = summarize(latencies)
+    result.update({
+        "concurrency": concurrency,
+        "requests": requests,
+        "failures": failures,
+        "statuses": statuses,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "wall_s": wall
+    })
+    return result
+
+
+def run_load(scenarios=tuple(SCENARIOS), requests: int = 200, concurrency: int = 16,
+             latency: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Start mock upstreams and the service, then drive each scenario"""
+    results: Dict[str, Any] = {}
+    with mock_upstream_process(latency) as upstream:
+        with service_process(upstream.url) as service:
+            for scenario in scenarios:
+                # Short warm-up so connection setup and first-import costs are excluded
+                asyncio.run(run_scenario(service.url, scenario, min(concurrency, requests), concurrency))
+                results[f"load.{scenario}[c={concurrency}]"] = asyncio.run(
+                    run_scenario(service.url, scenario, requests, concurrency)
+                )
+    return results
@@ -0,0 +1,103 @@
+# services/analysis-service/benchmarks/micro.py
+from typing import Any, Dict, List
+
+from benchmarks import fixtures
+from benchmarks.harness import time_callable
+
+BAR_SIZES = (20, 250, 5_000, 50_000)
+CORPUS_SIZES = (100, 1_000, 10_000)
+UNIVERSE_SIZES = (15, 500, 5_000)
+
+
+def bench_indicators(sizes=BAR_SIZES, min_time: float = 0.2) -> Dict[str, Any]:
+    """Each TechnicalAnalysisService indicator at increasing history lengths"""
+    from app.services.technical_analysis import TechnicalAnalysisService as tas
+
+    results: Dict[str, Any] = {}
+    for n in sizes:
+        prices, volumes = fixtures.price_series(n)
+        cases = {
+            "rsi": lambda: tas.calculate_rsi(prices),
+            "moving_averages": lambda: tas.calculate_moving_averages(prices),
+            "ema_26": lambda: tas._calculate_ema(prices, 26),
+            "macd": lambda: tas.calculate_macd(prices),
+            "bollinger_bands": lambda: tas.calculate_bollinger_bands(prices),
+            "volume_trend": lambda: tas.analyze_volume_trend(volumes),
+            "comprehensive": lambda: tas.get_comprehensive_analysis(prices, volumes)
+        }
+        for name, func in cases.items():
+            results[f"indicator.{name}[{n}]"] = time_callable(func, min_time=min_time)
+    return results
+
+
+def bench_sentiment(sizes=CORPUS_SIZES, min_time: float = 0.2) -> Dict[str, Any]:
+    """Rule-based headline scoring over increasingly large corpora"""
+    from app.dependencies import get_sentiment_service
+
+    sentiment_service = get_sentiment_service()
+    results: Dict[str, Any] = {}
+    for n in sizes:
+        corpus = fixtures.headlines(n)
+
+        def run(corpus: List[str] = corpus):
+            for text in corpus:
+                sentiment_service.analyze_text_sentiment(text)
+
+        results[f"sentiment.analyze_text_sentiment[{n}]"] = time_callable(run, min_time=min_time, min_runs=3)
+    return results
+
+
+def bench_scoring(min_time: float = 0.2) -> Dict[str, Any]:
+    """Strategy scoring and prompt building for a single snapshot"""
+    from app.models.analysis import TechnicalIndicators
+    from app.routes.analysis import calculate_investment_scores
+    from app.services.prompt_builder import build_stock_prompt
+    from app.dependencies import get_technical_service
+
+    technical_service = get_technical_service()
+    stock_data = fixtures.stock_snapshot(bars=250)
+    tech = technical_service.get_comprehensive_analysis(stock_data["prices"], stock_data["volumes"])
+    indicators = TechnicalIndicators(
+        rsi=tech.get("rsi"),
+        macd=tech.get("macd"),
+        moving_averages=tech.get("moving_averages"),
+        bollinger_bands=tech.get("bollinger_bands"),
+        volume_trend=tech.get("volume_trend")
+    )
+    return {
+        "scoring.calculate_investment_scores": time_callable(
+            lambda: calculate_investment_scores(stock_data, indicators), min_time=min_time),
+        "prompt.build_stock_prompt": time_callable(
+            lambda: build_stock_prompt("BENCH", stock_data, indicators), min_time=min_time)
+    }
+
+
+def bench_fear_greed(sizes=UNIVERSE_SIZES, min_time: float = 0.2) -> Dict[str, Any]:
+    """Bulk Fear & Greed scoring over universes of 120-bar histories"""
+    import numpy as np
+    from app.dependencies import get_sentiment_service, get_technical_service
+    from app.services.fear_greed_service import FEAR_GREED_BARS
+
+    sentiment_service = get_sentiment_service()
+    technical_service = get_technical_service()
+    results: Dict[str, Any] = {}
+    for n in sizes:
+        series = [fixtures.price_series(FEAR_GREED_BARS, f"SYM{i}") for i in range(n)]
+        closes = np.array([prices for prices, _ in series])
+        volumes = np.array([volume for _, volume in series], dtype=np.float64)
+
+        def run(closes=closes, volumes=volumes):
+            components = technical_service.fear_greed_components(closes, volumes)
+            sentiment_service.calculate_fear_greed_bulk(components)
+
+        results[f"fear_greed.bulk[{n}]"] = time_callable(run, min_time=min_time)
+    return results
+
+
+def run_micro(min_time: float = 0.2, sizes=BAR_SIZES) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    results.update(bench_indicators(sizes, min_time))
+    results.update(bench_sentiment(min_time=min_time))
+    results.update(bench_scoring(min_time))
+    results.update(bench_fear_greed(min_time=min_time))
+    return results
@@ -0,0 +1,152 @@
+# services/analysis-service/benchmarks/mock_servers.py
+import argparse
+import asyncio
+import json
+import socket
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from benchmarks import fixtures
+
+MOCK_COMPLETION = (
+    "Recommendation: HOLD. The company shows steady revenue growth and a healthy balance sheet, "
+    "but valuation is stretched relative to peers. Key risks include margin pressure and "
+    "regulatory scrutiny. Price target implies modest upside over twelve months."
+)
+
+MOCK_STRUCTURED_COMPLETION = json.dumps({
+    "recommendation": "Hold",
+    "confidence": 0.65,
+    "price_target": 172.5,
+    "summary": MOCK_COMPLETION,
+    "key_points": ["Steady revenue growth", "Healthy balance sheet", "Valuation stretched relative to peers"],
+    "risks": ["Margin pressure", "Regulatory scrutiny"],
+    "opportunities": ["Buyback program supports EPS growth"],
+    "investor_profile": "long-term growth"
+})
+
+
+def create_mock_app(latency: Optional[Dict[str, float]] = None) -> FastAPI:
+    """One app that impersonates Alpha Vantage, NewsAPI and Ollama"""
+    latency = {"alpha_vantage": 0.03, "newsapi": 0.05, "ollama": 0.25, "ollama_embed": 0.01, **(latency or {})}
+    app = FastAPI()
+    # Payloads are deterministic per symbol; build each once so the mock never becomes the bottleneck
+    cache: Dict[str, Dict] = {}
+
+    def cached(key: str, factory):
+        if key not in cache:
+            cache[key] = factory()
+        return cache[key]
+
+    @app.get("/query")
+    async def alpha_vantage(function: str, symbol: str = "BENCH", outputsize: str = "compact", interval: str = "5min"):
+        await asyncio.sleep(latency["alpha_vantage"])
+        symbol = symbol.upper()
+        if function == "GLOBAL_QUOTE":
+            return cached(f"quote:{symbol}", lambda: {"Global Quote": fixtures.global_quote(symbol)})
+        if function == "OVERVIEW":
+            return cached(f"overview:{symbol}", lambda: fixtures.company_overview(symbol))
+        if function == "TIME_SERIES_DAILY":
+            bars = 5000 if outputsize == "full" else 100
+            return cached(f"daily:{symbol}:{bars}", lambda: {
+                "Meta Data": {"2. Symbol": symbol},
+                "Time Series (Daily)": fixtures.daily_time_series(symbol, bars)
+            })
+        if function == "TIME_SERIES_INTRADAY":
+            minutes = int(interval.removesuffix("min"))
+            # A full intraday response covers the last 30 sessions of 390 minutes
+            bars = 30 * 390 // minutes if outputsize == "full" else 100
+            return cached(f"intraday:{symbol}:{interval}:{bars}", lambda: {
+                "Meta Data": {"2. Symbol": symbol, "4. Interval": interval, "6. Time Zone": "US/Eastern"},
+                f"Time Series ({interval})": fixtures.intraday_time_series(symbol, bars, minutes)
+            })
+        if function in ("TIME_SERIES_WEEKLY", "TIME_SERIES_MONTHLY"):
+            weekly = function == "TIME_SERIES_WEEKLY"
+            key = "Weekly Time Series" if weekly else "Monthly Time Series"
+            return cached(f"{function}:{symbol}", lambda: {
+                "Meta Data": {"2. Symbol": symbol},
+                key: fixtures.daily_time_series(symbol, 1000 if weekly else 240, step_days=7 if weekly else 30)
+            })
+        return {"Error Message": f"Unsupported function {function}"}
+
+    @app.get("/v2/everything")
+    async def news(q: str = ""):
+        await asyncio.sleep(latency["newsapi"])
+        symbol = q.split(" OR ")[-1].strip().upper() or "BENCH"
+        articles = cached(f"news:{symbol}", lambda: fixtures.news_articles(20, symbol))
+        return {"status": "ok", "totalResults": len(articles), "articles": articles}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        payload = await request.json()
+        if not payload.get("prompt"):
+            # Empty prompt: Ollama just loads the model / refreshes keep_alive
+            return {"model": payload.get("model", "mock"), "response": "", "done": True, "done_reason": "load"}
+        completion = MOCK_STRUCTURED_COMPLETION if payload.get("format") else MOCK_COMPLETION
+        start = time.perf_counter()
+
+        def stats() -> Dict:
+            elapsed_ns = int((time.perf_counter() - start) * 1e9)
+            return {
+                "model": payload.get("model", "mock"),
+                "done": True,
+                "total_duration": elapsed_ns,
+                "prompt_eval_count": max(1, len(payload.get("prompt", "")) // 4),
+                "prompt_eval_duration": elapsed_ns // 4,
+                "eval_count": max(1, len(completion) // 4),
+                "eval_duration": elapsed_ns - elapsed_ns // 4
+            }
+
+        if payload.get("stream", True):
+            # Spread the latency over ~16-character chunks the way tokens trickle out of a model
+            pieces = [completion[i:i + 16] for i in range(0, len(completion), 16)]
+
+            async def chunks():
+                for piece in pieces:
+                    await asyncio.sleep(latency["ollama"] / len(pieces))
+                    yield json.dumps({"model": payload.get("model", "mock"), "response": piece, "done": False}) + "\n"
+                yield json.dumps({**stats(), "response": ""}) + "\n"
+
+            return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+        await asyncio.sleep(latency["ollama"])
+        return {**stats(), "response": completion}
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        payload = await request.json()
+        texts = payload.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        await asyncio.sleep(latency["ollama_embed"])
+        return {"model": payload.get("model", "mock-embed"), "embeddings": [fixtures.embedding(text) for text in texts]}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [
+            {"name": name, "size": 0, "modified_at": "2024-01-01T00:00:00Z"}
+            for name in ("mock:latest", "mock-embed:latest")
+        ]}
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve mock Alpha Vantage, NewsAPI and Ollama endpoints")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--latency", default="{}", help='JSON latency overrides, e.g. {"ollama": 1.0}')
+    args = parser.parse_args(argv)
+    uvicorn.run(create_mock_app(json.loads(args.latency)), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
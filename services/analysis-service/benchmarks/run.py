@@ -0,0 +1,57 @@
+# services/analysis-service/benchmarks/run.py
+import argparse
+import os
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
+
+from benchmarks.harness import save_results  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run analysis service benchmarks")
+    parser.add_argument("suite", choices=["micro", "load", "startup", "all"], nargs="?", default="micro")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<suite>-<commit>-<time>.json)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds spent per micro-benchmark")
+    parser.add_argument("--sizes", default="20,250,5000,50000", help="Bar counts for indicator benchmarks")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per load scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients per load scenario")
+    parser.add_argument("--scenarios", default="stock,compare,technical,technical_intraday", help="Load scenarios to run")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh interpreters per startup benchmark")
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.suite in ("micro", "all"):
+        from benchmarks.micro import run_micro
+        sizes = tuple(int(n) for n in args.sizes.split(","))
+        results.update(run_micro(min_time=args.min_time, sizes=sizes))
+    if args.suite in ("load", "all"):
+        from benchmarks.load import run_load
+        results.update(run_load(
+            scenarios=tuple(args.scenarios.split(",")),
+            requests=args.requests,
+            concurrency=args.concurrency
+        ))
+    if args.suite in ("startup", "all"):
+        from benchmarks.startup import run_startup
+        results.update(run_startup(runs=args.startup_runs))
+
+    for name, result in results.items():
+        metric = "p95_ms" if name.startswith("load.") else "median_ms"
+        extra = f"  {result['throughput_rps']:.1f} req/s" if "throughput_rps" in result else ""
+        print(f"{name:<55} {metric}={result[metric]:.3f}{extra}")
+
+    path = save_results(args.suite, results, args.output)
+    print(f"Results written to {path}")
+
+    eager = results.get("startup.import_main", {}).get("eager_heavy_modules")
+    if eager:
+        print(f"Heavy modules imported eagerly by main: {', '.join(eager)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# services/analysis-service/benchmarks/startup.py
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.harness import summarize
+from benchmarks.mock_servers import free_port
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the app defers until first use; importing any of them from ``main`` is a regression
+HEAVY_MODULES = ("numpy", "httpx", "redis")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def _env() -> Dict[str, str]:
+    return {
+        **os.environ,
+        "PYTHONPATH": SERVICE_DIR,
+        # Keep the service from reaching out to real upstreams while it boots
+        "FEAR_GREED_REFRESH_SECONDS": "0"
+    }
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for every line of ``-X importtime`` output"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def import_profile(module: str = "main", runs: int = 5, top: int = 15) -> Dict[str, Any]:
+    """Time ``import <module>`` in fresh interpreters and report what it pulled in"""
+    totals: List[float] = []
+    rows: List[Tuple[str, int, int, int]] = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=SERVICE_DIR, env=_env(), capture_output=True, text=True, check=True
+        )
+        rows = parse_importtime(completed.stderr)
+        totals.append(next(cumulative for name, _, cumulative, depth in rows if name == module and depth == 0) / 1e6)
+
+    imported = {name for name, _, _, _ in rows}
+    result = summarize(totals)
+    result.update({
+        "eager_heavy_modules": [name for name in HEAVY_MODULES if name in imported],
+        "top_modules": [
+            {"module": name, "cumulative_ms": cumulative / 1000, "self_ms": self_us / 1000}
+            for name, self_us, cumulative, depth in sorted(rows, key=lambda row: -row[2])[:top]
+        ]
+    })
+    return result
+
+
+def cold_start(runs: int = 5, timeout: float = 30.0) -> Dict[str, Any]:
+    """Seconds from spawning uvicorn to the first successful ``/health`` response"""
+    durations: List[float] = []
+    for _ in range(runs):
+        port = free_port()
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=SERVICE_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError("service exited during startup")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError("service did not become healthy")
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.01)
+            durations.append(time.perf_counter() - start)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    return summarize(durations)
+
+
+def run_startup(runs: int = 5) -> Dict[str, Any]:
+    return {
+        "startup.import_main": import_profile("main", runs),
+        "startup.cold_start": cold_start(runs)
+    }
@@ -0,0 +1,13 @@
+# services/analysis-service/gunicorn.conf.py
+# Production serving: gunicorn -c gunicorn.conf.py main:app
+from app.config import settings
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WORKERS
+worker_class = "app.workers.AnalysisWorker"
+
+# Shutdown first waits for open requests, then the lifespan drains background LLM jobs
+graceful_timeout = settings.SHUTDOWN_DRAIN_TIMEOUT * 2 + 5
+# Async workers heartbeat from the event loop, so this only fires when a loop is blocked
+timeout = 120
+keepalive = 5
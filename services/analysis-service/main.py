@@ -1,14 +1,61 @@
 # services/analysis-service/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from app.routes import analysis, health
+from app.routes import alerts, analysis, backtest, health, metrics, risk
+from app.middleware import CompressionMiddleware, DeadlineMiddleware, TimingMiddleware, TracingMiddleware
+from app.telemetry.log import log
+from app.telemetry.loop_monitor import loop_monitor
+from app.telemetry.tracing import tracer
+from app.resources import resources
+from app.dependencies import (
+    get_alert_engine, get_enrichment_service, get_fear_greed_service, get_health_service, get_ollama_service
+)
+from app.utils.compute import compute
+from app.utils.lazy import preload
 from app.config import settings
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once per worker process: pools and background tasks belong to that worker's event loop
+    await resources.startup()
+    loop_monitor.start()
+    log(f"Analysis Service starting on {settings.HOST}:{settings.PORT}")
+    log(f"Ollama endpoint: {settings.OLLAMA_URL}")
+    if resources.redis is not None:
+        log("Shared state: Redis")
+    if tracer.enabled:
+        log(f"Tracing enabled ({settings.TRACING_EXPORTER} exporter, sample rate {settings.TRACING_SAMPLE_RATE})")
+    if settings.PROMPT_TOKEN_BUDGET + settings.MAX_ANALYSIS_LENGTH > settings.OLLAMA_NUM_CTX:
+        log("Warning: PROMPT_TOKEN_BUDGET + MAX_ANALYSIS_LENGTH exceeds OLLAMA_NUM_CTX; long analyses may be truncated")
+    get_fear_greed_service().start()
+    get_ollama_service().start()
+    get_alert_engine().start()
+    get_health_service().start()
+    if settings.PRELOAD_MODULES:
+        # Heavy imports were deferred so the worker starts serving sooner; finish them off the loop
+        asyncio.get_running_loop().run_in_executor(None, preload)
+    
+    yield
+    
+    await get_health_service().stop()
+    await get_fear_greed_service().stop()
+    await get_alert_engine().stop()
+    await get_ollama_service().stop()
+    await get_enrichment_service().drain(settings.SHUTDOWN_DRAIN_TIMEOUT)
+    await get_ollama_service().drain(settings.SHUTDOWN_DRAIN_TIMEOUT)
+    await resources.shutdown()
+    await loop_monitor.stop()
+    compute.shutdown()
+    tracer.shutdown()
+
 app = FastAPI(
     title="Natols Analysis Service",
     description="AI-powered stock analysis using Ollama",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -18,21 +65,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Trace-Id", "ETag"],
 )
 
+# gzip / brotli for JSON and NDJSON bodies
+app.add_middleware(CompressionMiddleware)
+
+# Per-request deadline from X-Request-Timeout and the route budgets
+app.add_middleware(DeadlineMiddleware)
+
+# Request metrics and Server-Timing breakdown
+app.add_middleware(TimingMiddleware)
+
+# Request tracing (outermost so the server span covers every other middleware)
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(health.router, tags=["Health"])
+app.include_router(metrics.router, tags=["Metrics"])
 app.include_router(analysis.router, prefix="/analysis", tags=["Analysis"])
-
-@app.on_event("startup")
-async def startup_event():
-    print(f"Analysis Service starting on {settings.HOST}:{settings.PORT}")
-    print(f"Ollama endpoint: {settings.OLLAMA_URL}")
+app.include_router(alerts.router, prefix="/alerts", tags=["Alerts"])
+app.include_router(backtest.router, prefix="/backtest", tags=["Backtest"])
+app.include_router(risk.router, prefix="/risk", tags=["Risk"])
 
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
+        workers=settings.WORKERS,
+        loop=settings.UVICORN_LOOP,
+        http=settings.UVICORN_HTTP,
+        timeout_graceful_shutdown=settings.SHUTDOWN_DRAIN_TIMEOUT,
         reload=False
     )
\ No newline at end of file
@@ -0,0 +1,204 @@
+# services/analysis-service/tests/conftest.py
+"""Shared test setup: run from anywhere with the service directory importable
+
+Tests exercise the real modules with NumPy, httpx and FastAPI installed from
+requirements.txt. Upstream services are replaced by small in-process fakes: Alpha
+Vantage here (``alpha_vantage``), Ollama and the rest next to the tests that use them.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
+
+DAY = 86400
+
+
+@pytest.fixture
+def history_store(tmp_path):
+    """Empty price history database in a temporary file"""
+    from app.services.history_store import HistoryStore
+    return HistoryStore(str(tmp_path / "history.db"))
+
+
+@pytest.fixture
+def store_closes(history_store):
+    """Write daily bars with the given closes for a symbol, one day apart from ``start_day``"""
+    def store(symbol, closes, start_day=19000, interval="daily"):
+        closes = np.asarray(closes, dtype=np.float64)
+        history_store.upsert_bars(symbol, interval, {
+            "timestamp": (start_day + np.arange(len(closes), dtype=np.int64)) * DAY,
+            "open": closes,
+            "high": closes * 1.01,
+            "low": closes * 0.99,
+            "close": closes,
+            "volume": np.full(len(closes), 1000, dtype=np.int64)
+        })
+    return store
+
+
+class FakeAlphaVantage:
+    """Alpha Vantage answered in-process through ``httpx.MockTransport``
+
+    ``closes[symbol]`` holds the daily closes served (ending yesterday); the latest
+    close is also the quote price. Every request is kept in ``requests``.
+    """
+
+    def __init__(self):
+        self.closes = {}
+        self.requests = []
+
+    def daily_series(self, symbol):
+        end = (int(time.time()) // DAY - 1) * DAY
+        closes = self.closes[symbol]
+        series = {}
+        for i, close in enumerate(closes):
+            day = datetime.fromtimestamp(end - (len(closes) - 1 - i) * DAY, tz=timezone.utc)
+            series[day.strftime("%Y-%m-%d")] = {
+                "1. open": str(close), "2. high": str(close * 1.01), "3. low": str(close * 0.99),
+                "4. close": str(close), "5. volume": "1000000"
+            }
+        return series
+
+    def __call__(self, request):
+        self.requests.append(request)
+        params = request.url.params
+        function, symbol = params.get("function"), params.get("symbol")
+        if symbol not in self.closes:
+            return httpx.Response(200, json={"Error Message": "Invalid API call"})
+        closes = self.closes[symbol]
+        if function == "GLOBAL_QUOTE":
+            return httpx.Response(200, json={"Global Quote": {
+                "01. symbol": symbol, "02. open": str(closes[-2]), "03. high": str(closes[-1] * 1.01),
+                "04. low": str(closes[-1] * 0.99), "05. price": str(closes[-1]), "06. volume": "1000000",
+                "08. previous close": str(closes[-2]),
+                "10. change percent": f"{(closes[-1] / closes[-2] - 1) * 100:.4f}%"
+            }})
+        if function == "OVERVIEW":
+            return httpx.Response(200, json={"Symbol": symbol, "Name": f"{symbol} Inc", "MarketCapitalization": "1000000000"})
+        if function == "TIME_SERIES_DAILY":
+            return httpx.Response(200, json={"Time Series (Daily)": self.daily_series(symbol)})
+        return httpx.Response(200, json={"Error Message": f"Unsupported function {function}"})
+
+    def calls(self, function):
+        return sum(1 for request in self.requests if request.url.params.get("function") == function)
+
+
+@pytest.fixture
+def alpha_vantage(monkeypatch):
+    """A ``FakeAlphaVantage`` behind the shared HTTP client, with hedging off so calls can be counted"""
+    from app.config import settings
+    from app.resources import resources
+
+    fake = FakeAlphaVantage()
+    monkeypatch.setattr(settings, "ALPHA_VANTAGE_API_KEY", "test")
+    monkeypatch.setattr(settings, "HEDGE_ENABLED", False)
+    monkeypatch.setattr(resources, "_http", httpx.AsyncClient(transport=httpx.MockTransport(fake)))
+    return fake
+
+
+class FakeRedis:
+    """The subset of ``redis.asyncio`` the shared state uses, kept in a dict
+
+    Keys expire on the monotonic clock like Redis TTLs. With ``broken`` set every
+    command raises ``ConnectionError``, as when the server goes away.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.broken = False
+
+    def _check(self):
+        if self.broken:
+            raise ConnectionError("Redis is unreachable")
+
+    def _live(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and time.monotonic() >= expires:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    async def get(self, key):
+        self._check()
+        return self.data[key] if self._live(key) else None
+
+    async def set(self, key, value, nx=False, px=None):
+        self._check()
+        if nx and self._live(key):
+            return None
+        self.data[key] = str(value)
+        self.expires.pop(key, None)
+        if px is not None:
+            self.expires[key] = time.monotonic() + px / 1000
+        return True
+
+    async def exists(self, key):
+        self._check()
+        return int(self._live(key))
+
+    async def eval(self, script, numkeys, key, token):
+        # Only the lock release script is used
+        self._check()
+        if self._live(key) and self.data[key] == token:
+            del self.data[key]
+            self.expires.pop(key, None)
+            return 1
+        return 0
+
+    def ttl(self, key):
+        return self.expires[key] - time.monotonic() if self._live(key) and key in self.expires else None
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def incr(self, key):
+        self.commands.append(("incr", key))
+
+    def expire(self, key, seconds):
+        self.commands.append(("expire", key, seconds))
+
+    async def execute(self):
+        redis = self.redis
+        redis._check()
+        results = []
+        for command, key, *args in self.commands:
+            if command == "incr":
+                value = int(redis.data[key]) + 1 if redis._live(key) else 1
+                redis.data[key] = str(value)
+                results.append(value)
+            else:
+                redis.expires[key] = time.monotonic() + args[0]
+                results.append(True)
+        self.commands = []
+        return results
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """A ``FakeRedis`` installed as the shared Redis client, as with REDIS_URL set"""
+    from app.resources import resources
+
+    redis = FakeRedis()
+    monkeypatch.setattr(resources, "redis", redis)
+    return redis
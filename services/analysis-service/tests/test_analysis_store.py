@@ -0,0 +1,101 @@
+# services/analysis-service/tests/test_analysis_store.py
+import itertools
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import analysis_store
+from app.services.analysis_store import AnalysisStore, data_fingerprint
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Strictly increasing save times so newest-first order is deterministic
+    clock = itertools.count(1_700_000_000)
+    monkeypatch.setattr(analysis_store, "time", SimpleNamespace(time=lambda: float(next(clock))))
+    return AnalysisStore("sqlite", str(tmp_path / "analyses" / "analysis.db"), history_limit=5)
+
+
+def test_fingerprint_changes_with_inputs_only():
+    snapshot = {"symbol": "AAPL", "price": 190.5, "indicators": {"rsi": 55.1}}
+    same = {"indicators": {"rsi": 55.1}, "price": 190.5, "symbol": "AAPL"}
+    assert data_fingerprint(snapshot, {"mode": "full"}) == data_fingerprint(same, {"mode": "full"})
+    assert data_fingerprint(snapshot, {"mode": "full"}) != data_fingerprint({**snapshot, "price": 191.0}, {"mode": "full"})
+    assert data_fingerprint(snapshot, {"mode": "full"}) != data_fingerprint(snapshot, {"mode": "fast"})
+
+
+def test_get_returns_the_analysis_for_exactly_that_input(store):
+    store.save("AAPL", "comprehensive", "fp1", {"summary": "first"})
+    found = store.get("AAPL", "comprehensive", "fp1")
+    assert found["analysis"] == {"summary": "first"}
+    assert found["symbol"] == "AAPL" and found["fingerprint"] == "fp1"
+    assert store.get("AAPL", "comprehensive", "fp2") is None
+    assert store.get("AAPL", "technical", "fp1") is None
+
+
+def test_saving_the_same_input_replaces_the_result(store):
+    store.save("AAPL", "comprehensive", "fp1", {"summary": "first"})
+    store.save("AAPL", "comprehensive", "fp1", {"summary": "second"})
+    items, _ = store.history("AAPL")
+    assert [item["analysis"]["summary"] for item in items] == ["second"]
+
+
+def test_history_pages_newest_first_and_is_trimmed(store):
+    for i in range(7):
+        store.save("AAPL", "comprehensive", f"fp{i}", {"n": i})
+    store.save("AAPL", "technical", "t0", {"n": "t"})
+
+    first, cursor = store.history("AAPL", "comprehensive", limit=3)
+    second, last_cursor = store.history("AAPL", "comprehensive", limit=3, cursor=cursor)
+    # history_limit keeps the newest 5 per symbol and type
+    assert [item["analysis"]["n"] for item in first] == [6, 5, 4]
+    assert [item["analysis"]["n"] for item in second] == [3, 2]
+    assert last_cursor is None
+    assert len(store.history("AAPL")[0]) == 6
+
+    with pytest.raises(ValueError):
+        store.history("AAPL", cursor="not-a-cursor")
+
+
+def test_latest_per_symbol(store):
+    store.save("AAPL", "comprehensive", "a1", {"n": 1})
+    store.save("AAPL", "technical", "a2", {"n": 2})
+    store.save("MSFT", "comprehensive", "m1", {"n": 3})
+
+    latest = store.latest(["AAPL", "MSFT", "GOOG", "AAPL"])
+    assert {symbol: item["analysis"]["n"] for symbol, item in latest.items()} == {"AAPL": 2, "MSFT": 3}
+    assert store.latest(["AAPL"], "comprehensive")["AAPL"]["analysis"] == {"n": 1}
+    assert store.latest([]) == {}
+
+
+def test_invalidate(store):
+    store.save("AAPL", "comprehensive", "a1", {})
+    store.save("AAPL", "technical", "a2", {})
+    store.save("MSFT", "comprehensive", "m1", {})
+
+    assert store.invalidate("AAPL", "technical") == 1
+    assert store.invalidate("AAPL") == 1
+    assert store.get("AAPL", "comprehensive", "a1") is None
+    assert store.get("MSFT", "comprehensive", "m1") is not None
+
+
+def test_results_persist_and_are_shared_across_threads(store):
+    store.save("AAPL", "comprehensive", "fp1", {"summary": "kept"})
+    found = []
+    thread = threading.Thread(target=lambda: found.append(store.get("AAPL", "comprehensive", "fp1")))
+    thread.start()
+    thread.join()
+    assert found[0]["analysis"] == {"summary": "kept"}
+
+    reopened = AnalysisStore("sqlite", store.path)
+    assert reopened.get("AAPL", "comprehensive", "fp1")["analysis"] == {"summary": "kept"}
+    reopened.ping()
+
+
+def test_in_memory_store_and_unknown_backend():
+    store = AnalysisStore("sqlite", ":memory:")
+    store.save("AAPL", "comprehensive", "fp1", {"ok": True})
+    assert store.get("AAPL", "comprehensive", "fp1")["analysis"] == {"ok": True}
+    with pytest.raises(ValueError):
+        AnalysisStore("mongo")
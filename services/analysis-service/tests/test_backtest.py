@@ -0,0 +1,156 @@
+# services/analysis-service/tests/test_backtest.py
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.services.backtest import (
+    BacktestService,
+    align_histories,
+    bar_returns,
+    expand_grid,
+    positions,
+    run_grid,
+    simulate
+)
+from app.services.market_data_service import MarketDataError
+from app.utils.helpers import metric_value
+
+
+class NoMarketData:
+    """Alpha Vantage stand-in with no history for any symbol"""
+
+    def __init__(self):
+        self.requested = []
+
+    async def get_history(self, symbol, interval):
+        self.requested.append(symbol)
+        raise MarketDataError(f"No {interval} history for {symbol}")
+
+
+def reference_simulation(returns, target, start, fee):
+    """Bar-by-bar loop over one symbol, the definition ``simulate`` vectorizes"""
+    held = [0.0] + list(target[:-1])
+    held = [0.0 if t < start else position for t, position in enumerate(held)]
+    equity, previous = 1.0, 0.0
+    for t, position in enumerate(held):
+        gain = previous * returns[t] if t else 0.0
+        equity *= 1 + gain - fee * abs(position - previous)
+        previous = position
+    # A position still open on the last bar is marked to market, not sold
+    return equity - 1
+
+
+def test_expand_grid():
+    grid = expand_grid("rsi", {"oversold": [25, 30], "overbought": [70, 80]})
+    assert len(grid) == 4
+    assert grid[0] == {"rsi_period": 14, "oversold": 25, "overbought": 70}
+    assert isinstance(expand_grid("rsi", {"rsi_period": [10.0]})[0]["rsi_period"], int)
+
+    for strategy, params in (("macd", {}), ("rsi", {"period": [14]}), ("rsi", {"rsi_period": [1]}),
+                             ("bollinger", {"bb_period": [20.5]})):
+        with pytest.raises(ValueError):
+            expand_grid(strategy, params)
+
+
+def test_align_histories_forward_fills_on_the_union_of_dates():
+    a = {"timestamp": np.array([1, 2, 4]), "close": np.array([10.0, 11.0, 12.0]), "volume": np.array([1, 1, 1])}
+    b = {"timestamp": np.array([2, 3, 4]), "close": np.array([20.0, 21.0, 22.0]), "volume": np.array([5, 5, 5])}
+    timestamps, closes, volumes, first = align_histories([a, b])
+
+    assert timestamps.tolist() == [1, 2, 3, 4]
+    assert closes[0].tolist() == [10.0, 11.0, 11.0, 12.0]
+    assert closes[1, 1:].tolist() == [20.0, 21.0, 22.0]
+    assert volumes[0].tolist() == [1, 1, 0, 1]
+    assert first.tolist() == [0, 1]
+    assert bar_returns(closes)[0, 2] == 0.0
+
+
+def test_positions_hold_from_entry_to_exit():
+    entries = np.array([[False, True, False, False, True, False, False]])
+    exits = np.array([[True, False, False, True, False, True, False]])
+    assert positions(entries, exits).tolist() == [[0, 1, 1, 0, 1, 0, 0]]
+
+
+def test_simulate_trades_the_bar_after_the_signal():
+    closes = np.array([[100.0, 100.0, 110.0, 121.0, 121.0]])
+    target = np.array([[1.0, 1.0, 1.0, 0.0, 0.0]])
+    start = np.array([0])
+
+    result = simulate(bar_returns(closes), target, start, 0.0, 252)
+    assert result["total_return"][0] == pytest.approx(0.21)
+    assert result["trades"][0] == 1 and result["hit_rate"][0] == 1.0
+    assert result["exposure"][0] == pytest.approx(3 / 5)
+    assert result["max_drawdown"][0] == 0.0
+
+    with_fees = simulate(bar_returns(closes), target, start, 0.01, 252)
+    assert with_fees["total_return"][0] == pytest.approx(0.99 * 1.1 * 1.1 * 0.99 - 1)
+
+
+def test_simulate_matches_a_bar_by_bar_loop():
+    rng = np.random.default_rng(3)
+    closes = 50 * np.cumprod(1 + rng.normal(0, 0.03, (6, 120)), axis=1)
+    target = (rng.random((6, 120)) > 0.6).astype(np.float64)
+    start = np.array([0, 0, 10, 30, 119, 5])
+    returns = bar_returns(closes)
+
+    result = simulate(returns, target, start, 0.002, 252)
+    for row in range(6):
+        expected = reference_simulation(returns[row], target[row], start[row], 0.002)
+        assert result["total_return"][row] == pytest.approx(expected, rel=1e-9, abs=1e-12)
+    assert np.all((result["max_drawdown"] >= 0) & (result["max_drawdown"] < 1))
+    assert result["exposure"][4] == 0.0 and result["trades"][4] == 0
+
+
+def test_run_grid_shares_indicators_across_thresholds():
+    rng = np.random.default_rng(11)
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.02, (3, 300)), axis=1)
+    volumes = np.full(closes.shape, 1000.0)
+    first = start = np.zeros(3, dtype=np.int64)
+    combos = expand_grid("rsi", {"rsi_period": [14, 7], "oversold": [30, 40]})
+
+    results = run_grid("rsi", combos, closes, volumes, first, start, 0.0005, 252)
+    for i, params in enumerate(combos):
+        alone = run_grid("rsi", [params], closes, volumes, first, start, 0.0005, 252)
+        for name, values in alone.items():
+            np.testing.assert_allclose(results[name][i], values[0], equal_nan=True)
+
+
+def test_backtest_over_stored_history(history_store, store_closes):
+    rng = np.random.default_rng(5)
+    for symbol in ("AAA", "BBB"):
+        store_closes(symbol, 100 * np.cumprod(1 + rng.normal(0, 0.02, 400)))
+    store_closes("NEW", 100 * np.cumprod(1 + rng.normal(0, 0.02, 50)), start_day=19350)
+    market_data = NoMarketData()
+    service = BacktestService(market_data, history_store)
+
+    result = asyncio.run(service.run(
+        ["aaa", "BBB", "NEW", "MISSING"], "bollinger", {"num_std": [1.5, 2.0, 2.5]},
+        start=datetime.fromtimestamp(19100 * 86400, tz=timezone.utc), cost_bps=10
+    ))
+
+    # Stored symbols never touch Alpha Vantage; unknown ones are reported, not fatal
+    assert market_data.requested == ["MISSING"]
+    assert set(result["errors"]) == {"MISSING"}
+    assert result["symbols"] == ["AAA", "BBB", "NEW"]
+    assert result["combinations"] == 3
+    sharpes = [entry["summary"]["mean_sharpe"] for entry in result["results"]]
+    assert sharpes == sorted(sharpes, reverse=True)
+    assert result["best"]["params"] == result["results"][0]["params"]
+    assert set(result["best"]["symbols"]) == {"AAA", "BBB", "NEW"}
+    assert result["start"] == "2022-04-18"
+    assert result["benchmark"]["mean_exposure"] > 0.9
+
+
+def test_backtest_rejects_oversized_grids(history_store):
+    service = BacktestService(NoMarketData(), history_store)
+    grid = {"oversold": list(range(1, 40)), "overbought": list(range(50, 99)), "rsi_period": [7, 14, 21]}
+    with pytest.raises(ValueError):
+        asyncio.run(service.run(["AAA"], "rsi", grid))
+
+
+def test_metric_value_rounds_finite_scalars_and_drops_the_rest():
+    assert metric_value(np.float64(0.123456)) == 0.1235
+    assert metric_value(np.int64(3), 2) == 3.0 and type(metric_value(np.float32(1.5))) is float
+    assert [metric_value(v) for v in (None, np.nan, np.inf, -np.inf)] == [None] * 4
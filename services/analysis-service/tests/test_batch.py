@@ -0,0 +1,165 @@
+# services/analysis-service/tests/test_batch.py
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_analysis_store, get_sentiment_service
+from app.models.request import AnalysisRequest, BatchAnalysisRequest
+from app.routes import analysis
+from app.services.technical_analysis import TechnicalAnalysisService
+from app.telemetry.metrics import metrics
+from main import app
+
+
+class FakeSentiment:
+    def __init__(self):
+        self.batches = []
+
+    async def analyze_news_sentiment_bulk(self, symbols, concurrency=8):
+        self.batches.append(list(symbols))
+        return {symbol: {"overall_sentiment": "positive", "confidence": 0.8, "sources": ["Reuters"],
+                         "summary": f"{symbol} coverage"} for symbol in symbols}
+
+
+@pytest.fixture
+def client(alpha_vantage):
+    sentiment = FakeSentiment()
+    app.dependency_overrides.update({get_sentiment_service: lambda: sentiment, get_analysis_store: lambda: None})
+    for index, symbol in enumerate(("AAA", "BBB", "CCC")):
+        alpha_vantage.closes[symbol] = list(np.linspace(50, 60 + index, 40))
+    yield TestClient(app), sentiment
+    app.dependency_overrides.clear()
+
+
+def stream(client, symbols, **options):
+    response = client.post("/analysis/batch", json={"symbols": symbols, "mode": "fast", **options})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batch_streams_a_line_per_symbol_then_done(client):
+    client, sentiment = client
+    events = stream(client, ["AAA", "nope", " bbb ", "aaa", "CCC"])
+
+    # Failed fetches are reported first, every analysis as it completes, the summary last
+    assert events[0] == {"event": "error", "symbol": "NOPE", "status": 404, "error": "Stock symbol NOPE not found"}
+    results = events[1:-1]
+    assert sorted(event["symbol"] for event in results) == ["AAA", "BBB", "CCC"]
+    for event in results:
+        assert event["event"] == "result" and event["job_id"] is None
+        data = event["data"]
+        assert data["stock_symbol"] == event["symbol"] and data["mode"] == "fast"
+        assert data["technical_indicators"]["rsi"] is not None
+        assert data["sentiment"]["summary"] == f"{event['symbol']} coverage"
+    done = events[-1]
+    assert done["event"] == "done" and done["count"] == 3 and done["errors"] == 1
+    # Duplicates are analyzed once; sentiment comes from one bulk call
+    assert sentiment.batches == [["AAA", "NOPE", "BBB", "CCC"]]
+
+
+def test_one_failing_analysis_doesnt_stop_the_others(client, monkeypatch):
+    client, _ = client
+    run_analysis = analysis.run_analysis
+
+    async def failing(request, *args, **kwargs):
+        if request.symbol == "BBB":
+            raise RuntimeError("model crashed")
+        return await run_analysis(request, *args, **kwargs)
+
+    monkeypatch.setattr(analysis, "run_analysis", failing)
+    before = metrics.errors_total.get(stage="analyze_batch", error="RuntimeError")
+    events = stream(client, ["AAA", "BBB", "CCC"], include_sentiment=False)
+
+    assert {"event": "error", "symbol": "BBB", "status": 500, "error": "model crashed"} in events
+    assert sorted(event["symbol"] for event in events if event["event"] == "result") == ["AAA", "CCC"]
+    assert events[-1]["count"] == 2 and events[-1]["errors"] == 1
+    assert metrics.errors_total.get(stage="analyze_batch", error="RuntimeError") - before == 1
+
+
+def test_oversized_batches_are_rejected(client):
+    client, _ = client
+    response = client.post("/analysis/batch", json={"symbols": [f"S{i}" for i in range(51)]})
+    assert response.status_code == 400
+
+
+def test_disconnect_cancels_the_work_in_flight(monkeypatch):
+    cancelled = []
+
+    async def fetch_stock_data(symbol):
+        if symbol == "FAIL":
+            raise HTTPException(status_code=404, detail=f"Stock symbol {symbol} not found")
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(symbol)
+            raise
+
+    monkeypatch.setattr(analysis, "fetch_stock_data", fetch_stock_data)
+
+    async def main():
+        request = BatchAnalysisRequest(symbols=["SLOW1", "FAIL", "SLOW2"], include_sentiment=False)
+        response = await analysis.analyze_batch(request, None, None, None, None, None)
+        body = response.body_iterator
+        first = json.loads(await body.__anext__())
+        # The client goes away: the stream is closed while two fetches are still running
+        await body.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    assert asyncio.run(main())["symbol"] == "FAIL"
+    assert sorted(cancelled) == ["SLOW1", "SLOW2"]
+
+
+def record_compute(monkeypatch):
+    """Wraps ``compute.run`` to keep the arguments of every job"""
+    calls = []
+    run = analysis.compute.run
+
+    async def recording(fn, *args, **kwargs):
+        calls.append(args)
+        return await run(fn, *args, **kwargs)
+
+    monkeypatch.setattr(analysis.compute, "run", recording)
+    return calls
+
+
+def test_batch_sends_the_series_to_compute_as_one_matrix(client, monkeypatch):
+    client, _ = client
+    calls = record_compute(monkeypatch)
+    events = stream(client, ["AAA", "BBB", "CCC"], include_sentiment=False)
+
+    assert events[-1]["count"] == 3
+    [(prices, volumes)] = calls
+    for matrix in (prices, volumes):
+        assert isinstance(matrix, np.ndarray) and matrix.dtype == np.float64 and matrix.shape[0] == 3
+
+
+def test_batch_sends_uneven_series_as_arrays(client, alpha_vantage, monkeypatch):
+    client, _ = client
+    alpha_vantage.closes["DDD"] = list(np.linspace(50, 55, 12))
+    calls = record_compute(monkeypatch)
+    events = stream(client, ["AAA", "DDD"], include_sentiment=False)
+
+    assert events[-1]["count"] == 2
+    [(prices, volumes)] = calls
+    assert [len(row) for row in prices] == [20, 12] and [len(row) for row in volumes] == [20, 12]
+    for row in prices + volumes:
+        assert isinstance(row, np.ndarray) and row.dtype == np.float64
+
+
+def test_single_analysis_sends_the_series_to_compute_as_arrays(alpha_vantage, monkeypatch):
+    alpha_vantage.closes["AAA"] = list(np.linspace(50, 60, 40))
+    calls = record_compute(monkeypatch)
+    request = AnalysisRequest(symbol="AAA", mode="fast", include_sentiment=False)
+    stock_data, technical_indicators = asyncio.run(
+        analysis.gather_market_context(request, TechnicalAnalysisService()))
+
+    assert technical_indicators is not None and "technical_indicators" in stock_data
+    [(prices, volumes)] = calls
+    for series in (prices, volumes):
+        assert isinstance(series, np.ndarray) and series.dtype == np.float64 and series.shape == (20,)
@@ -0,0 +1,114 @@
+# services/analysis-service/tests/test_compute.py
+import asyncio
+import os
+import pickle
+import threading
+
+import numpy as np
+import pytest
+
+from app.telemetry.metrics import metrics
+from app.utils.compute import ComputeExecutor, SharedArray, _call, job_cost
+
+
+def describe(values, scale=1.0):
+    """Where the job ran and what its array argument looked like there"""
+    return {
+        "pid": os.getpid(),
+        "thread": threading.get_ident(),
+        "writeable": values.flags.writeable if isinstance(values, np.ndarray) else None,
+        "type": type(values).__name__,
+        "total": float(np.sum(values)) * scale
+    }
+
+
+@pytest.fixture
+def executor():
+    executor = ComputeExecutor(workers=1, inline_cost=1000, shm_min_bytes=1024)
+    yield executor
+    executor.shutdown()
+
+
+def test_job_cost_counts_elements():
+    assert job_cost(np.zeros((10, 5))) == 50
+    assert job_cost([np.zeros(4), np.zeros(4), np.zeros(4)]) == 12
+    assert job_cost([[1.0, 2.0], [3.0, 4.0]], {"a": np.zeros(7)}, "text", 3) == 4 + 7
+    assert job_cost([]) == 0
+
+
+def jobs(mode):
+    return metrics.compute_jobs_total.get(mode=mode)
+
+
+def test_cheap_jobs_run_inline(executor):
+    before = jobs("inline")
+    result = asyncio.run(executor.run(describe, np.arange(10.0)))
+    assert result["pid"] == os.getpid() and result["thread"] == threading.get_ident()
+    assert result["writeable"] and result["total"] == 45
+    assert jobs("inline") - before == 1
+
+
+def test_without_workers_expensive_jobs_run_on_a_thread():
+    executor = ComputeExecutor(workers=0, inline_cost=1000, shm_min_bytes=1024)
+    before = jobs("thread")
+    result = asyncio.run(executor.run(describe, np.arange(5000.0)))
+    assert result["pid"] == os.getpid() and result["thread"] != threading.get_ident()
+    # The array itself is passed: no shared memory without processes
+    assert result["writeable"]
+    assert jobs("thread") - before == 1
+
+
+def test_expensive_jobs_run_in_a_process_over_shared_memory(executor):
+    before = jobs("process")
+    values = np.arange(5000.0)
+    result = asyncio.run(executor.run(describe, values, scale=2.0))
+    assert result["pid"] != os.getpid()
+    # The worker maps the block read-only instead of unpickling a copy
+    assert result["type"] == "ndarray" and result["writeable"] is False
+    assert result["total"] == 2 * values.sum()
+    assert jobs("process") - before == 1
+
+    # An explicit cost overrides the estimate either way
+    assert asyncio.run(executor.run(describe, values, cost=10))["pid"] == os.getpid()
+    assert asyncio.run(executor.run(describe, np.arange(10.0), cost=10 ** 6))["pid"] != os.getpid()
+
+
+def test_shared_arrays_round_trip(executor):
+    values = np.arange(2000, dtype=np.float64).reshape(40, 50)[:, ::2]
+    small = np.arange(10.0)
+
+    async def main():
+        async with executor.share(values, small, [1, 2]) as handles:
+            shared, passed, items = handles
+            assert isinstance(shared, SharedArray) and passed is small and items == [1, 2]
+            assert shared.shape == (40, 25) and shared.size == 1000 and shared.local is values
+            # Handles pickle without the local array
+            copy = pickle.loads(pickle.dumps(shared))
+            assert copy.local is None and copy.name == shared.name
+            block, view = copy.attach()
+            try:
+                np.testing.assert_array_equal(view, values)
+                assert not view.flags.writeable
+            finally:
+                del view
+                block.close()
+            # What a worker does: attach, call, pickle the result
+            assert pickle.loads(_call(np.sum, (copy,), {})) == values.sum()
+            return shared
+
+    shared = asyncio.run(main())
+    # The blocks are freed once the share block exits
+    with pytest.raises(FileNotFoundError):
+        shared.attach()
+
+
+def test_object_arrays_and_small_arrays_are_not_shared(executor):
+    blocks, handles = executor._export((np.array(["a"] * 500, dtype=object), np.zeros(10), np.zeros(1000)))
+    try:
+        assert len(blocks) == 1
+        assert handles[0].dtype == object and isinstance(handles[1], np.ndarray)
+        assert isinstance(handles[2], SharedArray)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
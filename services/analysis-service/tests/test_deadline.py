@@ -0,0 +1,187 @@
+# services/analysis-service/tests/test_deadline.py
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.middleware.deadline import DeadlineMiddleware, parse_route_budgets
+from app.services.market_data_service import MarketDataService
+from app.utils import deadline
+from app.utils.hedging import Hedger
+
+
+def run_with_deadline(seconds, coro_factory):
+    async def run():
+        tokens = deadline.begin(seconds)
+        try:
+            return await coro_factory()
+        finally:
+            deadline.end(tokens)
+    return asyncio.run(run())
+
+
+def test_no_deadline_leaves_defaults_alone():
+    assert deadline.remaining() is None
+    assert deadline.timeout(30.0) == 30.0
+    deadline.ensure(1000.0, "anything")
+    assert not deadline.expired()
+
+
+def test_timeouts_and_stages_are_bounded_by_the_time_left():
+    tokens = deadline.begin(2.0)
+    try:
+        assert 0 < deadline.timeout(30.0) <= 2.0
+        assert deadline.timeout(0.5) == 0.5
+        deadline.ensure(1.0, "sentiment")
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.ensure(5.0, "the LLM narrative")
+        with deadline.unbounded():
+            assert deadline.timeout(30.0) == 30.0
+        deadline.skip("sentiment")
+        deadline.skip("sentiment")
+        assert deadline.skipped() == ["sentiment"]
+    finally:
+        deadline.end(tokens)
+    assert deadline.skipped() == []
+
+    tokens = deadline.begin(0.0)
+    try:
+        assert deadline.expired()
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.timeout(30.0)
+    finally:
+        deadline.end(tokens)
+
+
+def test_route_budgets_prefer_the_longest_prefix():
+    budgets = parse_route_budgets("/analysis/stock=150, /analysis/stock/stream=300,/bad,/batch/=900")
+    assert budgets == [("/analysis/stock/stream", 300.0), ("/analysis/stock", 150.0), ("/batch", 900.0)]
+
+
+@pytest.mark.parametrize("path, header, expected", [
+    ("/analysis/stock", None, 150.0),
+    ("/analysis/stock/stream", None, 300.0),
+    ("/analysis/stock", b"20", 20.0),
+    ("/analysis/stock", b"9999", 150.0),
+    ("/analysis/stockx", b"not-a-number", None),
+    ("/health", None, None)
+])
+def test_middleware_sets_the_request_deadline(monkeypatch, path, header, expected):
+    monkeypatch.setattr(settings, "DEADLINE_ROUTE_BUDGETS", "/analysis/stock=150,/analysis/stock/stream=300")
+    monkeypatch.setattr(settings, "DEADLINE_RESERVE", 0.25)
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(deadline.remaining())
+
+    headers = [(b"x-request-timeout", header)] if header is not None else []
+    asyncio.run(DeadlineMiddleware(app)({"type": "http", "path": path, "headers": headers}, None, None))
+
+    if expected is None:
+        assert seen == [None]
+    else:
+        assert expected - 0.25 - 1 < seen[0] <= expected - 0.25
+    assert deadline.remaining() is None
+
+
+def test_upstream_timeouts_follow_the_deadline(alpha_vantage, history_store):
+    alpha_vantage.closes["AAPL"] = [100.0, 101.0, 102.0]
+    service = MarketDataService(history_store)
+    run_with_deadline(2.0, lambda: service._fetch_series("AAPL", "daily", "compact"))
+    run_with_deadline(None, lambda: service._fetch_series("AAPL", "daily", "compact"))
+
+    bounded, unbounded = (request.extensions["timeout"]["read"] for request in alpha_vantage.requests)
+    assert 0 < bounded <= 2.0
+    assert unbounded == 30.0
+
+
+def test_shared_history_syncs_outlive_the_callers_deadline(alpha_vantage, history_store):
+    alpha_vantage.closes["AAPL"] = [100.0, 101.0, 102.0]
+    service = MarketDataService(history_store)
+    history = run_with_deadline(2.0, lambda: service.get_history("AAPL"))
+    assert history["close"].tolist() == [100.0, 101.0, 102.0]
+    # The sync is shared with other callers, so no one caller's deadline bounds it
+    [request] = alpha_vantage.requests
+    assert request.extensions["timeout"]["read"] == 30.0
+
+
+def test_stale_history_is_served_when_the_deadline_has_passed(alpha_vantage, history_store, store_closes, monkeypatch):
+    store_closes("AAPL", [100.0, 101.0])
+    monkeypatch.setattr(history_store, "last_fetched", lambda symbol, interval: time.time() - 10 * settings.CACHE_TTL)
+    alpha_vantage.closes["AAPL"] = [100.0, 101.0, 102.0]
+
+    async def stale():
+        history = await MarketDataService(history_store).get_history("AAPL")
+        return history, deadline.skipped()
+
+    history, skipped = run_with_deadline(0.0, stale)
+    assert history["close"].tolist() == [100.0, 101.0]
+    assert skipped == ["history_refresh"]
+    assert alpha_vantage.requests == []
+
+    # With nothing stored there is nothing to fall back on
+    with pytest.raises(deadline.DeadlineExceeded):
+        run_with_deadline(0.0, lambda: MarketDataService(history_store).get_history("MSFT"))
+
+
+def make_hedger(monkeypatch, latency=0.01, samples=20):
+    monkeypatch.setattr(settings, "HEDGE_ENABLED", True)
+    hedger = Hedger("test", quantile=0.95, max_ratio=1.0, min_samples=samples)
+    hedger._latencies.extend([latency] * samples)
+    return hedger
+
+
+def test_a_slow_call_is_hedged_and_the_faster_copy_wins(monkeypatch):
+    hedger = make_hedger(monkeypatch)
+    delays = [1.0, 0.0]
+    started = []
+
+    async def attempt():
+        delay = delays[len(started)]
+        started.append(delay)
+        await asyncio.sleep(delay)
+        return delay
+
+    began = time.perf_counter()
+    assert asyncio.run(hedger.run(attempt)) == 0.0
+    assert time.perf_counter() - began < 0.5
+    assert started == [1.0, 0.0] and hedger.hedged == 1
+
+
+def test_no_hedging_without_samples_or_time(monkeypatch):
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    # Too few latencies seen to know what slow is
+    hedger = make_hedger(monkeypatch)
+    hedger.min_samples = 50
+    assert asyncio.run(hedger.run(attempt)) == "done"
+    # The deadline would pass before the hedge is due
+    hedger = make_hedger(monkeypatch, latency=0.5)
+    assert run_with_deadline(0.3, lambda: hedger.run(attempt)) == "done"
+    # The second copy must be admitted, e.g. by the rate limiter
+    hedger = make_hedger(monkeypatch)
+
+    async def refuse():
+        return False
+
+    assert asyncio.run(hedger.run(attempt, admit=refuse)) == "done"
+    assert len(calls) == 3 and hedger.hedged == 0
+
+
+def test_when_both_copies_fail_the_original_error_is_raised(monkeypatch):
+    hedger = make_hedger(monkeypatch)
+    errors = iter([ValueError("first"), KeyError("second")])
+
+    async def attempt():
+        error = next(errors)
+        await asyncio.sleep(0.05 if isinstance(error, ValueError) else 0.0)
+        raise error
+
+    with pytest.raises(ValueError, match="first"):
+        asyncio.run(hedger.run(attempt))
@@ -0,0 +1,92 @@
+# services/analysis-service/tests/test_fear_greed.py
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services import fear_greed_service
+from app.services.fear_greed_service import FearGreedService
+from app.services.market_data_service import MarketDataError
+from app.services.sentiment_service import SentimentService
+from app.services.technical_analysis import TechnicalAnalysisService
+from app.utils import cache
+
+
+def history(start, end, bars=150):
+    return {
+        "close": np.linspace(start, end, bars),
+        "volume": np.full(bars, 1e6),
+        "timestamp": np.arange(bars) * 86400 + 1_700_006_400
+    }
+
+
+class FakeMarketData:
+    def __init__(self, histories):
+        self.histories = histories
+
+    async def get_history(self, symbol, interval):
+        result = self.histories.get(symbol)
+        if isinstance(result, BaseException):
+            raise result
+        if result is None:
+            raise MarketDataError(f"No price history for {symbol}")
+        return result
+
+
+class FakeSentiment(SentimentService):
+    def __init__(self, articles):
+        super().__init__()
+        self.articles = articles
+        self.calls = []
+
+    async def analyze_news_sentiment(self, symbol, company_name=None):
+        self.calls.append(symbol)
+        count = self.articles.get(symbol, 0)
+        return {"score": 0.5 if count else 0.0, "article_count": count}
+
+
+def service(histories, articles=None):
+    return FearGreedService(FakeMarketData(histories), FakeSentiment(articles or {}), TechnicalAnalysisService())
+
+
+def test_a_failing_symbol_is_reported_without_failing_the_others():
+    fear_greed = service({"UP": history(50, 80), "DOWN": history(80, 50), "BROKEN": RuntimeError("disk full")})
+    computed = asyncio.run(fear_greed.compute(["up", "BROKEN", "down", "MISSING"]))
+
+    assert [row["symbol"] for row in computed["results"]] == ["UP", "DOWN"]
+    assert computed["results"][0]["score"] > computed["results"][1]["score"]
+    assert computed["errors"] == {
+        "BROKEN": "Failed to load data: disk full",
+        "MISSING": "No price history for MISSING"
+    }
+
+
+def test_cancellation_still_propagates():
+    fear_greed = service({"UP": history(50, 80), "STOP": asyncio.CancelledError()})
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(fear_greed.compute(["UP", "STOP"]))
+
+
+def test_news_scores_are_cached_and_empty_results_only_briefly(monkeypatch):
+    fear_greed = service({}, articles={"NEWS": 3})
+    clock = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+
+    assert asyncio.run(fear_greed._news_score("NEWS")) == 0.5
+    assert asyncio.run(fear_greed._news_score("QUIET")) is None
+    calls = fear_greed.sentiment.calls
+    assert calls == ["NEWS", "QUIET"]
+
+    # Within the short negative TTL both are served from the cache
+    clock[0] += fear_greed_service.NEWS_EMPTY_TTL - 1
+    asyncio.run(fear_greed._news_score("NEWS"))
+    asyncio.run(fear_greed._news_score("QUIET"))
+    assert calls == ["NEWS", "QUIET"]
+
+    # Past it, only the query without articles (perhaps a failed fetch) is retried
+    clock[0] += 2
+    fear_greed.sentiment.articles["QUIET"] = 2
+    assert asyncio.run(fear_greed._news_score("QUIET")) == 0.5
+    assert asyncio.run(fear_greed._news_score("NEWS")) == 0.5
+    assert calls == ["NEWS", "QUIET", "QUIET"]
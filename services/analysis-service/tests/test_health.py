@@ -0,0 +1,187 @@
+# services/analysis-service/tests/test_health.py
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.dependencies import get_health_service, get_ollama_service
+from app.resources import resources
+from app.services import health_service as health_module
+from app.services.health_service import DEGRADED, HEALTHY, UNHEALTHY, HealthService, ProbeWarning
+from main import app
+
+
+class Probes:
+    """Scripted probe outcomes per component: a dict of details, an exception, or ``"slow"``"""
+
+    def __init__(self, **outcomes):
+        self.outcomes = outcomes
+
+    def __call__(self):
+        return {name: self.probe(name) for name in self.outcomes}
+
+    def probe(self, name):
+        async def run():
+            outcome = self.outcomes[name]
+            if outcome == "slow":
+                await asyncio.sleep(1)
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        return run
+
+
+def service(probes, critical=("ollama",), interval=15.0, threshold=2):
+    health = HealthService(interval, timeout=0.05, failure_threshold=threshold, critical=list(critical))
+    health.probes = probes
+    return health
+
+
+def test_snapshot_aggregates_component_status():
+    probes = Probes(ollama={"model": "m"}, redis={}, newsapi={})
+    health = service(probes)
+    asyncio.run(health.probe_all())
+    assert health.status() == HEALTHY
+    components = health.components()
+    assert list(components) == ["newsapi", "ollama", "redis"]
+    assert components["ollama"]["model"] == "m" and components["ollama"]["error"] is None
+    assert components["redis"]["consecutive_failures"] == 0
+
+    # A wrong answer is degraded straight away, but never unhealthy
+    probes.outcomes["redis"] = ProbeWarning("unexpected reply")
+    for _ in range(3):
+        asyncio.run(health.probe_all())
+    assert health.components()["redis"]["status"] == DEGRADED
+    assert health.status() == DEGRADED
+
+
+def test_failures_turn_unhealthy_after_the_threshold():
+    probes = Probes(ollama=ConnectionError("refused\nsee https://example.invalid"), newsapi="slow")
+    health = service(probes)
+
+    asyncio.run(health.probe_all())
+    components = health.components()
+    assert components["ollama"]["status"] == DEGRADED and components["ollama"]["error"] == "refused"
+    # A probe that outlasts the timeout is a failure
+    assert components["newsapi"]["status"] == DEGRADED and components["newsapi"]["error"] == "TimeoutError"
+    assert health.readiness()["ready"]
+
+    asyncio.run(health.probe_all())
+    assert health.components()["ollama"]["status"] == UNHEALTHY
+    assert health.components()["ollama"]["consecutive_failures"] == 2
+    # Ollama is critical, the news provider isn't
+    assert health.status() == UNHEALTHY
+    assert health.readiness() == {"ready": False, "reasons": ["ollama is unhealthy: refused"]}
+
+    probes.outcomes["ollama"] = {}
+    asyncio.run(health.probe_all())
+    assert health.components()["ollama"]["status"] == HEALTHY
+    assert health.components()["ollama"]["consecutive_failures"] == 0
+    assert health.status() == DEGRADED and health.readiness()["ready"]
+
+
+def test_non_critical_failures_only_degrade():
+    health = service(Probes(ollama={}, postgres=ConnectionError("down")), threshold=1)
+    asyncio.run(health.probe_all())
+    assert health.components()["postgres"]["status"] == UNHEALTHY
+    assert health.status() == DEGRADED and health.readiness()["ready"]
+
+
+def test_readiness_waits_for_fresh_probes(monkeypatch):
+    health = service(Probes(ollama={}), interval=1.0)
+    assert health.readiness() == {"ready": False, "reasons": ["starting"]}
+    assert health.stale()
+
+    asyncio.run(health.probe_all())
+    assert health.readiness() == {"ready": True, "reasons": []}
+    assert health.readiness(draining=True) == {"ready": False, "reasons": ["draining"]}
+
+    # The prober stopped: after three missed rounds the snapshot isn't trusted
+    now = health_module.time.monotonic()
+    monkeypatch.setattr(health_module, "time", SimpleNamespace(monotonic=lambda: now + 3.1,
+                                                               perf_counter=health_module.time.perf_counter))
+    assert health.stale()
+    assert health.readiness()["reasons"] == ["health probes are stale"]
+
+
+def test_disabled_probes_are_never_stale():
+    health = service(Probes(ollama=ConnectionError("down")), interval=0, threshold=1)
+    assert not health.enabled() and not health.stale()
+    assert health.readiness()["ready"]
+
+
+def test_background_prober_runs_immediately():
+    probes = Probes(ollama={})
+    health = service(probes, interval=0.05)
+
+    async def main():
+        health.start()
+        await asyncio.sleep(0.01)
+        first = health.components()["ollama"]["checked_at"]
+        await asyncio.sleep(0.08)
+        second = health.components()["ollama"]["checked_at"]
+        await health.stop()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first != second and health._task is None
+
+
+def ollama_tags(models):
+    def handler(request):
+        assert request.url.path == "/api/tags"
+        return httpx.Response(200, json={"models": [{"name": name, "size": 1, "modified_at": "x"} for name in models]})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_ollama_probe_reports_missing_models(monkeypatch):
+    monkeypatch.setattr(settings, "OLLAMA_MODEL", "big")
+    monkeypatch.setattr(settings, "OLLAMA_FAST_MODEL", "small")
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "RETRIEVAL_ENABLED", False)
+    health = HealthService(15.0, 1.0, 2, ["ollama"])
+
+    monkeypatch.setattr(resources, "_http", ollama_tags(["big:latest", "small"]))
+    asyncio.run(health._check("ollama", health._probe_ollama))
+    assert health.components()["ollama"]["status"] == HEALTHY
+    assert [model["name"] for model in health.models] == ["big:latest", "small"]
+
+    monkeypatch.setattr(resources, "_http", ollama_tags(["big"]))
+    asyncio.run(health._check("ollama", health._probe_ollama))
+    assert health.components()["ollama"]["status"] == DEGRADED
+    assert health.components()["ollama"]["error"] == "Model(s) not pulled: small"
+
+
+@pytest.fixture
+def client():
+    health = service(Probes(ollama=ConnectionError("refused"), redis={}), threshold=1)
+    asyncio.run(health.probe_all())
+    ollama = SimpleNamespace(draining=False)
+    app.dependency_overrides.update({get_health_service: lambda: health, get_ollama_service: lambda: ollama})
+    yield TestClient(app), health
+    app.dependency_overrides.clear()
+
+
+def test_health_endpoints_read_the_snapshot(client):
+    client, health = client
+    probes = health.probes
+    health.probes = lambda: pytest.fail("endpoints must not probe")
+
+    detailed = client.get("/health/detailed").json()
+    assert detailed["status"] == UNHEALTHY and detailed["stale"] is False
+    assert detailed["components"]["ollama"]["status"] == UNHEALTHY
+    assert detailed["components"]["ollama"]["url"] == settings.OLLAMA_URL
+    assert detailed["components"]["redis"]["status"] == HEALTHY
+
+    ready = client.get("/health/ready")
+    assert ready.status_code == 503 and ready.headers["cache-control"] == "no-store"
+    assert ready.json()["reasons"] == ["ollama is unhealthy: refused"]
+    assert client.get("/health/live").json()["status"] == "healthy"
+
+    health.probes = probes
+    probes.outcomes["ollama"] = {}
+    asyncio.run(health.probe_all())
+    assert client.get("/health/ready").status_code == 200
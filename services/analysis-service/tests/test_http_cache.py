@@ -0,0 +1,147 @@
+# services/analysis-service/tests/test_http_cache.py
+import gzip
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.dependencies import (
+    get_analysis_store,
+    get_market_data_service,
+    get_ollama_service,
+    get_retrieval_service,
+    get_semantic_cache,
+    get_sentiment_service
+)
+from app.services.market_data_service import MarketDataService
+from app.utils.http_cache import make_etag, not_modified
+from main import app
+
+NARRATIVE = {"recommendation": "Buy", "confidence": 0.7, "summary": "Steady trend", "key_points": ["volume up"]}
+
+
+class FakeOllama:
+    model = "test-model"
+
+    def __init__(self):
+        self.prompts = []
+
+    def response_format(self, schema_model):
+        return "json"
+
+    async def generate(self, prompt, system_prompt=None, max_tokens=None, response_format=None):
+        self.prompts.append(prompt)
+        return json.dumps(NARRATIVE)
+
+
+class FakeSentiment:
+    def __init__(self):
+        self.symbols = []
+
+    async def analyze_news_sentiment(self, symbol):
+        self.symbols.append(symbol)
+        return {"overall_sentiment": "neutral", "confidence": 0.5, "sources": ["Reuters"], "summary": "Mixed coverage"}
+
+
+def request_with(if_none_match):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_etags_are_weak_and_stable():
+    etag = make_etag("AAPL", {"b": 1, "a": [1, 2]}, np.arange(3))
+    assert etag.startswith('W/"') and etag == make_etag("AAPL", {"a": [1, 2], "b": 1}, np.arange(3))
+    assert etag != make_etag("AAPL", {"b": 1, "a": [1, 2]}, np.arange(3, dtype=np.float64))
+    assert etag != make_etag("AAPL", {"b": 2, "a": [1, 2]}, np.arange(3))
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('W/"other", W/"abc"', True),
+    ('W/"other"', False),
+    ("*", True)
+])
+def test_if_none_match_uses_weak_comparison(header, matches):
+    assert not_modified(request_with(header), 'W/"abc"') is matches
+
+
+@pytest.fixture
+def services(alpha_vantage, history_store):
+    ollama, sentiment = FakeOllama(), FakeSentiment()
+    market_data = MarketDataService(history_store)
+    app.dependency_overrides.update({
+        get_ollama_service: lambda: ollama,
+        get_sentiment_service: lambda: sentiment,
+        get_market_data_service: lambda: market_data,
+        get_analysis_store: lambda: None,
+        get_semantic_cache: lambda: None,
+        get_retrieval_service: lambda: None
+    })
+    yield ollama, sentiment
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client():
+    # No lifespan: background probes and model preloads stay off
+    return TestClient(app)
+
+
+def test_analysis_revalidates_before_news_and_llm_work(alpha_vantage, services, client):
+    ollama, sentiment = services
+    alpha_vantage.closes["AAPL"] = list(np.linspace(100, 120, 60))
+    body = {"symbol": "AAPL", "mode": "full", "include_news": False}
+
+    first = client.post("/analysis/stock", json=body)
+    assert first.status_code == 200 and first.json()["success"], first.json()
+    assert first.json()["data"]["narrative_status"] == "generated"
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    again = client.post("/analysis/stock", json=body, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    assert len(ollama.prompts) == 1 and len(sentiment.symbols) == 1
+
+    # Another mode is another response
+    fast = client.post("/analysis/stock", json={**body, "mode": "fast"}, headers={"If-None-Match": etag})
+    assert fast.status_code == 200 and fast.headers["etag"] != etag
+
+    # New market data invalidates the tag
+    alpha_vantage.closes["AAPL"].append(125.0)
+    changed = client.post("/analysis/stock", json=body, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert len(ollama.prompts) == 2
+
+
+def test_responses_missing_skipped_stages_carry_no_etag(alpha_vantage, services, client):
+    alpha_vantage.closes["AAPL"] = list(np.linspace(100, 120, 60))
+    # Less time than an LLM narrative needs: the response leaves it out
+    response = client.post("/analysis/stock", json={"symbol": "AAPL", "include_news": False},
+                           headers={"X-Request-Timeout": "3"})
+    assert response.json()["skipped"] == ["llm_generate"]
+    assert "etag" not in response.headers
+    assert services[0].prompts == []
+
+
+def test_technical_series_revalidate_and_compress(alpha_vantage, services, client):
+    alpha_vantage.closes["MSFT"] = list(100 + np.sin(np.arange(300) / 7) * 10)
+    url = "/analysis/technical/MSFT?period=6m&indicators=rsi,sma"
+
+    first = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    etag = first.headers["etag"]
+    assert first.json()["points"] > 100
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    other = client.get(url.replace("sma", "ema"), headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["etag"] != etag
+    # Weak tags survive a change of encoding
+    identity = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert identity.headers["etag"] == etag and "content-encoding" not in identity.headers
+    assert len(gzip.compress(identity.content)) < len(identity.content)
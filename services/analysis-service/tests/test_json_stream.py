@@ -0,0 +1,69 @@
+# services/analysis-service/tests/test_json_stream.py
+import json
+
+import pytest
+
+from app.utils.json_stream import IncrementalJSONParser, parse_json_object
+
+REPLY = {
+    "summary": "Strong quarter, \"beat\" estimates {again}",
+    "score": 7.5,
+    "risks": ["rates", {"name": "supply", "weight": [1, 2]}],
+    "outlook": {"short_term": "neutral", "notes": "a, b: c"},
+    "confident": True,
+    "target": None
+}
+
+
+def test_one_shot_parse_matches_json_loads():
+    text = json.dumps(REPLY)
+    assert parse_json_object(text) == REPLY
+    assert parse_json_object(json.dumps(REPLY, indent=2)) == REPLY
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_fields_are_reported_once_as_soon_as_they_complete(size):
+    text = json.dumps(REPLY)
+    parser = IncrementalJSONParser()
+    completed = []
+    for start in range(0, len(text), size):
+        chunk = text[start:start + size]
+        for key, value in parser.feed(chunk):
+            completed.append(key)
+            assert value == REPLY[key]
+            encoded = json.dumps(value)
+            end = text.index(f'"{key}": {encoded}') + len(f'"{key}": {encoded}')
+            if isinstance(value, (str, list, dict)):
+                # Reported by the chunk holding the closing quote or bracket, not later
+                assert start < end <= start + size
+
+    assert completed == list(REPLY)
+    assert parser.done
+    assert parser.result() == REPLY
+
+
+def test_string_field_completes_on_its_closing_quote():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"summary": "partial') == []
+    assert parser.feed(' text"') == [("summary", "partial text")]
+    # Numbers only end at the next delimiter
+    assert parser.feed(', "score": 12') == []
+    assert parser.feed('}') == [("score", 12)]
+    assert parser.feed('{"ignored": 1}') == []
+
+
+def test_text_around_the_object_is_ignored():
+    assert parse_json_object('```json\n{"a": [1, "]"]}\n```') == {"a": [1, "]"]}
+
+
+@pytest.mark.parametrize("text", [
+    '{"a": 1',
+    '{"a": }',
+    '{"a"}',
+    '{"a": 1 "b": 2}',
+    '{"a": tru}',
+    'no object here'
+])
+def test_malformed_replies_raise_value_error(text):
+    with pytest.raises(ValueError):
+        parse_json_object(text)
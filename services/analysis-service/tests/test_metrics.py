@@ -0,0 +1,81 @@
+# services/analysis-service/tests/test_metrics.py
+from app.telemetry.metrics import (
+    MetricsRegistry,
+    begin_server_timing,
+    current_server_timings,
+    end_server_timing,
+    metrics,
+    stage
+)
+
+
+def test_counter_and_gauge_render_labelled_samples():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_requests_total", "Requests", ("route",))
+    counter.inc(route="/a")
+    counter.inc(2, route="/a")
+    counter.inc(route='/b"quoted"')
+    gauge = registry.gauge("test_in_flight", "In flight")
+    gauge.inc()
+    gauge.dec()
+    gauge.set(3)
+
+    text = registry.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{route="/a"} 3.0' in text
+    assert 'test_requests_total{route="/b\\"quoted\\""} 1.0' in text
+    assert "test_in_flight 3" in text
+
+
+def test_registering_a_name_twice_returns_the_existing_metric():
+    registry = MetricsRegistry()
+    first = registry.counter("test_total", "Total")
+    assert registry.counter("test_total", "Total") is first
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+
+    lines = registry.render().splitlines()
+    assert "test_seconds_bucket{le=\"0.1\"} 2.0" in lines
+    assert "test_seconds_bucket{le=\"1.0\"} 3.0" in lines
+    assert "test_seconds_bucket{le=\"+Inf\"} 4.0" in lines
+    assert "test_seconds_count 4.0" in lines
+    assert "test_seconds_sum 5.65" in lines
+    assert histogram.count() == 4
+
+
+def test_cache_hit_ratio_per_cache():
+    registry = MetricsRegistry()
+    for hit in (True, True, False, True):
+        registry.record_cache("quotes", hit)
+    registry.record_cache("news", False)
+
+    assert registry.cache_hit_ratios() == {"quotes": 0.75, "news": 0.0}
+    assert 'analysis_cache_hit_ratio{cache="quotes"} 0.75' in registry.render()
+
+
+def test_stage_records_latency_server_timing_and_errors():
+    before = metrics.stage_duration.count(stage="test_stage")
+    errors = metrics.errors_total.get(stage="test_stage", error="KeyError")
+    token = begin_server_timing()
+    try:
+        with stage("test_stage"):
+            pass
+        try:
+            with stage("test_stage"):
+                raise KeyError("missing")
+        except KeyError:
+            pass
+        timings = current_server_timings()
+    finally:
+        end_server_timing(token)
+
+    assert [name for name, _ in timings] == ["test_stage", "test_stage"]
+    assert metrics.stage_duration.count(stage="test_stage") == before + 2
+    assert metrics.errors_total.get(stage="test_stage", error="KeyError") == errors + 1
+    # Outside a request there is nowhere to put Server-Timing entries
+    assert current_server_timings() == []
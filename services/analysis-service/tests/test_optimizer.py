@@ -0,0 +1,166 @@
+# services/analysis-service/tests/test_optimizer.py
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.optimizer import PortfolioOptimizer, optimize, portfolio_stats, project
+from app.services.risk import RiskService
+
+COVARIANCE = np.array([
+    [0.04, 0.006, 0.004],
+    [0.006, 0.09, 0.012],
+    [0.004, 0.012, 0.0625]
+])
+MEAN = np.array([0.06, 0.11, 0.08])
+
+
+class NoMarketData:
+    async def get_history(self, symbol, interval):
+        from app.services.market_data_service import MarketDataError
+        raise MarketDataError(f"No {interval} history for {symbol}")
+
+
+def run(current=None, lower=0.0, upper=1.0, radius=None, warm=None, points=20):
+    n = len(MEAN)
+    current = np.full(n, 1.0 / n) if current is None else current
+    return optimize(MEAN, COVARIANCE, current, np.full(n, lower), np.full(n, upper), radius,
+                    0.02, points, 5000, warm)
+
+
+def reference_projection(v, lower, upper, center, radius):
+    """Bisection on the shrinkage ``t`` the projection is defined by"""
+    def moved(t):
+        offset = v - center
+        return np.clip(center + np.sign(offset) * np.clip(np.abs(offset) - t, 0, None), lower, upper)
+
+    low, high = 0.0, float(np.abs(v - center).max())
+    if np.abs(np.clip(v, lower, upper) - center).sum() <= radius:
+        return np.clip(v, lower, upper)
+    for _ in range(200):
+        middle = (low + high) / 2
+        low, high = (low, middle) if np.abs(moved(middle) - center).sum() <= radius else (middle, high)
+    return moved(high)
+
+
+def test_projection_matches_a_bisection():
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        n = int(rng.integers(2, 8))
+        v = rng.normal(0, 0.5, n)
+        center = rng.dirichlet(np.ones(n))
+        lower, upper = np.zeros(n), np.full(n, rng.uniform(0.3, 1.0))
+        radius = float(rng.uniform(0.01, 1.0))
+        projected = project(v, lower, upper, center, radius)
+        if np.abs(np.clip(center, lower, upper) - center).sum() > radius:
+            # The box is out of reach: the nearest point of the box to the current weights
+            np.testing.assert_allclose(projected, np.clip(center, lower, upper))
+            continue
+        assert np.all(projected >= lower - 1e-12) and np.all(projected <= upper + 1e-12)
+        assert np.abs(projected - center).sum() <= radius + 1e-9
+        np.testing.assert_allclose(projected, reference_projection(v, lower, upper, center, radius), atol=1e-9)
+    # Without a turnover ball the projection is plain clipping
+    np.testing.assert_array_equal(project(np.array([-1.0, 0.5, 2.0]), np.zeros(3), np.ones(3), np.zeros(3), None),
+                                  [0.0, 0.5, 1.0])
+
+
+def test_unconstrained_solutions_match_the_closed_forms():
+    result = run(lower=-10.0, upper=10.0)
+    inverse = np.linalg.inv(COVARIANCE)
+
+    min_variance = inverse.sum(axis=1) / inverse.sum()
+    np.testing.assert_allclose(result["min_variance"][0], min_variance, atol=1e-5)
+
+    # The tangency portfolio; golden-section refinement gets close in weight and closer in Sharpe
+    tangency = inverse @ (MEAN - 0.02)
+    tangency /= tangency.sum()
+    best = portfolio_stats(tangency, MEAN, COVARIANCE, 0.02)["sharpe"]
+    weights, stats = result["max_sharpe"]
+    assert stats["sharpe"] == pytest.approx(best, rel=1e-4)
+    np.testing.assert_allclose(weights, tangency, atol=0.02)
+    assert all(stats["sharpe"] >= point["sharpe"] - 1e-9 for _, point in result["frontier"])
+    assert result["violation"] < 1e-6
+
+
+def test_frontier_trades_risk_for_return():
+    result = run()
+    points = [stats for _, stats in result["frontier"]]
+    assert len(points) == 20
+    assert points[0]["volatility"] == pytest.approx(result["min_variance"][1]["volatility"])
+    returns = [point["expected_return"] for point in points]
+    volatilities = [point["volatility"] for point in points]
+    assert returns == sorted(returns) and volatilities == sorted(volatilities)
+    for weights, _ in result["frontier"]:
+        assert weights.sum() == pytest.approx(1.0) and np.all(weights >= -1e-7)
+    # The highest risk aversion piles into the best-returning asset
+    assert result["frontier"][-1][0][1] > 0.9
+
+
+def test_bounds_and_turnover_are_respected():
+    current = np.array([0.7, 0.1, 0.2])
+    result = run(current=current, upper=0.5, radius=2 * 0.3)
+    for weights, _ in [*result["frontier"], result["max_sharpe"]]:
+        assert np.all(weights <= 0.5 + 1e-6) and weights.sum() == pytest.approx(1.0)
+        assert np.abs(weights - current).sum() / 2 <= 0.3 + 1e-6
+    assert result["violation"] < 1e-4
+
+
+def test_warm_start_cuts_the_iterations():
+    cold = run()
+    warm = run(warm=cold["state"])
+    assert warm["iterations"] < cold["iterations"] / 3
+    np.testing.assert_allclose(warm["max_sharpe"][0], cold["max_sharpe"][0], atol=1e-5)
+
+
+def stored_returns(store_closes, symbols, seed=5):
+    rng = np.random.default_rng(seed)
+    for index, symbol in enumerate(symbols):
+        daily = rng.normal(0.0004 * (index + 1), 0.01 + 0.004 * index, 300)
+        store_closes(symbol, 100 * np.exp(np.cumsum(daily)))
+
+
+def test_default_constraints(history_store, store_closes):
+    symbols = ["AAA", "BBB", "CCC", "DDD"]
+    stored_returns(store_closes, symbols)
+    optimizer = PortfolioOptimizer(RiskService(NoMarketData(), history_store))
+
+    # Nearly everything in one stock: the cap forces selling down to 40%
+    holdings = {"AAA": {"value": 9000}, "BBB": {"value": 500}, "CCC": {"value": 300}, "DDD": {"value": 200}}
+    result = asyncio.run(optimizer.optimize(holdings))
+    assert result["constraints"] == {"min_weight": 0.0, "max_weight": 0.4, "max_turnover": 0.5}
+    for target in ("min_variance", "max_sharpe"):
+        assert max(result[target]["weights"].values()) <= 0.4 + 1e-6
+        assert result[target]["turnover"] <= 0.5 + 1e-6
+    assert result["warm_start"] is False
+    assert sum(trade["value"] for trade in result["trades"]) == pytest.approx(0, abs=0.1)
+    assert asyncio.run(optimizer.optimize(holdings))["warm_start"] is True
+
+    # Balanced holdings keep the configured turnover limit
+    balanced = {symbol: {"value": 2500} for symbol in symbols}
+    assert asyncio.run(optimizer.optimize(balanced))["constraints"]["max_turnover"] == 0.25
+
+    # Two holdings can't both stay under 40%
+    pair = asyncio.run(optimizer.optimize({"AAA": {"value": 1}, "BBB": {"value": 1}}))
+    assert pair["constraints"]["max_weight"] == 0.5
+
+    # Passing 1 lifts both limits
+    free = asyncio.run(optimizer.optimize(holdings, max_weight=1, max_turnover=1))
+    assert free["constraints"] == {"min_weight": 0.0, "max_weight": 1.0, "max_turnover": 1.0}
+    assert free["max_sharpe"]["sharpe"] >= result["max_sharpe"]["sharpe"] - 1e-6
+
+
+def test_invalid_constraints_are_rejected(history_store, store_closes, monkeypatch):
+    stored_returns(store_closes, ["AAA", "BBB"])
+    optimizer = PortfolioOptimizer(RiskService(NoMarketData(), history_store))
+    holdings = {"AAA": {"value": 1}, "BBB": {"value": 1}}
+
+    with pytest.raises(ValueError, match="No fully invested portfolio"):
+        asyncio.run(optimizer.optimize(holdings, max_weight=0.3))
+    with pytest.raises(ValueError, match="not held"):
+        asyncio.run(optimizer.optimize(holdings, expected_returns={"ZZZ": 0.1}))
+    # An infeasible problem never converges: don't wait for every iteration
+    monkeypatch.setattr(settings, "OPTIMIZER_MAX_ITERATIONS", 200)
+    with pytest.raises(ValueError, match="can't all be met"):
+        asyncio.run(optimizer.optimize({"AAA": {"value": 9}, "BBB": {"value": 1}},
+                                       min_weight=0.4, max_turnover=0.1))
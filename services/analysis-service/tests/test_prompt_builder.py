@@ -0,0 +1,185 @@
+# services/analysis-service/tests/test_prompt_builder.py
+import math
+
+import pytest
+
+from app.services.prompt_builder import (
+    STOCK_SYSTEM_PROMPT,
+    PromptBuilder,
+    build_compare_prompt,
+    build_portfolio_prompt,
+    build_stock_prompt,
+    compact_value,
+    estimate_tokens,
+    is_missing,
+    percent
+)
+
+
+def test_token_estimate_counts_words_digits_and_symbols():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("price") == 2
+    assert estimate_tokens("P/E 12.5") == 1 + 1 + 1 + 4
+    assert estimate_tokens("a b c") == 3
+
+
+@pytest.mark.parametrize("value, text", [
+    (2_410_000_000_000, "2.41T"),
+    (52_300_000, "52.3M"),
+    (1_500_000_000, "1.5B"),
+    (150.25, "150.25"),
+    (150.0, "150"),
+    (0.031234, "0.0312"),
+    (-3, "-3"),
+    (True, "True"),
+    ("Tech", "Tech")
+])
+def test_compact_values(value, text):
+    assert compact_value(value) == text
+
+
+def test_missing_values():
+    assert all(is_missing(value) for value in (None, math.nan, "", " N/A ", "None", "-", {}, []))
+    assert not any(is_missing(value) for value in (0, 0.0, "0", False, [0]))
+    assert percent(0.0316) == "3.2%" and percent(0.03162, 2) == "3.16%"
+    assert percent(0) is None and percent(None) is None
+
+
+def test_sections_render_compactly():
+    builder = PromptBuilder("system", "HEADER", budget=10_000)
+    builder.fields("Price", {"last": 150.25, "change": None, "volume": 52_300_000, "nested": {"a": 1, "b": "n/a"}})
+    builder.fields("Empty", {"x": None, "y": ""})
+    builder.table("Rows", [{"symbol": "AAA", "pe": 12.5, "note": None}, {"symbol": "BBB", "pe": None}])
+    builder.text("Notes", "  first\nsecond  ")
+    assert builder.build() == "\n".join([
+        "HEADER",
+        "Price: last 150.25, volume 52.3M, nested.a 1",
+        "Rows (symbol|pe):",
+        "AAA|12.5",
+        "BBB|-",
+        "Notes:",
+        "first",
+        "second"
+    ])
+    assert builder.dropped == []
+    assert builder.estimated_tokens == estimate_tokens("system") + estimate_tokens(builder.build())
+
+
+def lines(count, word="row"):
+    return "\n".join(f"{word} {i} with some words in it" for i in range(count))
+
+
+def test_optional_sections_are_dropped_lowest_priority_first():
+    def builder(budget):
+        return (PromptBuilder("", "H", budget)
+                .text("Keep", "kept", required=True)
+                .text("High", lines(5), priority=3)
+                .text("LowFirst", lines(5), priority=1)
+                .text("Mid", lines(5), priority=2)
+                .text("LowLast", lines(5), priority=1))
+
+    full = builder(10_000)
+    full.build()
+
+    def cost(title):
+        return estimate_tokens(f"{title}:\n" + lines(5))
+
+    budget = full.estimated_tokens - cost("LowLast")
+    tight = builder(budget)
+    prompt = tight.build()
+    # Among equal priorities the section added last goes first
+    assert tight.dropped == ["LowLast"]
+    assert "LowFirst:" in prompt and tight.estimated_tokens <= budget
+
+    budget -= cost("LowFirst") + cost("Mid")
+    tighter = builder(budget)
+    prompt = tighter.build()
+    assert tighter.dropped == ["LowLast", "LowFirst", "Mid"]
+    assert "Keep:\nkept" in prompt and "High:" in prompt
+    assert tighter.estimated_tokens <= budget
+
+
+def test_required_sections_are_trimmed_not_dropped():
+    builder = PromptBuilder("", "H", budget=120)
+    builder.text("Optional", lines(3), priority=5)
+    builder.table("Holdings", [{"symbol": f"S{i:03}", "value": 1000 + i} for i in range(100)], required=True)
+    prompt = builder.build()
+
+    assert builder.dropped == ["Optional"]
+    assert builder.estimated_tokens <= 120
+    kept = [line for line in prompt.splitlines() if line.startswith("S")]
+    # The first rows survive and the rest are counted
+    assert kept == [f"S{i:03}|{1000 + i}" for i in range(len(kept))]
+    assert prompt.endswith(f"(+{100 - len(kept)} more rows)")
+    assert 0 < len(kept) < 100
+
+
+def test_the_longest_section_is_trimmed_first():
+    builder = PromptBuilder("", "H", budget=200)
+    builder.text("Short", lines(4), required=True)
+    builder.text("Long", lines(40), required=True)
+    prompt = builder.build()
+    assert "Short:\n" + lines(4) in prompt
+    assert "more rows)" in prompt and builder.estimated_tokens <= 200
+
+
+def test_at_least_one_row_of_each_section_is_kept():
+    builder = PromptBuilder("", "H", budget=5)
+    builder.fields("Totals", {"value": 100}, required=True)
+    builder.text("Rows", lines(10), required=True)
+    prompt = builder.build()
+    # Over budget, but nothing required disappears
+    assert prompt.splitlines()[:4] == ["H", "Totals: value 100", "Rows:", "row 0 with some words in it"]
+    assert prompt.endswith("(+9 more rows)")
+    assert builder.estimated_tokens > 5
+
+
+def test_stock_prompt_leaves_out_missing_data():
+    prompt = build_stock_prompt("AAPL", {
+        "name": "Apple", "sector": "Technology", "market_cap": 2_410_000_000_000, "price": 150.25,
+        "change_percent": 1.234, "pe_ratio": 0, "peg_ratio": None, "dividend_yield": 0.0052, "payout_ratio": "None"
+    })
+    assert "Company: name Apple, symbol AAPL, sector Technology, market cap 2.41T" in prompt
+    assert "Price: last 150.25, change +1.23%" in prompt
+    assert "Valuation" not in prompt and "payout" not in prompt
+    assert "Dividend: yield 0.52%" in prompt
+    assert estimate_tokens(STOCK_SYSTEM_PROMPT) + estimate_tokens(prompt) <= 1500
+
+
+def test_compare_prompt_uses_one_row_per_symbol():
+    prompt = build_compare_prompt({"AAA": {"price": 10, "pe_ratio": 12.5}, "BBB": {"price": 20, "pe_ratio": None}})
+    assert prompt.splitlines() == ["STOCK COMPARISON", "Stocks (symbol|price|pe_ratio):", "AAA|10|12.5", "BBB|20|-"]
+
+
+def test_untrimmed_sections_are_kept_whole():
+    builder = PromptBuilder("", "H", budget=100)
+    builder.table("Holdings", [{"symbol": f"S{i:03}", "value": 1000 + i} for i in range(40)], required=True)
+    builder.table("Trades", [{"symbol": f"T{i:03}", "value": i} for i in range(40)], required=True, trim=False)
+    prompt = builder.build()
+    assert all(f"T{i:03}|{i}" in prompt for i in range(40))
+    assert "(+" in prompt.split("Trades")[0] and "(+" not in prompt.split("Trades")[1]
+
+
+def test_rebalance_prompt_lists_every_trade_and_the_risk():
+    holdings = [{"symbol": f"S{i:02}", "value": 1000 + i, "weight": round(100 / 60, 2), "risk_share": 1.5}
+                for i in range(60)]
+    trades = [{"symbol": f"S{i:02}", "action": "buy" if i % 2 else "sell", "weight_from": 1.67,
+               "weight_to": 1.5 + i / 100, "value": 120.5 + i, "shares": 1.25} for i in range(60)]
+    data = {
+        "portfolio_id": 7,
+        "total_value": 61770.0,
+        "holdings": holdings,
+        "risk": {"horizon_days": 10, "var": {"0.95": 0.052, "0.99": 0.081}, "cvar": {"0.95": 0.067, "0.99": 0.094},
+                 "probability_of_loss": 0.46},
+        "rebalancing": {"objective": "max_sharpe", "turnover": 0.12},
+        "trades": trades
+    }
+    prompt = build_portfolio_prompt(data)
+    trade_lines = prompt.split("Trades (")[1].splitlines()[1:]
+    assert len(trade_lines) == 60 and "more rows" not in prompt.split("Trades (")[1]
+    for trade, line in zip(trades, trade_lines):
+        assert line.startswith(f"{trade['symbol']}|{trade['action']}|")
+    assert "Simulated risk: horizon_days 10, var.0.95 0.052, var.0.99 0.081, cvar.0.95 0.067" in prompt
+    assert "Rebalancing: objective max_sharpe" in prompt
+    # Holdings give way instead
+    assert "more rows)" in prompt.split("Trades (")[0]
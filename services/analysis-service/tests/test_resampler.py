@@ -0,0 +1,212 @@
+# services/analysis-service/tests/test_resampler.py
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from app.services import resampler as resampler_module
+from app.services.history_store import OHLCV_COLUMNS
+from app.services.market_data_service import MarketDataService, source_interval
+from app.services.resampler import MINUTE_TIMEFRAMES, TIMEFRAMES, Resampler, can_resample, resample
+
+EASTERN = ZoneInfo("US/Eastern")
+
+
+def session_bars(first_day, days, minutes=5, seed=0):
+    """Regular-session bars (09:30-16:00 Eastern) on the weekdays from ``first_day``"""
+    timestamps = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        start = datetime(day.year, day.month, day.day, 9, 30, tzinfo=EASTERN)
+        timestamps.extend(int((start + timedelta(minutes=m)).timestamp()) for m in range(0, 390, minutes))
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, len(timestamps))))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    spread = rng.uniform(0, 0.3, len(close))
+    return {
+        "timestamp": np.array(timestamps, dtype=np.int64),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(100, 10000, len(close)).astype(np.int64)
+    }
+
+
+def reference_label(timestamp, timeframe, zone):
+    """Bucket label computed one bar at a time with datetime arithmetic"""
+    local = datetime.fromtimestamp(int(timestamp), zone or timezone.utc)
+    seconds = MINUTE_TIMEFRAMES.get(timeframe)
+    if seconds is not None:
+        naive = local.replace(tzinfo=None)
+        floored = naive - timedelta(seconds=(naive - datetime(1970, 1, 1)).total_seconds() % seconds)
+        return int(floored.replace(tzinfo=local.tzinfo).timestamp())
+    day = local.date()
+    if timeframe == "weekly":
+        day -= timedelta(days=day.weekday())
+    elif timeframe == "monthly":
+        day = day.replace(day=1)
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def reference_resample(columns, timeframe, zone=None):
+    buckets = {}
+    for i, timestamp in enumerate(columns["timestamp"]):
+        buckets.setdefault(reference_label(timestamp, timeframe, zone), []).append(i)
+    labels = sorted(buckets)
+    return {
+        "timestamp": np.array(labels),
+        "open": np.array([columns["open"][buckets[label][0]] for label in labels]),
+        "high": np.array([columns["high"][buckets[label]].max() for label in labels]),
+        "low": np.array([columns["low"][buckets[label]].min() for label in labels]),
+        "close": np.array([columns["close"][buckets[label][-1]] for label in labels]),
+        "volume": np.array([columns["volume"][buckets[label]].sum() for label in labels])
+    }
+
+
+def assert_bars_equal(actual, expected):
+    for name in OHLCV_COLUMNS:
+        np.testing.assert_array_equal(actual[name], expected[name], err_msg=name)
+
+
+def test_can_resample():
+    assert can_resample("5min", "15min") and can_resample("5min", "60min") and can_resample("15min", "240min")
+    assert not can_resample("15min", "5min")
+    assert not can_resample("60min", "30min")
+    assert all(can_resample("1min", timeframe) for timeframe in ("daily", "weekly", "monthly"))
+    assert can_resample("daily", "weekly") and can_resample("daily", "monthly")
+    assert not can_resample("weekly", "monthly") and not can_resample("daily", "60min")
+    assert can_resample("monthly", "monthly")
+    assert not can_resample("5min", "2h") and not can_resample("tick", "daily")
+
+
+# 2024-03-04 to 2024-04-05 covers the switch to daylight saving time on 10 March and a month end
+@pytest.mark.parametrize("timeframe", [t for t in TIMEFRAMES if t not in ("1min", "5min")])
+def test_intraday_bars_roll_up_on_the_exchange_clock(timeframe):
+    columns = session_bars(date(2024, 3, 4), 33)
+    assert_bars_equal(resample(columns, timeframe, "US/Eastern"), reference_resample(columns, timeframe, EASTERN))
+
+
+def test_calendar_labels():
+    columns = session_bars(date(2024, 3, 4), 33)
+    weekly = resample(columns, "weekly", "US/Eastern")["timestamp"]
+    assert all(datetime.fromtimestamp(int(label), timezone.utc).weekday() == 0 for label in weekly)
+    monthly = resample(columns, "monthly", "US/Eastern")["timestamp"]
+    assert [str(np.datetime64(int(label), "s").astype("datetime64[D]")) for label in monthly] == [
+        "2024-03-01", "2024-04-01"
+    ]
+    # Hourly buckets follow the local clock: the session opens in a half-hour bucket before and after the switch
+    hourly = resample(columns, "60min", "US/Eastern")["timestamp"]
+    opens = [datetime.fromtimestamp(int(label), EASTERN).strftime("%H:%M") for label in hourly[::7]]
+    assert set(opens) == {"09:00"}
+
+
+def test_daily_bars_roll_up_without_a_timezone():
+    days = np.arange(19000, 19400, dtype=np.int64)
+    closes = np.linspace(100, 140, len(days))
+    columns = {"timestamp": days * 86400, "open": closes, "high": closes + 1, "low": closes - 1,
+               "close": closes, "volume": np.full(len(days), 10, dtype=np.int64)}
+    for timeframe in ("weekly", "monthly", "daily"):
+        assert_bars_equal(resample(columns, timeframe), reference_resample(columns, timeframe))
+    empty = resample({name: columns[name][:0] for name in OHLCV_COLUMNS}, "weekly")
+    assert len(empty["timestamp"]) == 0 and len(empty["first_bar"]) == 0
+
+
+def test_unsupported_timeframes_are_rejected():
+    columns = session_bars(date(2024, 3, 4), 1)
+    with pytest.raises(ValueError, match="Unsupported timeframe"):
+        resample(columns, "quarterly")
+
+
+@pytest.fixture
+def resample_calls(monkeypatch):
+    """Number of input bars of every ``resample`` call the ``Resampler`` makes"""
+    calls = []
+
+    def counted(columns, timeframe, timezone_name=None):
+        calls.append(len(columns["timestamp"]))
+        return resample(columns, timeframe, timezone_name)
+
+    monkeypatch.setattr(resampler_module, "resample", counted)
+    return calls
+
+
+def prefix(columns, end, start=0):
+    return {name: columns[name][start:end].copy() for name in OHLCV_COLUMNS}
+
+
+def test_resampler_extends_the_cached_series(resample_calls):
+    columns = session_bars(date(2024, 3, 4), 12)
+    resampler = Resampler()
+    expected = reference_resample(columns, "60min", EASTERN)
+
+    first = prefix(columns, 500)
+    bars = resampler.roll("AAA", first, "60min", "US/Eastern")
+    assert_bars_equal(bars, reference_resample(first, "60min", EASTERN))
+    # The same stored series again is a cache hit
+    assert resampler.roll("AAA", first, "60min", "US/Eastern") is bars
+    assert resample_calls == [500]
+
+    # Newer bars and a revised latest bar: only the last bucket onwards is re-aggregated
+    grown = prefix(columns, len(columns["timestamp"]))
+    grown["close"][499] += 0.5
+    bars = resampler.roll("AAA", grown, "60min", "US/Eastern")
+    assert_bars_equal(bars, reference_resample(grown, "60min", EASTERN))
+    # The new bars and at most a full hour (12 bars) before them
+    assert len(grown["timestamp"]) - 500 < resample_calls[-1] <= len(grown["timestamp"]) - 500 + 12
+
+    # Pruned history no longer lines up with the cache: rebuilt from scratch
+    pruned = prefix(columns, len(columns["timestamp"]), start=78)
+    bars = resampler.roll("AAA", pruned, "60min", "US/Eastern")
+    assert_bars_equal(bars, reference_resample(pruned, "60min", EASTERN))
+    assert resample_calls[-1] == len(pruned["timestamp"])
+
+    # Other series and timeframes are cached separately
+    assert_bars_equal(resampler.roll("BBB", columns, "60min", "US/Eastern"), expected)
+    assert_bars_equal(resampler.roll("AAA", pruned, "daily", "US/Eastern"),
+                      reference_resample(pruned, "daily", EASTERN))
+
+
+def test_incremental_rolls_match_a_full_recompute():
+    columns = session_bars(date(2024, 2, 26), 40, seed=4)
+    resampler = Resampler()
+    total = len(columns["timestamp"])
+    for end in [*range(1, total, 97), total]:
+        for timeframe in ("15min", "240min", "daily", "weekly", "monthly"):
+            bars = resampler.roll("AAA", prefix(columns, end), timeframe, "US/Eastern")
+            expected = resample(prefix(columns, end), timeframe, "US/Eastern")
+            assert_bars_equal(bars, expected)
+
+
+def test_source_interval():
+    assert source_interval("daily") == "daily"
+    assert source_interval("240min") == "60min"
+    assert source_interval("30min") == "15min"
+    assert source_interval("60min", base="5min") == "5min"
+    with pytest.raises(ValueError, match="cannot be rolled up"):
+        source_interval("monthly", base="weekly")
+    with pytest.raises(ValueError, match="Unsupported base"):
+        source_interval("daily", base="30min")
+    with pytest.raises(ValueError, match="Unsupported interval"):
+        source_interval("2h")
+
+
+def test_get_bars_rolls_up_stored_intraday_history(history_store):
+    columns = session_bars(date(2024, 3, 4), 12)
+    history_store.upsert_bars("AAPL", "5min", columns)
+    service = MarketDataService(history_store)
+
+    async def main():
+        hourly = await service.get_bars("aapl", "60min", base="5min")
+        again = await service.get_bars("AAPL", "60min", base="5min")
+        raw = await service.get_bars("AAPL", "5min")
+        return hourly, again, raw
+
+    hourly, again, raw = asyncio.run(main())
+    assert again is hourly
+    assert_bars_equal(hourly, reference_resample(columns, "60min", EASTERN))
+    np.testing.assert_array_equal(raw["timestamp"], columns["timestamp"])
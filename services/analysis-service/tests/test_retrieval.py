@@ -0,0 +1,222 @@
+# services/analysis-service/tests/test_retrieval.py
+import asyncio
+import os
+import re
+import time
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.news_index import NewsIndex
+from app.services.prompt_builder import estimate_tokens, passage_line
+from app.services.retrieval_service import RetrievalService, article_id, article_passages, chunk_text
+
+DIMS = 512
+
+
+def embedding(text):
+    """Bag-of-words vector: passages sharing words with the question score higher"""
+    vector = np.zeros(DIMS)
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(word) > 3:
+            vector[zlib.crc32(word.encode()) % DIMS] += 1.0
+    return vector.tolist()
+
+
+class FakeEmbedder:
+    """The embedding half of ``OllamaService``"""
+
+    def __init__(self):
+        self.embedded = []
+
+    async def embed(self, texts):
+        self.embedded.extend(texts)
+        return [embedding(text) for text in texts]
+
+    async def embed_query(self, text):
+        return embedding(text)
+
+
+def passage(article, text, published_at, **extra):
+    return {"article_id": article, "published_at": published_at, "text": text, **extra}
+
+
+def unit(*components):
+    vector = np.zeros(4, dtype=np.float32)
+    vector[:len(components)] = components
+    return vector
+
+
+@pytest.fixture
+def index(tmp_path):
+    return NewsIndex(str(tmp_path / "news"), max_passages=6)
+
+
+def test_chunks_are_whole_sentences_within_the_budget():
+    text = " ".join(f"Sentence number {i} talks about revenue growth." for i in range(20))
+    chunks = chunk_text(text, 30)
+    assert " ".join(chunks) == text
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    # A run-on sentence is cut by words
+    run_on = " ".join(["word"] * 200)
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunk_text(run_on, 30))
+    assert " ".join(chunk_text(run_on, 30)) == run_on
+
+
+def test_article_passages_drop_truncation_and_repeats():
+    article = {
+        "title": "Apple beats estimates",
+        "description": "Revenue rose 8% on strong iPhone demand in China, Europe and the Americas last quarter.",
+        "content": "Revenue rose 8% on strong iPhone demand in China, Europe and the Americas … [+2817 chars]",
+        "source": {"name": "Reuters"},
+        "url": "https://example.invalid/apple",
+        "publishedAt": "2024-05-01T12:00:00Z"
+    }
+    [only] = article_passages(article, 120)
+    assert only["text"] == ("Apple beats estimates. Revenue rose 8% on strong iPhone demand in China, "
+                            "Europe and the Americas last quarter.")
+    # Truncated content that adds something is kept, without the marker
+    [with_content] = article_passages({**article, "description": None}, 120)
+    assert with_content["text"].endswith("Europe and the Americas.")
+    assert only["source"] == "Reuters" and only["title"] == "Apple beats estimates"
+    assert only["published_at"] == datetime(2024, 5, 1, 12, tzinfo=timezone.utc).timestamp()
+    assert only["article_id"] == article_id(article) == article_id({"url": article["url"]})
+    # Without a URL, the title and date identify the article
+    assert article_id({"title": "A", "publishedAt": "1"}) != article_id({"title": "A", "publishedAt": "2"})
+
+
+def test_search_ranks_by_similarity(index):
+    now = time.time()
+    added = index.append("AAPL", "embed", np.array([unit(1, 0), unit(1, 1), unit(0, 1), unit(-1, 0)]), [
+        passage("a", "exact", now, source="Reuters"), passage("b", "close", now),
+        passage("c", "orthogonal", now), passage("d", "opposite", now)
+    ])
+    assert added == 4
+    found = index.search("AAPL", "embed", [2, 0, 0, 0], k=3)
+    assert [p["text"] for p in found] == ["exact", "close", "orthogonal"]
+    assert found[0]["score"] == 1.0 and found[1]["score"] == pytest.approx(0.7071, abs=1e-4)
+    assert found[0]["source"] == "Reuters"
+    assert [p["text"] for p in index.search("AAPL", "embed", [1, 0, 0, 0], k=5, min_score=0.5)] == ["exact", "close"]
+    # Other symbols, models, dimensions and zero queries find nothing
+    assert index.search("MSFT", "embed", [1, 0, 0, 0], k=3) == []
+    assert index.search("AAPL", "other", [1, 0, 0, 0], k=3) == []
+    assert index.search("AAPL", "embed", [1, 0, 0], k=3) == []
+    assert index.search("AAPL", "embed", [0, 0, 0, 0], k=3) == []
+
+
+def test_articles_are_indexed_once(index):
+    now = time.time()
+    vectors = np.array([unit(1), unit(0, 1)])
+    assert index.append("AAPL", "embed", vectors, [passage("a", "one", now), passage("b", "two", now)]) == 2
+    assert index.known_articles("AAPL", ["a", "b", "c"]) == {"a", "b"}
+    assert index.append("AAPL", "embed", vectors, [passage("a", "one", now), passage("c", "three", now)]) == 1
+    assert index.stats("AAPL") == {"symbol": "AAPL", "articles": 3, "passages": 3, "model": "embed", "dimensions": 4}
+
+
+def test_one_article_cant_crowd_out_the_rest(index):
+    now = time.time()
+    index.append("AAPL", "embed", np.array([unit(1, 0.1 * i) for i in range(4)] + [unit(1, 1)]),
+                 [passage("long", f"part {i}", now) for i in range(4)] + [passage("other", "other", now)])
+    found = index.search("AAPL", "embed", [1, 0, 0, 0], k=4)
+    assert [p["text"] for p in found] == ["part 0", "part 1", "other"]
+
+
+def test_old_passages_expire(index):
+    now = time.time()
+    index.append("AAPL", "embed", np.array([unit(1), unit(1, 0.5)]),
+                 [passage("old", "old news", now - 40 * 86400), passage("new", "new news", now - 86400)])
+    assert [p["text"] for p in index.search("AAPL", "embed", [1, 0, 0, 0], k=5)] == ["old news", "new news"]
+    assert [p["text"] for p in index.search("AAPL", "embed", [1, 0, 0, 0], k=5, max_age_seconds=30 * 86400)] == ["new news"]
+
+
+def test_full_index_keeps_the_newest_passages(index, tmp_path):
+    now = time.time()
+    for batch in range(3):
+        index.append("AAPL", "embed", np.array([unit(1, i) for i in range(4)]),
+                     [passage(f"{batch}-{i}", f"batch {batch} item {i}", now - 1000 * (3 - batch) + i) for i in range(4)])
+        # Searches between appends see a consistent index
+        assert len(index.search("AAPL", "embed", [1, 0, 0, 0], k=10, per_article=10)) == min(6, 4 * (batch + 1))
+    found = index.search("AAPL", "embed", [1, 0, 0, 0], k=10)
+    assert sorted(p["text"] for p in found) == sorted(
+        [f"batch 2 item {i}" for i in range(4)] + ["batch 1 item 2", "batch 1 item 3"]
+    )
+    # Old generations are removed; dropped articles are still known, so never embedded again
+    assert sorted(os.listdir(tmp_path / "news")) == ["AAPL-2.f32", "passages.db", "passages.db-shm", "passages.db-wal"]
+    assert index.known_articles("AAPL", ["0-0"]) == {"0-0"}
+
+
+def test_another_embedding_model_starts_over(index):
+    now = time.time()
+    index.append("AAPL", "old-model", np.array([unit(1)]), [passage("a", "one", now)])
+    assert index.append("AAPL", "new-model", np.array([[1.0, 0.0]]), [passage("b", "two", now)]) == 1
+    assert index.stats("AAPL")["model"] == "new-model" and index.stats("AAPL")["passages"] == 1
+    assert index.search("AAPL", "old-model", [1, 0, 0, 0], k=3) == []
+    assert [p["text"] for p in index.search("AAPL", "new-model", [1, 0], k=3)] == ["two"]
+
+
+def news(title, body, days_ago=1, url=None):
+    published = datetime.fromtimestamp(time.time() - days_ago * 86400, timezone.utc)
+    return {"title": title, "description": body, "url": url or f"https://example.invalid/{zlib.crc32(title.encode())}",
+            "source": {"name": "Wire"}, "publishedAt": published.isoformat().replace("+00:00", "Z")}
+
+
+ARTICLES = [
+    news("Apple quarterly earnings beat revenue guidance", "Apple reported earnings above guidance with revenue growth."),
+    news("Apple opens new retail store", "The store features wooden tables and a large video wall."),
+    news("Apple earnings revenue guidance history", "Earnings revenue guidance from a year ago.", days_ago=400),
+    news("Regulators examine smartphone market", "Competition authorities started a smartphone market review.")
+]
+
+
+@pytest.fixture
+def retrieval(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RETRIEVAL_MIN_SCORE", 0.2)
+    embedder = FakeEmbedder()
+    return RetrievalService(NewsIndex(str(tmp_path / "news"), max_passages=100), embedder), embedder
+
+
+def test_news_is_embedded_once_and_retrieved_by_relevance(retrieval):
+    service, embedder = retrieval
+    assert asyncio.run(service.ingest("aapl", ARTICLES + [{"title": "", "description": "untitled"}])) == 4
+    assert len(embedder.embedded) == 4 and embedder.embedded[0].startswith("Apple quarterly earnings")
+    assert asyncio.run(service.ingest("AAPL", ARTICLES)) == 0
+    assert len(embedder.embedded) == 4
+
+    found = asyncio.run(service.retrieve("AAPL", "Apple earnings revenue guidance"))
+    # The year-old article is past RETRIEVAL_MAX_AGE_DAYS; the unrelated ones score too low
+    assert [p["title"] for p in found] == ["Apple quarterly earnings beat revenue guidance"]
+    assert found[0]["source"] == "Wire"
+
+    found = asyncio.run(service.retrieve("AAPL", "Apple store smartphone market review"))
+    assert {p["title"] for p in found} >= {"Regulators examine smartphone market"}
+
+
+def test_retrieval_stays_within_the_token_budget(retrieval, monkeypatch):
+    service, _ = retrieval
+    monkeypatch.setattr(settings, "RETRIEVAL_MAX_AGE_DAYS", 0)
+    asyncio.run(service.ingest("AAPL", ARTICLES))
+    question = "Apple earnings revenue guidance"
+
+    everything = asyncio.run(service.retrieve("AAPL", question, budget=10_000))
+    assert len(everything) == 2 and everything[0]["score"] >= everything[1]["score"]
+    first = estimate_tokens(passage_line(everything[0]))
+    assert asyncio.run(service.retrieve("AAPL", question, budget=first)) == everything[:1]
+    assert asyncio.run(service.retrieve("AAPL", question, budget=5)) == []
+
+
+def test_retrieval_waits_for_background_ingestion(retrieval):
+    service, _ = retrieval
+
+    async def main():
+        service.ingest_later("aapl", ARTICLES)
+        assert service._pending["AAPL"]
+        found = await service.retrieve("AAPL", "Apple earnings revenue guidance")
+        await asyncio.sleep(0)
+        return found
+
+    assert len(asyncio.run(main())) == 1
+    assert service._pending == {}
@@ -0,0 +1,139 @@
+# services/analysis-service/tests/test_risk.py
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.risk import (
+    RiskService,
+    common_returns,
+    covariance_factor,
+    default_paths,
+    simulate_paths,
+    tail_risk
+)
+
+Z_95 = 1.6448536269514722
+
+
+class NoMarketData:
+    async def get_history(self, symbol, interval):
+        from app.services.market_data_service import MarketDataError
+        raise MarketDataError(f"No {interval} history for {symbol}")
+
+
+def lognormal_closes(volatility, days, seed):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, volatility, days)))
+
+
+def test_tail_risk_of_a_known_distribution():
+    terminal = np.linspace(-0.1, 0.1, 2001)
+    var, cvar = tail_risk(terminal, 0.95)
+    assert var == pytest.approx(0.09)
+    # Mean loss beyond VaR: the average of 0.09 ... 0.1
+    assert cvar == pytest.approx(0.095)
+    assert tail_risk(terminal, 0.99)[0] > var
+
+
+def test_covariance_factor_handles_semi_definite_matrices():
+    covariance = np.array([[0.04, 0.01], [0.01, 0.09]])
+    factor = covariance_factor(covariance)
+    np.testing.assert_allclose(factor @ factor.T, covariance)
+
+    # Two perfectly correlated holdings: no Cholesky factor exists
+    singular = np.array([[0.04, 0.04], [0.04, 0.04]])
+    factor = covariance_factor(singular)
+    np.testing.assert_allclose(factor @ factor.T, singular, atol=1e-12)
+
+
+def test_common_returns_cover_the_days_all_symbols_have():
+    closes = np.array([[100.0, 101.0, 102.0, 103.0, 104.0], [50.0, 50.0, 50.0, 51.0, 52.0]])
+    returns = common_returns(closes, np.array([0, 2]), lookback=10)
+    assert returns.shape == (2, 2)
+    np.testing.assert_allclose(returns[:, 1], np.log([51 / 50, 52 / 51]))
+    assert common_returns(closes, np.array([0, 0]), lookback=2).shape == (2, 2)
+
+
+def test_default_paths_stay_within_the_draw_budget(monkeypatch):
+    monkeypatch.setattr(settings, "RISK_DEFAULT_PATHS", 20000)
+    monkeypatch.setattr(settings, "RISK_DEFAULT_DRAWS", 10_000_000)
+    assert default_paths(21, 2) == 20000
+    assert default_paths(250, 99) == 2000
+    paths = default_paths(21, 50)
+    assert paths == 9522 and paths * 21 * 50 <= 10_000_000
+
+
+def run_paths(sigma, horizon, paths, seed=7, chunk_elements=1_000_000, drift=0.0, holdings=1):
+    streams = np.random.SeedSequence(seed).spawn(2)
+    factor = np.eye(holdings) * sigma
+    return simulate_paths(np.full(holdings, drift), factor, np.ones(holdings), horizon, streams,
+                          [paths // 2, paths - paths // 2], chunk_elements)
+
+
+def test_paths_depend_only_on_the_seed():
+    terminal, drawdown = run_paths(0.02, 10, 3001)
+    # Chunking changes the order paths come out in, not the paths
+    for chunk_elements in (70, 100, 12345):
+        chunked = run_paths(0.02, 10, 3001, chunk_elements=chunk_elements)
+        np.testing.assert_allclose(np.sort(terminal), np.sort(chunked[0]), rtol=1e-5, atol=1e-7)
+        np.testing.assert_allclose(np.sort(drawdown), np.sort(chunked[1]), rtol=1e-5, atol=1e-7)
+    np.testing.assert_array_equal(terminal, run_paths(0.02, 10, 3001)[0])
+    assert not np.array_equal(terminal, run_paths(0.02, 10, 3001, seed=8)[0])
+    assert np.all((drawdown >= 0) & (drawdown < 1))
+    assert np.all(drawdown >= np.maximum(-terminal, 0) - 1e-6)
+
+
+def test_antithetic_pairs_mirror_the_log_returns():
+    terminal, _ = run_paths(0.02, 5, 2000, chunk_elements=5 * 1000)
+    log_returns = np.log1p(terminal.astype(np.float64))
+    # Each stream's chunk is drawn as z then -z: the halves cancel
+    first, second = log_returns[:500], log_returns[500:1000]
+    np.testing.assert_allclose(first, -second, atol=1e-5)
+
+
+def test_single_holding_var_matches_the_lognormal_quantile():
+    sigma, horizon = 0.02, 21
+    terminal, _ = run_paths(sigma, horizon, 200_000, chunk_elements=4_000_000)
+    var, cvar = tail_risk(terminal, 0.95)
+    expected = 1 - math.exp(-Z_95 * sigma * math.sqrt(horizon))
+    assert var == pytest.approx(expected, rel=0.03)
+    assert cvar > var
+
+
+def test_simulation_over_stored_history(history_store, store_closes):
+    store_closes("AAA", lognormal_closes(0.01, 300, 1))
+    store_closes("BBB", lognormal_closes(0.03, 300, 2))
+    service = RiskService(NoMarketData(), history_store)
+    holdings = {"aaa": {"value": 60000}, "BBB": {"quantity": 10}}
+
+    result = asyncio.run(service.simulate(holdings, paths=4000, horizon_days=10, seed=42))
+    again = asyncio.run(service.simulate(holdings, paths=4000, horizon_days=10, seed=42))
+
+    assert result == again and result["seed"] == 42
+    assert result["symbols"] == ["AAA", "BBB"]
+    bbb_value = result["holdings"]["BBB"]["value"]
+    assert result["portfolio_value"] == pytest.approx(60000 + bbb_value, abs=0.01)
+    assert result["observations"] == 299
+    assert sum(h["risk_contribution"] for h in result["holdings"].values()) == pytest.approx(1.0, abs=1e-3)
+    var, cvar = result["var"], result["cvar"]
+    assert 0 < var["0.95"]["percent"] < var["0.99"]["percent"] <= cvar["0.99"]["percent"]
+    assert cvar["0.95"]["percent"] >= var["0.95"]["percent"]
+    assert var["0.95"]["amount"] == pytest.approx(var["0.95"]["percent"] * result["portfolio_value"], rel=1e-3)
+    percentiles = list(result["return_percentiles"].values())
+    assert percentiles == sorted(percentiles)
+
+
+def test_invalid_portfolios_are_rejected(history_store, store_closes):
+    store_closes("AAA", lognormal_closes(0.01, 300, 1))
+    store_closes("SHORT", lognormal_closes(0.01, 30, 3), start_day=19270)
+    service = RiskService(NoMarketData(), history_store)
+
+    with pytest.raises(ValueError, match="No daily history"):
+        asyncio.run(service.simulate({"AAA": {"value": 1}, "MISSING": {"value": 1}}, paths=2000))
+    with pytest.raises(ValueError, match="at least 60"):
+        asyncio.run(service.simulate({"AAA": {"value": 1}, "SHORT": {"value": 1}}, paths=2000))
+    with pytest.raises(ValueError, match="At most"):
+        asyncio.run(service.simulate({"AAA": {"value": 1}}, paths=settings.RISK_MAX_PATHS + 1))
@@ -0,0 +1,175 @@
+# services/analysis-service/tests/test_semantic_cache.py
+import asyncio
+import re
+import zlib
+
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import (
+    get_analysis_store,
+    get_ollama_service,
+    get_retrieval_service,
+    get_semantic_cache,
+    get_sentiment_service
+)
+from app.resources import resources
+from app.services.ollama_service import OllamaService
+from app.services.semantic_cache import SemanticCache
+from app.utils import vector_index
+from app.utils.vector_index import VectorIndex
+from main import app
+
+DIMS = 64
+
+
+def embedding(text):
+    """Bag-of-words vector: prompts sharing most words are similar"""
+    vector = np.zeros(DIMS)
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        vector[zlib.crc32(word.encode()) % DIMS] += 1.0
+    return vector.tolist()
+
+
+class FakeOllamaServer:
+    """/api/embed and /api/generate answered in-process; other hosts go to ``fallback``"""
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback
+        self.embedded = []
+        self.generated = []
+        self.embed_error = False
+
+    def __call__(self, request):
+        if request.url.path == "/api/embed":
+            if self.embed_error:
+                return httpx.Response(500, json={"error": "model not found"})
+            texts = httpx.Response(200, content=request.content).json()["input"]
+            self.embedded.extend(texts)
+            return httpx.Response(200, json={"embeddings": [embedding(text) for text in texts]})
+        if request.url.path == "/api/generate":
+            prompt = httpx.Response(200, content=request.content).json()["prompt"]
+            self.generated.append(prompt)
+            return httpx.Response(200, json={"response": f"Answer {len(self.generated)}", "done": True})
+        return self.fallback(request)
+
+
+@pytest.fixture
+def ollama(alpha_vantage, monkeypatch):
+    server = FakeOllamaServer(alpha_vantage)
+    monkeypatch.setattr(resources, "_http", httpx.AsyncClient(transport=httpx.MockTransport(server)))
+    return server
+
+
+def make_cache(threshold=0.9, max_price_move=0.02):
+    return SemanticCache(OllamaService(), capacity=8, ttl=60, threshold=threshold, max_price_move=max_price_move)
+
+
+def test_similar_prompts_about_the_same_symbol_hit(ollama):
+    cache = make_cache()
+
+    async def scenario():
+        await cache.store("aapl", "What is the outlook for Apple shares", 190.0, "Positive")
+        return [
+            await cache.lookup("AAPL", "what is the outlook for apple shares now", 190.5),
+            await cache.lookup("AAPL", "Is the dividend safe", 190.0),
+            await cache.lookup("MSFT", "What is the outlook for Apple shares", 190.0),
+            await cache.lookup("AAPL", "What is the outlook for Apple shares", 200.0)
+        ]
+
+    # Similar question, unrelated question, another symbol, price moved over 2%
+    assert asyncio.run(scenario()) == ["Positive", None, None, None]
+
+
+def test_prompt_embeddings_are_memoised(ollama):
+    cache = make_cache()
+
+    async def scenario():
+        await cache.lookup("AAPL", "Outlook for Apple", 190.0)
+        await cache.store("AAPL", "Outlook for Apple ", 190.0, "Positive")
+
+    asyncio.run(scenario())
+    assert ollama.embedded == ["Outlook for Apple"]
+
+
+def test_embedding_failures_are_misses(ollama):
+    ollama.embed_error = True
+    cache = make_cache()
+
+    async def scenario():
+        await cache.store("AAPL", "Outlook for Apple", 190.0, "Positive")
+        return await cache.lookup("AAPL", "Outlook for Apple", 190.0)
+
+    assert asyncio.run(scenario()) is None
+    assert len(cache.index) == 0
+
+
+def test_blank_answers_are_not_stored(ollama):
+    cache = make_cache()
+    asyncio.run(cache.store("AAPL", "Outlook for Apple", 190.0, "  "))
+    assert len(cache.index) == 0 and ollama.embedded == []
+
+
+def test_vector_index_scopes_threshold_and_best_match():
+    index = VectorIndex(capacity=4, ttl=60)
+    index.add("AAPL", [1.0, 0.0, 0.0], "x")
+    index.add("AAPL", [0.8, 0.6, 0.0], "xy")
+    index.add("MSFT", [1.0, 0.0, 0.0], "msft")
+
+    payload, score = index.search("AAPL", [2.0, 0.1, 0.0], 0.5)
+    assert payload == "x" and score == pytest.approx(2 / np.hypot(2, 0.1))
+    assert index.search("AAPL", [0.0, 0.0, 1.0], 0.5) is None
+    # accept() can veto the best match in favour of the next one
+    assert index.search("AAPL", [1.0, 0.0, 0.0], 0.5, accept=lambda payload: payload != "x")[0] == "xy"
+    assert index.search("GOOG", [1.0, 0.0, 0.0], 0.5) is None
+    # A different dimension means a different embedding model
+    assert index.search("AAPL", [1.0, 0.0], 0.5) is None
+    index.add("AAPL", [1.0, 0.0], "2d")
+    assert len(index) == 1
+
+
+def test_vector_index_expiry_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(vector_index.time, "monotonic", lambda: now[0])
+    index = VectorIndex(capacity=2, ttl=10)
+    index.add("A", [1.0, 0.0], "first")
+    now[0] += 1
+    index.add("A", [0.0, 1.0], "second")
+    now[0] += 1
+    index.search("A", [1.0, 0.0], 0.9)  # "first" is now the more recently used
+    now[0] += 1
+    index.add("A", [1.0, 1.0], "third")
+    assert index.search("A", [0.0, 1.0], 0.99) is None
+    assert index.search("A", [1.0, 0.0], 0.99)[0] == "first"
+
+    now[0] += 60
+    assert index.search("A", [1.0, 0.0], 0.5) is None
+    assert len(index) == 0
+
+
+def test_analysis_reuses_a_similar_custom_prompt_answer(alpha_vantage, ollama, history_store):
+    alpha_vantage.closes["AAPL"] = list(np.linspace(100, 120, 60))
+    service = OllamaService()
+    cache = SemanticCache(service, capacity=8, ttl=60, threshold=0.9, max_price_move=0.02)
+    app.dependency_overrides.update({
+        get_ollama_service: lambda: service,
+        get_semantic_cache: lambda: cache,
+        get_analysis_store: lambda: None,
+        get_retrieval_service: lambda: None,
+        get_sentiment_service: lambda: None
+    })
+    try:
+        client = TestClient(app)
+        body = {"symbol": "AAPL", "include_sentiment": False, "include_news": False,
+                "custom_prompt": "What is the outlook for Apple shares"}
+        first = client.post("/analysis/stock", json=body).json()
+        second = client.post("/analysis/stock", json={**body, "custom_prompt": "What is the outlook for Apple shares now"}).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert first["data"]["narrative_status"] == "generated"
+    assert second["data"]["narrative_status"] == "similar"
+    assert second["data"]["summary"] == first["data"]["summary"] == "Answer 1"
+    assert len(ollama.generated) == 1
@@ -0,0 +1,265 @@
+# services/analysis-service/tests/test_shared_state.py
+"""Coalescing and rate limiting shared between workers
+
+Workers are modelled as separate ``Coalescer``/``RateLimiter`` instances with the
+same name; only the (fake) Redis connects them, as it does across processes.
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.telemetry.metrics import metrics
+from app.utils import deadline
+from app.utils.shared_state import Coalescer, RateLimiter, RateLimitExceeded, SharedStore
+
+
+class Work:
+    """Factory that counts calls and takes ``delay`` seconds"""
+
+    def __init__(self, result="done", delay=0.05, error=None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.running = 0
+        self.overlapped = False
+
+    async def __call__(self):
+        self.calls += 1
+        self.running += 1
+        self.overlapped |= self.running > 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            return self.result
+        finally:
+            self.running -= 1
+
+
+def test_concurrent_callers_in_one_worker_share_one_call():
+    coalescer, work = Coalescer("test"), Work()
+    before = metrics.coalesced_total.get(name="test", scope="local")
+
+    async def main():
+        return await asyncio.gather(*(coalescer.run("AAPL", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["done"] * 5
+    assert work.calls == 1
+    assert metrics.coalesced_total.get(name="test", scope="local") - before == 4
+    assert coalescer._inflight == {}
+
+
+def test_leader_failure_reaches_every_follower():
+    coalescer, work = Coalescer("test"), Work(error=ValueError("upstream down"))
+
+    async def main():
+        return await asyncio.gather(*(coalescer.run("AAPL", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert work.calls == 1
+    assert all(isinstance(result, ValueError) and str(result) == "upstream down" for result in results)
+    # The failure isn't remembered: the next call tries again
+    work.error = None
+    assert asyncio.run(coalescer.run("AAPL", work)) == "done" and work.calls == 2
+
+
+def test_workers_share_the_leader_result(fake_redis):
+    first, second = Coalescer("quotes"), Coalescer("quotes")
+    work = Work(result={"price": 101.5}, delay=0.2)
+
+    async def main():
+        leader = asyncio.create_task(first.run("AAPL", work, result_ttl=30))
+        await asyncio.sleep(0.02)
+        follower = await second.run("AAPL", work, result_ttl=30)
+        return await leader, follower
+
+    assert asyncio.run(main()) == ({"price": 101.5}, {"price": 101.5})
+    assert work.calls == 1
+    assert json.loads(fake_redis.data["coalesce:quotes:result:AAPL"]) == {"price": 101.5}
+    assert 29 < fake_redis.ttl("coalesce:quotes:result:AAPL") <= 30
+    # The lock is released once the result is published
+    assert "coalesce:quotes:lock:AAPL" not in fake_redis.data
+
+    # Late callers in any worker reuse the published result until it expires
+    assert asyncio.run(Coalescer("quotes").run("AAPL", work, result_ttl=30)) == {"price": 101.5}
+    assert work.calls == 1
+
+
+def test_published_results_expire(fake_redis):
+    coalescer, work = Coalescer("quotes"), Work(delay=0)
+    asyncio.run(coalescer.run("AAPL", work, result_ttl=0.05))
+    time.sleep(0.06)
+    asyncio.run(coalescer.run("AAPL", work, result_ttl=0.05))
+    assert work.calls == 2
+
+
+def test_without_a_shared_result_followers_run_after_the_leader(fake_redis):
+    # get_history's pattern: the leader fills a shared store, followers then read it
+    first, second = Coalescer("history"), Coalescer("history")
+    work = Work(delay=0.2)
+
+    async def main():
+        leader = asyncio.create_task(first.run("AAPL", work))
+        await asyncio.sleep(0.02)
+        await asyncio.gather(leader, second.run("AAPL", work))
+
+    asyncio.run(main())
+    assert work.calls == 2 and not work.overlapped
+
+
+def test_failed_leader_releases_the_lock(fake_redis):
+    first, second = Coalescer("quotes"), Coalescer("quotes")
+    failing, work = Work(error=ValueError("upstream down"), delay=0.1), Work(delay=0)
+
+    async def main():
+        leader = asyncio.create_task(first.run("AAPL", failing, result_ttl=30))
+        await asyncio.sleep(0.02)
+        follower = await second.run("AAPL", work, result_ttl=30)
+        with pytest.raises(ValueError):
+            await leader
+        return follower
+
+    # The follower does the work itself as soon as the lock is gone, not after lock_ttl
+    started = time.monotonic()
+    assert asyncio.run(main()) == "done"
+    assert time.monotonic() - started < 1
+    assert failing.calls == 1 and work.calls == 1
+
+
+def test_lock_of_a_crashed_leader_expires(fake_redis):
+    coalescer, work = Coalescer("quotes", lock_ttl=0.2, poll_interval=0.01), Work(delay=0)
+    # A worker took the lock and died without releasing it
+    asyncio.run(fake_redis.set("coalesce:quotes:lock:AAPL", "crashed", nx=True, px=200))
+
+    started = time.monotonic()
+    assert asyncio.run(coalescer.run("AAPL", work, result_ttl=30)) == "done"
+    assert 0.15 < time.monotonic() - started < 1
+    assert work.calls == 1
+
+
+def test_redis_errors_fall_back_to_local_work(fake_redis):
+    fake_redis.broken = True
+    coalescer, work = Coalescer("quotes"), Work(delay=0)
+    assert asyncio.run(coalescer.run("AAPL", work, result_ttl=30)) == "done"
+
+    store = SharedStore("test_store")
+    asyncio.run(store.set("key", {"a": 1}))
+    assert asyncio.run(store.get("key")) == {"a": 1}
+
+
+def test_shared_store_is_visible_to_every_worker(fake_redis):
+    asyncio.run(SharedStore("test_store").set("key", [1, 2], ttl=30))
+    assert asyncio.run(SharedStore("test_store").get("key")) == [1, 2]
+    assert asyncio.run(SharedStore("test_store").get("other")) is None
+
+
+def test_rate_limit_is_shared_between_workers(fake_redis):
+    first, second = RateLimiter("upstream", 3, period=60), RateLimiter("upstream", 3, period=60)
+
+    async def main():
+        granted = [await limiter.try_acquire() for limiter in (first, second, first, second)]
+        with pytest.raises(RateLimitExceeded):
+            await second.acquire(max_wait=0)
+        return granted
+
+    assert asyncio.run(main()) == [True, True, True, False]
+    [key] = [key for key in fake_redis.data if key.startswith("ratelimit:upstream:")]
+    assert fake_redis.data[key] == "5"
+    # The window's counter outlives the window by a second, no more
+    assert 60 < fake_redis.ttl(key) <= 61
+
+
+def test_rate_limit_waits_for_the_next_window(fake_redis):
+    limiter = RateLimiter("fast", 2, period=0.2)
+    before = metrics.rate_limited_total.get(limiter="fast", outcome="delayed")
+
+    async def main():
+        # Start at the beginning of a window so both grants fall in it
+        await asyncio.sleep(0.2 - time.time() % 0.2)
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire(max_wait=1)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) > 0.1
+    assert metrics.rate_limited_total.get(limiter="fast", outcome="delayed") - before == 1
+
+
+def test_rate_limit_without_redis_is_per_worker():
+    first, second = RateLimiter("local", 1, period=60), RateLimiter("local", 1, period=60)
+
+    async def main():
+        return [await first.try_acquire(), await first.try_acquire(), await second.try_acquire()]
+
+    assert asyncio.run(main()) == [True, False, True]
+    assert asyncio.run(RateLimiter("off", 0).try_acquire())
+
+
+def test_a_leader_out_of_time_doesnt_fail_the_followers():
+    coalescer = Coalescer("quotes")
+    seen_deadlines = []
+
+    async def work():
+        seen_deadlines.append(deadline.remaining())
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def caller(seconds):
+        tokens = deadline.begin(seconds)
+        try:
+            return await coalescer.run("AAPL", work)
+        finally:
+            deadline.end(tokens)
+
+    async def main():
+        leader = asyncio.create_task(caller(0.05))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(leader, caller(5.0), caller(None), return_exceptions=True)
+
+    leader, bounded, unbounded = asyncio.run(main())
+    assert isinstance(leader, deadline.DeadlineExceeded)
+    assert bounded == unbounded == "done"
+    # The shared work ran once, without the leader's deadline
+    assert seen_deadlines == [None]
+
+    # A caller with no time left doesn't start anything
+    with pytest.raises(deadline.DeadlineExceeded):
+        asyncio.run(caller(0.0))
+    assert len(seen_deadlines) == 1
+
+
+def test_a_cancelled_leader_doesnt_cancel_the_followers():
+    coalescer, work = Coalescer("quotes"), Work(delay=0.1)
+
+    async def main():
+        leader = asyncio.create_task(coalescer.run("AAPL", work))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(coalescer.run("AAPL", work))
+        await asyncio.sleep(0.01)
+        # e.g. the batch endpoint cancelling its fetches when the client disconnects
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+    assert work.calls == 1
+
+
+def test_work_nobody_waits_for_still_finishes():
+    coalescer, work = Coalescer("quotes"), Work(delay=0.05)
+
+    async def main():
+        caller = asyncio.create_task(coalescer.run("AAPL", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.1)
+        # Finished and forgotten: the next call starts afresh
+        assert coalescer._inflight == {}
+        return await coalescer.run("AAPL", work)
+
+    assert asyncio.run(main()) == "done"
+    assert work.calls == 2 and work.running == 0
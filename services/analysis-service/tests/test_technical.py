@@ -0,0 +1,83 @@
+# services/analysis-service/tests/test_technical.py
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_market_data_service
+from app.services.market_data_service import MarketDataService
+from app.utils.helpers import lttb_indices
+from main import app
+
+
+def test_lttb_keeps_the_ends_and_returns_ascending_indices():
+    rng = np.random.default_rng(1)
+    x = np.arange(1000, dtype=np.float64)
+    y = np.cumsum(rng.normal(0, 1, 1000))
+    for threshold in (3, 10, 57, 500, 999):
+        keep = lttb_indices(x, y, threshold)
+        assert len(keep) == threshold
+        assert keep[0] == 0 and keep[-1] == 999
+        assert np.all(np.diff(keep) > 0)
+
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(1000)
+    y[[137, 612]] = [50.0, -40.0]
+    keep = lttb_indices(np.arange(1000), y, 20)
+    assert 137 in keep and 612 in keep
+
+
+def test_lttb_leaves_short_series_alone():
+    np.testing.assert_array_equal(lttb_indices(np.arange(10), np.arange(10), 10), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(np.arange(10), np.arange(10), 50), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(np.arange(10), np.arange(10), 2), np.arange(10))
+
+
+@pytest.fixture
+def client(alpha_vantage, history_store):
+    market_data = MarketDataService(history_store)
+    app.dependency_overrides[get_market_data_service] = lambda: market_data
+    alpha_vantage.closes["MSFT"] = list(100 + np.sin(np.arange(400) / 9) * 10 + np.arange(400) / 20)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_series_are_downsampled_to_max_points(client):
+    full = client.get("/analysis/technical/MSFT?period=1y&max_points=5000").json()
+    assert full["points"] == full["total_points"] > 300
+
+    sampled = client.get("/analysis/technical/MSFT?period=1y&max_points=50").json()
+    assert sampled["points"] == 50 and sampled["total_points"] == full["total_points"]
+    timestamps = sampled["series"]["timestamp"]
+    assert len(timestamps) == 50 and timestamps == sorted(set(timestamps))
+    assert timestamps[0] == full["series"]["timestamp"][0]
+    assert timestamps[-1] == full["series"]["timestamp"][-1]
+    # Every column is sampled at the same bars
+    index = {timestamp: i for i, timestamp in enumerate(full["series"]["timestamp"])}
+    for name, values in sampled["series"].items():
+        assert len(values) == 50
+        assert values == [full["series"][name][index[timestamp]] for timestamp in timestamps]
+
+
+def test_only_the_selected_indicators_are_computed(client):
+    body = client.get("/analysis/technical/MSFT?period=3m&indicators=rsi").json()
+    assert body["indicators"] == ["rsi"]
+    assert set(body["series"]) == {"timestamp", "open", "high", "low", "close", "volume", "rsi"}
+    # Warm-up bars before the range: the RSI is defined from the first point
+    assert body["series"]["rsi"][0] is not None
+
+    assert client.get("/analysis/technical/MSFT?indicators=rsi,vwap").status_code == 400
+    assert client.get("/analysis/technical/MSFT?period=2y").status_code == 400
+    assert client.get("/analysis/technical/MSFT?interval=2h").status_code == 400
+    assert client.get("/analysis/technical/MSFT?max_points=5").status_code == 422
+
+
+def test_matching_etag_gets_304(client):
+    url = "/analysis/technical/MSFT?period=6m&max_points=60"
+    first = client.get(url)
+    etag = first.headers["etag"]
+    revalidated = client.get(url, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    # max_points shapes the response, so it is part of the tag
+    assert client.get(url.replace("60", "61"), headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,107 @@
+# services/analysis-service/tests/test_tracing.py
+import asyncio
+
+import httpx
+import pytest
+
+from app.middleware.tracing import TracingMiddleware
+from app.resources import _propagate_trace
+from app.telemetry import InMemorySpanExporter, SimpleSpanProcessor, stage, track_upstream, tracer
+from app.telemetry.tracing import inject_headers, parse_traceparent
+
+REMOTE_TRACE = "0af7651916cd43dd8448eb211c80319c"
+REMOTE_PARENT = f"00-{REMOTE_TRACE}-b7ad6b7169203331-01"
+
+
+@pytest.fixture
+def exporter():
+    saved = (tracer.enabled, tracer.processor, tracer.sampler)
+    exporter = InMemorySpanExporter()
+    tracer.configure(enabled=True, sample_rate=1.0, processor=SimpleSpanProcessor(exporter))
+    yield exporter
+    tracer.enabled, tracer.processor, tracer.sampler = saved
+
+
+def test_parse_traceparent():
+    context = parse_traceparent(REMOTE_PARENT, "vendor=1")
+    assert context.trace_id_hex == REMOTE_TRACE
+    assert context.span_id_hex == "b7ad6b7169203331"
+    assert context.sampled and context.is_remote
+    assert context.trace_state == "vendor=1"
+    assert context.to_traceparent() == REMOTE_PARENT
+
+    for malformed in (None, "", "garbage", "ff-" + REMOTE_PARENT[3:],
+                      f"00-{'0' * 32}-b7ad6b7169203331-01", f"00-{REMOTE_TRACE}-xyz-01"):
+        assert parse_traceparent(malformed) is None
+
+
+def test_stages_and_upstream_calls_nest_under_one_trace(exporter):
+    with tracer.start_as_current_span("request", kind="server") as root:
+        with stage("market_data"):
+            with track_upstream("alpha_vantage", "quote"):
+                pass
+        with pytest.raises(RuntimeError):
+            with stage("llm_generation"):
+                raise RuntimeError("model unavailable")
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert set(spans) == {"request", "market_data", "alpha_vantage quote", "llm_generation"}
+    assert {span.context.trace_id for span in spans.values()} == {root.context.trace_id}
+    assert spans["market_data"].parent.span_id == root.context.span_id
+    assert spans["alpha_vantage quote"].parent.span_id == spans["market_data"].context.span_id
+    assert spans["alpha_vantage quote"].kind == "client"
+    assert spans["alpha_vantage quote"].attributes["upstream.provider"] == "alpha_vantage"
+    assert spans["llm_generation"].status_code == "ERROR"
+    assert spans["llm_generation"].events[0]["attributes"]["exception.type"] == "RuntimeError"
+    assert spans["request"].to_dict()["parentSpanId"] == ""
+
+
+def test_unsampled_traces_record_nothing_but_still_propagate(exporter):
+    tracer.configure(enabled=True, sample_rate=0.0, processor=tracer.processor)
+    with tracer.start_as_current_span("request", kind="server"):
+        with stage("market_data"):
+            headers = inject_headers({})
+
+    assert exporter.get_finished_spans() == []
+    assert headers["traceparent"].endswith("-00")
+
+
+def test_outbound_requests_carry_the_client_span_context(exporter):
+    request = httpx.Request("GET", "https://www.alphavantage.co/query")
+    with track_upstream("alpha_vantage", "quote"):
+        asyncio.run(_propagate_trace(request))
+
+    (span,) = exporter.get_finished_spans()
+    assert request.headers["traceparent"] == span.context.to_traceparent()
+
+
+def test_middleware_continues_the_gateway_trace(exporter):
+    async def app(scope, receive, send):
+        with stage("handler"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/analysis/technical/AAPL",
+        "headers": [(b"traceparent", REMOTE_PARENT.encode())]
+    }
+    asyncio.run(TracingMiddleware(app)(scope, receive, send))
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    server = spans["GET /analysis/technical/AAPL"]
+    assert server.context.trace_id_hex == REMOTE_TRACE
+    assert server.parent.span_id_hex == "b7ad6b7169203331"
+    assert server.attributes["http.status_code"] == 200
+    assert spans["handler"].parent.span_id == server.context.span_id
+    assert (b"x-trace-id", REMOTE_TRACE.encode()) in sent[0]["headers"]
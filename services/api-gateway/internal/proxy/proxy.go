@@ -2,6 +2,8 @@ package proxy
 
 import (
 	"api-gateway/internal/config"
+	"crypto/rand"
+	"encoding/hex"
 	"io"
 	"net/http"
 	"strings"
@@ -51,6 +53,15 @@ func (p *ProxyHandler) proxyRequest(w http.ResponseWriter, r *http.Request, targ
 		}
 	}
 
+	// Propagate W3C trace context; mint a trace id for requests that arrive without one
+	// so every backend span for this request joins the same trace. The gateway does not
+	// record spans itself, so the sampled flag is left unset for the backend to decide.
+	if proxyReq.Header.Get("traceparent") == "" {
+		if traceparent, err := newTraceparent(); err == nil {
+			proxyReq.Header.Set("traceparent", traceparent)
+		}
+	}
+
 	// Execute request with extended timeout for AI analysis
 	client := &http.Client{
 		Timeout: 120 * time.Second,
@@ -75,3 +86,12 @@ func (p *ProxyHandler) proxyRequest(w http.ResponseWriter, r *http.Request, targ
 	// Copy body
 	io.Copy(w, resp.Body)
 }
+
+// newTraceparent builds a W3C traceparent header with random trace and span ids
+func newTraceparent() (string, error) {
+	ids := make([]byte, 24)
+	if _, err := rand.Read(ids); err != nil {
+		return "", err
+	}
+	return "00-" + hex.EncodeToString(ids[:16]) + "-" + hex.EncodeToString(ids[16:]) + "-00", nil
+}